@@ -0,0 +1,43 @@
+import numpy as np
+
+# Generador compartido para las llamadas que no reciben uno explícito (sin semilla)
+_generador_global = np.random.default_rng()
+
+def crear_generador(semilla=None):
+    """
+    Crea el generador de números aleatorios de una ejecución
+
+    Con la misma semilla, la misma ejecución produce exactamente los mismos movimientos.
+
+    Args:
+        semilla (int): Semilla de la ejecución (None para una secuencia no reproducible)
+
+    Returns:
+        np.random.Generator: Generador de números aleatorios
+    """
+    return np.random.default_rng(semilla)
+
+def obtener_generador(rng=None):
+    """Devuelve rng si se indicó uno, o el generador compartido del módulo"""
+    return rng if rng is not None else _generador_global
+
+def entero(rng, minimo, maximo):
+    """Entero aleatorio en [minimo, maximo], ambos incluidos (como random.randint)"""
+    return int(rng.integers(minimo, maximo + 1))
+
+def decimal(rng, minimo, maximo):
+    """Número real aleatorio entre minimo y maximo (como random.uniform)"""
+    return float(rng.uniform(minimo, maximo))
+
+def elegir(rng, elementos):
+    """Elige un elemento de la lista (como random.choice)"""
+    return elementos[int(rng.integers(len(elementos)))]
+
+def muestra(rng, elementos, cantidad):
+    """Selecciona cantidad elementos distintos de la lista (como random.sample)"""
+    indices = rng.choice(len(elementos), size=cantidad, replace=False)
+    return [elementos[i] for i in indices]
+
+def mezclar(rng, elementos):
+    """Devuelve una copia de la lista en orden aleatorio (como random.shuffle, sin modificar la original)"""
+    return [elementos[i] for i in rng.permutation(len(elementos))]
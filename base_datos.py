@@ -0,0 +1,392 @@
+import os
+import sqlite3
+import sys
+import zlib
+from datetime import date, datetime
+
+import numpy as np
+import pandas as pd
+
+# Motores de base de datos disponibles
+BACKEND_SQLSERVER = 'sqlserver'
+BACKEND_SQLITE = 'sqlite'
+BACKENDS = (BACKEND_SQLSERVER, BACKEND_SQLITE)
+
+# Configuración por variables de entorno:
+#   INVENTARIO_BACKEND = sqlserver (predeterminado) | sqlite
+#   INVENTARIO_SQLITE  = ruta del archivo SQLite (predeterminado: inventario.db junto a este módulo)
+VARIABLE_BACKEND = 'INVENTARIO_BACKEND'
+VARIABLE_RUTA_SQLITE = 'INVENTARIO_SQLITE'
+RUTA_SQLITE_PREDETERMINADA = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'inventario.db')
+
+# Segundos que SQLite espera a que otra conexión libere el archivo antes de fallar
+TIEMPO_ESPERA_SQLITE = 30
+
+# Tablas que usan los generadores y el libro auxiliar, con los mismos nombres de columna que en SQL Server
+ESQUEMA_SQLITE = """
+CREATE TABLE IF NOT EXISTS Inventario (
+    CODIGO VARCHAR(50) PRIMARY KEY,
+    CATEGORIA VARCHAR(100),
+    TIPO VARCHAR(100),
+    DESCRIPCION VARCHAR(255),
+    MARCA VARCHAR(100),
+    Linea VARCHAR(50),
+    PRECIO_COMPRA FLOAT,
+    PRECIO_VENTA FLOAT,
+    COSTO_REFERENCIA FLOAT,
+    EXISTENCIA FLOAT
+);
+
+CREATE TABLE IF NOT EXISTS InventarioContable (
+    Periodo VARCHAR(7) PRIMARY KEY,
+    Descripcion VARCHAR(100),
+    Inicial FLOAT,
+    Final FLOAT,
+    AjusteCompras FLOAT DEFAULT 0,
+    AjusteVentas FLOAT DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS MovInvent (
+    Product VARCHAR(50),
+    Fecha DATETIME,
+    Tipo VARCHAR(20),
+    Motivo VARCHAR(100),
+    Cantidad_Actual FLOAT,
+    Cantidad FLOAT,
+    Co_Usuario VARCHAR(20),
+    Codigo VARCHAR(50),
+    Precio_Compra FLOAT,
+    Precio_venta FLOAT,
+    cantidad_nueva FLOAT,
+    autoriza VARCHAR(20),
+    Documento VARCHAR(50),
+    Anulada INTEGER DEFAULT 0,
+    Alicuota FLOAT
+);
+CREATE INDEX IF NOT EXISTS IX_MovInvent_Fecha ON MovInvent (Fecha);
+
+CREATE TABLE IF NOT EXISTS MovInventMes (
+    Periodo VARCHAR(7),
+    Codigo VARCHAR(50),
+    inicial FLOAT,
+    Costo FLOAT,
+    Descripcion VARCHAR(255),
+    Entradas FLOAT,
+    Salidas FLOAT,
+    AutoConsumo FLOAT,
+    Retiros FLOAT,
+    final FLOAT,
+    Fecha DATETIME,
+    Inventario FLOAT
+);
+CREATE INDEX IF NOT EXISTS IX_MovInventMes_Periodo ON MovInventMes (Periodo, Codigo);
+
+CREATE TABLE IF NOT EXISTS MovInventMesPreparacion (
+    Periodo VARCHAR(7),
+    Codigo VARCHAR(50),
+    inicial FLOAT,
+    Costo FLOAT,
+    Descripcion VARCHAR(255),
+    Entradas FLOAT,
+    Salidas FLOAT,
+    AutoConsumo FLOAT,
+    Retiros FLOAT,
+    final FLOAT,
+    Fecha DATETIME,
+    Inventario FLOAT
+);
+CREATE INDEX IF NOT EXISTS IX_MovInventMesPreparacion_Periodo ON MovInventMesPreparacion (Periodo, Codigo);
+
+CREATE TABLE IF NOT EXISTS MovPeridoMes (
+    Periodo VARCHAR(7),
+    Codigo VARCHAR(50),
+    Descripcion VARCHAR(255),
+    Costo FLOAT,
+    Inicial FLOAT,
+    Entradas FLOAT,
+    Salidas FLOAT,
+    AutoConsumo FLOAT,
+    Retiros FLOAT,
+    Fecha DATETIME
+);
+CREATE INDEX IF NOT EXISTS IX_MovPeridoMes_Periodo ON MovPeridoMes (Periodo);
+"""
+
+# Configuración fijada desde el código (tiene prioridad sobre las variables de entorno)
+_configuracion = {}
+# Bases SQL Server en las que ya se verificó la tabla de preparación
+_preparacion_creada = set()
+# Sentencias ejecutadas por las conexiones SQLite abiertas con el contador activo
+_contador_sentencias = {'activo': False, 'sentencias': 0}
+
+def configurar_backend(backend, ruta_sqlite=None):
+    """
+    Selecciona el motor de base de datos para las conexiones que se abran a partir de ahora
+
+    Args:
+        backend (str): 'sqlserver' o 'sqlite'
+        ruta_sqlite (str): Archivo SQLite a usar (solo para 'sqlite')
+    """
+    backend = backend.lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend desconocido: {backend} (opciones: {', '.join(BACKENDS)})")
+    _configuracion['backend'] = backend
+    _configuracion['ruta_sqlite'] = ruta_sqlite
+
+def backend_actual():
+    """Motor de base de datos configurado ('sqlserver' o 'sqlite')"""
+    backend = _configuracion.get('backend') or os.environ.get(VARIABLE_BACKEND) or BACKEND_SQLSERVER
+    backend = backend.lower()
+    if backend not in BACKENDS:
+        raise ValueError(f"Backend desconocido en {VARIABLE_BACKEND}: {backend}")
+    return backend
+
+def es_sqlite():
+    """Indica si las conexiones se abren contra SQLite"""
+    return backend_actual() == BACKEND_SQLITE
+
+def ruta_sqlite():
+    """Ruta del archivo SQLite configurado"""
+    return (_configuracion.get('ruta_sqlite') or os.environ.get(VARIABLE_RUTA_SQLITE)
+            or RUTA_SQLITE_PREDETERMINADA)
+
+def clave_conexion(cadena_conexion):
+    """
+    Identifica la base de datos a la que apunta una cadena de conexión con el motor configurado
+
+    Con SQL Server es la propia cadena ODBC; con SQLite todas las cadenas apuntan al mismo
+    archivo, de modo que los módulos comparten un único pool.
+
+    Args:
+        cadena_conexion (str): Cadena de conexión ODBC del módulo
+
+    Returns:
+        str|tuple: Clave del pool de conexiones
+    """
+    if es_sqlite():
+        return (BACKEND_SQLITE, os.path.abspath(ruta_sqlite()))
+    return cadena_conexion
+
+def conectar(cadena_conexion):
+    """
+    Abre una conexión nueva con el motor configurado
+
+    Args:
+        cadena_conexion (str): Cadena de conexión ODBC (se ignora con SQLite)
+
+    Returns:
+        Connection: Conexión pyodbc o sqlite3
+    """
+    if es_sqlite():
+        return conectar_sqlite(ruta_sqlite())
+    return importar_pyodbc().connect(cadena_conexion)
+
+def importar_pyodbc():
+    """
+    Importa pyodbc al abrir la primera conexión a SQL Server
+
+    La importación es diferida para que el backend SQLite funcione sin pyodbc ni el
+    controlador ODBC instalados.
+
+    Returns:
+        module: Módulo pyodbc
+    """
+    import pyodbc
+    return pyodbc
+
+def pyodbc_importado():
+    """
+    Módulo pyodbc si ya se importó en este proceso, o None
+
+    Sirve para reconocer errores de pyodbc sin importarlo: si nunca se importó, ninguna
+    conexión pudo lanzarlos.
+    """
+    return sys.modules.get('pyodbc')
+
+def error_de_uso():
+    """Clase ProgrammingError del controlador del motor configurado"""
+    if es_sqlite():
+        return sqlite3.ProgrammingError
+    return importar_pyodbc().ProgrammingError
+
+def conectar_sqlite(ruta):
+    """
+    Abre una conexión SQLite lista para las consultas de los generadores
+
+    Crea las tablas que falten y registra las funciones de SQL Server que usan las
+    consultas (YEAR, MONTH, CONCAT, BINARY_CHECKSUM, CHECKSUM_AGG). El esquema se verifica
+    en cada conexión nueva (no por ruta y proceso): el archivo puede haberse borrado y
+    creado de nuevo desde la última vez.
+
+    Args:
+        ruta (str): Archivo de la base de datos
+
+    Returns:
+        sqlite3.Connection: Conexión abierta
+    """
+    directorio = os.path.dirname(os.path.abspath(ruta))
+    os.makedirs(directorio, exist_ok=True)
+
+    # check_same_thread=False: el pool puede entregar la conexión a otro hilo
+    conn = sqlite3.connect(ruta, timeout=TIEMPO_ESPERA_SQLITE, detect_types=sqlite3.PARSE_DECLTYPES,
+                           check_same_thread=False)
+    _registrar_funciones(conn)
+    conn.execute("PRAGMA journal_mode=WAL")
+    crear_esquema(conn)
+    # Después del esquema, para que el contador mida solo el trabajo de los generadores
+    if _contador_sentencias['activo']:
+        conn.set_trace_callback(_contar_sentencia)
+    return conn
+
+def activar_contador_sentencias():
+    """
+    Cuenta las sentencias que ejecuten las conexiones SQLite abiertas a partir de ahora
+
+    SQLite no tiene viajes de red: el contador es la aproximación de los viajes de ida
+    y vuelta que usa el benchmark (executemany cuenta una sentencia por fila).
+    """
+    _contador_sentencias['activo'] = True
+
+def sentencias_ejecutadas():
+    """Número de sentencias contadas desde el último reinicio"""
+    return _contador_sentencias['sentencias']
+
+def reiniciar_contador_sentencias():
+    """Pone a cero el contador de sentencias"""
+    _contador_sentencias['sentencias'] = 0
+
+def _contar_sentencia(sentencia):
+    _contador_sentencias['sentencias'] += 1
+
+def crear_esquema(conn):
+    """Crea en SQLite las tablas e índices que aún no existan"""
+    conn.executescript(ESQUEMA_SQLITE)
+    conn.commit()
+
+def asegurar_tabla_preparacion(conn, cadena_conexion):
+    """
+    Crea, si no existe, la tabla MovInventMesPreparacion donde se escribe un mes antes de publicarlo
+
+    En SQLite forma parte del esquema; en SQL Server se crea con la misma estructura que
+    MovInventMes (SELECT TOP 0 ... INTO), una sola vez por base de datos y proceso.
+
+    Args:
+        conn: Conexión abierta a la base de datos
+        cadena_conexion (str): Cadena de conexión del módulo, para no repetir la verificación
+    """
+    if es_sqlite():
+        return
+    if cadena_conexion in _preparacion_creada:
+        return
+    cursor = conn.cursor()
+    cursor.execute("""
+        IF OBJECT_ID('dbo.MovInventMesPreparacion', 'U') IS NULL
+        BEGIN
+            SELECT TOP 0 * INTO dbo.MovInventMesPreparacion FROM dbo.MovInventMes;
+            CREATE INDEX IX_MovInventMesPreparacion_Periodo ON dbo.MovInventMesPreparacion (Periodo, Codigo);
+        END
+    """)
+    conn.commit()
+    _preparacion_creada.add(cadena_conexion)
+
+def crear_punto_guardado(cursor, nombre):
+    """
+    Marca un punto de guardado en la transacción en curso (la abre si hace falta)
+
+    Args:
+        cursor: Cursor de la transacción
+        nombre (str): Nombre del punto de guardado
+    """
+    if es_sqlite():
+        cursor.execute(f"SAVEPOINT {nombre}")
+    else:
+        # SAVE TRANSACTION necesita una transacción abierta. pyodbc sin autocommit trabaja con
+        # IMPLICIT_TRANSACTIONS ON: ahí BEGIN TRANSACTION abre la transacción implícita y además
+        # una anidada (@@TRANCOUNT = 2), y conn.commit() solo bajaría un nivel. El COMMIT interno
+        # cierra la anidada y deja la implícita, que confirma o deshace conn.commit()/rollback().
+        cursor.execute(f"""
+            IF @@TRANCOUNT = 0
+            BEGIN
+                BEGIN TRANSACTION;
+                IF @@TRANCOUNT > 1 COMMIT TRANSACTION;
+            END;
+            SAVE TRANSACTION {nombre}
+        """)
+
+def deshacer_hasta_punto_guardado(cursor, nombre):
+    """Deshace lo hecho desde el punto de guardado; la transacción sigue abierta y el punto se descarta"""
+    if es_sqlite():
+        cursor.execute(f"ROLLBACK TO SAVEPOINT {nombre}")
+        cursor.execute(f"RELEASE SAVEPOINT {nombre}")
+    else:
+        cursor.execute(f"ROLLBACK TRANSACTION {nombre}")
+
+def liberar_punto_guardado(cursor, nombre):
+    """Descarta el punto de guardado conservando lo hecho desde él (en SQL Server no hace falta)"""
+    if es_sqlite():
+        cursor.execute(f"RELEASE SAVEPOINT {nombre}")
+
+def _anio(valor):
+    fecha = _a_fecha(valor)
+    return fecha.year if fecha is not None else None
+
+def _mes(valor):
+    fecha = _a_fecha(valor)
+    return fecha.month if fecha is not None else None
+
+def _a_fecha(valor):
+    """Interpreta las fechas guardadas por SQLite (texto ISO) como datetime"""
+    if valor is None:
+        return None
+    if isinstance(valor, (datetime, date)):
+        return valor
+    try:
+        return datetime.fromisoformat(str(valor))
+    except ValueError:
+        return None
+
+def _concat(*valores):
+    """CONCAT de SQL Server: los nulos se tratan como cadena vacía"""
+    return ''.join('' if valor is None else str(valor) for valor in valores)
+
+def _binary_checksum(*valores):
+    """Equivalente de BINARY_CHECKSUM: entero de 32 bits con signo que cambia si cambia algún valor"""
+    suma = zlib.crc32(repr(valores).encode('utf-8'))
+    return suma - (1 << 32) if suma >= (1 << 31) else suma
+
+class _ChecksumAgg:
+    """Equivalente de CHECKSUM_AGG: combina los checksums de las filas con XOR"""
+
+    def __init__(self):
+        self.suma = None
+
+    def step(self, valor):
+        if valor is not None:
+            self.suma = valor if self.suma is None else self.suma ^ valor
+
+    def finalize(self):
+        return self.suma
+
+def _registrar_funciones(conn):
+    conn.create_function('YEAR', 1, _anio, deterministic=True)
+    conn.create_function('MONTH', 1, _mes, deterministic=True)
+    conn.create_function('CONCAT', -1, _concat, deterministic=True)
+    conn.create_function('BINARY_CHECKSUM', -1, _binary_checksum, deterministic=True)
+    conn.create_aggregate('CHECKSUM_AGG', 1, _ChecksumAgg)
+
+def _fecha_sql(valor):
+    return valor.isoformat(' ')
+
+def _leer_fecha(valor):
+    return datetime.fromisoformat(valor.decode('utf-8'))
+
+# Tipos que SQLite no sabe guardar por sí mismo: fechas (también las de pandas) y escalares de NumPy
+sqlite3.register_adapter(datetime, _fecha_sql)
+sqlite3.register_adapter(pd.Timestamp, lambda valor: _fecha_sql(valor.to_pydatetime()))
+sqlite3.register_adapter(date, lambda valor: valor.isoformat())
+for _tipo in (np.int8, np.int16, np.int32, np.int64, np.uint8, np.uint16, np.uint32, np.uint64):
+    sqlite3.register_adapter(_tipo, int)
+for _tipo in (np.float16, np.float32, np.float64):
+    sqlite3.register_adapter(_tipo, float)
+sqlite3.register_adapter(np.bool_, bool)
+sqlite3.register_converter('DATETIME', _leer_fecha)
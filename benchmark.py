@@ -0,0 +1,361 @@
+import argparse
+import calendar
+import contextlib
+import csv
+import io
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+import base_datos
+from instrumentacion import medicion
+
+# Directorio predeterminado de las bases sintéticas y de los resultados
+DIRECTORIO_RESULTADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'resultados_benchmark')
+
+TAMAÑOS_PREDETERMINADOS = (1000, 10000, 100000)
+AÑO_PREDETERMINADO = 2024
+MOTORES = ('directo', 'directo_vectorizado', 'clasico', 'procesar', 'procesar_agrupado', 'excel')
+
+# Columnas del archivo CSV (mismo orden que las claves de cada resultado)
+COLUMNAS_RESULTADO = (
+    'motor', 'productos', 'periodos', 'correcto', 'segundos', 'filas', 'filas_por_segundo',
+    'sentencias', 'viajes', 'segundos_bd', 'memoria_pico_mb', 'memoria_base_mb', 'error'
+)
+
+def crear_base_sintetica(ruta, productos, año_inicial=AÑO_PREDETERMINADO, años=2, semilla=0):
+    """
+    Crea una base SQLite con un catálogo y una cadena de InventarioContable sintéticos
+
+    El valor inicial de la cadena es el valor del catálogo (precio de compra x existencia) y
+    cada mes cierra con una variación aleatoria de -4% a +6% sobre su inicial; el inicial de
+    cada mes es el final del anterior, empezando en diciembre del año previo.
+
+    Args:
+        ruta (str): Archivo SQLite a crear (se reemplaza si existe)
+        productos (int): Número de productos del catálogo
+        año_inicial (int): Primer año de la cadena
+        años (int): Número de años de la cadena
+        semilla (int): Semilla de los datos sintéticos
+    """
+    if os.path.exists(ruta):
+        os.remove(ruta)
+    rng = np.random.default_rng(semilla)
+
+    codigos = [f"{i:010d}" for i in range(1000, 1000 + productos)]
+    precios_compra = np.round(rng.uniform(5.0, 500.0, productos), 2)
+    precios_venta = np.round(precios_compra * rng.uniform(1.1, 1.6, productos), 2)
+    existencias = rng.integers(0, 120, productos)
+    categorias = rng.integers(0, 20, productos)
+    filas_inventario = [
+        (codigo, f"CATEGORIA {categoria}", f"TIPO {i % 7}", f"PRODUCTO {i}", f"MARCA {i % 50}", 'GENERAL',
+         float(compra), float(venta), float(compra), int(existencia))
+        for i, (codigo, categoria, compra, venta, existencia)
+        in enumerate(zip(codigos, categorias, precios_compra, precios_venta, existencias))
+    ]
+
+    valor = round(float(np.dot(precios_compra, existencias)), 2)
+    filas_contable = [(f"12/{año_inicial - 1}", f"DICIEMBRE {año_inicial - 1}", valor, valor)]
+    for año in range(año_inicial, año_inicial + años):
+        for mes in range(1, 13):
+            final = round(valor * (1 + rng.uniform(-0.04, 0.06)), 2)
+            filas_contable.append((f"{mes:02d}/{año}", f"{mes:02d}/{año}", valor, final))
+            valor = final
+
+    conn = base_datos.conectar_sqlite(ruta)
+    try:
+        conn.executemany("""
+            INSERT INTO Inventario (CODIGO, CATEGORIA, TIPO, DESCRIPCION, MARCA, Linea,
+                                    PRECIO_COMPRA, PRECIO_VENTA, COSTO_REFERENCIA, EXISTENCIA)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, filas_inventario)
+        conn.executemany("""
+            INSERT INTO InventarioContable (Periodo, Descripcion, Inicial, Final, AjusteCompras, AjusteVentas)
+            VALUES (?, ?, ?, ?, 0, 0)
+        """, filas_contable)
+        conn.commit()
+    finally:
+        conn.close()
+
+def _memoria_pico_mb():
+    """Memoria residente máxima del proceso en MB (None si la plataforma no la informa)"""
+    try:
+        import resource
+    except ImportError:
+        resource = None
+    if resource is not None:
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux informa KB y macOS bytes
+        return pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024
+    try:
+        import psutil
+        return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+    except (ImportError, AttributeError):
+        return None
+
+def _contar_filas(tabla, periodos):
+    from conexion import obtener_pool
+    conn = obtener_pool('benchmark').obtener()
+    try:
+        cursor = conn.cursor()
+        marcadores = ', '.join('?' for _ in periodos)
+        if tabla == 'MovInvent':
+            # MovInvent no tiene período: se cuenta por mes y año de la fecha
+            condiciones = ' OR '.join('(MONTH(Fecha) = ? AND YEAR(Fecha) = ?)' for _ in periodos)
+            parametros = [valor for periodo in periodos for valor in (int(periodo[:2]), int(periodo[3:]))]
+            cursor.execute(f"SELECT COUNT(*) FROM MovInvent WHERE {condiciones}", parametros)
+        else:
+            cursor.execute(f"SELECT COUNT(*) FROM {tabla} WHERE Periodo IN ({marcadores})", list(periodos))
+        return int(cursor.fetchone()[0])
+    finally:
+        conn.close()
+
+def _ejecutar_motor(motor, año, meses, semilla):
+    """Ejecuta un motor y devuelve (correcto, tabla y períodos cuyas filas se cuentan)"""
+    periodos = [f"{mes:02d}/{año}" for mes in meses]
+
+    if motor == 'directo':
+        from generador_inventario_directo import generar_movimientos_directo
+        correcto = all(generar_movimientos_directo(año, mes, semilla=semilla) for mes in meses)
+        return correcto, 'MovInventMes', periodos
+
+    if motor == 'directo_vectorizado':
+        # El generador NumPy con todo el catálogo, no solo los productos del criterio por fila
+        from generador_inventario_directo import generar_movimientos_directo, obtener_productos
+        num_productos = len(obtener_productos())
+        correcto = all(generar_movimientos_directo(año, mes, semilla=semilla, vectorizado=True, num_productos=num_productos)
+                       for mes in meses)
+        return correcto, 'MovInventMes', periodos
+
+    if motor == 'clasico':
+        from aleatorio import crear_generador
+        from generador_inventario import generar_movimientos, insertar_movimientos
+        rng = crear_generador(semilla)
+        correcto = True
+        for mes in meses:
+            movimientos = generar_movimientos(año, mes, rng=rng)
+            correcto = correcto and bool(movimientos)
+            if movimientos:
+                insertar_movimientos(movimientos)
+        return correcto, 'MovInvent', periodos
+
+    if motor in ('procesar', 'procesar_agrupado'):
+        from generador_inventario import procesar_movimientos_inventario
+        correcto = True
+        for mes, periodo in zip(meses, periodos):
+            # Mismo rango de fechas que generar_y_procesar_mes
+            ultimo_dia = calendar.monthrange(año, mes)[1]
+            correcto = procesar_movimientos_inventario(periodo, datetime(año, mes, 1), datetime(año, mes, ultimo_dia),
+                                                       agrupado=motor == 'procesar_agrupado') and correcto
+        return correcto, 'MovInventMes', periodos
+
+    if motor == 'excel':
+        from generador_inventario_execel import generar_excel_inventario
+        archivo = generar_excel_inventario(año)
+        if archivo and os.path.exists(archivo):
+            os.remove(archivo)
+        return bool(archivo), 'MovInventMes', [f"{mes:02d}/{año}" for mes in range(1, 13)]
+
+    raise ValueError(f"Motor desconocido: {motor} (opciones: {', '.join(MOTORES)})")
+
+def ejecutar_caso(motor, ruta_bd, año, meses, semilla=None, directorio=None):
+    """
+    Mide un motor sobre una base SQLite (se ejecuta en un proceso nuevo por caso)
+
+    La salida por consola del motor se descarta durante la medición, de modo que el
+    tiempo no incluye la escritura en la terminal. Los viajes son las llamadas a execute
+    y executemany registradas por los cursores del pool (ver instrumentacion).
+
+    Args:
+        motor (str): 'directo', 'directo_vectorizado', 'clasico', 'procesar', 'procesar_agrupado' o 'excel'
+        ruta_bd (str): Archivo SQLite sobre el que se ejecuta
+        año (int): Año a procesar
+        meses (list): Meses a procesar (el motor 'excel' siempre usa el año completo)
+        semilla (int): Semilla de los generadores
+        directorio (str): Directorio de trabajo (donde se escriben los archivos Excel)
+
+    Returns:
+        dict: Resultado con las columnas de COLUMNAS_RESULTADO (salvo productos)
+    """
+    base_datos.configurar_backend(base_datos.BACKEND_SQLITE, ruta_bd)
+    base_datos.activar_contador_sentencias()
+    if directorio:
+        os.chdir(directorio)
+
+    memoria_base = _memoria_pico_mb()
+    base_datos.reiniciar_contador_sentencias()
+    error = None
+    inicio = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()), medicion(motor, mostrar=False) as medida:
+            correcto, tabla, periodos = _ejecutar_motor(motor, año, meses, semilla)
+    except Exception as e:
+        correcto, tabla, periodos = False, None, []
+        error = f"{type(e).__name__}: {e}"
+    segundos = time.perf_counter() - inicio
+    sentencias = base_datos.sentencias_ejecutadas()
+
+    filas = _contar_filas(tabla, periodos) if tabla else 0
+    return {
+        'motor': motor,
+        'periodos': len(periodos),
+        'correcto': bool(correcto),
+        'segundos': round(segundos, 3),
+        'filas': filas,
+        'filas_por_segundo': round(filas / segundos, 1) if segundos > 0 else None,
+        'sentencias': sentencias,
+        'viajes': medida.sentencias,
+        'segundos_bd': round(medida.segundos_bd, 3),
+        'memoria_pico_mb': _redondear(_memoria_pico_mb()),
+        'memoria_base_mb': _redondear(memoria_base),
+        'error': error
+    }
+
+def _redondear(valor):
+    return round(valor, 1) if valor is not None else None
+
+def _en_proceso_nuevo(*argumentos):
+    """Ejecuta un caso en un proceso propio: memoria pico, cachés y pools no se comparten entre casos"""
+    contexto = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=contexto) as ejecutor:
+        return ejecutor.submit(ejecutar_caso, *argumentos).result()
+
+def ejecutar_benchmark(tamaños=TAMAÑOS_PREDETERMINADOS, motores=MOTORES, año=AÑO_PREDETERMINADO, meses=(1,),
+                       años=2, semilla=0, directorio=DIRECTORIO_RESULTADOS):
+    """
+    Sintetiza una base por tamaño de catálogo y mide cada motor sobre ella
+
+    Cada motor trabaja sobre su propia copia de la base sintética: 'excel' usa la copia de
+    'directo' (necesita MovInventMes del año) y 'procesar' y 'procesar_agrupado' la de 'clasico'
+    (necesitan MovInvent).
+
+    Args:
+        tamaños (list): Números de productos del catálogo
+        motores (list): Motores a medir, en el orden de MOTORES
+        año (int): Año a procesar (primer año de la cadena sintética)
+        meses (list): Meses que procesan los motores por mes
+        años (int): Años de la cadena de InventarioContable
+        semilla (int): Semilla de los datos y de los generadores
+        directorio (str): Directorio de las bases y de los resultados
+
+    Returns:
+        list: Resultados de cada caso (ver ejecutar_caso)
+    """
+    os.makedirs(directorio, exist_ok=True)
+    directorio = os.path.abspath(directorio)
+    base_de = {'directo': None, 'directo_vectorizado': None, 'clasico': None, 'procesar': 'clasico', 'procesar_agrupado': 'clasico',
+               'excel': 'directo'}
+    resultados = []
+
+    for productos in tamaños:
+        ruta_base = os.path.join(directorio, f"sintetica_{productos}.db")
+        print(f"Creando base sintética con {productos} productos...")
+        crear_base_sintetica(ruta_base, productos, año, años, semilla)
+
+        copias = {}
+        for motor in (m for m in MOTORES if m in motores):
+            origen = base_de[motor]
+            if origen in copias:
+                ruta = copias[origen]
+            else:
+                ruta = os.path.join(directorio, f"sintetica_{productos}_{motor}.db")
+                shutil.copy(ruta_base, ruta)
+            copias[motor] = ruta
+
+            print(f"  {motor:<20} {productos:>7} productos...", end=' ', flush=True)
+            resultado = _en_proceso_nuevo(motor, ruta, año, list(meses), semilla, directorio)
+            resultado = {'productos': productos, **resultado}
+            resultados.append(resultado)
+            print(f"{resultado['segundos']:.2f} s, {resultado['filas']} filas, {resultado['viajes']} viajes, "
+                  f"{resultado['sentencias']} sentencias" + ("" if resultado['correcto'] else " (ERROR)"))
+
+        for ruta in set(copias.values()) | {ruta_base}:
+            for sufijo in ('', '-wal', '-shm'):
+                if os.path.exists(ruta + sufijo):
+                    os.remove(ruta + sufijo)
+
+    return resultados
+
+def _commit_actual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def guardar_resultados(resultados, directorio=DIRECTORIO_RESULTADOS, parametros=None):
+    """
+    Guarda los resultados en JSON (con los datos de la ejecución) y en CSV
+
+    Returns:
+        tuple: (ruta del JSON, ruta del CSV)
+    """
+    commit = _commit_actual()
+    nombre = f"benchmark_{datetime.now().strftime('%Y%m%d_%H%M%S')}" + (f"_{commit}" if commit else "")
+    ruta_json = os.path.join(directorio, f"{nombre}.json")
+    ruta_csv = os.path.join(directorio, f"{nombre}.csv")
+
+    with open(ruta_json, 'w', encoding='utf-8') as archivo:
+        json.dump({
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'commit': commit,
+            'python': platform.python_version(),
+            'plataforma': platform.platform(),
+            'parametros': parametros or {},
+            'resultados': resultados
+        }, archivo, indent=2, ensure_ascii=False)
+
+    with open(ruta_csv, 'w', newline='', encoding='utf-8') as archivo:
+        escritor = csv.DictWriter(archivo, fieldnames=COLUMNAS_RESULTADO)
+        escritor.writeheader()
+        escritor.writerows(resultados)
+
+    return ruta_json, ruta_csv
+
+def comparar_resultados(ruta_anterior, resultados):
+    """Muestra la variación de tiempo y sentencias de cada caso respecto a un JSON anterior"""
+    with open(ruta_anterior, encoding='utf-8') as archivo:
+        anterior = json.load(archivo)
+    previos = {(r['motor'], r['productos']): r for r in anterior['resultados']}
+
+    print(f"\nComparación con {os.path.basename(ruta_anterior)} (commit {anterior.get('commit')}):")
+    for resultado in resultados:
+        previo = previos.get((resultado['motor'], resultado['productos']))
+        if previo is None or not previo['segundos']:
+            continue
+        print(f"  {resultado['motor']:<9} {resultado['productos']:>7} productos: "
+              f"{previo['segundos']:.2f} s -> {resultado['segundos']:.2f} s "
+              f"(x{previo['segundos'] / resultado['segundos']:.2f}), "
+              f"viajes {previo.get('viajes')} -> {resultado['viajes']}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de los motores de generación sobre bases SQLite sintéticas")
+    parser.add_argument('--tamaños', type=int, nargs='+', default=list(TAMAÑOS_PREDETERMINADOS),
+                        help="Números de productos del catálogo")
+    parser.add_argument('--motores', nargs='+', choices=MOTORES, default=list(MOTORES))
+    parser.add_argument('--año', type=int, default=AÑO_PREDETERMINADO)
+    parser.add_argument('--meses', type=int, nargs='+', default=[1], help="Meses que procesan los motores por mes")
+    parser.add_argument('--años', type=int, default=2, help="Años de la cadena de InventarioContable")
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--directorio', default=DIRECTORIO_RESULTADOS)
+    parser.add_argument('--comparar', help="JSON de una ejecución anterior para comparar")
+    args = parser.parse_args()
+
+    resultados = ejecutar_benchmark(args.tamaños, args.motores, args.año, args.meses, args.años,
+                                    args.semilla, args.directorio)
+    ruta_json, ruta_csv = guardar_resultados(resultados, args.directorio, parametros={
+        'tamaños': args.tamaños, 'motores': args.motores, 'año': args.año,
+        'meses': args.meses, 'años': args.años, 'semilla': args.semilla
+    })
+    print(f"\nResultados guardados en {ruta_json} y {ruta_csv}")
+    if args.comparar:
+        comparar_resultados(args.comparar, resultados)
@@ -0,0 +1,270 @@
+import hashlib
+import os
+import pickle
+import sys
+import threading
+
+import numpy as np
+import pandas as pd
+
+from registro import obtener_registro
+
+log = obtener_registro('catalogo')
+
+# Directorio de las copias en disco del catálogo (una por consulta y base de datos)
+DIRECTORIO_SNAPSHOTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache_catalogo')
+
+# Marca de la tabla Inventario: cambia si se agrega, elimina o modifica cualquier producto
+CONSULTA_MARCA_INVENTARIO = """
+SELECT
+    COUNT(*) AS Filas,
+    CHECKSUM_AGG(BINARY_CHECKSUM(CODIGO, CATEGORIA, TIPO, DESCRIPCION, MARCA,
+                                 PRECIO_COMPRA, PRECIO_VENTA, EXISTENCIA)) AS Suma
+FROM Inventario
+"""
+
+# Productos con existencia que pueden recibir movimientos (excluye los registros especiales)
+CONSULTA_PRODUCTOS = """
+SELECT CODIGO, CATEGORIA, TIPO, DESCRIPCION, MARCA, PRECIO_COMPRA, EXISTENCIA
+FROM Inventario
+WHERE EXISTENCIA > 0 AND CODIGO NOT IN ('0000000001', '0000000002')
+ORDER BY CODIGO
+"""
+
+# Catálogos cargados en este proceso: {clave: (marca, datos)}
+_catalogos = {}
+_bloqueo_catalogos = threading.Lock()
+
+def marca_inventario(conn):
+    """
+    Obtiene la marca de cambios de la tabla Inventario
+
+    Args:
+        conn: Conexión abierta a la base de datos
+
+    Returns:
+        tuple: (número de filas, checksum de la tabla)
+    """
+    cursor = conn.cursor()
+    cursor.execute(CONSULTA_MARCA_INVENTARIO)
+    filas, suma = cursor.fetchone()
+    return (int(filas), int(suma) if suma is not None else 0)
+
+def _ruta_snapshot(clave):
+    nombre = hashlib.sha1(repr(clave).encode('utf-8')).hexdigest()
+    return os.path.join(DIRECTORIO_SNAPSHOTS, f'{nombre}.pkl')
+
+def _leer_snapshot(ruta, marca):
+    """Lee la copia en disco del catálogo; None si no existe o la tabla cambió desde que se guardó"""
+    try:
+        with open(ruta, 'rb') as archivo:
+            contenido = pickle.load(archivo)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+    if contenido.get('marca') != marca:
+        return None
+    return contenido['datos']
+
+def _guardar_snapshot(ruta, marca, datos):
+    """Guarda la copia en disco del catálogo (se escribe en un temporal y se renombra)"""
+    try:
+        os.makedirs(DIRECTORIO_SNAPSHOTS, exist_ok=True)
+        temporal = f'{ruta}.tmp'
+        with open(temporal, 'wb') as archivo:
+            pickle.dump({'marca': marca, 'datos': datos}, archivo, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporal, ruta)
+    except OSError as e:
+        log.warning(f"Advertencia: No se pudo guardar el catálogo en disco: {str(e)}")
+
+def obtener_catalogo(clave, cargar, obtener_conexion, snapshot=True):
+    """
+    Obtiene un catálogo de productos leyendo la tabla Inventario solo si cambió
+
+    Antes de cargar se consulta la marca de la tabla (ver marca_inventario). Si coincide
+    con la del catálogo ya cargado en este proceso, o con la de la copia en disco, se
+    devuelve ese catálogo sin repetir la consulta completa.
+
+    Args:
+        clave (tuple): Identificador del catálogo, p. ej. ('productos', cadena_conexion)
+        cargar (function): Función que recibe la conexión y devuelve el catálogo
+        obtener_conexion (function): Función que devuelve una conexión del pool
+        snapshot (bool): Si se usa la copia en disco entre ejecuciones
+
+    Returns:
+        Catalogo|list: El catálogo (las listas se devuelven como copia)
+    """
+    conn = obtener_conexion()
+    try:
+        marca = marca_inventario(conn)
+
+        with _bloqueo_catalogos:
+            en_memoria = _catalogos.get(clave)
+        if en_memoria is not None and en_memoria[0] == marca:
+            return _copia(en_memoria[1])
+
+        ruta = _ruta_snapshot(clave)
+        datos = _leer_snapshot(ruta, marca) if snapshot else None
+        if datos is None:
+            datos = cargar(conn)
+            if snapshot:
+                _guardar_snapshot(ruta, marca, datos)
+
+        with _bloqueo_catalogos:
+            _catalogos[clave] = (marca, datos)
+        return _copia(datos)
+
+    finally:
+        conn.close()
+
+def _copia(datos):
+    """Las listas se copian para que el llamador no altere la caché; un Catalogo no se modifica"""
+    return list(datos) if isinstance(datos, list) else datos
+
+def limpiar_cache_catalogos():
+    """Descarta los catálogos cargados en este proceso (las copias en disco se invalidan solas por la marca)"""
+    with _bloqueo_catalogos:
+        _catalogos.clear()
+
+class Catalogo:
+    """
+    Catálogo de productos en arreglos NumPy paralelos
+
+    El producto i tiene codigos[i], descripciones[i], precios[i] y existencias[i]; los
+    generadores trabajan con esos índices enteros en lugar de diccionarios por producto,
+    y las existencias por producto se guardan en arreglos alineados con el catálogo.
+    """
+
+    __slots__ = ('codigos', 'descripciones', 'precios', 'existencias', 'indices')
+
+    def __init__(self, codigos, descripciones, precios, existencias):
+        """
+        Args:
+            codigos (list): Código de cada producto
+            descripciones (list): Descripción completa de cada producto
+            precios (list): Precio de compra de cada producto
+            existencias (list): Existencia de cada producto en la tabla Inventario
+        """
+        # Los códigos se internan: el mismo objeto str se comparte con el mapa de índices
+        self.codigos = np.array([sys.intern(str(codigo)) for codigo in codigos], dtype=object)
+        self.descripciones = np.asarray(descripciones, dtype=object)
+        self.precios = np.asarray(precios, dtype=float)
+        self.existencias = np.asarray(existencias, dtype=np.int64)
+        self.indices = {codigo: i for i, codigo in enumerate(self.codigos)}
+
+    @classmethod
+    def desde_dataframe(cls, df):
+        """Crea el catálogo a partir del resultado de normalizar_productos"""
+        return cls(df['codigo'].tolist(), df['descripcion'].to_numpy(dtype=object),
+                   df['precio'].to_numpy(dtype=float), df['existencia'].to_numpy(dtype=np.int64))
+
+    def __len__(self):
+        return len(self.codigos)
+
+    def __getitem__(self, i):
+        """Producto i como diccionario (codigo, descripcion, precio, existencia)"""
+        return {
+            'codigo': self.codigos[i],
+            'descripcion': self.descripciones[i],
+            'precio': float(self.precios[i]),
+            'existencia': int(self.existencias[i])
+        }
+
+    def indice(self, codigo):
+        """Índice del producto con ese código, o None si no está en el catálogo"""
+        return self.indices.get(codigo)
+
+def _texto(serie):
+    """Texto sin espacios en los extremos; los nulos quedan como cadena vacía"""
+    return serie.fillna('').astype(str).str.strip()
+
+def _numeros(serie):
+    """
+    Convierte una columna a números
+
+    Returns:
+        tuple: (valores float con NaN en los nulos, máscara de valores no convertibles)
+    """
+    valores = pd.to_numeric(serie, errors='coerce').astype(float)
+    return valores, valores.isna() & serie.notna()
+
+def _reportar_invalidos(df, invalidos):
+    """Informa en un solo mensaje los productos descartados por datos inválidos"""
+    if not invalidos.any():
+        return
+    codigos = _texto(df.loc[invalidos, 'CODIGO']).tolist()
+    listado = ', '.join(codigos[:10]) + (' ...' if len(codigos) > 10 else '')
+    log.warning(f"Advertencia: Se omitieron {len(codigos)} productos con precio o existencia inválidos: {listado}")
+
+def normalizar_productos(df):
+    """
+    Normaliza en bloque el resultado de la consulta de productos
+
+    Construye la descripción completa (CATEGORIA TIPO DESCRIPCION MARCA), limita el precio
+    de compra al rango [5, 500] y convierte la existencia a entero. Las filas con precio o
+    existencia no numéricos se descartan y se informan en un único mensaje.
+
+    Args:
+        df (pd.DataFrame): Columnas CODIGO, CATEGORIA, TIPO, DESCRIPCION, MARCA, PRECIO_COMPRA y EXISTENCIA
+
+    Returns:
+        pd.DataFrame: Columnas codigo, descripcion, precio (float) y existencia (int64)
+    """
+    precio, precio_invalido = _numeros(df['PRECIO_COMPRA'])
+    existencia, existencia_invalida = _numeros(df['EXISTENCIA'])
+    invalidos = precio_invalido | existencia_invalida
+    _reportar_invalidos(df, invalidos)
+
+    descripcion = _texto(df['CATEGORIA']).str.cat(
+        [_texto(df['TIPO']), _texto(df['DESCRIPCION']), _texto(df['MARCA'])], sep=' '
+    ).str.strip()
+
+    validos = ~invalidos
+    return pd.DataFrame({
+        'codigo': _texto(df['CODIGO'])[validos],
+        'descripcion': descripcion[validos],
+        # Asegurar que los precios estén en un rango razonable (entre 5 y 500)
+        'precio': precio[validos].fillna(0.0).clip(5.0, 500.0),
+        'existencia': np.trunc(existencia[validos].fillna(0)).astype(np.int64)
+    }).reset_index(drop=True)
+
+def normalizar_datos_inventario(df):
+    """
+    Normaliza en bloque el resultado de la consulta del generador clásico
+
+    Args:
+        df (pd.DataFrame): Columnas CODIGO, DESCRIPCION, PRECIO_COMPRA, PRECIO_VENTA y EXISTENCIA
+
+    Returns:
+        pd.DataFrame: Mismas columnas con textos sin espacios, precios float y existencia int64
+    """
+    precio_compra, compra_invalida = _numeros(df['PRECIO_COMPRA'])
+    precio_venta, venta_invalida = _numeros(df['PRECIO_VENTA'])
+    existencia, existencia_invalida = _numeros(df['EXISTENCIA'])
+    invalidos = compra_invalida | venta_invalida | existencia_invalida
+    _reportar_invalidos(df, invalidos)
+
+    validos = ~invalidos
+    return pd.DataFrame({
+        'CODIGO': _texto(df['CODIGO'])[validos],
+        'DESCRIPCION': _texto(df['DESCRIPCION'])[validos],
+        'PRECIO_COMPRA': precio_compra[validos].fillna(0.0),
+        'PRECIO_VENTA': precio_venta[validos].fillna(0.0),
+        'EXISTENCIA': np.trunc(existencia[validos].fillna(0)).astype(np.int64)
+    }).reset_index(drop=True)
+
+def cargar_productos(conn):
+    """Carga los productos del inventario para generar movimientos"""
+    return normalizar_productos(pd.read_sql(CONSULTA_PRODUCTOS, conn)).to_dict('records')
+
+def cargar_catalogo(conn):
+    """Carga los productos del inventario como Catalogo (ver cargar_productos)"""
+    return Catalogo.desde_dataframe(normalizar_productos(pd.read_sql(CONSULTA_PRODUCTOS, conn)))
+
+def cargar_datos_inventario(conn):
+    """Carga los productos del inventario con los campos del generador clásico"""
+    query = """
+    SELECT CODIGO, DESCRIPCION, PRECIO_COMPRA, PRECIO_VENTA, EXISTENCIA
+    FROM Inventario
+    WHERE EXISTENCIA > 0
+    """
+    return normalizar_datos_inventario(pd.read_sql(query, conn)).to_dict('records')
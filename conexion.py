@@ -0,0 +1,332 @@
+import atexit
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+
+from base_datos import clave_conexion, conectar, error_de_uso
+from instrumentacion import CursorMedido
+from registro import obtener_registro, RESUMEN
+
+log = obtener_registro('conexion')
+
+# Valores por defecto del pool de conexiones
+TAMAÑO_MAXIMO_POOL = 5
+TIEMPO_INACTIVIDAD_SEGUNDOS = 300
+TIEMPO_ESPERA_SEGUNDOS = 30
+
+class ConexionAgrupada:
+    """
+    Envoltura de una conexión pyodbc obtenida del pool.
+
+    Se comporta igual que la conexión original, salvo que close() la devuelve
+    al pool en lugar de cerrarla. Los cambios no confirmados se descartan
+    al devolverla, igual que ocurriría al cerrar una conexión pyodbc.
+    Si la envoltura se pierde sin llamar a close() (p. ej. en un camino de error),
+    la conexión vuelve al pool cuando el recolector la libera, igual que pyodbc
+    cierra una conexión sin referencias. Los cursores se entregan envueltos en
+    CursorMedido (ver instrumentacion) y mantienen viva la envoltura mientras se usan.
+    """
+
+    def __init__(self, pool, conexion):
+        self._pool = pool
+        self._conexion = conexion
+        # Sin referencia a self, para que la envoltura pueda liberarse
+        self._finalizador = weakref.finalize(self, pool.devolver, conexion)
+
+    def __getattr__(self, nombre):
+        conexion = self.__dict__.get('_conexion')
+        if conexion is None:
+            raise error_de_uso()('Attempt to use a closed connection.')
+        return getattr(conexion, nombre)
+
+    def cursor(self):
+        """Cursor de la conexión que registra sentencias, filas y tiempo en las mediciones abiertas"""
+        return CursorMedido(self.__getattr__('cursor')(), conexion=self)
+
+    def close(self):
+        """Devuelve la conexión al pool (llamadas repetidas no tienen efecto)"""
+        if self._conexion is None:
+            return
+        self._conexion = None
+        # El finalizador se ejecuta una sola vez: close() y la recolección no devuelven dos veces
+        self._finalizador()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        # Igual que pyodbc: commit si no hubo error, rollback en caso contrario
+        if self._conexion is None:
+            return False
+        if tipo is None:
+            self._conexion.commit()
+        else:
+            self._conexion.rollback()
+        return False
+
+class PoolConexiones:
+    """
+    Pool de conexiones a la base de datos con reutilización, tamaño máximo,
+    verificación de salud y expiración por inactividad.
+    """
+
+    def __init__(self, fabrica, tamaño_maximo=TAMAÑO_MAXIMO_POOL,
+                 tiempo_inactividad=TIEMPO_INACTIVIDAD_SEGUNDOS,
+                 tiempo_espera=TIEMPO_ESPERA_SEGUNDOS, verificar_salud=True):
+        """
+        Args:
+            fabrica (callable): Función sin argumentos que abre una conexión nueva
+            tamaño_maximo (int): Número máximo de conexiones abiertas a la vez
+            tiempo_inactividad (float): Segundos tras los cuales una conexión inactiva se descarta
+            tiempo_espera (float): Segundos a esperar por una conexión libre antes de fallar
+            verificar_salud (bool): Si se ejecuta SELECT 1 antes de reutilizar una conexión
+        """
+        self.fabrica = fabrica
+        self.tamaño_maximo = max(1, int(tamaño_maximo))
+        self.tiempo_inactividad = tiempo_inactividad
+        self.tiempo_espera = tiempo_espera
+        self.verificar_salud = verificar_salud
+
+        self._inactivas = []  # Lista de (conexion, instante_devolucion)
+        self._en_uso = 0
+        self._condicion = threading.Condition()
+        self.reiniciar_estadisticas()
+
+    def reiniciar_estadisticas(self):
+        """Pone a cero los contadores de la ejecución actual"""
+        self.abiertas = 0
+        self.reutilizadas = 0
+        self.descartadas = 0
+
+    def estadisticas(self):
+        """
+        Devuelve las estadísticas del pool
+
+        Returns:
+            dict: Conexiones abiertas, reutilizadas, descartadas, en uso e inactivas
+        """
+        with self._condicion:
+            return {
+                'abiertas': self.abiertas,
+                'reutilizadas': self.reutilizadas,
+                'descartadas': self.descartadas,
+                'en_uso': self._en_uso,
+                'inactivas': len(self._inactivas)
+            }
+
+    def _conexion_sana(self, conexion):
+        """Comprueba que una conexión inactiva siga siendo utilizable"""
+        if not self.verificar_salud:
+            return True
+        try:
+            cursor = conexion.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _descartar(self, conexion):
+        self.descartadas += 1
+        self._cerrar(conexion)
+
+    @staticmethod
+    def _cerrar(conexion):
+        try:
+            conexion.close()
+        except Exception:
+            pass
+
+    def obtener(self):
+        """
+        Entrega una conexión del pool, reutilizando una inactiva si es posible
+
+        La verificación de salud (SELECT 1) se hace fuera del bloqueo del pool, con el hueco
+        ya reservado, para que una conexión lenta no detenga a los demás hilos.
+
+        Returns:
+            ConexionAgrupada: Conexión cuyo close() la devuelve al pool
+        """
+        limite = time.monotonic() + self.tiempo_espera
+        while True:
+            conexion, expiradas = self._reservar(limite)
+            for expirada in expiradas:
+                self._cerrar(expirada)
+            if conexion is None:
+                break
+
+            if self._conexion_sana(conexion):
+                with self._condicion:
+                    self.reutilizadas += 1
+                return ConexionAgrupada(self, conexion)
+
+            # No es utilizable: liberar el hueco y probar con la siguiente
+            with self._condicion:
+                self._en_uso -= 1
+                self.descartadas += 1
+                self._condicion.notify()
+            self._cerrar(conexion)
+
+        try:
+            conexion = self.fabrica()
+        except Exception:
+            with self._condicion:
+                self._en_uso -= 1
+                self._condicion.notify()
+            raise
+
+        with self._condicion:
+            self.abiertas += 1
+        return ConexionAgrupada(self, conexion)
+
+    def _reservar(self, limite):
+        """
+        Reserva un hueco del pool, esperando hasta limite si están todos en uso
+
+        Args:
+            limite (float): Instante (time.monotonic) a partir del cual se deja de esperar
+
+        Returns:
+            tuple: (conexión inactiva a verificar o None si hay que abrir una nueva,
+                lista de conexiones expiradas que el llamador debe cerrar)
+        """
+        expiradas = []
+        with self._condicion:
+            while True:
+                ahora = time.monotonic()
+
+                # La conexión inactiva más reciente que no haya expirado
+                while self._inactivas:
+                    conexion, devuelta_en = self._inactivas.pop()
+                    if ahora - devuelta_en > self.tiempo_inactividad:
+                        self.descartadas += 1
+                        expiradas.append(conexion)
+                        continue
+                    self._en_uso += 1
+                    return conexion, expiradas
+
+                if self._en_uso < self.tamaño_maximo:
+                    # Reservar el hueco antes de abrir la conexión
+                    self._en_uso += 1
+                    return None, expiradas
+
+                restante = limite - ahora
+                if restante <= 0:
+                    for conexion in expiradas:
+                        self._cerrar(conexion)
+                    raise RuntimeError(
+                        f"No hay conexiones disponibles en el pool (máximo {self.tamaño_maximo})"
+                    )
+                self._condicion.wait(restante)
+
+    def devolver(self, conexion):
+        """Devuelve una conexión al pool descartando los cambios no confirmados"""
+        try:
+            conexion.rollback()
+            valida = True
+        except Exception:
+            valida = False
+
+        with self._condicion:
+            self._en_uso -= 1
+            if valida:
+                self._inactivas.append((conexion, time.monotonic()))
+            else:
+                self._descartar(conexion)
+            self._condicion.notify()
+
+    @contextmanager
+    def sesion(self):
+        """
+        Sesión de trabajo sobre una conexión del pool: confirma al terminar,
+        revierte si hay una excepción y siempre devuelve la conexión.
+        """
+        conexion = self.obtener()
+        try:
+            yield conexion
+            conexion.commit()
+        except Exception:
+            try:
+                conexion.rollback()
+            except Exception:
+                pass
+            raise
+        finally:
+            conexion.close()
+
+    def cerrar_todas(self):
+        """Cierra todas las conexiones inactivas del pool"""
+        with self._condicion:
+            while self._inactivas:
+                conexion, _ = self._inactivas.pop()
+                try:
+                    conexion.close()
+                except Exception:
+                    pass
+
+# Pools compartidos por cadena de conexión, para que todos los módulos
+# que apuntan al mismo servidor reutilicen las mismas conexiones
+_pools = {}
+_bloqueo_pools = threading.Lock()
+
+def obtener_pool(cadena_conexion, **opciones):
+    """
+    Obtiene (o crea) el pool asociado a una cadena de conexión ODBC
+
+    Las conexiones se abren con el motor configurado en base_datos: con SQLite todas
+    las cadenas comparten el pool del archivo configurado.
+
+    Args:
+        cadena_conexion (str): Cadena de conexión ODBC
+        **opciones: Parámetros de PoolConexiones usados al crear el pool
+
+    Returns:
+        PoolConexiones: Pool compartido para esa base de datos
+    """
+    clave = clave_conexion(cadena_conexion)
+    with _bloqueo_pools:
+        pool = _pools.get(clave)
+        if pool is None:
+            pool = PoolConexiones(lambda: conectar(cadena_conexion), **opciones)
+            _pools[clave] = pool
+        return pool
+
+def reiniciar_estadisticas_conexiones():
+    """Pone a cero las estadísticas de todos los pools (inicio de una ejecución)"""
+    with _bloqueo_pools:
+        for pool in _pools.values():
+            pool.reiniciar_estadisticas()
+
+def estadisticas_conexiones():
+    """
+    Suma las estadísticas de todos los pools
+
+    Returns:
+        dict: Conexiones abiertas, reutilizadas, descartadas, en uso e inactivas
+    """
+    totales = {'abiertas': 0, 'reutilizadas': 0, 'descartadas': 0, 'en_uso': 0, 'inactivas': 0}
+    with _bloqueo_pools:
+        pools = list(_pools.values())
+    for pool in pools:
+        for clave, valor in pool.estadisticas().items():
+            totales[clave] += valor
+    return totales
+
+def imprimir_estadisticas_conexiones():
+    """Registra un resumen del uso de conexiones de la ejecución actual (nivel RESUMEN)"""
+    stats = estadisticas_conexiones()
+    solicitudes = stats['abiertas'] + stats['reutilizadas']
+    log.log(RESUMEN, f"Conexiones: {solicitudes} solicitadas, {stats['abiertas']} abiertas, "
+                     f"{stats['reutilizadas']} reutilizadas, {stats['descartadas']} descartadas",
+            extra={'datos': dict(stats, solicitadas=solicitudes)})
+
+def cerrar_pools():
+    """Cierra las conexiones inactivas de todos los pools"""
+    with _bloqueo_pools:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.cerrar_todas()
+
+atexit.register(cerrar_pools)
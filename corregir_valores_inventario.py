@@ -1,4 +1,4 @@
-from generador_inventario_directo import verificar_coherencia_valores
+from generador_inventario_directo import verificar_coherencia_año
 import sys
 import traceback
 
@@ -15,10 +15,8 @@ if __name__ == "__main__":
         
         print(f"\nIniciando verificación y corrección de valores para el año {año}...")
         
-        # Verificar y corregir cada mes
-        for mes in range(1, 13):
-            print(f"\nVerificando mes {mes:02d}/{año}...")
-            verificar_coherencia_valores(año, mes)
+        # Verificar y corregir los doce meses con dos consultas y una única transacción
+        verificar_coherencia_año(año)
         
         print(f"\nVerficación y corrección completada para el año {año}.")
         
@@ -0,0 +1,300 @@
+import numpy as np
+
+from instrumentacion import contar
+from registro import obtener_registro
+
+log = obtener_registro('cuadre')
+
+# Códigos reservados (inventario inicial y ajustes) que nunca se modifican al cuadrar
+CODIGOS_RESERVADOS = ('0000000001', '0000000002')
+
+# Una entrada o una salida puede crecer hasta este múltiplo de su cantidad original
+MULTIPLO_MAXIMO_CANTIDAD = 3
+
+# Existencia mínima que debe quedar en cualquier momento del mes al bajar existencias
+EXISTENCIA_MINIMA = 10
+
+# Número máximo de unidades que la búsqueda exacta suma o resta para cuadrar los últimos centavos
+PROFUNDIDAD_MAXIMA_BUSQUEDA = 8
+
+def a_centavos(valores):
+    """Convierte importes o costos con dos decimales a centavos enteros"""
+    return np.rint(np.asarray(valores, dtype=float) * 100).astype(np.int64)
+
+def calcular_limites(codigos, entradas, salidas, es_entrada, es_salida, existencias_iniciales):
+    """
+    Cuánto puede cambiar la existencia que aporta cada fila ajustable
+
+    El cambio se mide en unidades de existencia: positivo si la fila suma existencia (más
+    entradas o menos salidas) y negativo si la resta. Una entrada puede bajar hasta una unidad
+    o crecer hasta MULTIPLO_MAXIMO_CANTIDAD veces; una salida puede bajar hasta una unidad o
+    crecer hasta MULTIPLO_MAXIMO_CANTIDAD veces. Las bajadas de existencia de un producto se
+    reparten en orden cronológico de modo que, aunque se usen todas a la vez, la existencia no
+    quede por debajo de EXISTENCIA_MINIMA en ningún movimiento del mes.
+
+    Args:
+        codigos (np.ndarray): Código de cada fila
+        entradas (np.ndarray): Entradas de cada fila (enteros)
+        salidas (np.ndarray): Salidas de cada fila (enteros)
+        es_entrada (np.ndarray): Máscara de las filas de solo entrada que se pueden ajustar
+        es_salida (np.ndarray): Máscara de las filas con salida que se pueden ajustar
+        existencias_iniciales (dict): Existencia de cada código al inicio del mes
+
+    Returns:
+        tuple: (mínimo, máximo) del cambio de cada fila, cero en las no ajustables
+    """
+    maximo = np.where(es_entrada, entradas * MULTIPLO_MAXIMO_CANTIDAD, np.where(es_salida, salidas - 1, 0))
+    bajada = np.where(es_entrada, entradas - 1, np.where(es_salida, salidas * MULTIPLO_MAXIMO_CANTIDAD, 0))
+    minimo = np.zeros(len(codigos), dtype=np.int64)
+    if not len(codigos):
+        return minimo, maximo
+
+    # Filas agrupadas por producto conservando el orden cronológico dentro de cada uno
+    valores_codigo, grupo = np.unique(codigos, return_inverse=True)
+    orden = np.argsort(grupo, kind='stable')
+    grupo_ordenado = grupo[orden]
+    inicio_grupo = np.r_[0, np.flatnonzero(np.diff(grupo_ordenado)) + 1]
+    filas_grupo = np.diff(np.r_[inicio_grupo, len(orden)])
+
+    # Existencia tras cada movimiento: suma acumulada por producto más la existencia inicial
+    movimiento = (entradas - salidas)[orden]
+    acumulado = np.cumsum(movimiento)
+    base = np.repeat(acumulado[inicio_grupo] - movimiento[inicio_grupo], filas_grupo)
+    iniciales = np.array([int(existencias_iniciales.get(codigo, 0)) for codigo in valores_codigo], dtype=np.int64)
+    existencia = acumulado - base + iniciales[grupo_ordenado]
+
+    # Existencia mínima desde cada movimiento hasta el final del mes: mínimo acumulado hacia
+    # atrás, con un desplazamiento por producto para que cada producto empiece por debajo del anterior
+    escala = int(existencia.max() - existencia.min()) + 1
+    desplazamiento = grupo_ordenado.astype(np.int64) * escala
+    margen_posterior = (np.minimum.accumulate((existencia + desplazamiento)[::-1])[::-1] - desplazamiento
+                        - EXISTENCIA_MINIMA)
+
+    # Reparto en orden cronológico de las bajadas de cada producto (solo las filas que pueden bajar):
+    # lo asignado hasta cada fila es la suma acumulada de las bajadas, limitada por el margen
+    # posterior, que no decrece: asignada_k = min(asignada_k-1 + bajada_k, margen_k), es decir
+    # B_k + min(0, min_j<=k (margen_j - B_j)) con B la suma acumulada de las bajadas del producto
+    posiciones = np.flatnonzero((es_entrada | es_salida)[orden] & (bajada[orden] > 0))
+    if not len(posiciones):
+        return minimo, maximo
+    grupo_ajustable = grupo_ordenado[posiciones]
+    bajada_ajustable = bajada[orden[posiciones]].astype(np.int64)
+    inicio_ajustable = np.r_[0, np.flatnonzero(np.diff(grupo_ajustable)) + 1]
+    filas_ajustable = np.diff(np.r_[inicio_ajustable, len(posiciones)])
+    acumulada = np.cumsum(bajada_ajustable)
+    acumulada -= np.repeat(acumulada[inicio_ajustable] - bajada_ajustable[inicio_ajustable], filas_ajustable)
+    holgura = np.maximum(margen_posterior[posiciones], 0) - acumulada
+    # Mínimo acumulado por producto: cada producto empieza por debajo de todos los anteriores
+    escala = int(holgura.max() - holgura.min()) + 1
+    rango_grupo = np.repeat(np.arange(len(inicio_ajustable), dtype=np.int64), filas_ajustable) * escala
+    minimo_holgura = np.minimum.accumulate(holgura - rango_grupo) + rango_grupo
+    asignada = acumulada + np.minimum(0, minimo_holgura)
+    anterior = np.r_[0, asignada[:-1]]
+    anterior[inicio_ajustable] = 0
+    minimo[orden[posiciones]] = -(asignada - anterior)
+    return minimo, maximo
+
+def repartir_proporcional(diferencia, costos, limite):
+    """
+    Reparte la diferencia (en centavos) entre las filas en proporción a su capacidad
+
+    Cada fila usa la misma fracción de su límite de cambio (reparto de mínimos cuadrados
+    relativo a la capacidad), redondeada hacia cero; después se completa por orden de costo
+    descendente con tantas unidades enteras como quepan. Lo que queda es menor que el costo
+    de cualquier fila con capacidad libre.
+
+    Args:
+        diferencia (int): Centavos a cubrir (positivo o negativo, con el signo de limite)
+        costos (np.ndarray): Costo de cada fila en centavos
+        limite (np.ndarray): Cambio máximo de cada fila en la dirección de la diferencia (valor absoluto)
+
+    Returns:
+        tuple: (cambio de cada fila en unidades, con signo; centavos sin cubrir)
+    """
+    signo = 1 if diferencia > 0 else -1
+    restante = abs(diferencia)
+    capacidad = int((limite * costos).sum())
+    if capacidad <= 0:
+        return np.zeros(len(costos), dtype=np.int64), diferencia
+
+    fraccion = min(1.0, restante / capacidad)
+    unidades = np.floor(limite * fraccion).astype(np.int64)
+    restante -= int((unidades * costos).sum())
+
+    for fila in np.argsort(-costos, kind='stable'):
+        # Las filas sin costo no cubren nada (y no se puede dividir por su costo)
+        if costos[fila] <= 0 or restante < costos[fila]:
+            continue
+        extra = min(restante // int(costos[fila]), int(limite[fila] - unidades[fila]))
+        if extra > 0:
+            unidades[fila] += extra
+            restante -= extra * int(costos[fila])
+    return signo * unidades, signo * restante
+
+def buscar_combinacion_exacta(objetivo, costos, holgura_subida, holgura_bajada):
+    """
+    Busca la combinación con menos unidades que suma exactamente objetivo centavos
+
+    Búsqueda en anchura sobre los importes alcanzables sumando o restando una unidad de
+    alguna fila (un paso por costo distinto), hasta PROFUNDIDAD_MAXIMA_BUSQUEDA unidades.
+
+    Args:
+        objetivo (int): Centavos a cubrir
+        costos (np.ndarray): Costo de cada fila en centavos
+        holgura_subida (np.ndarray): Unidades que aún puede subir cada fila
+        holgura_bajada (np.ndarray): Unidades que aún puede bajar cada fila
+
+    Returns:
+        np.ndarray: Cambio de cada fila en unidades, o None si no hay combinación
+    """
+    if objetivo == 0:
+        return np.zeros(len(costos), dtype=np.int64)
+
+    # Un paso por costo y sentido: la fila con más holgura para ese costo (la primera si empatan),
+    # en el orden en que aparece cada importe recorriendo las filas (subida antes que bajada)
+    filas = np.flatnonzero(costos > 0)
+    candidatos = np.concatenate([filas, filas])
+    importes = np.concatenate([costos[filas], -costos[filas]])
+    holguras = np.concatenate([holgura_subida[filas], holgura_bajada[filas]])
+    aparicion = np.concatenate([2 * filas, 2 * filas + 1])
+    validos = holguras > 0
+    if not validos.any():
+        return None
+    candidatos, importes, holguras, aparicion = (candidatos[validos], importes[validos],
+                                                  holguras[validos], aparicion[validos])
+    orden = np.lexsort((aparicion, -holguras, importes))
+    primero = np.r_[True, np.diff(importes[orden]) != 0]
+    elegidos = orden[primero]
+    primera_aparicion = np.minimum.reduceat(aparicion[orden], np.flatnonzero(primero))
+    por_aparicion = np.argsort(primera_aparicion, kind='stable')
+    importes = importes[elegidos][por_aparicion].astype(np.int64)
+    filas_paso = candidatos[elegidos][por_aparicion].astype(np.int64)
+
+    # Combinaciones de uno o dos pasos: se buscan directamente sobre los importes ordenados, con el
+    # mismo resultado que la búsqueda en anchura (que con miles de costos distintos es lo más caro)
+    cambio = np.zeros(len(costos), dtype=np.int64)
+    directo = np.flatnonzero(importes == objetivo)
+    if len(directo):
+        cambio[filas_paso[directo[0]]] += 1 if objetivo > 0 else -1
+        return cambio if (cambio <= holgura_subida).all() and (-cambio <= holgura_bajada).all() else None
+    orden_importes = np.argsort(importes, kind='stable')
+    complemento = objetivo - importes
+    posicion = np.minimum(np.searchsorted(importes[orden_importes], complemento), len(importes) - 1)
+    pares = np.flatnonzero(importes[orden_importes[posicion]] == complemento)
+    if len(pares):
+        for paso in (pares[0], orden_importes[posicion[pares[0]]]):
+            cambio[filas_paso[paso]] += 1 if importes[paso] > 0 else -1
+        return cambio if (cambio <= holgura_subida).all() and (-cambio <= holgura_bajada).all() else None
+
+    # Importes alcanzables en [-radio, radio], desplazados para indexar desde cero
+    radio = abs(objetivo) + 2 * int(np.abs(importes).max())
+    visitado = np.zeros(2 * radio + 1, dtype=bool)
+    paso_previo = np.full(2 * radio + 1, -1, dtype=np.int64)
+    visitado[radio] = True
+    frontera = np.array([radio], dtype=np.int64)
+    destino = objetivo + radio
+
+    for _ in range(PROFUNDIDAD_MAXIMA_BUSQUEDA):
+        nuevos = []
+        for paso, importe in enumerate(importes):
+            alcanzados = frontera + importe
+            alcanzados = alcanzados[(alcanzados >= 0) & (alcanzados <= 2 * radio)]
+            alcanzados = np.unique(alcanzados[~visitado[alcanzados]])
+            visitado[alcanzados] = True
+            paso_previo[alcanzados] = paso
+            nuevos.append(alcanzados)
+        if visitado[destino] or not nuevos:
+            break
+        frontera = np.concatenate(nuevos)
+        if not len(frontera):
+            break
+    if not visitado[destino]:
+        return None
+
+    cambio = np.zeros(len(costos), dtype=np.int64)
+    estado = destino
+    while estado != radio:
+        paso = paso_previo[estado]
+        cambio[filas_paso[paso]] += 1 if importes[paso] > 0 else -1
+        estado -= importes[paso]
+    if (cambio > holgura_subida).any() or (-cambio > holgura_bajada).any():
+        return None
+    return cambio
+
+def cuadrar_cantidades(codigos, entradas, salidas, inicial, final, costos, existencias_iniciales, diferencia):
+    """
+    Ajusta las cantidades de productos reales para que el valor del mes cambie exactamente en diferencia
+
+    Reemplaza a los movimientos artificiales de ajuste: primero se reparte la diferencia entre
+    las entradas y salidas en proporción a su capacidad (ver calcular_limites y
+    repartir_proporcional) y los últimos centavos se cubren con la combinación exacta de menos
+    unidades (buscar_combinacion_exacta). Se ajustan las entradas de las filas de solo entrada y
+    las salidas de las filas con salida; después se corrigen las existencias registradas: la final
+    de las filas de entrada, la inicial de las filas con salida (que guardan inicial = salidas) y
+    la inicial y final de las filas posteriores del producto que llevan la existencia real.
+
+    Las filas deben estar en orden cronológico dentro de cada producto y los costos tener dos decimales.
+
+    Args:
+        codigos (np.ndarray): Código de cada fila
+        entradas (np.ndarray): Entradas de cada fila
+        salidas (np.ndarray): Salidas de cada fila
+        inicial (np.ndarray): Existencia inicial registrada en cada fila
+        final (np.ndarray): Existencia final registrada en cada fila
+        costos (np.ndarray): Costo unitario de cada fila
+        existencias_iniciales (dict): Existencia de cada código al inicio del mes
+        diferencia (float): Cambio de valor necesario (valor objetivo - valor calculado)
+
+    Returns:
+        tuple: (entradas, salidas, inicial, final, residuo) con las cantidades corregidas y el
+            importe que no se pudo cubrir (0.0 si el cuadre es exacto)
+    """
+    codigos = np.asarray(codigos, dtype=object)
+    entradas = np.asarray(entradas, dtype=np.int64).copy()
+    salidas = np.asarray(salidas, dtype=np.int64).copy()
+    inicial = np.asarray(inicial, dtype=np.int64).copy()
+    final = np.asarray(final, dtype=np.int64).copy()
+    costos = a_centavos(costos)
+    objetivo = int(a_centavos(diferencia))
+    if objetivo == 0:
+        return entradas, salidas, inicial, final, 0.0
+
+    validas = (costos > 0) & ~np.isin(codigos, CODIGOS_RESERVADOS)
+    es_entrada = validas & (entradas > 0) & (salidas == 0)
+    # Solo las filas con salida que guardan inicial = salidas (ver generar_filas_mes)
+    es_salida = validas & (salidas > 0) & (inicial == salidas)
+    minimo, maximo = calcular_limites(codigos, entradas, salidas, es_entrada, es_salida, existencias_iniciales)
+
+    cambio, restante = repartir_proporcional(objetivo, costos, maximo if objetivo > 0 else -minimo)
+    # Si las cantidades no alcanzaron para cubrir la diferencia no tiene sentido buscar los centavos
+    ajustables = es_entrada | es_salida
+    if ajustables.any() and abs(restante) <= costos[ajustables].max():
+        exacto = buscar_combinacion_exacta(restante, costos, maximo - cambio, cambio - minimo)
+        if exacto is not None:
+            cambio += exacto
+            restante = 0
+
+    # Aplicar los cambios en la propia fila
+    entradas += np.where(es_entrada, cambio, 0)
+    final += np.where(es_entrada, cambio, 0)
+    salidas -= np.where(es_salida, cambio, 0)
+    inicial -= np.where(es_salida, cambio, 0)
+
+    # La existencia real de las filas siguientes del producto se desplaza con la suma de los
+    # cambios anteriores (suma acumulada por producto, sin incluir la propia fila)
+    _, grupo = np.unique(codigos, return_inverse=True)
+    orden = np.argsort(grupo, kind='stable')
+    acumulado = np.cumsum(cambio[orden])
+    inicio_grupo = np.r_[0, np.flatnonzero(np.diff(grupo[orden])) + 1]
+    base = np.repeat(acumulado[inicio_grupo] - cambio[orden][inicio_grupo], np.diff(np.r_[inicio_grupo, len(orden)]))
+    desplazamiento = np.empty_like(cambio)
+    desplazamiento[orden] = acumulado - base - cambio[orden]
+    existencia_real = salidas == 0
+    inicial += np.where(existencia_real, desplazamiento, 0)
+    final += np.where(existencia_real, desplazamiento, 0)
+
+    filas_ajustadas = int(np.count_nonzero(cambio))
+    contar('cuadre_filas_ajustadas', filas_ajustadas)
+    log.debug(f"Cuadre exacto: {filas_ajustadas} filas ajustadas ({int(cambio.sum()):+d} unidades de existencia), "
+              f"{restante / 100:.2f} sin cubrir")
+    return entradas, salidas, inicial, final, restante / 100
@@ -1,6 +1,16 @@
-from generador_inventario import generar_movimientos, obtener_datos_periodo
+from generador_inventario import generar_movimientos, obtener_datos_periodo, calcular_totales_movimientos
 import traceback
 
+def verificar_totales(movimientos):
+    """Compara los totales incrementales del lote con los recalculados desde sus columnas"""
+    incrementales = calcular_totales_movimientos(movimientos)
+    recalculados = calcular_totales_movimientos(movimientos, recalcular=True)
+    diferencias = {clave: recalculados[clave] - valor for clave, valor in incrementales.items()
+                   if abs(recalculados[clave] - valor) > 0.01}
+    if diferencias:
+        print(f"Advertencia: los totales incrementales no coinciden con los recalculados: {diferencias}")
+    return not diferencias
+
 def probar_mes(año, mes):
     """Prueba la generación de movimientos para un mes específico"""
     try:
@@ -20,6 +30,7 @@ def probar_mes(año, mes):
         
         if movimientos:
             print(f"Éxito! Se generaron {len(movimientos)} movimientos")
+            verificar_totales(movimientos)
             return movimientos
         else:
             print("No se pudieron generar movimientos")
@@ -1,9 +1,20 @@
 from generador_inventario import generar_año_completo
+from registro import obtener_registro, configurar_desde_argumentos, semilla_desde_argumentos
 import sys
-import traceback
+
+log = obtener_registro('ejecucion')
 
 if __name__ == "__main__":
     try:
+        # --semilla N: generar movimientos reproducibles
+        # --agrupado: procesar cada mes agrupando en memoria en lugar de producto a producto
+        # --silencioso / --detalle / --json: nivel y formato de los mensajes (ver registro.py)
+        configurar_desde_argumentos(sys.argv)
+        agrupado = '--agrupado' in sys.argv
+        if agrupado:
+            sys.argv.remove('--agrupado')
+        semilla = semilla_desde_argumentos(sys.argv)
+        
         # Obtener el año de los argumentos de línea de comandos
         if len(sys.argv) > 1:
             año = int(sys.argv[1])
@@ -13,12 +24,10 @@ if __name__ == "__main__":
         if año < 1900 or año > 2100:
             raise ValueError("El año debe estar entre 1900 y 2100")
             
-        print(f"Iniciando generación de movimientos para {año}...")
-        generar_año_completo(año)
-        print("Generación completada.")
+        log.info(f"Iniciando generación de movimientos para {año}...")
+        generar_año_completo(año, semilla=semilla, agrupado=agrupado)
+        log.info("Generación completada.")
     except ValueError as e:
-        print(f"Error: {str(e)}")
+        log.error(f"Error: {str(e)}")
     except Exception as e:
-        print(f"Error durante la generación: {str(e)}")
-        print("Detalles del error:")
-        traceback.print_exc() 
\ No newline at end of file
+        log.exception(f"Error durante la generación: {str(e)}")
@@ -1,12 +1,28 @@
 from generador_inventario_directo import generar_año_directo, inicializar_periodos_año
+from planificador_anual import generar_año_planificado
+from registro import obtener_registro, configurar_desde_argumentos, entero_desde_argumentos, semilla_desde_argumentos
 import sys
-import traceback
+
+log = obtener_registro('ejecucion')
 
 if __name__ == "__main__":
     try:
+        # --planificado: generar el año en memoria y guardarlo en una única transacción
+        # --vectorizado: usar el generador NumPy en lugar del generador por fila
+        # --semilla N: generar movimientos reproducibles
+        # --productos N: productos con movimientos en cada mes (p. ej. el catálogo completo con --vectorizado)
+        # --silencioso / --detalle / --json: nivel y formato de los mensajes (ver registro.py)
+        configurar_desde_argumentos(sys.argv)
+        semilla = semilla_desde_argumentos(sys.argv)
+        num_productos = entero_desde_argumentos(sys.argv, '--productos')
+        opciones = [a for a in sys.argv[1:] if a.startswith('--')]
+        argumentos = [a for a in sys.argv[1:] if not a.startswith('--')]
+        generar_año = generar_año_planificado if '--planificado' in opciones else generar_año_directo
+        vectorizado = '--vectorizado' in opciones
+        
         # Obtener el año de los argumentos de línea de comandos
-        if len(sys.argv) > 1:
-            año = int(sys.argv[1])
+        if argumentos:
+            año = int(argumentos[0])
         else:
             año = int(input("Ingrese el año para generar los movimientos: "))
             
@@ -18,26 +34,25 @@ if __name__ == "__main__":
             VALOR_INICIAL_2024 = 1120797.03  # Final de 2023
             VALOR_FINAL_2024 = 1892903.00    # Final de 2024
             
-            print(f"Iniciando generación de movimientos para {año}...")
-            print(f"Valor inicial enero: {VALOR_INICIAL_2024}")
-            print(f"Valor final diciembre: {VALOR_FINAL_2024}")
-            print(f"Diferencia anual: {VALOR_FINAL_2024 - VALOR_INICIAL_2024:.2f}")
+            log.info(f"Iniciando generación de movimientos para {año}...")
+            log.info(f"Valor inicial enero: {VALOR_INICIAL_2024}")
+            log.info(f"Valor final diciembre: {VALOR_FINAL_2024}")
+            log.info(f"Diferencia anual: {VALOR_FINAL_2024 - VALOR_INICIAL_2024:.2f}")
             
             # Primero inicializar los valores de los periodos
-            print("\nInicializando períodos para distribución de valores...")
+            log.info("Inicializando períodos para distribución de valores...")
             inicializar_periodos_año(año, VALOR_INICIAL_2024, VALOR_FINAL_2024)
             
             # Luego generar los movimientos
-            generar_año_directo(año, VALOR_INICIAL_2024, VALOR_FINAL_2024)
+            generar_año(año, VALOR_INICIAL_2024, VALOR_FINAL_2024, vectorizado=vectorizado, semilla=semilla,
+                        num_productos=num_productos)
         else:
             # Para otros años, usar valores default
-            print(f"Iniciando generación de movimientos para {año}...")
-            generar_año_directo(año)
+            log.info(f"Iniciando generación de movimientos para {año}...")
+            generar_año(año, vectorizado=vectorizado, semilla=semilla, num_productos=num_productos)
             
-        print("Generación completada con éxito.")
+        log.info("Generación completada con éxito.")
     except ValueError as e:
-        print(f"Error: {str(e)}")
+        log.error(f"Error: {str(e)}")
     except Exception as e:
-        print(f"Error durante la generación: {str(e)}")
-        print("Detalles del error:")
-        traceback.print_exc() 
\ No newline at end of file
+        log.exception(f"Error durante la generación: {str(e)}") 
\ No newline at end of file
@@ -1,20 +1,29 @@
-import pyodbc
 import pandas as pd
 from datetime import datetime, timedelta
-import random
 import calendar
 import numpy as np
+from aleatorio import crear_generador, obtener_generador, entero, decimal, muestra
+from catalogo import obtener_catalogo, cargar_datos_inventario
+from conexion import obtener_pool, reiniciar_estadisticas_conexiones, imprimir_estadisticas_conexiones
+from instrumentacion import medido, Etapas
+from insercion_lotes import insertar_en_lotes, insertar_aislando_rechazos, SQL_INSERTAR_MOVINVENTMES, TAMAÑO_LOTE_PREDETERMINADO
+from lote_movimientos import LoteMovimientos, SQL_INSERTAR_MOVINVENT
+from registro import obtener_registro
+
+log = obtener_registro('clasico')
 
 # Configuración de la conexión a SQL Server
+CADENA_CONEXION = (
+    "DRIVER={SQL Server};"
+    "SERVER=DELLXEONE31545\\SQLEXPRESS;"
+    "DATABASE=DatqBoxExpress;"
+    "UID=sa;"
+    "PWD=e!334011"
+)
+
 def get_connection():
-    conn_str = (
-        "DRIVER={SQL Server};"
-        "SERVER=DELLXEONE31545\\SQLEXPRESS;"
-        "DATABASE=DatqBoxExpress;"
-        "UID=sa;"
-        "PWD=e!334011"
-    )
-    return pyodbc.connect(conn_str)
+    """Obtiene una conexión del pool compartido (close() la devuelve al pool)"""
+    return obtener_pool(CADENA_CONEXION).obtener()
 
 def get_dias_habiles(año, mes):
     """Obtiene los días hábiles (lunes a sábado) del mes especificado"""
@@ -34,37 +43,13 @@ def get_dias_habiles(año, mes):
     
     return dias_habiles
 
-def obtener_datos_inventario():
-    """Obtiene los productos del inventario de forma segura"""
+def obtener_datos_inventario(snapshot=True):
+    """Obtiene los productos del inventario de forma segura (la tabla solo se relee si cambió, ver catalogo.obtener_catalogo)"""
     try:
-        conn = get_connection()
-        query = """
-        SELECT CODIGO, DESCRIPCION, PRECIO_COMPRA, PRECIO_VENTA, EXISTENCIA
-        FROM Inventario
-        WHERE EXISTENCIA > 0
-        """
-        df = pd.read_sql(query, conn)
-        conn.close()
-        
-        # Convertir a una lista de diccionarios para evitar problemas con Series
-        productos = []
-        for _, row in df.iterrows():
-            try:
-                producto = {
-                    'CODIGO': str(row['CODIGO']).strip(),
-                    'DESCRIPCION': str(row['DESCRIPCION']).strip() if 'DESCRIPCION' in row else "",
-                    'PRECIO_COMPRA': float(row['PRECIO_COMPRA']) if not pd.isna(row['PRECIO_COMPRA']) else 0.0,
-                    'PRECIO_VENTA': float(row['PRECIO_VENTA']) if not pd.isna(row['PRECIO_VENTA']) else 0.0,
-                    'EXISTENCIA': int(row['EXISTENCIA']) if not pd.isna(row['EXISTENCIA']) else 0
-                }
-                productos.append(producto)
-            except Exception as e:
-                print(f"Error al procesar producto: {str(e)}")
-                continue
-                
-        return productos
+        return obtener_catalogo(('datos_inventario', CADENA_CONEXION), cargar_datos_inventario, get_connection,
+                                snapshot=snapshot)
     except Exception as e:
-        print(f"Error al obtener datos del inventario: {str(e)}")
+        log.error(f"Error al obtener datos del inventario: {str(e)}")
         return []
 
 def obtener_datos_periodo(periodo):
@@ -121,34 +106,36 @@ def insertar_periodo(periodo, descripcion, inicial, final):
 
 def obtener_valores_año(año):
     """Obtiene los valores inicial y final del año desde InventarioContable"""
-    print("DEBUG: Entrando a obtener_valores_año")
+    log.debug("Entrando a obtener_valores_año")
     # Obtener valor inicial (enero)
     periodo_enero = f"01/{año}"
     try:
         datos_enero = obtener_datos_periodo(periodo_enero)
         if datos_enero is None:
-            print(f"Error: No se encontró el período inicial {periodo_enero} en InventarioContable")
+            log.error(f"Error: No se encontró el período inicial {periodo_enero} en InventarioContable")
             return None, None
 
         # Obtener valor final (diciembre)
         periodo_diciembre = f"12/{año}"
         datos_diciembre = obtener_datos_periodo(periodo_diciembre)
         if datos_diciembre is None:
-            print(f"Error: No se encontró el período final {periodo_diciembre} en InventarioContable")
+            log.error(f"Error: No se encontró el período final {periodo_diciembre} en InventarioContable")
             return None, None
 
-        print(f"DEBUG: Valores de año {año} - Inicial: {datos_enero['Inicial']}, Final: {datos_diciembre['Final']}")
+        log.debug(f"Valores de año {año} - Inicial: {datos_enero['Inicial']}, Final: {datos_diciembre['Final']}")
         return datos_enero['Inicial'], datos_diciembre['Final']
     except Exception as e:
-        print(f"ERROR en obtener_valores_año: {str(e)}")
+        log.error(f"ERROR en obtener_valores_año: {str(e)}")
         return None, None
 
-def calcular_valor_final_mes(mes, año, valor_inicial):
+def calcular_valor_final_mes(mes, año, valor_inicial, rng=None):
     """Calcula un valor final razonable para el mes"""
+    rng = obtener_generador(rng)
+    
     # Obtener el valor final objetivo de diciembre desde la tabla
     _, valor_final_diciembre = obtener_valores_año(año)
     if valor_final_diciembre is None:
-        print(f"Error: No se pudo obtener el valor final de diciembre {año}")
+        log.error(f"Error: No se pudo obtener el valor final de diciembre {año}")
         return None
 
     if mes == 12:
@@ -163,7 +150,7 @@ def calcular_valor_final_mes(mes, año, valor_inicial):
         factor_crecimiento = (valor_objetivo / valor_inicial) ** (1 / meses_restantes)
         
         # Añadimos una variación aleatoria al factor (±5% del incremento para más control)
-        variacion = random.uniform(0.95, 1.05)
+        variacion = decimal(rng, 0.95, 1.05)
         factor_final = 1 + ((factor_crecimiento - 1) * variacion)
         
         return round(valor_inicial * factor_final, 2)
@@ -234,33 +221,27 @@ def obtener_precios_promedio():
         }
     return precios_promedio
 
-def calcular_totales_movimientos(movimientos):
-    """Calcula los totales de los movimientos y verifica la consistencia"""
+def calcular_totales_movimientos(movimientos, recalcular=False):
+    """
+    Calcula los totales de los movimientos y verifica la consistencia
+
+    El inicial es el del registro de inventario inicial (código 0000000001); las entradas y
+    salidas suman el resto de ingresos y egresos, cada uno limitado a 50000. El lote lleva
+    esos totales al día a medida que se agregan movimientos, así que no se recorre.
+
+    Args:
+        movimientos (LoteMovimientos): Movimientos generados por generar_movimientos
+        recalcular (bool): Recalcula los totales desde las columnas (LoteMovimientos.recalcular_totales)
+            en lugar de usar los incrementales, para verificarlos
+
+    Returns:
+        dict: Totales inicial, entradas, salidas y final
+    """
     try:
-        total_inicial = 0
-        total_entradas = 0
-        total_salidas = 0
-        
-        # Agrupar movimientos por producto (convertimos a diccionarios simples)
-        for mov in movimientos:
-            codigo = mov.get('Codigo', '')
-            
-            # Tratar el registro de inventario inicial de forma especial
-            if codigo == '0000000001' and mov.get('Motivo') == "INVENTARIO INICIAL MES ANTERIOR":
-                total_inicial = float(mov['Precio_Compra'])
-            # El código 0000000002 es para ajustes y se procesa normalmente según su tipo
-            elif codigo != '0000000001' and mov.get('Tipo') == "Ingreso":
-                # Es un ingreso normal o un ajuste de ingreso
-                monto = float(mov['Precio_Compra']) * float(mov['Cantidad'])
-                # Limitar montos extremadamente grandes
-                monto = min(monto, 50000)
-                total_entradas += monto
-            elif codigo != '0000000001' and mov.get('Tipo') == "Egreso":
-                # Es un egreso normal o un ajuste de egreso
-                monto = float(mov['Precio_venta']) * float(mov['Cantidad'])
-                # Limitar montos extremadamente grandes
-                monto = min(monto, 50000)
-                total_salidas += monto
+        if recalcular:
+            total_inicial, total_entradas, total_salidas = movimientos.recalcular_totales()
+        else:
+            total_inicial, total_entradas, total_salidas = movimientos.totales()
         
         # Asegurar que no haya valores negativos
         total_inicial = max(0, total_inicial)
@@ -280,7 +261,7 @@ def calcular_totales_movimientos(movimientos):
             'final': limitar_valor_float(total_final)
         }
     except Exception as e:
-        print(f"Error en calcular_totales_movimientos: {str(e)}")
+        log.error(f"Error en calcular_totales_movimientos: {str(e)}")
         return {'inicial': 0, 'entradas': 0, 'salidas': 0, 'final': 0}
 
 def actualizar_inventario_contable(periodo, totales):
@@ -297,38 +278,41 @@ def actualizar_inventario_contable(periodo, totales):
         """, (totales['inicial'], totales['final'], periodo))
         
         conn.commit()
-        print(f"\nInventarioContable actualizado para {periodo}:")
-        print(f"Inicial: {totales['inicial']:.2f}")
-        print(f"Final: {totales['final']:.2f}")
+        log.info(f"InventarioContable actualizado para {periodo}:")
+        log.info(f"Inicial: {totales['inicial']:.2f}")
+        log.info(f"Final: {totales['final']:.2f}")
         
     except Exception as e:
-        print(f"Error al actualizar InventarioContable: {str(e)}")
+        log.error(f"Error al actualizar InventarioContable: {str(e)}")
     finally:
         conn.close()
 
-def generar_movimientos(año, mes):
+def generar_movimientos(año, mes, rng=None):
     """
     Genera movimientos para un mes específico.
     
     Args:
         año (int): El año para el cual generar movimientos
         mes (int): El mes para el cual generar movimientos (1-12)
+        rng (np.random.Generator): Generador de números aleatorios de la ejecución
         
     Returns:
-        list: Lista de movimientos generados, o None en caso de error
+        LoteMovimientos: Movimientos generados (vacío si el período ya tenía movimientos), o None en caso de error
     """
+    rng = obtener_generador(rng)
+    
     try:
         año = int(año)  # Asegurar que el año sea un entero
         mes = int(mes)  # Asegurar que el mes sea un entero
     except ValueError:
-        print("Error: El año y el mes deben ser números enteros válidos")
+        log.error("Error: El año y el mes deben ser números enteros válidos")
         return None
         
     periodo = f"{mes:02d}/{año}"
     datos_periodo = obtener_datos_periodo(periodo)
     
     if datos_periodo is None:
-        print(f"Error: No se encontró el período {periodo}")
+        log.error(f"Error: No se encontró el período {periodo}")
         return None
     
     # Manejar valor inicial para enero (debe ser el final de diciembre del año anterior)
@@ -340,44 +324,44 @@ def generar_movimientos(año, mes):
             valor_inicial = limitar_valor_float(datos_diciembre_anterior['Final'])
             # Actualizar el valor inicial en InventarioContable para mantener coherencia
             actualizar_periodo(periodo, inicial=valor_inicial)
-            print(f"Actualizando valor inicial de {periodo} para que sea igual al final de {periodo_diciembre_anterior}")
+            log.info(f"Actualizando valor inicial de {periodo} para que sea igual al final de {periodo_diciembre_anterior}")
         else:
             # Si no hay datos de diciembre del año anterior, usar el valor de la tabla
             valor_inicial = limitar_valor_float(datos_periodo['Inicial'])
-            print(f"Advertencia: No se encontró período {periodo_diciembre_anterior}, usando valor inicial de tabla")
+            log.warning(f"Advertencia: No se encontró período {periodo_diciembre_anterior}, usando valor inicial de tabla")
     else:
         # Para los demás meses, usar el valor inicial de la tabla
         valor_inicial = limitar_valor_float(datos_periodo['Inicial'])
     
     valor_final_objetivo = limitar_valor_float(datos_periodo['Final'])
     
-    print(f"\nGenerando movimientos para {periodo}")
-    print(f"Valor inicial: {valor_inicial:.2f}")
-    print(f"Valor final objetivo: {valor_final_objetivo:.2f}")
+    log.info(f"Generando movimientos para {periodo}")
+    log.info(f"Valor inicial: {valor_inicial:.2f}")
+    log.info(f"Valor final objetivo: {valor_final_objetivo:.2f}")
     
     # Si es diciembre, asegurarnos de que el valor final sea respetado exactamente
     if mes == 12:
-        print("Mes de diciembre: se respetará el valor final de referencia exactamente.")
+        log.info("Mes de diciembre: se respetará el valor final de referencia exactamente.")
     
     # Verificar que los valores sean válidos
     if valor_inicial < 0:
-        print(f"Error: Valor inicial negativo detectado en {periodo}")
+        log.error(f"Error: Valor inicial negativo detectado en {periodo}")
         return None
         
     if valor_final_objetivo < 0:
-        print(f"Error: Valor final negativo detectado en {periodo}")
+        log.error(f"Error: Valor final negativo detectado en {periodo}")
         return None
     
     # Obtener productos del inventario
     productos_lista = obtener_datos_inventario()
     if not productos_lista:
-        print("Error: No hay productos en el inventario")
+        log.error("Error: No hay productos en el inventario")
         return None
         
     # Obtener días hábiles
     dias_habiles = get_dias_habiles(año, mes)
     if not dias_habiles:
-        print(f"Error: No hay días hábiles para {periodo}")
+        log.error(f"Error: No hay días hábiles para {periodo}")
         return None
     
     # Verificar si ya existe un movimiento inicial para este período
@@ -397,33 +381,17 @@ def generar_movimientos(año, mes):
     conn.close()
     
     # Generar movimientos
-    movimientos = []
+    movimientos = LoteMovimientos()
     
     # Agregar registro de inventario inicial solo si no existen movimientos
     if not movimientos_existentes:
         primer_dia = dias_habiles[0]
-        movimiento_inicial = {
-            'Product': '0000000001',
-            'Fecha': primer_dia,
-            'Tipo': "Ingreso",
-            'Motivo': "INVENTARIO INICIAL MES ANTERIOR",
-            'Cantidad_Actual': 0,
-            'Cantidad': 1,
-            'Co_Usuario': 'SUPERVISOR',
-            'Codigo': '0000000001',
-            'Precio_Compra': valor_inicial,
-            'Precio_venta': valor_inicial,
-            'cantidad_nueva': 1,
-            'autoriza': None,
-            'Documento': "INV-INICIAL",
-            'Anulada': 0,
-            'Alicuota': 16.0
-        }
-        movimientos.append(movimiento_inicial)
-        print(f"Agregando movimiento inicial con valor {valor_inicial:.2f}")
+        movimientos.agregar('0000000001', primer_dia, "Ingreso", "INVENTARIO INICIAL MES ANTERIOR", 0, 1,
+                            valor_inicial, valor_inicial, 1, "INV-INICIAL")
+        log.info(f"Agregando movimiento inicial con valor {valor_inicial:.2f}")
     else:
-        print(f"Movimientos para {periodo} ya existen, no se agregarán nuevamente")
-        return []  # Si ya existen movimientos, retornamos una lista vacía
+        log.info(f"Movimientos para {periodo} ya existen, no se agregarán nuevamente")
+        return movimientos  # Si ya existen movimientos, retornamos un lote vacío
     
     # Diccionario para rastrear inventario
     inventario_actual = {}
@@ -476,7 +444,7 @@ def generar_movimientos(año, mes):
         num_movimientos = min(5, len(productos_lista))
         
         # Seleccionar productos aleatoriamente pero sin repetir en un mismo día
-        productos_seleccionados = random.sample(productos_lista, num_movimientos) if len(productos_lista) >= num_movimientos else productos_lista
+        productos_seleccionados = muestra(rng, productos_lista, num_movimientos) if len(productos_lista) >= num_movimientos else productos_lista
         
         for producto in productos_seleccionados:
             codigo = producto['CODIGO'][:15]  # Limitar a 15 caracteres
@@ -490,10 +458,10 @@ def generar_movimientos(año, mes):
                 es_ingreso = True
             
             # O si la tendencia general es de crecimiento (necesitamos más entradas)
-            elif requiere_mas_entradas and random.random() < 0.7:  # 70% de probabilidad de ingreso
+            elif requiere_mas_entradas and rng.random() < 0.7:  # 70% de probabilidad de ingreso
                 es_ingreso = True
             # Si la tendencia es a la baja, favorecer salidas
-            elif not requiere_mas_entradas and random.random() < 0.7:  # 70% de probabilidad de salida
+            elif not requiere_mas_entradas and rng.random() < 0.7:  # 70% de probabilidad de salida
                 es_ingreso = False
             
             # Obtener el precio base para este producto
@@ -502,12 +470,12 @@ def generar_movimientos(año, mes):
             if es_ingreso:
                 tipo = "Ingreso"
                 motivo = "Compra"
-                cantidad = random.randint(1, 3)  # Reducir las cantidades
+                cantidad = entero(rng, 1, 3)  # Reducir las cantidades
                 cantidad_actual = inventario_actual.get(codigo, 0)
                 cantidad_nueva = cantidad_actual + cantidad
                 
                 # Usar el precio base con una pequeña variación
-                variacion = random.uniform(0.9, 1.1)  # ±10%
+                variacion = decimal(rng, 0.9, 1.1)  # ±10%
                 precio_compra = precio_base['compra'] * variacion
                 precio_venta = precio_base['venta'] * variacion
                 
@@ -532,11 +500,11 @@ def generar_movimientos(año, mes):
                 if max_cantidad <= 0:
                     continue
                     
-                cantidad = random.randint(1, max_cantidad)
+                cantidad = entero(rng, 1, max_cantidad)
                 cantidad_nueva = cantidad_actual - cantidad
                 
                 # Usar el precio base con una pequeña variación
-                variacion = random.uniform(0.9, 1.1)  # ±10%
+                variacion = decimal(rng, 0.9, 1.1)  # ±10%
                 precio_compra = precio_base['compra'] * variacion
                 precio_venta = precio_base['venta'] * variacion
                 
@@ -559,25 +527,8 @@ def generar_movimientos(año, mes):
             inventario_actual[codigo] = cantidad_nueva
             
             # Crear movimiento
-            movimiento = {
-                'Product': codigo,
-                'Fecha': dia,
-                'Tipo': tipo,
-                'Motivo': motivo,
-                'Cantidad_Actual': cantidad_actual,
-                'Cantidad': cantidad,
-                'Co_Usuario': 'SUPERVISOR',
-                'Codigo': codigo,
-                'Precio_Compra': precio_compra,
-                'Precio_venta': precio_venta,
-                'cantidad_nueva': cantidad_nueva,
-                'autoriza': None,
-                'Documento': f"{random.randint(1000, 9999)}-{random.randint(1, 999):03d}",
-                'Anulada': 0,
-                'Alicuota': 16.0
-            }
-            
-            movimientos.append(movimiento)
+            movimientos.agregar(codigo, dia, tipo, motivo, cantidad_actual, cantidad, precio_compra, precio_venta,
+                                cantidad_nueva, serie=entero(rng, 1000, 9999), correlativo=entero(rng, 1, 999))
             
             # Verificar si hemos alcanzado el objetivo con suficiente precisión
             if abs(valor_acumulado - valor_objetivo_dia) < 50:
@@ -591,122 +542,80 @@ def generar_movimientos(año, mes):
     diferencia_final = valor_final_objetivo - totales['final']
     
     if abs(diferencia_final) > 1:
-        print(f"Añadiendo movimiento de ajuste para diferencia de {diferencia_final:.2f}")
+        log.info(f"Añadiendo movimiento de ajuste para diferencia de {diferencia_final:.2f}")
         # Determinar si el ajuste debe ser un ingreso o un egreso
         if diferencia_final > 0:
             # Necesitamos añadir un ingreso para aumentar el valor final
             ultimo_dia = dias_habiles[-1]
-            movimiento_ajuste = {
-                'Product': '0000000002',  # Usamos un código diferente para el ajuste
-                'Fecha': ultimo_dia,
-                'Tipo': "Ingreso",
-                'Motivo': "Ajuste de Inventario",
-                'Cantidad_Actual': 1,
-                'Cantidad': 1,
-                'Co_Usuario': 'SUPERVISOR',
-                'Codigo': '0000000002',
-                'Precio_Compra': diferencia_final,
-                'Precio_venta': diferencia_final,
-                'cantidad_nueva': 2,
-                'autoriza': None,
-                'Documento': "AJUSTE-FINAL",
-                'Anulada': 0,
-                'Alicuota': 16.0
-            }
-            movimientos.append(movimiento_ajuste)
+            movimientos.agregar('0000000002', ultimo_dia, "Ingreso", "Ajuste de Inventario", 1, 1,
+                                diferencia_final, diferencia_final, 2, "AJUSTE-FINAL")
         else:
             # Necesitamos añadir un egreso para disminuir el valor final
             ultimo_dia = dias_habiles[-1]
-            movimiento_ajuste = {
-                'Product': '0000000002',  # Usamos un código diferente para el ajuste
-                'Fecha': ultimo_dia,
-                'Tipo': "Egreso",
-                'Motivo': "Ajuste de Inventario",
-                'Cantidad_Actual': 2,
-                'Cantidad': 1,
-                'Co_Usuario': 'SUPERVISOR',
-                'Codigo': '0000000002',
-                'Precio_Compra': abs(diferencia_final),
-                'Precio_venta': abs(diferencia_final),
-                'cantidad_nueva': 1,
-                'autoriza': None,
-                'Documento': "AJUSTE-FINAL",
-                'Anulada': 0,
-                'Alicuota': 16.0
-            }
-            movimientos.append(movimiento_ajuste)
+            movimientos.agregar('0000000002', ultimo_dia, "Egreso", "Ajuste de Inventario", 2, 1,
+                                abs(diferencia_final), abs(diferencia_final), 1, "AJUSTE-FINAL")
         
         # Recalcular totales después del ajuste
         totales = calcular_totales_movimientos(movimientos)
     
-    print(f"Se generaron {len(movimientos)} movimientos para {periodo}")
-    print(f"Valor final alcanzado: {totales['final']:.2f}")
-    print(f"Valor objetivo: {valor_final_objetivo:.2f}")
-    print(f"Diferencia: {(valor_final_objetivo - totales['final']):.2f}")
+    log.info(f"Se generaron {len(movimientos)} movimientos para {periodo}")
+    log.info(f"Valor final alcanzado: {totales['final']:.2f}")
+    log.info(f"Valor objetivo: {valor_final_objetivo:.2f}")
+    log.info(f"Diferencia: {(valor_final_objetivo - totales['final']):.2f}")
     
     return movimientos
 
-def insertar_movimientos(movimientos):
-    """Inserta los movimientos en la tabla MovInvent"""
+# Movimientos rechazados que se muestran al terminar una inserción (el resto solo se cuenta)
+MAXIMO_RECHAZOS_MOSTRADOS = 5
+
+def insertar_movimientos(movimientos, tamaño_lote=TAMAÑO_LOTE_PREDETERMINADO):
+    """
+    Inserta los movimientos en la tabla MovInvent por lotes
+
+    Los movimientos que la base de datos rechaza se aíslan dividiendo el lote que falla
+    (ver insercion_lotes.insertar_aislando_rechazos); el resto se inserta y se confirma.
+    Las filas de cada lote se arman desde las columnas del lote de movimientos justo antes
+    de enviarlo, sin copiar todo el mes a tuplas.
+
+    Args:
+        movimientos (LoteMovimientos): Movimientos generados por generar_movimientos
+        tamaño_lote (int): Número de filas por lote de inserción
+
+    Returns:
+        list: Movimientos rechazados, como tuplas (movimiento, mensaje de error)
+    """
     if not movimientos:
-        print("No hay movimientos para insertar")
-        return
+        log.info("No hay movimientos para insertar")
+        return []
         
-    print(f"Intentando insertar {len(movimientos)} movimientos...")
+    log.info(f"Intentando insertar {len(movimientos)} movimientos...")
     conn = get_connection()
     cursor = conn.cursor()
     
-    movimientos_insertados = 0
-    for mov in movimientos:
-        try:
-            # Convertir la fecha al formato YYYY-MM-DD para SQL Server
-            fecha_sql = mov['Fecha'].strftime('%Y-%m-%d')
-            
-            # Imprimir detalles del movimiento que se va a insertar
-            print(f"\nInsertando movimiento:")
-            print(f"Product: {mov['Product']}")
-            print(f"Fecha: {fecha_sql}")
-            print(f"Tipo: {mov['Tipo']}")
-            print(f"Motivo: {mov['Motivo']}")
-            
-            cursor.execute("""
-                INSERT INTO MovInvent (
-                    Product, Fecha, Tipo, Motivo, Cantidad_Actual,
-                    Cantidad, Co_Usuario, Codigo, Precio_Compra,
-                    Precio_venta, cantidad_nueva, autoriza,
-                    Documento, Anulada, Alicuota
-                ) VALUES (
-                    ?, CONVERT(datetime, ?, 120), ?, ?, ?, 
-                    ?, ?, ?, ?, 
-                    ?, ?, ?,
-                    ?, ?, ?
-                )
-            """, (
-                mov['Product'], fecha_sql, mov['Tipo'],
-                mov['Motivo'], mov['Cantidad_Actual'], mov['Cantidad'],
-                mov['Co_Usuario'], mov['Codigo'], mov['Precio_Compra'],
-                mov['Precio_venta'], mov['cantidad_nueva'],
-                mov['autoriza'], mov['Documento'], mov['Anulada'],
-                mov['Alicuota']
-            ))
-            
-            movimientos_insertados += 1
-            print("Movimiento insertado correctamente")
-            
-        except Exception as e:
-            print(f"\nError al insertar movimiento: {str(e)}")
-            print("Detalles del movimiento que causó el error:")
-            for key, value in mov.items():
-                print(f"{key}: {value}")
-            continue
-    
     try:
+        movimientos_insertados = 0
+        rechazadas = []
+        for inicio in range(0, len(movimientos), tamaño_lote):
+            insertadas, rechazadas_lote = insertar_aislando_rechazos(
+                cursor, SQL_INSERTAR_MOVINVENT, movimientos.filas(inicio, inicio + tamaño_lote),
+                tamaño_lote=tamaño_lote)
+            movimientos_insertados += insertadas
+            rechazadas.extend((inicio + posicion, error) for posicion, error in rechazadas_lote)
         conn.commit()
-        print(f"\nSe insertaron {movimientos_insertados} de {len(movimientos)} movimientos")
+        log.info(f"Se insertaron {movimientos_insertados} de {len(movimientos)} movimientos")
     except Exception as e:
-        print(f"Error al hacer commit: {str(e)}")
+        log.error(f"Error al insertar movimientos: {str(e)}")
+        conn.rollback()
+        return [(mov, str(e)) for mov in movimientos]
     finally:
         conn.close()
+    
+    rechazados = [(movimientos[posicion], error) for posicion, error in rechazadas]
+    if rechazados:
+        log.warning(f"Movimientos rechazados: {len(rechazados)}")
+        for mov, error in rechazados[:MAXIMO_RECHAZOS_MOSTRADOS]:
+            log.warning(f"  {mov['Product']} {mov['Fecha']:%Y-%m-%d} {mov['Tipo']}: {error}")
+    return rechazados
 
 def obtener_ultimo_periodo_año_anterior(año):
     """Obtiene el último período del año anterior"""
@@ -715,20 +624,20 @@ def obtener_ultimo_periodo_año_anterior(año):
 
 def crear_periodos_faltantes(año):
     """Crea los períodos faltantes en InventarioContable"""
-    print("DEBUG: Entrando a crear_periodos_faltantes")
+    log.debug("Entrando a crear_periodos_faltantes")
     try:
         # Obtener el valor inicial del último período del año anterior
         periodo_diciembre_anterior = f"12/{año-1}"
         datos_diciembre_anterior = obtener_datos_periodo(periodo_diciembre_anterior)
         if datos_diciembre_anterior is None:
-            print(f"Error: No se encontró el período final del año anterior (12/{año-1})")
+            log.error(f"Error: No se encontró el período final del año anterior (12/{año-1})")
             return False
         
         # Obtener los valores inicial y final del año actual
         valor_inicial_año, valor_final_año = obtener_valores_año(año)
         
-        print(f"Valor inicial del año {año} (tomado del final de {año-1}): {datos_diciembre_anterior['Final']:.2f}")
-        print(f"Valor final del año {año} (tomado de InventarioContable): {valor_final_año:.2f}")
+        log.info(f"Valor inicial del año {año} (tomado del final de {año-1}): {datos_diciembre_anterior['Final']:.2f}")
+        log.info(f"Valor final del año {año} (tomado de InventarioContable): {valor_final_año:.2f}")
 
         # Procesar cada mes del año
         valor_actual = datos_diciembre_anterior['Final']  # Comenzamos con el final del año anterior
@@ -739,7 +648,7 @@ def crear_periodos_faltantes(año):
             
             datos_mes = obtener_datos_periodo(periodo)
             if datos_mes is not None:
-                print(f"El período {periodo} ya existe - Inicial: {datos_mes['Inicial']:.2f}, Final: {datos_mes['Final']:.2f}")
+                log.info(f"El período {periodo} ya existe - Inicial: {datos_mes['Inicial']:.2f}, Final: {datos_mes['Final']:.2f}")
                 # No modificamos los valores existentes
                 valor_actual = datos_mes['Final']
                 continue
@@ -754,18 +663,18 @@ def crear_periodos_faltantes(año):
             try:
                 # Insertar el período con el valor inicial y final calculado
                 insertar_periodo(periodo, descripcion, valor_actual, valor_final)
-                print(f"Período creado: {periodo} - Inicial: {valor_actual:.2f}, Final: {valor_final:.2f}")
+                log.info(f"Período creado: {periodo} - Inicial: {valor_actual:.2f}, Final: {valor_final:.2f}")
                 
                 # El valor final de este mes será el inicial del siguiente
                 valor_actual = valor_final
                 
             except Exception as e:
-                print(f"Error al crear período {periodo}: {str(e)}")
+                log.error(f"Error al crear período {periodo}: {str(e)}")
                 return False
         
         return True
     except Exception as e:
-        print(f"ERROR en crear_periodos_faltantes: {str(e)}")
+        log.error(f"ERROR en crear_periodos_faltantes: {str(e)}")
         return False
 
 def actualizar_valor_inicial_mes(año, mes, valor_inicial):
@@ -783,18 +692,18 @@ def actualizar_valor_inicial_mes(año, mes, valor_inicial):
             """, (valor_inicial, periodo))
             
             conn.commit()
-            print(f"Actualizado valor inicial de {periodo} a {valor_inicial:.2f}")
+            log.info(f"Actualizado valor inicial de {periodo} a {valor_inicial:.2f}")
         except Exception as e:
-            print(f"Error SQL al actualizar valor inicial de {periodo}: {str(e)}")
+            log.error(f"Error SQL al actualizar valor inicial de {periodo}: {str(e)}")
         finally:
             conn.close()
     except Exception as e:
-        print(f"Error en actualizar_valor_inicial_mes: {str(e)}")
+        log.error(f"Error en actualizar_valor_inicial_mes: {str(e)}")
         
 def actualizar_valor_final_mes(año, mes, valor_final):
     """Actualiza el valor final de un mes (excepto diciembre)"""
     if mes == 12:
-        print("No se puede actualizar el valor final de diciembre")
+        log.info("No se puede actualizar el valor final de diciembre")
         return
     
     try:    
@@ -826,311 +735,451 @@ def actualizar_valor_final_mes(año, mes, valor_final):
             """, (valor_final, siguiente_periodo))
             
             conn.commit()
-            print(f"Actualizado valor final de {periodo} a {valor_final:.2f}")
-            print(f"Actualizado valor inicial de {siguiente_periodo} a {valor_final:.2f}")
+            log.info(f"Actualizado valor final de {periodo} a {valor_final:.2f}")
+            log.info(f"Actualizado valor inicial de {siguiente_periodo} a {valor_final:.2f}")
         except Exception as e:
-            print(f"Error SQL al actualizar valores: {str(e)}")
+            log.error(f"Error SQL al actualizar valores: {str(e)}")
         finally:
             conn.close()
     except Exception as e:
-        print(f"Error en actualizar_valor_final_mes: {str(e)}")
+        log.error(f"Error en actualizar_valor_final_mes: {str(e)}")
+
+def limpiar_y_obtener_valores_periodo(cursor, periodo, desde, hasta, etapas):
+    """
+    Pasos 1 y 2 de sp_MovUnidadesMes: limpia MovInvent en el rango y lee los valores contables
+
+    Args:
+        cursor: Cursor de la transacción del procesamiento
+        periodo (str): Período en formato MM/AAAA
+        desde (datetime): Fecha de inicio del período
+        hasta (datetime): Fecha de fin del período
+        etapas (Etapas): Fases del procesamiento en curso
 
-def procesar_movimientos_inventario(periodo, desde, hasta):
+    Returns:
+        tuple: (inventario_inicial, inventario_final), o None si el período no existe
+    """
+    # 1. LIMPIEZA INICIAL
+    etapas.siguiente('limpieza')
+    
+    # Eliminar registros de servicios (mantener solo productos físicos)
+    cursor.execute("""
+        DELETE FROM MovInvent
+        WHERE Fecha BETWEEN ? AND ?
+          AND Product IN (SELECT CODIGO FROM Inventario WHERE Linea = 'SERVICIO')
+    """, (desde, hasta))
+    
+    # Corregir valores negativos
+    cursor.execute("""
+        UPDATE MovInvent 
+        SET CANTIDAD_ACTUAL = 0 
+        WHERE CANTIDAD_ACTUAL < 0 AND Fecha BETWEEN ? AND ?
+    """, (desde, hasta))
+    
+    # 2. OBTENER VALORES DE INVENTARIO
+    etapas.siguiente('valores_contables')
+    
+    # Extraer mes y año del período
+    mes_actual = int(periodo[:2])
+    año_actual = int(periodo[3:])
+    
+    # Determinar el período anterior
+    if mes_actual == 1:
+        periodo_anterior = f"12/{año_actual - 1}"
+    else:
+        periodo_anterior = f"{mes_actual - 1:02d}/{año_actual}"
+    
+    # Obtener valor inicial y final del período actual
+    cursor.execute("""
+        SELECT Inicial, Final
+        FROM InventarioContable
+        WHERE Periodo = ?
+    """, (periodo,))
+    
+    row = cursor.fetchone()
+    if not row:
+        log.error(f"Error: No se encontró el período {periodo} en InventarioContable")
+        return None
+        
+    inventario_inicial = float(row[0])
+    inventario_final = float(row[1])
+    
+    # Para diciembre, destacar que utilizamos el valor final exacto de referencia
+    if mes_actual == 12:
+        log.info(f"Procesando diciembre: Utilizando valor final de referencia: {inventario_final:.2f}")
+    
+    # Para enero, asegurar que el valor inicial sea el final del período anterior
+    if mes_actual == 1:
+        cursor.execute("""
+            SELECT Final
+            FROM InventarioContable
+            WHERE Periodo = ?
+        """, (periodo_anterior,))
+        
+        row = cursor.fetchone()
+        if row:
+            valor_final_anterior = float(row[0])
+            inventario_inicial = valor_final_anterior
+            
+            # Actualizar el valor inicial en InventarioContable
+            cursor.execute("""
+                UPDATE InventarioContable
+                SET Inicial = ?
+                WHERE Periodo = ?
+            """, (inventario_inicial, periodo))
+
+    return inventario_inicial, inventario_final
+
+# Tipos de movimiento de MovInvent y columna de MovInventMes que acumula cada uno
+COLUMNAS_POR_TIPO = {'Ingreso': 'Entradas', 'Egreso': 'Salidas', 'Consumo': 'AutoConsumo', 'Retiro': 'Retiros'}
+
+def escribir_movinventmes_agrupado(conn, periodo, desde, hasta, inventario_inicial, inventario_final, etapas):
+    """
+    Pasos 3 a 11 de sp_MovUnidadesMes con la agrupación hecha en memoria
+
+    Lee una sola vez los movimientos del mes y los productos del Inventario que los tienen,
+    suma cantidades y valores por producto con groupby, calcula el final de cada producto y
+    el registro de ajuste 0000000002, y escribe el mes con inserciones por lotes. El resultado
+    es el mismo que el de la versión producto a producto de procesar_movimientos_inventario.
+    No confirma la transacción.
+
+    Args:
+        conn: Conexión de la transacción del procesamiento
+        periodo (str): Período en formato MM/AAAA
+        desde (datetime): Fecha de inicio del período
+        hasta (datetime): Fecha de fin del período
+        inventario_inicial (float): Valor inicial contable del período
+        inventario_final (float): Valor final contable del período
+        etapas (Etapas): Fases del procesamiento en curso
+
+    Returns:
+        int: Número de registros escritos en MovInventMes
+    """
+    # 6. CALCULAR Y AGRUPAR MOVIMIENTOS EXISTENTES
+    etapas.siguiente('agrupacion')
+    movimientos = pd.read_sql("""
+        SELECT Product, Tipo, Cantidad, Precio_Compra, Precio_venta
+        FROM MovInvent
+        WHERE Fecha BETWEEN ? AND ? AND Anulada = 0
+    """, conn, params=[desde, hasta])
+
+    cantidad = movimientos['Cantidad'].astype(float)
+    # Las salidas se valoran a precio de venta; el resto de movimientos a precio de compra
+    precio = movimientos['Precio_venta'].where(movimientos['Tipo'] == 'Egreso', movimientos['Precio_Compra']).astype(float)
+    sumas = pd.DataFrame({'Product': movimientos['Product']})
+    for tipo, columna in COLUMNAS_POR_TIPO.items():
+        es_tipo = movimientos['Tipo'] == tipo
+        sumas[columna] = cantidad.where(es_tipo, 0)
+        sumas[columna + 'Valor'] = (cantidad * precio).where(es_tipo, 0)
+    # Los valores se totalizan sobre todos los movimientos, también los de códigos fuera del Inventario
+    totales = sumas.drop(columns='Product').sum()
+    por_producto = sumas.groupby(sumas['Product'].astype(str).str.strip()).sum(numeric_only=True)
+
+    # Productos del Inventario con movimientos en el rango (la misma condición que el INNER JOIN)
+    productos = pd.read_sql("""
+        SELECT CODIGO, COSTO_REFERENCIA, CATEGORIA, TIPO, DESCRIPCION, MARCA
+        FROM Inventario
+        WHERE CODIGO IN (SELECT Product FROM MovInvent WHERE Fecha BETWEEN ? AND ? AND Anulada = 0)
+          AND CODIGO NOT IN ('0000000001', '0000000002')
+        ORDER BY CODIGO
+    """, conn, params=[desde, hasta])
+
+    # 7. PRODUCTOS CON SUS MOVIMIENTOS Y SU FINAL (sin existencias negativas)
+    etapas.siguiente('insercion_productos')
+    mov = por_producto.reindex(productos['CODIGO'].astype(str).str.strip(), fill_value=0)
+    descripciones = productos['CATEGORIA'].fillna('').astype(str)
+    for columna in ('TIPO', 'DESCRIPCION', 'MARCA'):
+        descripciones = descripciones + ' ' + productos[columna].fillna('').astype(str)
+    entradas = mov['Entradas'].to_numpy()
+    salidas = mov['Salidas'].to_numpy()
+    autoconsumo = mov['AutoConsumo'].to_numpy()
+    retiros = mov['Retiros'].to_numpy()
+    finales = np.maximum(entradas - salidas - autoconsumo - retiros, 0)
+
+    filas = [(periodo, '0000000001', inventario_inicial, inventario_inicial, 'INVENTARIO INICIAL MES ANTERIOR',
+              0, 0, 0, 0, inventario_final, desde, None)]
+    filas.extend(zip(
+        [periodo] * len(productos), productos['CODIGO'].tolist(), [0] * len(productos),
+        productos['COSTO_REFERENCIA'].fillna(0).astype(float).tolist(), descripciones.tolist(),
+        entradas.tolist(), salidas.tolist(), autoconsumo.tolist(), retiros.tolist(), finales.tolist(),
+        [desde] * len(productos), [None] * len(productos)
+    ))
+
+    # 8 y 9. CUADRAR CON EL VALOR FINAL CONTABLE MEDIANTE EL REGISTRO DE AJUSTE
+    etapas.siguiente('cuadre')
+    valor_final_calculado = (inventario_inicial + totales['EntradasValor'] - totales['SalidasValor']
+                             - totales['AutoConsumoValor'] - totales['RetirosValor'])
+    if abs(valor_final_calculado - inventario_final) > 1:
+        log.info(f"Ajustando valores para cuadrar: valor calculado = {valor_final_calculado:.2f}, valor objetivo = {inventario_final:.2f}")
+        if valor_final_calculado < inventario_final:
+            entradas_adicionales = inventario_final - valor_final_calculado
+            filas.append((periodo, '0000000002', 0, entradas_adicionales, 'AJUSTE DE INVENTARIO',
+                          entradas_adicionales, 0, 0, 0, entradas_adicionales, hasta, None))
+            log.info(f"Añadiendo entradas adicionales al registro de ajuste: {entradas_adicionales:.2f}")
+        else:
+            salidas_adicionales = valor_final_calculado - inventario_final
+            # El final de los registros que no son el principal nunca es negativo
+            filas.append((periodo, '0000000002', 0, salidas_adicionales, 'AJUSTE DE INVENTARIO',
+                          0, salidas_adicionales, 0, 0, 0, hasta, None))
+            log.info(f"Añadiendo salidas adicionales al registro de ajuste: {salidas_adicionales:.2f}")
+
+    # 4, 5, 10 y 11. REEMPLAZAR EL PERÍODO CON LAS FILAS CALCULADAS
+    etapas.siguiente('calculo_final')
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM MovInventMes WHERE Periodo = ?", (periodo,))
+    return insertar_en_lotes(cursor, SQL_INSERTAR_MOVINVENTMES, filas)
+
+@medido('Procesar {periodo}')
+def procesar_movimientos_inventario(periodo, desde, hasta, agrupado=False):
     """
     Implementa la lógica del SP directamente en Python para procesar los movimientos
     y preparar los datos para el informe, garantizando consistencia.
+    Al terminar se muestra el tiempo de cada paso y las sentencias ejecutadas.
+    
+    Con agrupado=True la agrupación y el cuadre se hacen en memoria con pandas y el mes
+    se escribe por lotes (ver escribir_movinventmes_agrupado), con un número fijo de
+    sentencias en lugar de una inserción por producto.
     
     Args:
         periodo (str): Período en formato MM/AAAA
         desde (datetime): Fecha de inicio del período
         hasta (datetime): Fecha de fin del período
+        agrupado (bool): Si se agrupa en memoria en lugar de producto a producto
     
     Returns:
         bool: True si se procesó correctamente, False en caso de error
     """
+    etapas = Etapas()
     try:
-        print(f"Procesando movimientos de inventario para período {periodo}...")
+        log.info(f"Procesando movimientos de inventario para período {periodo}...")
         conn = get_connection()
         cursor = conn.cursor()
         
-        # 1. LIMPIEZA INICIAL
-        
-        # Eliminar registros de servicios (mantener solo productos físicos)
-        cursor.execute("""
-            DELETE m
-            FROM dbo.MovInvent m
-            INNER JOIN dbo.Inventario i ON m.Product = i.CODIGO
-            WHERE i.Linea = N'SERVICIO' AND m.Fecha BETWEEN ? AND ?
-        """, (desde, hasta))
-        
-        # Corregir valores negativos
-        cursor.execute("""
-            UPDATE MovInvent 
-            SET CANTIDAD_ACTUAL = 0 
-            WHERE CANTIDAD_ACTUAL < 0 AND Fecha BETWEEN ? AND ?
-        """, (desde, hasta))
-        
-        # 2. OBTENER VALORES DE INVENTARIO
-        
-        # Extraer mes y año del período
-        mes_actual = int(periodo[:2])
-        año_actual = int(periodo[3:])
-        
-        # Determinar el período anterior
-        if mes_actual == 1:
-            periodo_anterior = f"12/{año_actual - 1}"
-        else:
-            periodo_anterior = f"{mes_actual - 1:02d}/{año_actual}"
-        
-        # Obtener valor inicial y final del período actual
-        cursor.execute("""
-            SELECT Inicial, Final
-            FROM InventarioContable
-            WHERE Periodo = ?
-        """, (periodo,))
-        
-        row = cursor.fetchone()
-        if not row:
-            print(f"Error: No se encontró el período {periodo} en InventarioContable")
+        # 1 y 2. LIMPIEZA INICIAL Y VALORES DE INVENTARIO
+        valores = limpiar_y_obtener_valores_periodo(cursor, periodo, desde, hasta, etapas)
+        if valores is None:
             conn.close()
             return False
+        inventario_inicial, inventario_final = valores
             
-        inventario_inicial = float(row[0])
-        inventario_final = float(row[1])
-        
-        # Para diciembre, destacar que utilizamos el valor final exacto de referencia
-        if mes_actual == 12:
-            print(f"Procesando diciembre: Utilizando valor final de referencia: {inventario_final:.2f}")
+        if agrupado:
+            # 3 a 11. AGRUPAR LOS MOVIMIENTOS EN MEMORIA Y ESCRIBIR EL MES POR LOTES
+            escribir_movinventmes_agrupado(conn, periodo, desde, hasta, inventario_inicial, inventario_final, etapas)
+        else:
+            # Calcular diferencia
+            diferencia_inventario = inventario_final - inventario_inicial
         
-        # Para enero, asegurar que el valor inicial sea el final del período anterior
-        if mes_actual == 1:
+            # 3. VERIFICAR SI YA EXISTE EL REGISTRO DE INVENTARIO INICIAL
             cursor.execute("""
-                SELECT Final
-                FROM InventarioContable
-                WHERE Periodo = ?
-            """, (periodo_anterior,))
-            
-            row = cursor.fetchone()
-            if row:
-                valor_final_anterior = float(row[0])
-                inventario_inicial = valor_final_anterior
-                
-                # Actualizar el valor inicial en InventarioContable
-                cursor.execute("""
-                    UPDATE InventarioContable
-                    SET Inicial = ?
-                    WHERE Periodo = ?
-                """, (inventario_inicial, periodo))
-            
-        # Calcular diferencia
-        diferencia_inventario = inventario_final - inventario_inicial
+                SELECT COUNT(*)
+                FROM MovInvent
+                WHERE Product = '0000000001' 
+                  AND Motivo = 'INVENTARIO INICIAL MES ANTERIOR'
+                  AND Fecha BETWEEN ? AND ?
+            """, (desde, hasta))
         
-        # 3. VERIFICAR SI YA EXISTE EL REGISTRO DE INVENTARIO INICIAL
-        cursor.execute("""
-            SELECT COUNT(*)
-            FROM MovInvent
-            WHERE Product = '0000000001' 
-              AND Motivo = 'INVENTARIO INICIAL MES ANTERIOR'
-              AND Fecha BETWEEN ? AND ?
-        """, (desde, hasta))
+            registro_inicial_existe = cursor.fetchone()[0] > 0
         
-        registro_inicial_existe = cursor.fetchone()[0] > 0
+            # 4. LIMPIAR TABLA DE RESULTADOS
+            etapas.siguiente('registro_inicial')
+            cursor.execute("DELETE FROM MovInventMes WHERE Periodo = ?", (periodo,))
         
-        # 4. LIMPIAR TABLA DE RESULTADOS
-        cursor.execute("DELETE FROM MovInventMes WHERE Periodo = ?", (periodo,))
+            # 5. PROCESAR DATOS DEL INVENTARIO
         
-        # 5. PROCESAR DATOS DEL INVENTARIO
+            # Crear registro para el inventario inicial en MovInventMes - solo uno por período
+            # Aseguramos explícitamente que Entradas, Salidas, AutoConsumo y Retiros sean cero
+            cursor.execute("""
+                INSERT INTO MovInventMes (Periodo, Codigo, inicial, Costo, Descripcion, Entradas, Salidas, AutoConsumo, Retiros, final, Fecha)
+                VALUES (?, '0000000001', ?, ?, 'INVENTARIO INICIAL MES ANTERIOR', 0, 0, 0, 0, ?, ?)
+            """, (periodo, inventario_inicial, inventario_inicial, inventario_inicial, desde))
         
-        # Crear registro para el inventario inicial en MovInventMes - solo uno por período
-        # Aseguramos explícitamente que Entradas, Salidas, AutoConsumo y Retiros sean cero
-        cursor.execute("""
-            INSERT INTO MovInventMes (Periodo, Codigo, inicial, Costo, Descripcion, Entradas, Salidas, AutoConsumo, Retiros, final, Fecha)
-            VALUES (?, '0000000001', ?, ?, 'INVENTARIO INICIAL MES ANTERIOR', 0, 0, 0, 0, ?, ?)
-        """, (periodo, inventario_inicial, inventario_inicial, inventario_inicial, desde))
+            # 6. CALCULAR Y AGRUPAR MOVIMIENTOS EXISTENTES
+            etapas.siguiente('agrupacion')
+        
+            # Obtener movimientos agrupados por producto y tipo
+            cursor.execute("""
+                SELECT 
+                    m.Product,
+                    SUM(CASE WHEN m.Tipo = 'Ingreso' THEN m.Cantidad ELSE 0 END) AS Entradas,
+                    SUM(CASE WHEN m.Tipo = 'Ingreso' THEN m.Cantidad * m.Precio_Compra ELSE 0 END) AS EntradasValor,
+                    SUM(CASE WHEN m.Tipo = 'Egreso' THEN m.Cantidad ELSE 0 END) AS Salidas,
+                    SUM(CASE WHEN m.Tipo = 'Egreso' THEN m.Cantidad * m.Precio_venta ELSE 0 END) AS SalidasValor,
+                    SUM(CASE WHEN m.Tipo = 'Consumo' THEN m.Cantidad ELSE 0 END) AS Autoconsumo,
+                    SUM(CASE WHEN m.Tipo = 'Consumo' THEN m.Cantidad * m.Precio_Compra ELSE 0 END) AS AutoconsumoValor,
+                    SUM(CASE WHEN m.Tipo = 'Retiro' THEN m.Cantidad ELSE 0 END) AS Retiros,
+                    SUM(CASE WHEN m.Tipo = 'Retiro' THEN m.Cantidad * m.Precio_Compra ELSE 0 END) AS RetirosValor
+                FROM MovInvent m
+                WHERE m.Fecha BETWEEN ? AND ? AND m.Anulada = 0
+                GROUP BY m.Product
+            """, (desde, hasta))
+        
+            movimientos_producto = {}
+            for row in cursor.fetchall():
+                codigo = row[0]
+                movimientos_producto[codigo] = {
+                    'entradas': float(row[1]) if row[1] is not None else 0.0,
+                    'entradas_valor': float(row[2]) if row[2] is not None else 0.0,
+                    'salidas': float(row[3]) if row[3] is not None else 0.0,
+                    'salidas_valor': float(row[4]) if row[4] is not None else 0.0,
+                    'autoconsumo': float(row[5]) if row[5] is not None else 0.0,
+                    'autoconsumo_valor': float(row[6]) if row[6] is not None else 0.0,
+                    'retiros': float(row[7]) if row[7] is not None else 0.0,
+                    'retiros_valor': float(row[8]) if row[8] is not None else 0.0
+                }
         
-        # 6. CALCULAR Y AGRUPAR MOVIMIENTOS EXISTENTES
+            # 7. INSERTAR PRODUCTOS CON SUS MOVIMIENTOS
+            etapas.siguiente('insercion_productos')
         
-        # Obtener movimientos agrupados por producto y tipo
-        cursor.execute("""
-            SELECT 
-                m.Product,
-                SUM(CASE WHEN m.Tipo = 'Ingreso' THEN m.Cantidad ELSE 0 END) AS Entradas,
-                SUM(CASE WHEN m.Tipo = 'Ingreso' THEN m.Cantidad * m.Precio_Compra ELSE 0 END) AS EntradasValor,
-                SUM(CASE WHEN m.Tipo = 'Egreso' THEN m.Cantidad ELSE 0 END) AS Salidas,
-                SUM(CASE WHEN m.Tipo = 'Egreso' THEN m.Cantidad * m.Precio_venta ELSE 0 END) AS SalidasValor,
-                SUM(CASE WHEN m.Tipo = 'Consumo' THEN m.Cantidad ELSE 0 END) AS Autoconsumo,
-                SUM(CASE WHEN m.Tipo = 'Consumo' THEN m.Cantidad * m.Precio_Compra ELSE 0 END) AS AutoconsumoValor,
-                SUM(CASE WHEN m.Tipo = 'Retiro' THEN m.Cantidad ELSE 0 END) AS Retiros,
-                SUM(CASE WHEN m.Tipo = 'Retiro' THEN m.Cantidad * m.Precio_Compra ELSE 0 END) AS RetirosValor
-            FROM MovInvent m
-            WHERE m.Fecha BETWEEN ? AND ? AND m.Anulada = 0
-            GROUP BY m.Product
-        """, (desde, hasta))
-        
-        movimientos_producto = {}
-        for row in cursor.fetchall():
-            codigo = row[0]
-            movimientos_producto[codigo] = {
-                'entradas': float(row[1]) if row[1] is not None else 0.0,
-                'entradas_valor': float(row[2]) if row[2] is not None else 0.0,
-                'salidas': float(row[3]) if row[3] is not None else 0.0,
-                'salidas_valor': float(row[4]) if row[4] is not None else 0.0,
-                'autoconsumo': float(row[5]) if row[5] is not None else 0.0,
-                'autoconsumo_valor': float(row[6]) if row[6] is not None else 0.0,
-                'retiros': float(row[7]) if row[7] is not None else 0.0,
-                'retiros_valor': float(row[8]) if row[8] is not None else 0.0
-            }
-        
-        # 7. INSERTAR PRODUCTOS CON SUS MOVIMIENTOS
-        
-        # Obtener todos los productos con movimientos
-        cursor.execute("""
-            SELECT DISTINCT i.CODIGO, i.COSTO_REFERENCIA, 
-                  i.CATEGORIA + ' ' + i.TIPO + ' ' + i.DESCRIPCION + ' ' + i.MARCA AS Descripciones
-            FROM Inventario i
-            INNER JOIN MovInvent m ON i.CODIGO = m.Product
-            WHERE m.Fecha BETWEEN ? AND ? AND m.Anulada = 0 
-            AND i.CODIGO NOT IN ('0000000001', '0000000002')
-        """, (desde, hasta))
-        
-        for row in cursor.fetchall():
-            codigo = row[0]
-            costo = float(row[1]) if row[1] is not None else 0.0
-            descripcion = row[2]
-            
-            mov = movimientos_producto.get(codigo, {
-                'entradas': 0, 'salidas': 0, 'autoconsumo': 0, 'retiros': 0
-            })
-            
+            # Obtener todos los productos con movimientos
             cursor.execute("""
-                INSERT INTO MovInventMes (Periodo, Codigo, inicial, Costo, Descripcion, Entradas, Salidas, AutoConsumo, Retiros, Fecha)
-                VALUES (?, ?, 0, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                periodo, 
-                codigo, 
-                costo, 
-                descripcion, 
-                mov.get('entradas', 0),
-                mov.get('salidas', 0),
-                mov.get('autoconsumo', 0),
-                mov.get('retiros', 0),
-                desde
-            ))
-        
-        # 8. CALCULAR TOTALES DE VALORES
-        total_entradas = 0
-        total_salidas = 0
-        total_autoconsumo = 0
-        total_retiros = 0
-        
-        for _, mov in movimientos_producto.items():
-            total_entradas += mov.get('entradas_valor', 0)
-            total_salidas += mov.get('salidas_valor', 0)
-            total_autoconsumo += mov.get('autoconsumo_valor', 0)
-            total_retiros += mov.get('retiros_valor', 0)
-        
-        # 9. VERIFICAR SI NECESITAMOS AJUSTAR ENTRADAS O SALIDAS PARA CUADRAR
-        
-        # Calcular el valor final teórico
-        valor_final_calculado = inventario_inicial + total_entradas - total_salidas - total_autoconsumo - total_retiros
-        
-        # Si la diferencia es mayor a 1, ajustar
-        if abs(valor_final_calculado - inventario_final) > 1:
-            print(f"Ajustando valores para cuadrar: valor calculado = {valor_final_calculado:.2f}, valor objetivo = {inventario_final:.2f}")
+                SELECT DISTINCT i.CODIGO, i.COSTO_REFERENCIA, 
+                      CONCAT(i.CATEGORIA, ' ', i.TIPO, ' ', i.DESCRIPCION, ' ', i.MARCA) AS Descripciones
+                FROM Inventario i
+                INNER JOIN MovInvent m ON i.CODIGO = m.Product
+                WHERE m.Fecha BETWEEN ? AND ? AND m.Anulada = 0 
+                AND i.CODIGO NOT IN ('0000000001', '0000000002')
+            """, (desde, hasta))
+        
+            for row in cursor.fetchall():
+                codigo = row[0]
+                costo = float(row[1]) if row[1] is not None else 0.0
+                descripcion = row[2]
+            
+                mov = movimientos_producto.get(codigo, {
+                    'entradas': 0, 'salidas': 0, 'autoconsumo': 0, 'retiros': 0
+                })
             
-            # En lugar de ajustar entradas/salidas en el registro 0000000001, 
-            # creamos o actualizamos un registro de ajuste separado
-            if valor_final_calculado < inventario_final:
-                # Necesitamos aumentar entradas - lo hacemos con un registro de ajuste
-                entradas_adicionales = inventario_final - valor_final_calculado
-                
-                # Verificar si existe un registro de ajuste
                 cursor.execute("""
-                    SELECT COUNT(*) FROM MovInventMes 
-                    WHERE Periodo = ? AND Codigo = '0000000002'
-                """, (periodo,))
-                
-                tiene_ajuste = cursor.fetchone()[0] > 0
+                    INSERT INTO MovInventMes (Periodo, Codigo, inicial, Costo, Descripcion, Entradas, Salidas, AutoConsumo, Retiros, Fecha)
+                    VALUES (?, ?, 0, ?, ?, ?, ?, ?, ?, ?)
+                """, (
+                    periodo, 
+                    codigo, 
+                    costo, 
+                    descripcion, 
+                    mov.get('entradas', 0),
+                    mov.get('salidas', 0),
+                    mov.get('autoconsumo', 0),
+                    mov.get('retiros', 0),
+                    desde
+                ))
+        
+            # 8. CALCULAR TOTALES DE VALORES
+            etapas.siguiente('cuadre')
+            total_entradas = 0
+            total_salidas = 0
+            total_autoconsumo = 0
+            total_retiros = 0
+        
+            for _, mov in movimientos_producto.items():
+                total_entradas += mov.get('entradas_valor', 0)
+                total_salidas += mov.get('salidas_valor', 0)
+                total_autoconsumo += mov.get('autoconsumo_valor', 0)
+                total_retiros += mov.get('retiros_valor', 0)
+        
+            # 9. VERIFICAR SI NECESITAMOS AJUSTAR ENTRADAS O SALIDAS PARA CUADRAR
+        
+            # Calcular el valor final teórico
+            valor_final_calculado = inventario_inicial + total_entradas - total_salidas - total_autoconsumo - total_retiros
+        
+            # Si la diferencia es mayor a 1, ajustar
+            if abs(valor_final_calculado - inventario_final) > 1:
+                log.info(f"Ajustando valores para cuadrar: valor calculado = {valor_final_calculado:.2f}, valor objetivo = {inventario_final:.2f}")
+            
+                # En lugar de ajustar entradas/salidas en el registro 0000000001, 
+                # creamos o actualizamos un registro de ajuste separado
+                if valor_final_calculado < inventario_final:
+                    # Necesitamos aumentar entradas - lo hacemos con un registro de ajuste
+                    entradas_adicionales = inventario_final - valor_final_calculado
                 
-                if tiene_ajuste:
-                    # Actualizar el registro de ajuste existente
+                    # Verificar si existe un registro de ajuste
                     cursor.execute("""
-                        UPDATE MovInventMes
-                        SET Entradas = ?, Salidas = 0,
-                            final = inicial + ?
+                        SELECT COUNT(*) FROM MovInventMes 
                         WHERE Periodo = ? AND Codigo = '0000000002'
-                    """, (entradas_adicionales, entradas_adicionales, periodo))
-                else:
-                    # Crear un nuevo registro de ajuste
-                    cursor.execute("""
-                        INSERT INTO MovInventMes 
-                        (Periodo, Codigo, inicial, Costo, Descripcion, Entradas, Salidas, AutoConsumo, Retiros, final, Fecha)
-                        VALUES (?, '0000000002', 0, ?, 'AJUSTE DE INVENTARIO', ?, 0, 0, 0, ?, ?)
-                    """, (periodo, entradas_adicionales, entradas_adicionales, entradas_adicionales, hasta))
+                    """, (periodo,))
                 
-                print(f"Añadiendo entradas adicionales al registro de ajuste: {entradas_adicionales:.2f}")
-            else:
-                # Necesitamos aumentar salidas - lo hacemos con un registro de ajuste
-                salidas_adicionales = valor_final_calculado - inventario_final
+                    tiene_ajuste = cursor.fetchone()[0] > 0
                 
-                # Verificar si existe un registro de ajuste
-                cursor.execute("""
-                    SELECT COUNT(*) FROM MovInventMes 
-                    WHERE Periodo = ? AND Codigo = '0000000002'
-                """, (periodo,))
+                    if tiene_ajuste:
+                        # Actualizar el registro de ajuste existente
+                        cursor.execute("""
+                            UPDATE MovInventMes
+                            SET Entradas = ?, Salidas = 0,
+                                final = inicial + ?
+                            WHERE Periodo = ? AND Codigo = '0000000002'
+                        """, (entradas_adicionales, entradas_adicionales, periodo))
+                    else:
+                        # Crear un nuevo registro de ajuste
+                        cursor.execute("""
+                            INSERT INTO MovInventMes 
+                            (Periodo, Codigo, inicial, Costo, Descripcion, Entradas, Salidas, AutoConsumo, Retiros, final, Fecha)
+                            VALUES (?, '0000000002', 0, ?, 'AJUSTE DE INVENTARIO', ?, 0, 0, 0, ?, ?)
+                        """, (periodo, entradas_adicionales, entradas_adicionales, entradas_adicionales, hasta))
                 
-                tiene_ajuste = cursor.fetchone()[0] > 0
+                    log.info(f"Añadiendo entradas adicionales al registro de ajuste: {entradas_adicionales:.2f}")
+                else:
+                    # Necesitamos aumentar salidas - lo hacemos con un registro de ajuste
+                    salidas_adicionales = valor_final_calculado - inventario_final
                 
-                if tiene_ajuste:
-                    # Actualizar el registro de ajuste existente
+                    # Verificar si existe un registro de ajuste
                     cursor.execute("""
-                        UPDATE MovInventMes
-                        SET Entradas = 0, Salidas = ?,
-                            final = inicial - ?
+                        SELECT COUNT(*) FROM MovInventMes 
                         WHERE Periodo = ? AND Codigo = '0000000002'
-                    """, (salidas_adicionales, salidas_adicionales, periodo))
-                else:
-                    # Crear un nuevo registro de ajuste
-                    cursor.execute("""
-                        INSERT INTO MovInventMes 
-                        (Periodo, Codigo, inicial, Costo, Descripcion, Entradas, Salidas, AutoConsumo, Retiros, final, Fecha)
-                        VALUES (?, '0000000002', 0, ?, 'AJUSTE DE INVENTARIO', 0, ?, 0, 0, ?, ?)
-                    """, (periodo, salidas_adicionales, salidas_adicionales, -salidas_adicionales, hasta))
+                    """, (periodo,))
+                
+                    tiene_ajuste = cursor.fetchone()[0] > 0
                 
-                print(f"Añadiendo salidas adicionales al registro de ajuste: {salidas_adicionales:.2f}")
+                    if tiene_ajuste:
+                        # Actualizar el registro de ajuste existente
+                        cursor.execute("""
+                            UPDATE MovInventMes
+                            SET Entradas = 0, Salidas = ?,
+                                final = inicial - ?
+                            WHERE Periodo = ? AND Codigo = '0000000002'
+                        """, (salidas_adicionales, salidas_adicionales, periodo))
+                    else:
+                        # Crear un nuevo registro de ajuste
+                        cursor.execute("""
+                            INSERT INTO MovInventMes 
+                            (Periodo, Codigo, inicial, Costo, Descripcion, Entradas, Salidas, AutoConsumo, Retiros, final, Fecha)
+                            VALUES (?, '0000000002', 0, ?, 'AJUSTE DE INVENTARIO', 0, ?, 0, 0, ?, ?)
+                        """, (periodo, salidas_adicionales, salidas_adicionales, -salidas_adicionales, hasta))
+                
+                    log.info(f"Añadiendo salidas adicionales al registro de ajuste: {salidas_adicionales:.2f}")
         
-        # 10. CÁLCULOS FINALES Y AJUSTES
+            # 10. CÁLCULOS FINALES Y AJUSTES
+            etapas.siguiente('calculo_final')
         
-        # Calcular valor final para cada producto (pero mantener un valor positivo o cero) excepto para 0000000001
-        cursor.execute("""
-            UPDATE MovInventMes
-            SET final = 
-                CASE 
-                    WHEN (ISNULL(inicial, 0) + ISNULL(Entradas, 0) - ISNULL(Salidas, 0) - 
-                          ISNULL(AutoConsumo, 0) - ISNULL(Retiros, 0)) >= 0 
-                    THEN (ISNULL(inicial, 0) + ISNULL(Entradas, 0) - ISNULL(Salidas, 0) - 
-                          ISNULL(AutoConsumo, 0) - ISNULL(Retiros, 0))
-                    ELSE 0
-                END
-            WHERE Periodo = ? AND Codigo <> '0000000001'
-        """, (periodo,))
+            # Calcular valor final para cada producto (pero mantener un valor positivo o cero) excepto para 0000000001
+            cursor.execute("""
+                UPDATE MovInventMes
+                SET final = 
+                    CASE 
+                        WHEN (COALESCE(inicial, 0) + COALESCE(Entradas, 0) - COALESCE(Salidas, 0) - 
+                              COALESCE(AutoConsumo, 0) - COALESCE(Retiros, 0)) >= 0 
+                        THEN (COALESCE(inicial, 0) + COALESCE(Entradas, 0) - COALESCE(Salidas, 0) - 
+                              COALESCE(AutoConsumo, 0) - COALESCE(Retiros, 0))
+                        ELSE 0
+                    END
+                WHERE Periodo = ? AND Codigo <> '0000000001'
+            """, (periodo,))
         
-        # 11. ACTUALIZAR INVENTARIO ACUMULADO FINAL
+            # 11. ACTUALIZAR INVENTARIO ACUMULADO FINAL
         
-        # Asegurarnos que el registro principal tenga el valor inicial y final correcto (el de InventarioContable)
-        # Y que sus entradas y salidas sean siempre cero
-        cursor.execute("""
-            UPDATE MovInventMes
-            SET inicial = ?,
-                final = ?,
-                Entradas = 0,
-                Salidas = 0,
-                AutoConsumo = 0,
-                Retiros = 0
-            WHERE Periodo = ? AND Codigo = '0000000001'
-        """, (inventario_inicial, inventario_final, periodo))
+            # Asegurarnos que el registro principal tenga el valor inicial y final correcto (el de InventarioContable)
+            # Y que sus entradas y salidas sean siempre cero
+            cursor.execute("""
+                UPDATE MovInventMes
+                SET inicial = ?,
+                    final = ?,
+                    Entradas = 0,
+                    Salidas = 0,
+                    AutoConsumo = 0,
+                    Retiros = 0
+                WHERE Periodo = ? AND Codigo = '0000000001'
+            """, (inventario_inicial, inventario_final, periodo))
         
         # 12. GENERAR RESUMEN PARA MOVPERIDOMES
+        etapas.siguiente('movperidomes')
         
         cursor.execute("DELETE FROM MovPeridoMes WHERE Periodo = ?", (periodo,))
         
@@ -1146,14 +1195,13 @@ def procesar_movimientos_inventario(periodo, desde, hasta):
         # Commit y cerrar conexión
         conn.commit()
         conn.close()
+        etapas.terminar()
         
-        print(f"Procesamiento de movimientos para {periodo} completado con éxito.")
+        log.info(f"Procesamiento de movimientos para {periodo} completado con éxito.")
         return True
         
     except Exception as e:
-        print(f"Error al procesar movimientos: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception(f"Error al procesar movimientos: {str(e)}")
         
         # Intentar hacer rollback si la conexión sigue abierta
         try:
@@ -1165,7 +1213,7 @@ def procesar_movimientos_inventario(periodo, desde, hasta):
             
         return False
 
-def generar_y_procesar_mes(año, mes):
+def generar_y_procesar_mes(año, mes, rng=None, agrupado=False):
     """
     Genera y procesa los movimientos para un mes específico en un solo paso.
     Integra la generación de movimientos con el procesamiento para el informe.
@@ -1173,6 +1221,8 @@ def generar_y_procesar_mes(año, mes):
     Args:
         año (int): El año para el cual generar movimientos
         mes (int): El mes para el cual generar movimientos (1-12)
+        rng (np.random.Generator): Generador de números aleatorios de la ejecución
+        agrupado (bool): Si el procesamiento agrupa en memoria (ver procesar_movimientos_inventario)
         
     Returns:
         bool: True si se completó con éxito, False en caso de error
@@ -1183,8 +1233,8 @@ def generar_y_procesar_mes(año, mes):
         datos_periodo = obtener_datos_periodo(periodo)
         
         if datos_periodo is None:
-            print(f"No se encontró el período {periodo} en InventarioContable.")
-            print("Creando período faltante...")
+            log.info(f"No se encontró el período {periodo} en InventarioContable.")
+            log.info("Creando período faltante...")
             # Crear el período si no existe
             if mes == 1:
                 # Para enero, intentar obtener el valor final de diciembre del año anterior
@@ -1215,14 +1265,14 @@ def generar_y_procesar_mes(año, mes):
             nombre_mes = calendar.month_name[mes].upper()
             descripcion = f"{nombre_mes} {año}"
             insertar_periodo(periodo, descripcion, valor_inicial, valor_final)
-            print(f"Período creado: {periodo} - Inicial: {valor_inicial:.2f}, Final: {valor_final:.2f}")
+            log.info(f"Período creado: {periodo} - Inicial: {valor_inicial:.2f}, Final: {valor_final:.2f}")
         
         # Generar los movimientos
-        print(f"\nGenerando movimientos para {mes:02d}/{año}...")
-        movimientos = generar_movimientos(año, mes)
+        log.info(f"Generando movimientos para {mes:02d}/{año}...")
+        movimientos = generar_movimientos(año, mes, rng=rng)
         
         if movimientos is None or len(movimientos) == 0:
-            print(f"No se pudieron generar movimientos para {mes:02d}/{año}")
+            log.info(f"No se pudieron generar movimientos para {mes:02d}/{año}")
             # Si no se generaron movimientos, verificar si ya existen en la base de datos
             conn = get_connection()
             cursor = conn.cursor()
@@ -1237,12 +1287,12 @@ def generar_y_procesar_mes(año, mes):
             if not movimientos_existentes:
                 return False
             
-            print("Se encontraron movimientos existentes, continuando con el procesamiento...")
+            log.info("Se encontraron movimientos existentes, continuando con el procesamiento...")
             
         else:
             # Insertar los movimientos
             insertar_movimientos(movimientos)
-            print(f"Se generaron e insertaron {len(movimientos)} movimientos para {mes:02d}/{año}")
+            log.info(f"Se generaron e insertaron {len(movimientos)} movimientos para {mes:02d}/{año}")
         
         # Calcular rango de fechas del período
         primer_dia = datetime(año, mes, 1)
@@ -1252,10 +1302,10 @@ def generar_y_procesar_mes(año, mes):
             ultimo_dia = datetime(año, mes + 1, 1) - timedelta(days=1)
             
         # Procesar los movimientos para el informe
-        exito = procesar_movimientos_inventario(periodo, primer_dia, ultimo_dia)
+        exito = procesar_movimientos_inventario(periodo, primer_dia, ultimo_dia, agrupado=agrupado)
         
         if exito:
-            print(f"Proceso completo para {periodo} finalizado correctamente.")
+            log.info(f"Proceso completo para {periodo} finalizado correctamente.")
             
             # Verificar si los valores finales coinciden con los de InventarioContable
             conn = get_connection()
@@ -1277,45 +1327,49 @@ def generar_y_procesar_mes(año, mes):
             
             if valor_final_movimientos is not None and valor_final_inventario is not None:
                 if abs(float(valor_final_movimientos) - float(valor_final_inventario)) > 1:
-                    print(f"Advertencia: Los valores finales no coinciden:")
-                    print(f"Valor final en MovInventMes: {valor_final_movimientos:.2f}")
-                    print(f"Valor final en InventarioContable: {valor_final_inventario:.2f}")
+                    log.warning(f"Advertencia: Los valores finales no coinciden. "
+                                f"Valor final en MovInventMes: {valor_final_movimientos:.2f}, "
+                                f"en InventarioContable: {valor_final_inventario:.2f}")
                     
                     # Si es diciembre, no actualizar el valor final en InventarioContable
                     if mes == 12:
-                        print(f"No se actualizará el valor final de diciembre en InventarioContable, ya que es un valor de referencia")
+                        log.info(f"No se actualizará el valor final de diciembre en InventarioContable, ya que es un valor de referencia")
                     else:
                         # Solo actualizar para otros meses
                         actualizar_periodo(periodo, final=valor_final_movimientos)
-                        print(f"Se actualizó el valor final en InventarioContable a {valor_final_movimientos:.2f}")
+                        log.info(f"Se actualizó el valor final en InventarioContable a {valor_final_movimientos:.2f}")
             
         else:
-            print(f"Hubo errores en el procesamiento para {periodo}")
+            log.info(f"Hubo errores en el procesamiento para {periodo}")
             
         return exito
     
     except Exception as e:
-        print(f"Error en generar_y_procesar_mes: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception(f"Error en generar_y_procesar_mes: {str(e)}")
         return False
 
-def generar_año_completo(año):
+def generar_año_completo(año, semilla=None, agrupado=False):
     """
     Genera movimientos para todo el año, asegurando coherencia entre los valores
     de cada mes y manteniéndolos dentro de rangos razonables.
     
     Args:
         año (int): El año para el cual generar movimientos
+        semilla (int): Semilla del año; con la misma semilla se regeneran exactamente los mismos movimientos
+        agrupado (bool): Si el procesamiento de cada mes agrupa en memoria (ver procesar_movimientos_inventario)
         
     Returns:
         None
     """
-    print(f"Creando períodos faltantes para el año {año}...")
+    log.info(f"Creando períodos faltantes para el año {año}...")
+    reiniciar_estadisticas_conexiones()
+    
+    # Un único generador para todo el año, de modo que el año completo sea reproducible
+    rng = crear_generador(semilla)
     try:
         # Asegurar que existan todos los períodos del año
         if not crear_periodos_faltantes(año):
-            print("Error al crear los períodos faltantes")
+            log.error("Error al crear los períodos faltantes")
             return
         
         # Obtener el valor final de diciembre (valor de referencia) - NO debemos modificarlo
@@ -1327,19 +1381,19 @@ def generar_año_completo(año):
         row = cursor.fetchone()
         
         if row is None:
-            print(f"No se encontró el período 12/{año}")
+            log.info(f"No se encontró el período 12/{año}")
             conexion.close()
             return
         
         valor_final_diciembre = float(row[0])
-        print(f"Valor final de referencia para diciembre: {valor_final_diciembre:.2f}")
+        log.info(f"Valor final de referencia para diciembre: {valor_final_diciembre:.2f}")
         
         # Verificar si existe el valor inicial para enero
         cursor.execute("SELECT Inicial FROM InventarioContable WHERE Periodo = ?", (f"01/{año}",))
         row = cursor.fetchone()
         
         if row is None:
-            print(f"No se encontró el período 01/{año}")
+            log.info(f"No se encontró el período 01/{año}")
             conexion.close()
             return
         
@@ -1375,33 +1429,32 @@ def generar_año_completo(año):
         conexion.commit()
         conexion.close()
         
-        print("\nValores coherentes establecidos para todo el año")
-        print(f"Valor inicial del año: {valor_inicial_enero:.2f}")
-        print(f"Valor final del año (referencia): {valor_final_diciembre:.2f}")
-        print(f"Incremento anual: {(incremento_anual - 1) * 100:.2f}%")
+        log.info("Valores coherentes establecidos para todo el año")
+        log.info(f"Valor inicial del año: {valor_inicial_enero:.2f}")
+        log.info(f"Valor final del año (referencia): {valor_final_diciembre:.2f}")
+        log.info(f"Incremento anual: {(incremento_anual - 1) * 100:.2f}%")
         
-        print("\nGenerando movimientos para cada mes...")
+        log.info("Generando movimientos para cada mes...")
         for mes in range(1, 13):
             try:
-                print(f"\nGenerando movimientos para {calendar.month_name[mes]} {año}...")
+                log.info(f"Generando movimientos para {calendar.month_name[mes]} {año}...")
                 
                 # Usar la función integrada para generar y procesar en un solo paso
-                exito = generar_y_procesar_mes(año, mes)
+                exito = generar_y_procesar_mes(año, mes, rng=rng, agrupado=agrupado)
                 
                 if not exito:
-                    print(f"Error al procesar {calendar.month_name[mes]}, continuando con el siguiente mes...")
+                    log.error(f"Error al procesar {calendar.month_name[mes]}, continuando con el siguiente mes...")
                 
             except Exception as e:
-                print(f"Error en mes {mes}: {str(e)}")
+                log.error(f"Error en mes {mes}: {str(e)}")
                 continue
                 
-        print("\nGeneración de movimientos completada para el año completo")
+        log.info("Generación de movimientos completada para el año completo")
+        imprimir_estadisticas_conexiones()
         
     except Exception as e:
-        print(f"Error en generar_año_completo: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception(f"Error en generar_año_completo: {str(e)}")
 
 if __name__ == "__main__":
-    print("Por favor, use ejecutar_generacion.py para generar los movimientos.")
-    print("Ejemplo: python ejecutar_generacion.py 2025") 
\ No newline at end of file
+    log.info("Por favor, use ejecutar_generacion.py para generar los movimientos.")
+    log.info("Ejemplo: python ejecutar_generacion.py 2025")
\ No newline at end of file
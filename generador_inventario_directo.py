@@ -1,20 +1,49 @@
-import pyodbc
 import pandas as pd
 from datetime import datetime, timedelta
-import random
 import calendar
 import numpy as np
+from aleatorio import crear_generador, obtener_generador, entero, decimal, muestra, mezclar
+from insercion_lotes import (insertar_en_lotes, COLUMNAS_MOVINVENTMES, SQL_INSERTAR_PREPARACION, TABLA_PREPARACION,
+                             TAMAÑO_LOTE_PREDETERMINADO)
+from base_datos import asegurar_tabla_preparacion
+from catalogo import obtener_catalogo, cargar_catalogo
+from conexion import obtener_pool, reiniciar_estadisticas_conexiones, imprimir_estadisticas_conexiones
+from instrumentacion import medido, fase, contar
+from registro import obtener_registro
+from cuadre_exacto import cuadrar_cantidades, a_centavos
+
+log = obtener_registro('directo')
 
 # Configuración de la conexión a SQL Server
+CADENA_CONEXION = (
+    "DRIVER={SQL Server};"
+    "SERVER=SANJOSESQLI3;"
+    "DATABASE=sanjose;"
+    "UID=sd;"
+    "PWD=1234"
+)
+
+# El registro 0000000001 guarda el valor del inventario inicial como el Costo de una sola
+# unidad: su cantidad inicial y final es siempre esta, de modo que Costo * final es el valor
+UNIDADES_REGISTRO_INICIAL = 1
+
+# Valor de los movimientos de un mes sin el registro 0000000001: entradas menos salidas
+# (y autoconsumo y retiros) valoradas a su Costo
+SQL_VALOR_MOVIMIENTOS_MES = """
+    SUM(CASE WHEN Codigo = '0000000001' THEN 0
+             ELSE Costo * (Entradas - Salidas - AutoConsumo - Retiros) END)
+"""
+
+# Valor final de un mes: el valor inicial (registro 0000000001) más el de sus movimientos.
+# Es el valor que cuadran cuadrar_filas_mes y generar_movimientos_vectorizado; la existencia
+# que arrastra cada producto ya está dentro del valor inicial, por eso no es SUM(Costo * final)
+SQL_VALOR_FINAL_MES = f"""
+    (SUM(CASE WHEN Codigo = '0000000001' THEN Costo * final ELSE 0 END) + {SQL_VALOR_MOVIMIENTOS_MES})
+"""
+
 def get_connection():
-    conn_str = (
-        "DRIVER={SQL Server};"
-        "SERVER=SANJOSESQLI3;"
-        "DATABASE=sanjose;"
-        "UID=sd;"
-        "PWD=1234"
-    )
-    return pyodbc.connect(conn_str)
+    """Obtiene una conexión del pool compartido (close() la devuelve al pool)"""
+    return obtener_pool(CADENA_CONEXION).obtener()
 
 def obtener_datos_periodo(periodo):
     """Obtiene los datos del período de InventarioContable"""
@@ -28,42 +57,20 @@ def obtener_datos_periodo(periodo):
     conn.close()
     return df.iloc[0] if not df.empty else None
 
-def obtener_productos():
-    """Obtiene los productos del inventario para generar movimientos"""
-    conn = get_connection()
-    query = """
-    SELECT CODIGO, CATEGORIA, TIPO, DESCRIPCION, MARCA, PRECIO_COMPRA, EXISTENCIA
-    FROM Inventario
-    WHERE EXISTENCIA > 0 AND CODIGO NOT IN ('0000000001', '0000000002')
+def obtener_productos(snapshot=True):
     """
-    df = pd.read_sql(query, conn)
-    conn.close()
+    Obtiene los productos del inventario para generar movimientos
     
-    productos = []
-    for _, row in df.iterrows():
-        try:
-            # Construir descripción completa
-            categoria = str(row['CATEGORIA']).strip() if 'CATEGORIA' in row and not pd.isna(row['CATEGORIA']) else ""
-            tipo = str(row['TIPO']).strip() if 'TIPO' in row and not pd.isna(row['TIPO']) else ""
-            descripcion = str(row['DESCRIPCION']).strip() if 'DESCRIPCION' in row and not pd.isna(row['DESCRIPCION']) else ""
-            marca = str(row['MARCA']).strip() if 'MARCA' in row and not pd.isna(row['MARCA']) else ""
-            
-            descripcion_completa = f"{categoria} {tipo} {descripcion} {marca}".strip()
-            
-            producto = {
-                'codigo': str(row['CODIGO']).strip(),
-                'descripcion': descripcion_completa,
-                'precio': float(row['PRECIO_COMPRA']) if not pd.isna(row['PRECIO_COMPRA']) else 0.0,
-                'existencia': int(row['EXISTENCIA']) if not pd.isna(row['EXISTENCIA']) else 0
-            }
-            # Asegurar que los precios estén en un rango razonable (entre 5 y 500)
-            producto['precio'] = max(5.0, min(500.0, producto['precio']))
-            productos.append(producto)
-        except Exception as e:
-            print(f"Error al procesar producto: {str(e)}")
-            continue
+    La tabla Inventario solo se vuelve a leer si cambió desde la última carga
+    (ver catalogo.obtener_catalogo).
+    
+    Args:
+        snapshot (bool): Si se usa la copia en disco del catálogo entre ejecuciones
     
-    return productos
+    Returns:
+        Catalogo: Códigos, descripciones, precios y existencias en arreglos paralelos
+    """
+    return obtener_catalogo(('catalogo', CADENA_CONEXION), cargar_catalogo, get_connection, snapshot=snapshot)
 
 def obtener_dias_habiles(año, mes):
     """Obtiene los días hábiles (lunes a sábado) del mes especificado"""
@@ -83,28 +90,32 @@ def obtener_dias_habiles(año, mes):
     
     return dias_habiles
 
-def distribuir_valor(valor_total, num_productos):
+def distribuir_valor(valor_total, num_productos, rng=None):
     """Distribuye un valor total entre varios productos de forma aleatoria pero equilibrada"""
     if num_productos <= 0:
         return []
+    rng = obtener_generador(rng)
     
     # Generar pesos aleatorios para la distribución
-    pesos = np.random.dirichlet(np.ones(num_productos)) * valor_total
+    pesos = rng.dirichlet(np.ones(num_productos)) * valor_total
     
     # Redondear a 2 decimales
     return [round(peso, 2) for peso in pesos]
 
-def calcular_precio_consistente(precio_base, categoria_precio):
+def calcular_precio_consistente(precio_base, categoria_precio, rng=None):
     """
     Calcula un precio consistente basado en un precio base y una categoría
     
     Args:
         precio_base (float): Precio base del producto
         categoria_precio (int): Categoría de precio (0-4)
+        rng (np.random.Generator): Generador de números aleatorios de la ejecución
         
     Returns:
         float: Precio calculado
     """
+    rng = obtener_generador(rng)
+    
     # Definir rangos de precios por categoría
     rangos = [
         (5.0, 25.0),     # Categoría 0: productos muy económicos
@@ -119,7 +130,7 @@ def calcular_precio_consistente(precio_base, categoria_precio):
     # Si el precio base ya está en el rango, ajustarlo ligeramente
     if rango_min <= precio_base <= rango_max:
         # Variación aleatoria de ±10%
-        factor = random.uniform(0.9, 1.1)
+        factor = decimal(rng, 0.9, 1.1)
         precio = precio_base * factor
     else:
         # Si está fuera del rango, generamos un precio dentro del rango
@@ -129,15 +140,15 @@ def calcular_precio_consistente(precio_base, categoria_precio):
         
         if distancia_min < distancia_max:
             # Más cercano al mínimo
-            precio = rango_min + random.uniform(0, (rango_max - rango_min) * 0.4)
+            precio = rango_min + decimal(rng, 0, (rango_max - rango_min) * 0.4)
         else:
             # Más cercano al máximo
-            precio = rango_max - random.uniform(0, (rango_max - rango_min) * 0.4)
+            precio = rango_max - decimal(rng, 0, (rango_max - rango_min) * 0.4)
     
     # Redondear a 2 decimales
     return round(precio, 2)
 
-def distribuir_cantidad_por_dia(cantidad_total, num_dias, variabilidad=0.3):
+def distribuir_cantidad_por_dia(cantidad_total, num_dias, variabilidad=0.3, rng=None):
     """
     Distribuye una cantidad total entre varios días con cierta variabilidad
     
@@ -145,18 +156,20 @@ def distribuir_cantidad_por_dia(cantidad_total, num_dias, variabilidad=0.3):
         cantidad_total (int): Cantidad total a distribuir
         num_dias (int): Número de días
         variabilidad (float): Factor de variabilidad (0-1)
+        rng (np.random.Generator): Generador de números aleatorios de la ejecución
         
     Returns:
         list: Lista de cantidades por día
     """
     if num_dias <= 0 or cantidad_total <= 0:
         return []
+    rng = obtener_generador(rng)
     
     # Cantidad base por día
     cantidad_base = cantidad_total / num_dias
     
     # Generar factores aleatorios para cada día
-    factores = np.random.normal(1.0, variabilidad, num_dias)
+    factores = rng.normal(1.0, variabilidad, num_dias)
     
     # Normalizar factores para que sumen 1
     factores = factores / factores.sum()
@@ -167,7 +180,7 @@ def distribuir_cantidad_por_dia(cantidad_total, num_dias, variabilidad=0.3):
     # Ajustar para que sumen exactamente la cantidad total
     diferencia = cantidad_total - sum(cantidades)
     if diferencia != 0:
-        idx = random.randint(0, num_dias - 1)
+        idx = entero(rng, 0, num_dias - 1)
         cantidades[idx] += diferencia
     
     # Asegurar que no hay cantidades negativas
@@ -175,16 +188,18 @@ def distribuir_cantidad_por_dia(cantidad_total, num_dias, variabilidad=0.3):
     
     return cantidades
 
-def obtener_existencias_previas(año, mes):
+def obtener_existencias_previas(año, mes, catalogo=None):
     """
     Obtiene las existencias finales del período anterior para considerar como iniciales
     
     Args:
         año (int): Año actual
         mes (int): Mes actual (1-12)
+        catalogo (Catalogo): Si se indica, las existencias se devuelven alineadas con el catálogo
         
     Returns:
-        dict: Diccionario con existencias por código de producto
+        dict|np.ndarray: Diccionario con existencias por código de producto, o la existencia
+            de cada producto del catálogo (0 si no tuvo movimientos) si se indicó catalogo
     """
     try:
         # Determinar período anterior
@@ -200,25 +215,30 @@ def obtener_existencias_previas(año, mes):
         # Consultar existencias finales del período anterior
         conn = get_connection()
         query = """
-        SELECT Codigo, Final
+        SELECT Codigo, Final AS Final
         FROM MovInventMes
         WHERE Periodo = ? AND Codigo <> '0000000001'
         """
         df = pd.read_sql(query, conn, params=[periodo_anterior])
         conn.close()
         
-        # Crear diccionario de existencias
-        existencias = {}
-        for _, row in df.iterrows():
-            codigo = row['Codigo']
-            existencia = int(row['Final']) if not pd.isna(row['Final']) else 0
-            # Asegurar que no haya existencias negativas en los datos previos
-            existencias[codigo] = max(0, existencia)
+        # Si un código aparece varias veces vale su último registro
+        df = df.drop_duplicates('Codigo', keep='last')
+        # Asegurar que no haya existencias negativas en los datos previos
+        finales = df['Final'].fillna(0).astype(np.int64).clip(lower=0)
         
+        if catalogo is None:
+            return dict(zip(df['Codigo'], finales.tolist()))
+        
+        # Existencias alineadas con el catálogo (los códigos fuera del catálogo se ignoran)
+        existencias = np.zeros(len(catalogo), dtype=np.int64)
+        indices = df['Codigo'].str.strip().map(catalogo.indices)
+        en_catalogo = indices.notna().to_numpy()
+        existencias[indices[en_catalogo].astype(np.int64).to_numpy()] = finales.to_numpy()[en_catalogo]
         return existencias
     except Exception as e:
-        print(f"Error al obtener existencias previas: {str(e)}")
-        return {}
+        log.error(f"Error al obtener existencias previas: {str(e)}")
+        return {} if catalogo is None else np.zeros(len(catalogo), dtype=np.int64)
 
 def actualizar_inventario_contable(periodo, conn=None):
     """
@@ -242,18 +262,18 @@ def actualizar_inventario_contable(periodo, conn=None):
         # Obtener mes y año del período
         mes, año = map(int, periodo.split('/'))
         
-        # 1. Calcular valor inicial y final basado en MovInventMes
-        cursor.execute("""
+        # 1. Calcular valor inicial y final basado en MovInventMes (ver SQL_VALOR_FINAL_MES)
+        cursor.execute(f"""
             SELECT 
                 SUM(CASE WHEN Codigo = '0000000001' THEN Costo ELSE 0 END) AS ValorInicial,
-                SUM(Costo * final) AS ValorFinal
+                {SQL_VALOR_FINAL_MES} AS ValorFinal
             FROM MovInventMes
             WHERE Periodo = ?
         """, (periodo,))
         
         result = cursor.fetchone()
         valor_inicial = result[0] if result[0] is not None else 0
-        valor_final = result[1] if result[1] is not None else 0
+        valor_final = round(result[1], 2) if result[1] is not None else 0
         
         # 2. Si es diciembre del año actual, no actualizar el valor final
         es_diciembre_año_actual = (mes == 12 and año == datetime.now().year)
@@ -299,9 +319,7 @@ def actualizar_inventario_contable(periodo, conn=None):
         return True
         
     except Exception as e:
-        print(f"Error al actualizar InventarioContable para {periodo}: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception(f"Error al actualizar InventarioContable para {periodo}: {str(e)}")
         
         try:
             if cerrar_conn and conn:
@@ -316,6 +334,12 @@ def recalcular_periodos_año(año):
     """
     Recalcula todos los períodos de un año para asegurar coherencia
     
+    Los valores de todos los meses se obtienen de MovInventMes con una única consulta
+    agrupada por período; la cadena Final -> Inicial del mes siguiente se resuelve en
+    memoria, mes a mes, y solo los períodos que cambian se actualizan en un lote.
+    El valor final de cada mes es SQL_VALOR_FINAL_MES, el mismo que cuadra la generación,
+    de modo que un año recién generado conserva los objetivos de InventarioContable.
+    
     Args:
         año (int): Año a recalcular
     
@@ -324,123 +348,97 @@ def recalcular_periodos_año(año):
     """
     try:
         conn = get_connection()
+        cursor = conn.cursor()
+        periodo_enero_siguiente = f"01/{año+1}"
+        
+        # 1. Valores reales de todos los meses, calculados en una sola consulta sobre MovInventMes
+        cursor.execute(f"""
+            SELECT 
+                Periodo,
+                SUM(CASE WHEN Codigo = '0000000001' THEN Costo ELSE 0 END) AS ValorInicial,
+                {SQL_VALOR_FINAL_MES} AS ValorFinal
+            FROM MovInventMes
+            WHERE Periodo LIKE ?
+            GROUP BY Periodo
+        """, (f'__/{año}',))
+        valores_movimientos = {
+            periodo: (valor_inicial, round(valor_final, 2) if valor_final is not None else None)
+            for periodo, valor_inicial, valor_final in cursor.fetchall()
+        }
         
-        # Primer paso: procesar desde enero hasta noviembre
-        for mes in range(1, 12):  # Solo procesar hasta noviembre (11)
+        # 2. Valores actuales de InventarioContable del año y de enero del año siguiente
+        cursor.execute("""
+            SELECT Periodo, Inicial, Final
+            FROM InventarioContable
+            WHERE Periodo LIKE ? OR Periodo = ?
+        """, (f'__/{año}', periodo_enero_siguiente))
+        contable = {}
+        for periodo, inicial, final in cursor.fetchall():
+            contable.setdefault(periodo, {'Inicial': inicial, 'Final': final})
+        contable_original = {periodo: dict(valores) for periodo, valores in contable.items()}
+        
+        def actualizar(periodo, **valores):
+            # Como un UPDATE ... WHERE Periodo = ?: no hace nada si el período no existe
+            if periodo in contable:
+                contable[periodo].update(valores)
+        
+        # 3. Enero a noviembre: cada mes toma sus valores reales y pasa su final al inicial del siguiente
+        for mes in range(1, 12):
             periodo = f"{mes:02d}/{año}"
-            print(f"Recalculando período {periodo}...")
-            
-            # Obtener movimientos del período
-            cursor = conn.cursor()
-            
-            # 1. Calcular valores reales basados en MovInventMes
-            cursor.execute("""
-                SELECT 
-                    SUM(CASE WHEN Codigo = '0000000001' THEN Costo ELSE 0 END) AS ValorInicial,
-                    SUM(Costo * final) AS ValorFinal
-                FROM MovInventMes
-                WHERE Periodo = ?
-            """, (periodo,))
+            if periodo not in valores_movimientos or valores_movimientos[periodo][0] is None:
+                log.info(f"  No se encontraron datos para el período {periodo}")
+                continue
             
-            result = cursor.fetchone()
-            if result and result[0] is not None:
-                valor_inicial = result[0]
-                valor_final = result[1] if result[1] is not None else 0
-                
-                # 2. Actualizar InventarioContable para el mes actual
-                cursor.execute("""
-                    UPDATE InventarioContable
-                    SET Inicial = ?, Final = ?
-                    WHERE Periodo = ?
-                """, (valor_inicial, valor_final, periodo))
-                
-                # 3. Actualizar el inicial del mes siguiente (incluyendo diciembre)
-                siguiente_periodo = f"{mes+1:02d}/{año}"
-                cursor.execute("""
-                    UPDATE InventarioContable
-                    SET Inicial = ?
-                    WHERE Periodo = ?
-                """, (valor_final, siguiente_periodo))
-                
-                print(f"  Período {periodo}: Actualizado inicial={valor_inicial:.2f}, final={valor_final:.2f}")
-                print(f"  Período {siguiente_periodo}: Actualizado inicial={valor_final:.2f}")
-            else:
-                print(f"  No se encontraron datos para el período {periodo}")
+            valor_inicial, valor_final = valores_movimientos[periodo]
+            valor_final = valor_final if valor_final is not None else 0
+            siguiente_periodo = f"{mes+1:02d}/{año}"
+            actualizar(periodo, Inicial=valor_inicial, Final=valor_final)
+            actualizar(siguiente_periodo, Inicial=valor_final)
+            log.info(f"  Período {periodo}: inicial={valor_inicial:.2f}, final={valor_final:.2f}")
         
-        # Segundo paso: procesar diciembre por separado
+        # 4. Diciembre: toma como inicial el final de noviembre y conserva su valor final
         periodo_diciembre = f"12/{año}"
-        print(f"Recalculando período {periodo_diciembre}...")
-        
-        cursor = conn.cursor()
-        
-        # Obtener el valor inicial de diciembre (que debería ser el final de noviembre)
-        cursor.execute("""
-            SELECT Final
-            FROM InventarioContable
-            WHERE Periodo = ?
-        """, (f"11/{año}",))
+        valor_inicial_diciembre = contable.get(f"11/{año}", {}).get('Final')
+        valor_final_diciembre = contable.get(periodo_diciembre, {}).get('Final')
+        if valor_inicial_diciembre is None:
+            log.info(f"  No se encontró valor final para el período 11/{año}")
+        elif valor_final_diciembre is None:
+            log.info(f"  No se encontró valor final para el período {periodo_diciembre}")
+        else:
+            actualizar(periodo_diciembre, Inicial=valor_inicial_diciembre)
+            # Si existe enero del siguiente año, su inicial es el final de diciembre
+            actualizar(periodo_enero_siguiente, Inicial=valor_final_diciembre)
+            log.info(f"  Período {periodo_diciembre}: inicial={valor_inicial_diciembre:.2f} (final mantenido en {valor_final_diciembre:.2f})")
+        
+        # 5. Guardar en un lote solo los períodos que cambiaron
+        cambios = [
+            (valores['Inicial'], valores['Final'], periodo)
+            for periodo, valores in contable.items()
+            if valores != contable_original[periodo]
+        ]
+        if cambios:
+            cursor.executemany("""
+                UPDATE InventarioContable
+                SET Inicial = ?, Final = ?
+                WHERE Periodo = ?
+            """, cambios)
         
-        result = cursor.fetchone()
-        if result and result[0] is not None:
-            valor_inicial_diciembre = result[0]
-            
-            # Para diciembre, obtener el Costo (que debe ser el valor inicial) y mantener el Final existente
+        # El Costo del registro 0000000001 de diciembre es su valor inicial
+        if valor_inicial_diciembre is not None and valor_final_diciembre is not None:
             cursor.execute("""
-                SELECT 
-                    Final
-                FROM InventarioContable
-                WHERE Periodo = ?
-            """, (periodo_diciembre,))
-            
-            result_dic = cursor.fetchone()
-            if result_dic and result_dic[0] is not None:
-                valor_final_diciembre = result_dic[0]
-                
-                # Actualizar solo el inicial de diciembre con el final de noviembre
-                cursor.execute("""
-                    UPDATE InventarioContable
-                    SET Inicial = ?
-                    WHERE Periodo = ?
-                """, (valor_inicial_diciembre, periodo_diciembre))
-                
-                # Actualizar el Costo del registro 0000000001 de diciembre
-                cursor.execute("""
-                    UPDATE MovInventMes
-                    SET Costo = ?
-                    WHERE Periodo = ? AND Codigo = '0000000001'
-                """, (valor_inicial_diciembre, periodo_diciembre))
-                
-                print(f"  Período {periodo_diciembre}: Actualizado inicial={valor_inicial_diciembre:.2f} (final mantenido en {valor_final_diciembre:.2f})")
-                
-                # Si existe enero del siguiente año, actualizar su inicial con el final de diciembre
-                siguiente_año = año + 1
-                cursor.execute("""
-                    SELECT COUNT(*) 
-                    FROM InventarioContable 
-                    WHERE Periodo = ?
-                """, (f"01/{siguiente_año}",))
-                
-                if cursor.fetchone()[0] > 0:
-                    cursor.execute("""
-                        UPDATE InventarioContable
-                        SET Inicial = ?
-                        WHERE Periodo = ?
-                    """, (valor_final_diciembre, f"01/{siguiente_año}"))
-                    print(f"  Período 01/{siguiente_año}: Actualizado inicial={valor_final_diciembre:.2f}")
-            else:
-                print(f"  No se encontró valor final para el período {periodo_diciembre}")
-        else:
-            print(f"  No se encontró valor final para el período 11/{año}")
+                UPDATE MovInventMes
+                SET Costo = ?
+                WHERE Periodo = ? AND Codigo = '0000000001'
+            """, (valor_inicial_diciembre, periodo_diciembre))
         
         conn.commit()
         conn.close()
         
+        log.info(f"Períodos actualizados en InventarioContable: {len(cambios)}")
         return True
         
     except Exception as e:
-        print(f"Error al recalcular períodos del año {año}: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception(f"Error al recalcular períodos del año {año}: {str(e)}")
         
         try:
             conn.rollback()
@@ -450,107 +448,709 @@ def recalcular_periodos_año(año):
         
         return False
 
-def asegurar_no_negativos(conn, periodo):
+# Número máximo de productos con movimientos en un mes cuando no se indica num_productos
+MAXIMO_PRODUCTOS_MES = 50
+
+# Margen de unidades que se deja al corregir existencias negativas
+MARGEN_EXISTENCIAS_NEGATIVAS = 15
+
+def asegurar_no_negativos(conn, periodo, por_conjunto=True, confirmar=True, tabla='MovInventMes'):
     """
     Asegura que no haya existencias negativas en MovInventMes
     aplicando la regla: inicial + entradas >= salidas + autoconsumo + retiros
     
+    Por defecto corrige todos los registros del período con dos sentencias UPDATE
+    (modo por conjunto). Con por_conjunto=False se usa la corrección registro a registro.
+    
     Args:
         conn: Conexión a la base de datos
         periodo: Período a verificar
+        por_conjunto (bool): Si se corrigen todos los registros con sentencias por conjunto
+        confirmar (bool): Si se hace commit al terminar (False para incluirlo en una transacción mayor)
+        tabla (str): Tabla a corregir (MovInventMes o la tabla de preparación, ver TABLA_PREPARACION)
+    
+    Returns:
+        dict: Resumen con el número de registros con entradas y salidas ajustadas
     """
+    if not por_conjunto:
+        return asegurar_no_negativos_por_fila(conn, periodo, confirmar=confirmar, tabla=tabla)
+    
     cursor = conn.cursor()
     
+    # 1. Incrementar entradas donde no alcanzan para cubrir las salidas totales,
+    #    dejando un margen: inicial + Entradas = salidas totales + margen, por lo que final = margen
+    cursor.execute(f"""
+        UPDATE {tabla}
+        SET Entradas = Salidas + AutoConsumo + Retiros - inicial + ?,
+            final = ?
+        WHERE Periodo = ?
+          AND (final < 0 OR (inicial + Entradas) < (Salidas + AutoConsumo + Retiros))
+          AND Entradas < Salidas + AutoConsumo + Retiros - inicial + ?
+    """, (MARGEN_EXISTENCIAS_NEGATIVAS, MARGEN_EXISTENCIAS_NEGATIVAS, periodo, MARGEN_EXISTENCIAS_NEGATIVAS))
+    entradas_ajustadas = max(0, cursor.rowcount)
+    
+    # 2. Para los casos extremos donde final aún sea negativo, ajustar las salidas
+    #    y dejar el final en cero como mínimo
+    cursor.execute(f"""
+        UPDATE {tabla}
+        SET Salidas = CASE WHEN inicial + Entradas - AutoConsumo - Retiros < 0 THEN 0 
+                           ELSE inicial + Entradas - AutoConsumo - Retiros END,
+            final = CASE WHEN inicial + Entradas - Salidas - AutoConsumo - Retiros < 0 THEN 0
+                         ELSE inicial + Entradas - Salidas - AutoConsumo - Retiros END
+        WHERE Periodo = ? AND final < 0
+    """, (periodo,))
+    salidas_ajustadas = max(0, cursor.rowcount)
+    
+    if confirmar:
+        conn.commit()
+    
+    if entradas_ajustadas or salidas_ajustadas:
+        log.info(f"Corregidos registros con potencial de existencias negativas: "
+              f"{entradas_ajustadas} con entradas ajustadas, {salidas_ajustadas} con salidas ajustadas")
+    
+    return {
+        'entradas_ajustadas': entradas_ajustadas,
+        'salidas_ajustadas': salidas_ajustadas,
+        'registros_corregidos': entradas_ajustadas + salidas_ajustadas
+    }
+
+def asegurar_no_negativos_por_fila(conn, periodo, confirmar=True, tabla='MovInventMes'):
+    """
+    Versión registro a registro de asegurar_no_negativos (una sentencia UPDATE por registro)
+    
+    Aplica las mismas dos correcciones que el modo por conjunto, calculadas en Python para
+    cada registro leído. Como la tabla no tiene clave por registro, cada UPDATE identifica
+    el registro por su período, código y cantidades: los registros con los mismos valores
+    reciben la misma corrección que les daría el modo por conjunto, por lo que ambos modos
+    dejan la tabla igual y devuelven los mismos contadores.
+    
+    Args:
+        conn: Conexión a la base de datos
+        periodo: Período a verificar
+        confirmar (bool): Si se hace commit al terminar (False para incluirlo en una transacción mayor)
+        tabla (str): Tabla a corregir
+    
+    Returns:
+        dict: Resumen con el número de registros con entradas y salidas ajustadas
+    """
+    cursor = conn.cursor()
+    entradas_ajustadas = 0
+    salidas_ajustadas = 0
+    
     # Buscar registros donde final < 0 o inicial + entradas < salidas + autoconsumo + retiros
-    cursor.execute("""
+    cursor.execute(f"""
         SELECT Codigo, inicial, Entradas, Salidas, AutoConsumo, Retiros, final
-        FROM MovInventMes
+        FROM {tabla}
         WHERE Periodo = ? 
           AND (final < 0 OR (inicial + Entradas) < (Salidas + AutoConsumo + Retiros))
     """, (periodo,))
     
     registros_negativos = cursor.fetchall()
     if registros_negativos:
-        print(f"Corrigiendo {len(registros_negativos)} registros con potencial de existencias negativas...")
-        
-        for reg in registros_negativos:
-            codigo = reg[0]
-            inicial = reg[1]
-            entradas = reg[2]
-            salidas = reg[3]
-            autoconsumo = reg[4]
-            retiros = reg[5]
-            final_actual = reg[6]
+        log.info(f"Corrigiendo {len(registros_negativos)} registros con potencial de existencias negativas...")
+    
+    for codigo, inicial, entradas, salidas, autoconsumo, retiros, final_actual in registros_negativos:
+        salidas_totales = salidas + autoconsumo + retiros
+        nuevas_entradas, nuevas_salidas, nuevo_final = entradas, salidas, final_actual
+        
+        # Estrategia 1: incrementar entradas hasta cubrir las salidas totales más el margen
+        entradas_necesarias = salidas_totales - inicial + MARGEN_EXISTENCIAS_NEGATIVAS
+        ajusta_entradas = entradas < entradas_necesarias
+        if ajusta_entradas:
+            nuevas_entradas = entradas_necesarias
+            nuevo_final = MARGEN_EXISTENCIAS_NEGATIVAS
+        
+        # Estrategia 2: si el final aún es negativo, ajustar las salidas y dejar el final en cero como mínimo
+        ajusta_salidas = nuevo_final < 0
+        if ajusta_salidas:
+            nuevas_salidas = max(0, inicial + nuevas_entradas - autoconsumo - retiros)
+            nuevo_final = max(0, inicial + nuevas_entradas - salidas_totales)
+        
+        if not (ajusta_entradas or ajusta_salidas):
+            continue
+        
+        # Si varios registros tienen los mismos valores, el primero los corrige a todos y
+        # los siguientes ya no encuentran filas (rowcount 0)
+        cursor.execute(f"""
+            UPDATE {tabla}
+            SET Entradas = ?, Salidas = ?, final = ?
+            WHERE Periodo = ? AND Codigo = ? AND inicial = ? AND Entradas = ? AND Salidas = ?
+              AND AutoConsumo = ? AND Retiros = ? AND final = ?
+        """, (nuevas_entradas, nuevas_salidas, nuevo_final, periodo, codigo, inicial, entradas, salidas,
+              autoconsumo, retiros, final_actual))
+        filas = max(0, cursor.rowcount)
+        
+        if ajusta_entradas:
+            log.debug("Código %s: Entradas ajustadas de %s a %s", codigo, entradas, nuevas_entradas)
+            contar('entradas_ajustadas_negativos', filas)
+            entradas_ajustadas += filas
+        if ajusta_salidas:
+            log.debug("Código %s: Salidas ajustadas para evitar existencias negativas", codigo)
+            contar('salidas_ajustadas_negativos', filas)
+            salidas_ajustadas += filas
+    
+    if confirmar:
+        conn.commit()
+    
+    return {
+        'entradas_ajustadas': entradas_ajustadas,
+        'salidas_ajustadas': salidas_ajustadas,
+        'registros_corregidos': entradas_ajustadas + salidas_ajustadas
+    }
+
+def seleccionar_productos(catalogo, existencias_previas, diferencia, rng=None, num_productos=None):
+    """
+    Selecciona los productos que tendrán movimientos en el mes, priorizando los que tienen existencias
+    
+    Sin num_productos, el número depende de la diferencia del mes (entre 10 y
+    MAXIMO_PRODUCTOS_MES); con num_productos se seleccionan esos productos (hasta el
+    catálogo completo), p. ej. para generar con el motor vectorizado a escala de catálogo.
+    
+    Args:
+        catalogo (Catalogo): Productos disponibles (ver obtener_productos)
+        existencias_previas (np.ndarray): Existencia de cada producto del catálogo al cierre del período anterior
+        diferencia (float): Diferencia entre el valor final y el inicial del mes
+        rng (np.random.Generator): Generador de números aleatorios de la ejecución
+        num_productos (int): Número de productos a seleccionar (None para decidirlo según la diferencia)
+    
+    Returns:
+        np.ndarray: Índices en el catálogo de los productos seleccionados
+    """
+    rng = obtener_generador(rng)
+    
+    # Seleccionar un número de productos que depende del mes
+    # Más productos para los meses con mayor diferencia
+    if num_productos is None:
+        factor_productos = abs(diferencia) / 10000  # Ajustar según la magnitud
+        num_productos = max(10, min(MAXIMO_PRODUCTOS_MES, int(20 + factor_productos)))
+    num_productos = min(len(catalogo), max(0, int(num_productos)))
+    
+    # Priorizar productos con existencias previas
+    productos_con_existencia = np.flatnonzero(existencias_previas > 0)
+    productos_sin_existencia = np.flatnonzero(existencias_previas <= 0)
+    
+    # Asegurar que tenemos suficientes productos
+    if len(productos_con_existencia) < num_productos // 3:
+        # Si hay pocos productos con existencia, completar con productos sin existencia
+        productos_adicionales = muestra(rng, productos_sin_existencia, min(len(productos_sin_existencia), num_productos - len(productos_con_existencia)))
+        productos_seleccionados = [*productos_con_existencia, *productos_adicionales]
+    else:
+        # Si hay suficientes productos con existencia, seleccionar algunos de ellos
+        productos_seleccionados = muestra(rng, productos_con_existencia, min(len(productos_con_existencia), num_productos))
+        
+        # Completar con productos sin existencia si es necesario
+        if len(productos_seleccionados) < num_productos:
+            productos_adicionales = muestra(rng, productos_sin_existencia, min(len(productos_sin_existencia), num_productos - len(productos_seleccionados)))
+            productos_seleccionados += productos_adicionales
+    
+    return np.array(productos_seleccionados, dtype=np.int64)
+
+def generar_ajuste_final(periodo, diferencia, dias_habiles, valor_inventario):
+    """
+    Movimiento de ajuste para la parte de la diferencia que cuadrar_cantidades no pudo cubrir
+    
+    Solo se usa cuando las cantidades del mes no alcanzan (sin productos o con límites agotados):
+    un único registro del código 0000000002 el último día hábil, de una unidad con el importe pendiente.
+    
+    Args:
+        periodo (str): Período en formato MM/AAAA
+        diferencia (float): Importe pendiente (valor objetivo - valor alcanzado)
+        dias_habiles (list): Días hábiles del mes
+        valor_inventario (float): Valor del campo Inventario de cada registro
+    
+    Returns:
+        list: Fila de ajuste (vacía si no hace falta ajustar)
+    """
+    diferencia = round(diferencia, 2)
+    if abs(diferencia) < 0.01:
+        return []
+    
+    log.warning(f"ADVERTENCIA: Las cantidades de {periodo} no alcanzan para cuadrar {diferencia:.2f}. "
+                f"Se agrega un movimiento de ajuste.")
+    contar('ajuste_final_residual')
+    # Entrada de una unidad si falta valor, salida de una unidad si sobra
+    if diferencia > 0:
+        inicial, entradas, salidas = 0, 1, 0
+    else:
+        inicial, entradas, salidas = 1, 0, 1
+    return [(
+        periodo, '0000000002', inicial, abs(diferencia), 'AJUSTE VALOR FINAL PERIODO',
+        entradas, salidas, 0, 0, inicial + entradas - salidas, dias_habiles[-1], valor_inventario
+    )]
+
+def cuadrar_filas_mes(filas, periodo, valor_inicial, valor_final, existencias_iniciales, dias_habiles, valor_inventario):
+    """
+    Cuadra las filas del mes con el valor final ajustando las cantidades de productos reales
+    
+    Args:
+        filas (list): Filas en el orden de COLUMNAS_MOVINVENTMES, en orden cronológico por producto
+        periodo (str): Período en formato MM/AAAA
+        valor_inicial (float): Valor inicial del período
+        valor_final (float): Valor final objetivo del período
+        existencias_iniciales (dict): Existencia de cada código al inicio del mes
+        dias_habiles (list): Días hábiles del mes
+        valor_inventario (float): Valor del campo Inventario de cada registro
+    
+    Returns:
+        list: Filas cuadradas, más el ajuste de generar_ajuste_final si quedó importe sin cubrir
+    """
+    if not filas:
+        return generar_ajuste_final(periodo, valor_final - valor_inicial, dias_habiles, valor_inventario)
+    
+    columnas = list(zip(*filas))
+    indice = {columna: i for i, columna in enumerate(COLUMNAS_MOVINVENTMES)}
+    codigos = np.array(columnas[indice['Codigo']], dtype=object)
+    costos = np.array(columnas[indice['Costo']], dtype=float)
+    entradas = np.array(columnas[indice['Entradas']], dtype=np.int64)
+    salidas = np.array(columnas[indice['Salidas']], dtype=np.int64)
+    
+    # Valor alcanzado en centavos, con el mismo redondeo por movimiento que el generador
+    centavos_costo = a_centavos(costos)
+    valor_alcanzado = (int(a_centavos(valor_inicial)) + int((entradas * centavos_costo).sum())
+                       - int((salidas * centavos_costo).sum())) / 100
+    diferencia = valor_final - valor_alcanzado
+    
+    entradas, salidas, inicial, final, residuo = cuadrar_cantidades(
+        codigos, entradas, salidas, columnas[indice['inicial']], columnas[indice['final']],
+        costos, existencias_iniciales, diferencia
+    )
+    log.info(f"Cuadre de {periodo}: diferencia {diferencia:.2f}, {diferencia - residuo:.2f} cubiertos con "
+             f"cantidades de productos, {residuo:.2f} sin cubrir")
+    
+    cuadradas = []
+    for i, fila in enumerate(filas):
+        fila = list(fila)
+        fila[indice['inicial']] = int(inicial[i])
+        fila[indice['Entradas']] = int(entradas[i])
+        fila[indice['Salidas']] = int(salidas[i])
+        fila[indice['final']] = int(final[i])
+        cuadradas.append(tuple(fila))
+    return cuadradas + generar_ajuste_final(periodo, residuo, dias_habiles, valor_inventario)
+
+def generar_filas_mes(periodo, valor_inicial, valor_final, valor_inventario, catalogo, existencias_previas, dias_habiles,
+                      rng=None, num_productos=None):
+    """
+    Genera en memoria los movimientos de MovInventMes de un período, sin acceder a la base de datos
+    
+    Args:
+        periodo (str): Período en formato MM/AAAA
+        valor_inicial (float): Valor inicial del período (InventarioContable.Inicial)
+        valor_final (float): Valor final objetivo del período (InventarioContable.Final)
+        valor_inventario (float): Valor del campo Inventario de cada registro
+        catalogo (Catalogo): Productos disponibles (ver obtener_productos)
+        existencias_previas (np.ndarray): Existencia de cada producto del catálogo al cierre del período anterior
+        dias_habiles (list): Días hábiles del mes
+        rng (np.random.Generator): Generador de números aleatorios de la ejecución
+        num_productos (int): Productos con movimientos en el mes (ver seleccionar_productos)
+    
+    Returns:
+        list: Filas en el orden de COLUMNAS_MOVINVENTMES, listas para insertar
+    """
+    rng = obtener_generador(rng)
+    
+    # Calcular diferencia para este mes específico
+    diferencia = valor_final - valor_inicial
+    
+    productos_seleccionados = seleccionar_productos(catalogo, existencias_previas, diferencia, rng=rng,
+                                                    num_productos=num_productos)
+    
+    filas = []
+    
+    # Insertar registro de inventario inicial (1 unidad con el valor monetario total)
+    primer_dia = dias_habiles[0]
+    filas.append((
+        periodo, '0000000001', UNIDADES_REGISTRO_INICIAL, valor_inicial, 'INVENTARIO INICIAL MES ANTERIOR',
+        0, 0, 0, 0, UNIDADES_REGISTRO_INICIAL, primer_dia, valor_inventario
+    ))
+
+    # Distribuir el valor total entre los productos
+    # Ajustamos la magnitud según la diferencia del mes
+    valor_distribuir = abs(diferencia) * 0.5  # Usamos 50% de la diferencia
+    if diferencia > 0:
+        # Para diferencia positiva, aumentamos el factor de distribución
+        valor_total_productos = valor_distribuir + valor_inicial * 0.1  # 10% del valor inicial adicional
+    else:
+        # Para diferencia negativa, limitamos un poco el valor distribuido
+        valor_total_productos = max(valor_distribuir, valor_inicial * 0.05)  # Al menos 5% del valor inicial
+        
+    valores_por_producto = distribuir_valor(valor_total_productos, len(productos_seleccionados), rng=rng)
+    
+    # Variables para acumular valores monetarios
+    total_valor_entradas = 0
+    total_valor_salidas = 0
+    
+    # Procesar cada producto por su índice en el catálogo; cada producto se procesa de una vez,
+    # así que su existencia acumulada durante el mes se lleva en una variable local
+    for i, indice in enumerate(productos_seleccionados):
+        codigo = catalogo.codigos[indice]
+        descripcion = catalogo.descripciones[indice]
+        
+        # Asignar categoría de precio (0-4) basada en algún criterio
+        categoria_precio = i % 5
+        
+        # Calcular un precio consistente
+        precio_unitario = calcular_precio_consistente(float(catalogo.precios[indice]), categoria_precio, rng=rng)
+        
+        # Valor total asignado a este producto
+        valor_producto = valores_por_producto[i]
+        
+        # Existencia inicial del producto al inicio del mes
+        existencia_inicial = int(existencias_previas[indice])
+        existencia_acumulada = existencia_inicial
+        
+        # Para productos con existencia inicial < 5, garantizar una entrada inicial grande
+        if existencia_inicial < 5:
+            entrada_inicial_min = max(20, int(valor_producto / (precio_unitario * 0.5)))
+            entrada_inicial = entero(rng, entrada_inicial_min, entrada_inicial_min + 20)
+            
+            # Registrar entrada inicial al principio del mes
+            dia_entrada_inicial = dias_habiles[1] if len(dias_habiles) > 1 else dias_habiles[0]
+            
+            # Actualizar existencia acumulada
+            existencia_acumulada = existencia_inicial + entrada_inicial
+            
+            # Calcular valor de la entrada
+            valor_entrada = round(entrada_inicial * precio_unitario, 2)
+            total_valor_entradas += valor_entrada
             
-            # Calcular las salidas totales
-            salidas_totales = salidas + autoconsumo + retiros
+            # Insertar registro de entrada inicial
+            filas.append((
+                periodo, 
+                codigo, 
+                existencia_inicial,
+                precio_unitario,
+                descripcion,
+                entrada_inicial,
+                0, 0, 0,
+                existencia_acumulada,
+                dia_entrada_inicial,
+                valor_inventario
+            ))
+        
+        # Determinar número de movimientos adicionales para este producto (aprox. 4x)
+        factor_multiplicador_movs = 4 
+        if existencia_inicial < 5:
+            # Si ya generamos una entrada inicial grande, menos movimientos adicionales
+            num_movimientos = entero(rng, 1 * factor_multiplicador_movs, 3 * factor_multiplicador_movs) 
+        else:
+            # Más movimientos para productos con existencia
+            num_movimientos = entero(rng, 2 * factor_multiplicador_movs, 4 * factor_multiplicador_movs)
+        log.debug("Producto %s: Generando %d movimientos adicionales", codigo, num_movimientos)
+        
+        # Dividir los días hábiles en grupos para distribuir los movimientos
+        # Excluimos los primeros días ya usados
+        dias_inicio = 2 if existencia_inicial < 5 else 1
+        dias_disponibles = dias_habiles[dias_inicio:] if len(dias_habiles) > dias_inicio else []
+        
+        if not dias_disponibles:
+            continue  # Si no hay más días disponibles, pasar al siguiente producto
+            
+        # Mezclar días para evitar patrones
+        dias_disponibles = mezclar(rng, dias_disponibles)
+        dias_seleccionados = dias_disponibles[:num_movimientos] if num_movimientos <= len(dias_disponibles) else dias_disponibles
+        dias_seleccionados.sort()  # Ordenar cronológicamente
+        
+        # Determinar tendencia según diferencia global
+        # Si la diferencia es positiva (aumento en inventario), favorecer más entradas que salidas
+        porcentaje_entradas = 0.7 if diferencia > 0 else 0.5
+        
+        # Para cada día seleccionado, generar un movimiento
+        for idx, dia in enumerate(dias_seleccionados):
+            # Existencia antes del movimiento
+            existencia_antes = existencia_acumulada
+            
+            # Si es el primer movimiento o hay poca existencia, garantizar una entrada
+            debe_tener_entrada = idx == 0 or existencia_antes < 15 or rng.random() < porcentaje_entradas
+            
+            # Solo permitir salidas si hay suficiente existencia
+            puede_tener_salida = existencia_antes >= 15 and rng.random() < 0.6
+            
+            # Si es el último movimiento y aún no hay suficientes existencias, forzar entrada
+            if idx == len(dias_seleccionados) - 1 and existencia_antes < 20:
+                debe_tener_entrada = True
+                puede_tener_salida = False
             
-            # Estrategia 1: Si hay existencias negativas, incrementar entradas
-            if final_actual < 0 or (inicial + entradas) < salidas_totales:
-                # Calcular las entradas adicionales necesarias para garantizar existencias positivas
-                # La fórmula asegura que: inicial + (entradas + adicionales) = salidas_totales + margen
-                entradas_necesarias = salidas_totales - inicial + 15  # Agregamos margen de 15 unidades
+            # Calcular cantidades para entradas/salidas
+            cantidad_base = max(5, round(valor_producto / (precio_unitario * (num_movimientos + 1))))
+            
+            # CASO 1: Solo entradas
+            if debe_tener_entrada and not puede_tener_salida:
+                # Variación aleatoria para hacer más natural
+                factor_variacion = decimal(rng, 0.8, 1.5)
+                cantidad_entrada = max(5, round(cantidad_base * factor_variacion))
+                
+                # Actualizar existencia acumulada
+                existencia_acumulada += cantidad_entrada
                 
-                if entradas < entradas_necesarias:
-                    entradas_adicionales = entradas_necesarias - entradas
+                # Calcular valor real
+                valor_entrada = round(cantidad_entrada * precio_unitario, 2)
+                total_valor_entradas += valor_entrada
+                
+                filas.append((
+                    periodo, 
+                    codigo, 
+                    existencia_antes,
+                    precio_unitario,
+                    descripcion,
+                    cantidad_entrada,
+                    0, 0, 0,
+                    existencia_acumulada,
+                    dia,
+                    valor_inventario
+                ))
+            
+            # CASO 2: Solo salidas (asegurando no negatividad de valor)
+            elif puede_tener_salida and not debe_tener_entrada and existencia_antes > 20:
+                # Calcular salida máxima permitida en cantidad (dejando margen de seguridad de cantidad)
+                salida_maxima_cantidad = existencia_antes - 10  # Dejamos al menos 10 unidades
+
+                # Calcular salida deseada en cantidad
+                factor_variacion = decimal(rng, 0.3, 0.9)
+                cantidad_salida_deseada = round(cantidad_base * factor_variacion)
+                
+                # Limitar la salida en cantidad al máximo permitido y al menos 1
+                cantidad_salida = min(cantidad_salida_deseada, salida_maxima_cantidad)
+                cantidad_salida = max(1, cantidad_salida)
+
+                # Ajustar cantidad_salida para no exceder el valor disponible
+                if precio_unitario > 0:
+                    valor_disponible_para_salida = existencia_antes * precio_unitario
+                    cantidad_salida_max_por_valor = int(valor_disponible_para_salida / precio_unitario)
+                    if cantidad_salida > cantidad_salida_max_por_valor:
+                        log.debug("AJUSTE VALOR SALIDA (CASO 2): Prod %s, Día %s, Cant Salida: %s -> %s, ExistAntes: %s, "
+                                  "Precio: %.2f, ValorDisp: %.2f", codigo, dia, cantidad_salida, cantidad_salida_max_por_valor,
+                                  existencia_antes, precio_unitario, valor_disponible_para_salida)
+                        contar('ajuste_valor_salida')
+                        cantidad_salida = cantidad_salida_max_por_valor
+                else: # Si el precio es cero o negativo, no permitir salidas que puedan causar problemas de valor.
+                    if cantidad_salida > 0 :
+                        log.debug("VALOR SALIDA (CASO 2): Prod %s, Precio <= 0 (%.2f), forzando cantidad_salida a 0",
+                                  codigo, precio_unitario)
+                        contar('salida_anulada_precio_cero')
+                    cantidad_salida = 0
+                
+                cantidad_salida = max(0, cantidad_salida) # Asegurar que no sea negativa tras el ajuste de valor
+
+                if cantidad_salida > 0:
+                    # Actualizar existencia acumulada (real)
+                    existencia_acumulada_real = existencia_antes - cantidad_salida
                     
-                    # Actualizar el registro con las entradas adicionales
-                    cursor.execute("""
-                        UPDATE MovInventMes
-                        SET Entradas = Entradas + ?,
-                            final = inicial + Entradas + ? - Salidas - AutoConsumo - Retiros
-                        WHERE Periodo = ? AND Codigo = ?
-                    """, (entradas_adicionales, entradas_adicionales, periodo, codigo))
+                    # Calcular valor real
+                    valor_salida = round(cantidad_salida * precio_unitario, 2)
+                    total_valor_salidas += valor_salida
+
+                    # LÓGICA DE PRUEBA: Para movimientos con salida, inicial_db = cantidad_salida
+                    inicial_para_db = cantidad_salida
+                    final_para_db = 0 # Porque inicial_para_db - cantidad_salida = 0
                     
-                    print(f"  Código {codigo}: Entradas ajustadas de {entradas} a {entradas + entradas_adicionales}")
+                    filas.append((
+                        periodo, 
+                        codigo, 
+                        inicial_para_db, # PRUEBA
+                        precio_unitario,
+                        descripcion,
+                        0,
+                        cantidad_salida,
+                        0, 0,
+                        final_para_db, # PRUEBA
+                        dia,
+                        valor_inventario
+                    ))
+                    existencia_acumulada = existencia_acumulada_real # Actualizar el tracker global
+                # Si cantidad_salida se vuelve 0 después del ajuste de valor, no se inserta registro.
             
-            # Estrategia 2: Verificación adicional para casos extremos donde final aún sea negativo
-            cursor.execute("""
-                SELECT final 
-                FROM MovInventMes
-                WHERE Periodo = ? AND Codigo = ? AND final < 0
-            """, (periodo, codigo))
+            # CASO 3: Combinado (entradas y salidas en el mismo registro, asegurando no negatividad de valor)
+            elif debe_tener_entrada and puede_tener_salida:
+                # Primero calculamos la entrada
+                factor_variacion_entrada = decimal(rng, 1.0, 1.8)
+                cantidad_entrada = max(5, round(cantidad_base * factor_variacion_entrada))
+                
+                # Luego calculamos la salida, considerando la entrada que acabamos de planificar
+                existencia_con_entrada_planificada = existencia_antes + cantidad_entrada
+                # Calcular salida máxima permitida en cantidad (dejando margen de seguridad de cantidad)
+                salida_maxima_cantidad = existencia_con_entrada_planificada - 10
+                
+                factor_variacion_salida = decimal(rng, 0.3, 0.7)
+                cantidad_salida_deseada = round(cantidad_base * factor_variacion_salida)
+                
+                # Limitar la salida en cantidad al máximo permitido y al menos 1
+                cantidad_salida = min(cantidad_salida_deseada, salida_maxima_cantidad)
+                cantidad_salida = max(1, cantidad_salida)
+
+                # Ajustar cantidad_salida para no exceder el valor disponible tras la entrada
+                if precio_unitario > 0:
+                    valor_disponible_para_salida_tras_entrada = (existencia_antes + cantidad_entrada) * precio_unitario
+                    cantidad_salida_max_por_valor = int(valor_disponible_para_salida_tras_entrada / precio_unitario)
+                    if cantidad_salida > cantidad_salida_max_por_valor:
+                        log.debug("AJUSTE VALOR SALIDA (CASO 3): Prod %s, Día %s, Cant Salida: %s -> %s, ExistAntes: %s, "
+                                  "CantEntrada: %s, Precio: %.2f, ValorDispTrasEnt: %.2f", codigo, dia, cantidad_salida,
+                                  cantidad_salida_max_por_valor, existencia_antes, cantidad_entrada, precio_unitario,
+                                  valor_disponible_para_salida_tras_entrada)
+                        contar('ajuste_valor_salida')
+                        cantidad_salida = cantidad_salida_max_por_valor
+                else: # Si el precio es cero o negativo
+                    if cantidad_salida > 0 :
+                        log.debug("VALOR SALIDA (CASO 3): Prod %s, Precio <= 0 (%.2f), forzando cantidad_salida a 0",
+                                  codigo, precio_unitario)
+                        contar('salida_anulada_precio_cero')
+                    cantidad_salida = 0
+
+                cantidad_salida = max(0, cantidad_salida) # Asegurar que no sea negativa tras el ajuste de valor
+
+                # Actualizar existencia acumulada (real)
+                existencia_acumulada_real = existencia_antes + cantidad_entrada - cantidad_salida
+                
+                # Calcular valores monetarios
+                valor_entrada = round(cantidad_entrada * precio_unitario, 2)
+                total_valor_entradas += valor_entrada
+                
+                valor_salida = 0
+                if cantidad_salida > 0:
+                    valor_salida = round(cantidad_salida * precio_unitario, 2)
+                    total_valor_salidas += valor_salida
+
+                # LÓGICA DE PRUEBA:
+                inicial_para_db = existencia_antes # Por defecto, es la existencia real antes
+                final_para_db = existencia_acumulada_real # Por defecto, es la existencia real después
+
+                if cantidad_salida > 0:
+                    inicial_para_db = cantidad_salida
+                    final_para_db = cantidad_entrada # Porque (inicial_db + entrada - salida) = (salida + entrada - salida) = entrada
+                
+                filas.append((
+                    periodo, 
+                    codigo, 
+                    inicial_para_db, # PRUEBA si cantidad_salida > 0
+                    precio_unitario,
+                    descripcion,
+                    cantidad_entrada,
+                    cantidad_salida, 
+                    0, 0,
+                    final_para_db, # PRUEBA si cantidad_salida > 0
+                    dia,
+                    valor_inventario
+                ))
+                existencia_acumulada = existencia_acumulada_real # Actualizar el tracker global
             
-            if cursor.fetchone():
-                # Si aún hay existencias negativas, ajustar las salidas
-                cursor.execute("""
-                    UPDATE MovInventMes
-                    SET Salidas = CASE WHEN inicial + Entradas - AutoConsumo - Retiros < 0 THEN 0 
-                                     ELSE inicial + Entradas - AutoConsumo - Retiros END,
-                        final = CASE WHEN inicial + Entradas - AutoConsumo - Retiros < 0 THEN 0
-                                  ELSE inicial + Entradas - Salidas - AutoConsumo - Retiros END
-                    WHERE Periodo = ? AND Codigo = ? AND final < 0
-                """, (periodo, codigo))
-                print(f"  Código {codigo}: Salidas ajustadas para evitar existencias negativas")
-    
-    # Verificación final: asegurar que todos los finales sean >= 0
-    cursor.execute("""
-        UPDATE MovInventMes
-        SET final = 0
-        WHERE Periodo = ? AND final < 0
-    """, (periodo,))
+            # Si no se cumplió ninguna condición, asegurar al menos una entrada pequeña
+            else:
+                cantidad_entrada = max(3, round(cantidad_base * 0.5))
+                
+                # Actualizar existencia acumulada
+                existencia_acumulada += cantidad_entrada
+                
+                # Calcular valor real
+                valor_entrada = round(cantidad_entrada * precio_unitario, 2)
+                total_valor_entradas += valor_entrada
+                
+                filas.append((
+                    periodo, 
+                    codigo, 
+                    existencia_antes,
+                    precio_unitario,
+                    descripcion,
+                    cantidad_entrada,
+                    0, 0, 0,
+                    existencia_acumulada,
+                    dia,
+                    valor_inventario
+                ))
     
-    conn.commit()
+    # Verificar que los totales monetarios cuadren con lo esperado
+    valor_final_calculado = valor_inicial + total_valor_entradas - total_valor_salidas
+    
+    log.info(f"Valor inicial: {valor_inicial:.2f}")
+    log.info(f"Total valor entradas: {total_valor_entradas:.2f}")
+    log.info(f"Total valor salidas: {total_valor_salidas:.2f}")
+    log.info(f"Valor final calculado: {valor_final_calculado:.2f}")
+    log.info(f"Valor final objetivo: {valor_final:.2f}")
+
+    # Cuadrar el valor final ajustando las cantidades de los movimientos generados
+    existencias_iniciales = {catalogo.codigos[indice]: int(existencias_previas[indice]) for indice in productos_seleccionados}
+    return cuadrar_filas_mes(filas, periodo, valor_inicial, valor_final, existencias_iniciales,
+                             dias_habiles, valor_inventario)
+
 
-def generar_movimientos_directo(año, mes):
+def publicar_periodo(conn, periodo, confirmar=True):
+    """
+    Reemplaza el período en MovInventMes y MovPeridoMes por lo preparado en la tabla de preparación
+
+    Borra el período de ambas tablas, copia las filas preparadas y vacía la preparación del
+    período en una única transacción: quien lea los informes ve el mes anterior completo o el
+    nuevo completo, nunca un mes a medio generar.
+
+    Args:
+        conn: Conexión con las filas del período ya escritas en TABLA_PREPARACION
+        periodo (str): Período en formato MM/AAAA
+        confirmar (bool): Si se hace commit al terminar (False para incluirlo en una transacción mayor)
+
+    Returns:
+        int: Número de registros publicados en MovInventMes
+    """
+    columnas = ', '.join(COLUMNAS_MOVINVENTMES)
+    # MovPeridoMes no tiene los campos final ni Inventario
+    columnas_resumen = ', '.join(columna for columna in COLUMNAS_MOVINVENTMES if columna not in ('final', 'Inventario'))
+    cursor = conn.cursor()
+    try:
+        cursor.execute("DELETE FROM MovInventMes WHERE Periodo = ?", (periodo,))
+        cursor.execute(f"""
+            INSERT INTO MovInventMes ({columnas})
+            SELECT {columnas} FROM {TABLA_PREPARACION} WHERE Periodo = ?
+        """, (periodo,))
+        cursor.execute(f"SELECT COUNT(*) FROM {TABLA_PREPARACION} WHERE Periodo = ?", (periodo,))
+        total_registros = cursor.fetchone()[0]
+
+        cursor.execute("DELETE FROM MovPeridoMes WHERE Periodo = ?", (periodo,))
+        cursor.execute(f"""
+            INSERT INTO MovPeridoMes ({columnas_resumen})
+            SELECT {columnas_resumen} FROM {TABLA_PREPARACION} WHERE Periodo = ?
+        """, (periodo,))
+
+        cursor.execute(f"DELETE FROM {TABLA_PREPARACION} WHERE Periodo = ?", (periodo,))
+        if confirmar:
+            conn.commit()
+        return total_registros
+    except Exception:
+        if confirmar:
+            conn.rollback()
+        raise
+
+@medido('Período {mes:02d}/{año}')
+def generar_movimientos_directo(año, mes, tamaño_lote=TAMAÑO_LOTE_PREDETERMINADO, vectorizado=False, semilla=None, rng=None,
+                                num_productos=None):
     """
     Genera movimientos directamente para la tabla MovInventMes sin pasar por MovInvent
     
+    Las filas del mes se generan en memoria con generar_filas_mes y se insertan por lotes
+    (fast_executemany cuando el driver lo soporta) en lugar de una sentencia por fila.
+    Se escriben y corrigen en la tabla de preparación y se publican en MovInventMes y
+    MovPeridoMes en la misma transacción (ver publicar_periodo).
+    Al terminar se muestra el tiempo de cada fase y las sentencias ejecutadas (ver instrumentacion).
+    
     Args:
         año (int): Año para el cual generar movimientos
         mes (int): Mes para el cual generar movimientos (1-12)
+        tamaño_lote (int): Número de filas por lote de inserción
+        vectorizado (bool): Si se usa el generador NumPy (generador_vectorizado) en lugar del generador por fila
+        semilla (int): Semilla para reproducir exactamente los mismos movimientos (se ignora si se pasa rng)
+        rng (np.random.Generator): Generador de la ejecución, para compartirlo entre varios meses
+        num_productos (int): Productos con movimientos en el mes (por defecto entre 10 y MAXIMO_PRODUCTOS_MES)
     
     Returns:
         bool: True si se generó correctamente, False en caso contrario
     """
+    if rng is None:
+        rng = crear_generador(semilla)
+    
     try:
         periodo = f"{mes:02d}/{año}"
-        print(f"\nGenerando movimientos directamente para {periodo}")
+        log.info(f"Generando movimientos directamente para {periodo}")
         
         # Obtener datos del período desde InventarioContable
-        datos_periodo = obtener_datos_periodo(periodo)
+        with fase('datos_periodo'):
+            datos_periodo = obtener_datos_periodo(periodo)
         if datos_periodo is None:
-            print(f"Error: No se encontró el período {periodo} en InventarioContable")
+            log.error(f"Error: No se encontró el período {periodo} en InventarioContable")
             return False
         
         # CRUCIAL: Usar los valores exactos de la tabla InventarioContable
@@ -568,8 +1168,8 @@ def generar_movimientos_directo(año, mes):
         # Para enero 2024, verificar que el valor inicial sea el correcto (final de 2023)
         if año == 2024 and mes == 1:
             if abs(valor_inicial - VALOR_INICIAL_2024) > 0.01:
-                print(f"ADVERTENCIA: El valor inicial de enero 2024 debe ser {VALOR_INICIAL_2024}.")
-                print(f"             Se usará este valor en lugar de {valor_inicial}.")
+                log.warning(f"ADVERTENCIA: El valor inicial de enero 2024 debe ser {VALOR_INICIAL_2024}. "
+                            f"Se usará este valor en lugar de {valor_inicial}.")
                 valor_inicial = VALOR_INICIAL_2024
                 valor_inventario = VALOR_INICIAL_2024
                 
@@ -587,8 +1187,8 @@ def generar_movimientos_directo(año, mes):
         # Si estamos generando diciembre 2024, verificar que el valor final sea correcto
         if año == 2024 and mes == 12:
             if abs(valor_final - VALOR_FINAL_2024) > 0.01:
-                print(f"ADVERTENCIA: El valor final de diciembre 2024 debe ser {VALOR_FINAL_2024}.")
-                print(f"             Se usará este valor en lugar de {valor_final}.")
+                log.warning(f"ADVERTENCIA: El valor final de diciembre 2024 debe ser {VALOR_FINAL_2024}. "
+                            f"Se usará este valor en lugar de {valor_final}.")
                 valor_final = VALOR_FINAL_2024
                 
                 # Actualizar el valor en la base de datos para mantener coherencia
@@ -602,477 +1202,73 @@ def generar_movimientos_directo(año, mes):
                 conn_temp.commit()
                 conn_temp.close()
         
-        print(f"Valor inicial: {valor_inicial:.2f}")
-        print(f"Valor final objetivo: {valor_final:.2f}")
-        print(f"Diferencia: {valor_final - valor_inicial:.2f}")
-        
-        # Calcular diferencia para este mes específico
-        diferencia = valor_final - valor_inicial
-        
-        # Obtener existencias previas del período anterior
-        existencias_previas = obtener_existencias_previas(año, mes)
-        print(f"Se encontraron {len(existencias_previas)} productos con existencias previas")
+        log.info(f"Valor inicial: {valor_inicial:.2f}")
+        log.info(f"Valor final objetivo: {valor_final:.2f}")
+        log.info(f"Diferencia: {valor_final - valor_inicial:.2f}")
         
         # Obtener productos para distribuir movimientos
-        productos = obtener_productos()
-        if not productos:
-            print("Error: No hay productos disponibles en el inventario")
+        with fase('catalogo'):
+            catalogo = obtener_productos()
+        if not catalogo:
+            log.error("Error: No hay productos disponibles en el inventario")
             return False
         
+        # Obtener existencias previas del período anterior, alineadas con el catálogo
+        with fase('existencias_previas'):
+            existencias_previas = obtener_existencias_previas(año, mes, catalogo)
+        log.info(f"Se encontraron {np.count_nonzero(existencias_previas)} productos con existencias previas")
+        
         # Obtener días hábiles del mes
         dias_habiles = obtener_dias_habiles(año, mes)
         if not dias_habiles:
-            print(f"Error: No hay días hábiles para {mes}/{año}")
+            log.error(f"Error: No hay días hábiles para {mes}/{año}")
             return False
         
-        # Seleccionar un número de productos que depende del mes
-        # Más productos para los meses con mayor diferencia
-        factor_productos = abs(diferencia) / 10000  # Ajustar según la magnitud
-        num_productos_base = max(10, min(50, int(20 + factor_productos)))
-        num_productos = min(len(productos), num_productos_base)
-        
-        # Priorizar productos con existencias previas
-        productos_con_existencia = [p for p in productos if p['codigo'] in existencias_previas and existencias_previas[p['codigo']] > 0]
-        productos_sin_existencia = [p for p in productos if p['codigo'] not in existencias_previas or existencias_previas[p['codigo']] == 0]
-        
-        # Asegurar que tenemos suficientes productos
-        if len(productos_con_existencia) < num_productos // 3:
-            # Si hay pocos productos con existencia, completar con productos sin existencia
-            productos_adicionales = random.sample(productos_sin_existencia, min(len(productos_sin_existencia), num_productos - len(productos_con_existencia)))
-            productos_seleccionados = productos_con_existencia + productos_adicionales
-        else:
-            # Si hay suficientes productos con existencia, seleccionar algunos de ellos
-            productos_seleccionados = random.sample(productos_con_existencia, min(len(productos_con_existencia), num_productos))
-            
-            # Completar con productos sin existencia si es necesario
-            if len(productos_seleccionados) < num_productos:
-                productos_adicionales = random.sample(productos_sin_existencia, min(len(productos_sin_existencia), num_productos - len(productos_seleccionados)))
-                productos_seleccionados += productos_adicionales
-        
-        # Limpiar registros existentes para este período
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM MovInventMes WHERE Periodo = ?", (periodo,))
-        conn.commit()
-        
-        # Insertar registro de inventario inicial (1 unidad con el valor monetario total)
-        primer_dia = dias_habiles[0]
-        cursor.execute("""
-            INSERT INTO MovInventMes 
-            (Periodo, Codigo, inicial, Costo, Descripcion, Entradas, Salidas, AutoConsumo, Retiros, final, Fecha, Inventario)
-            VALUES (?, '0000000001', 1, ?, 'INVENTARIO INICIAL MES ANTERIOR', 0, 0, 0, 0, 1, ?, ?)
-        """, (periodo, valor_inicial, primer_dia, valor_inventario))
-        
-        # Distribuir el valor total entre los productos
-        # Ajustamos la magnitud según la diferencia del mes
-        valor_distribuir = abs(diferencia) * 0.5  # Usamos 50% de la diferencia
-        if diferencia > 0:
-            # Para diferencia positiva, aumentamos el factor de distribución
-            valor_total_productos = valor_distribuir + valor_inicial * 0.1  # 10% del valor inicial adicional
-        else:
-            # Para diferencia negativa, limitamos un poco el valor distribuido
-            valor_total_productos = max(valor_distribuir, valor_inicial * 0.05)  # Al menos 5% del valor inicial
-            
-        valores_por_producto = distribuir_valor(valor_total_productos, len(productos_seleccionados))
-        
-        # Variables para acumular valores monetarios
-        total_valor_entradas = 0
-        total_valor_salidas = 0
-        
-        # Diccionario para rastrear la existencia acumulada de cada producto durante el mes
-        existencia_acumulada = {}
-        for codigo in [p['codigo'] for p in productos_seleccionados]:
-            existencia_acumulada[codigo] = existencias_previas.get(codigo, 0)
-        
-        # Procesar cada producto
-        for i, producto in enumerate(productos_seleccionados):
-            codigo = producto['codigo']
-            
-            # Asignar categoría de precio (0-4) basada en algún criterio
-            categoria_precio = i % 5
-            
-            # Calcular un precio consistente
-            precio_unitario = calcular_precio_consistente(producto['precio'], categoria_precio)
-            
-            # Valor total asignado a este producto
-            valor_producto = valores_por_producto[i]
-            
-            # Existencia inicial del producto al inicio del mes
-            existencia_inicial = existencias_previas.get(codigo, 0)
-            
-            # Para productos con existencia inicial < 5, garantizar una entrada inicial grande
-            if existencia_inicial < 5:
-                entrada_inicial_min = max(20, int(valor_producto / (precio_unitario * 0.5)))
-                entrada_inicial = random.randint(entrada_inicial_min, entrada_inicial_min + 20)
-                
-                # Registrar entrada inicial al principio del mes
-                dia_entrada_inicial = dias_habiles[1] if len(dias_habiles) > 1 else dias_habiles[0]
-                
-                # Actualizar existencia acumulada
-                existencia_acumulada[codigo] = existencia_inicial + entrada_inicial
-                
-                # Calcular valor de la entrada
-                valor_entrada = round(entrada_inicial * precio_unitario, 2)
-                total_valor_entradas += valor_entrada
-                
-                # Insertar registro de entrada inicial
-                cursor.execute("""
-                    INSERT INTO MovInventMes 
-                    (Periodo, Codigo, inicial, Costo, Descripcion, Entradas, Salidas, AutoConsumo, Retiros, final, Fecha, Inventario)
-                    VALUES (?, ?, ?, ?, ?, ?, 0, 0, 0, ?, ?, ?)
-                """, (
-                    periodo, 
-                    codigo, 
-                    existencia_inicial,
-                    precio_unitario,
-                    producto['descripcion'],
-                    entrada_inicial,
-                    existencia_acumulada[codigo],
-                    dia_entrada_inicial,
-                    valor_inventario
+        with fase('generacion'):
+            if vectorizado:
+                from generador_vectorizado import generar_movimientos_vectorizado, dataframe_a_filas
+                filas = dataframe_a_filas(generar_movimientos_vectorizado(
+                    periodo, valor_inicial, valor_final, valor_inventario,
+                    catalogo, existencias_previas, dias_habiles, rng=rng, num_productos=num_productos
                 ))
-            
-            # Determinar número de movimientos adicionales para este producto (aprox. 4x)
-            factor_multiplicador_movs = 4 
-            if existencia_inicial < 5:
-                # Si ya generamos una entrada inicial grande, menos movimientos adicionales
-                num_movimientos = random.randint(1 * factor_multiplicador_movs, 3 * factor_multiplicador_movs) 
             else:
-                # Más movimientos para productos con existencia
-                num_movimientos = random.randint(2 * factor_multiplicador_movs, 4 * factor_multiplicador_movs)
-            print(f"    Producto {codigo}: Generando {num_movimientos} movimientos adicionales.")
-            
-            # Dividir los días hábiles en grupos para distribuir los movimientos
-            # Excluimos los primeros días ya usados
-            dias_inicio = 2 if existencia_inicial < 5 else 1
-            dias_disponibles = dias_habiles[dias_inicio:] if len(dias_habiles) > dias_inicio else []
-            
-            if not dias_disponibles:
-                continue  # Si no hay más días disponibles, pasar al siguiente producto
-                
-            # Mezclar días para evitar patrones
-            random.shuffle(dias_disponibles)
-            dias_seleccionados = dias_disponibles[:num_movimientos] if num_movimientos <= len(dias_disponibles) else dias_disponibles
-            dias_seleccionados.sort()  # Ordenar cronológicamente
-            
-            # Determinar tendencia según diferencia global
-            # Si la diferencia es positiva (aumento en inventario), favorecer más entradas que salidas
-            porcentaje_entradas = 0.7 if diferencia > 0 else 0.5
+                filas = generar_filas_mes(
+                    periodo, valor_inicial, valor_final, valor_inventario,
+                    catalogo, existencias_previas, dias_habiles, rng=rng, num_productos=num_productos
+                )
+        
+        # El mes se escribe y se corrige en la tabla de preparación; MovInventMes y MovPeridoMes
+        # solo se tocan al publicarlo, todo en la misma transacción
+        with fase('insercion'):
+            conn = get_connection()
+            asegurar_tabla_preparacion(conn, CADENA_CONEXION)
+            cursor = conn.cursor()
+            cursor.execute(f"DELETE FROM {TABLA_PREPARACION} WHERE Periodo = ?", (periodo,))
             
-            # Para cada día seleccionado, generar un movimiento
-            for idx, dia in enumerate(dias_seleccionados):
-                # Existencia antes del movimiento
-                existencia_antes = existencia_acumulada[codigo]
-                
-                # Si es el primer movimiento o hay poca existencia, garantizar una entrada
-                debe_tener_entrada = idx == 0 or existencia_antes < 15 or random.random() < porcentaje_entradas
-                
-                # Solo permitir salidas si hay suficiente existencia
-                puede_tener_salida = existencia_antes >= 15 and random.random() < 0.6
-                
-                # Si es el último movimiento y aún no hay suficientes existencias, forzar entrada
-                if idx == len(dias_seleccionados) - 1 and existencia_antes < 20:
-                    debe_tener_entrada = True
-                    puede_tener_salida = False
-                
-                # Calcular cantidades para entradas/salidas
-                cantidad_base = max(5, round(valor_producto / (precio_unitario * (num_movimientos + 1))))
-                
-                # CASO 1: Solo entradas
-                if debe_tener_entrada and not puede_tener_salida:
-                    # Variación aleatoria para hacer más natural
-                    factor_variacion = random.uniform(0.8, 1.5)
-                    cantidad_entrada = max(5, round(cantidad_base * factor_variacion))
-                    
-                    # Actualizar existencia acumulada
-                    existencia_acumulada[codigo] += cantidad_entrada
-                    
-                    # Calcular valor real
-                    valor_entrada = round(cantidad_entrada * precio_unitario, 2)
-                    total_valor_entradas += valor_entrada
-                    
-                    cursor.execute("""
-                        INSERT INTO MovInventMes 
-                        (Periodo, Codigo, inicial, Costo, Descripcion, Entradas, Salidas, AutoConsumo, Retiros, final, Fecha, Inventario)
-                        VALUES (?, ?, ?, ?, ?, ?, 0, 0, 0, ?, ?, ?)
-                    """, (
-                        periodo, 
-                        codigo, 
-                        existencia_antes,
-                        precio_unitario,
-                        producto['descripcion'],
-                        cantidad_entrada,
-                        existencia_acumulada[codigo],
-                        dia,
-                        valor_inventario
-                    ))
-                
-                # CASO 2: Solo salidas (asegurando no negatividad de valor)
-                elif puede_tener_salida and not debe_tener_entrada and existencia_antes > 20:
-                    # Calcular salida máxima permitida en cantidad (dejando margen de seguridad de cantidad)
-                    salida_maxima_cantidad = existencia_antes - 10  # Dejamos al menos 10 unidades
-
-                    # Calcular salida deseada en cantidad
-                    factor_variacion = random.uniform(0.3, 0.9)
-                    cantidad_salida_deseada = round(cantidad_base * factor_variacion)
-                    
-                    # Limitar la salida en cantidad al máximo permitido y al menos 1
-                    cantidad_salida = min(cantidad_salida_deseada, salida_maxima_cantidad)
-                    cantidad_salida = max(1, cantidad_salida)
-
-                    # Ajustar cantidad_salida para no exceder el valor disponible
-                    if precio_unitario > 0:
-                        valor_disponible_para_salida = existencia_antes * precio_unitario
-                        cantidad_salida_max_por_valor = int(valor_disponible_para_salida / precio_unitario)
-                        if cantidad_salida > cantidad_salida_max_por_valor:
-                            print(f"    AJUSTE VALOR SALIDA (CASO 2): Prod {codigo}, Día {dia.strftime('%Y-%m-%d')}, Cant Salida: {cantidad_salida} -> {cantidad_salida_max_por_valor}, ExistAntes: {existencia_antes}, Precio: {precio_unitario:.2f}, ValorDisp: {valor_disponible_para_salida:.2f}")
-                            cantidad_salida = cantidad_salida_max_por_valor
-                    else: # Si el precio es cero o negativo, no permitir salidas que puedan causar problemas de valor.
-                        if cantidad_salida > 0 :
-                             print(f"    ADVERTENCIA VALOR SALIDA (CASO 2): Prod {codigo}, Precio <= 0 ({precio_unitario:.2f}), forzando cantidad_salida a 0.")
-                        cantidad_salida = 0
-                    
-                    cantidad_salida = max(0, cantidad_salida) # Asegurar que no sea negativa tras el ajuste de valor
-
-                    if cantidad_salida > 0:
-                        # Actualizar existencia acumulada (real)
-                        existencia_acumulada_real = existencia_antes - cantidad_salida
-                        
-                        # Calcular valor real
-                        valor_salida = round(cantidad_salida * precio_unitario, 2)
-                        total_valor_salidas += valor_salida
-
-                        # LÓGICA DE PRUEBA: Para movimientos con salida, inicial_db = cantidad_salida
-                        inicial_para_db = cantidad_salida
-                        final_para_db = 0 # Porque inicial_para_db - cantidad_salida = 0
-                        
-                        cursor.execute("""
-                            INSERT INTO MovInventMes 
-                            (Periodo, Codigo, inicial, Costo, Descripcion, Entradas, Salidas, AutoConsumo, Retiros, final, Fecha, Inventario)
-                            VALUES (?, ?, ?, ?, ?, 0, ?, 0, 0, ?, ?, ?)
-                        """, (
-                            periodo, 
-                            codigo, 
-                            inicial_para_db, # PRUEBA
-                            precio_unitario,
-                            producto['descripcion'],
-                            cantidad_salida,
-                            final_para_db, # PRUEBA
-                            dia,
-                            valor_inventario
-                        ))
-                        existencia_acumulada[codigo] = existencia_acumulada_real # Actualizar el tracker global
-                    # Si cantidad_salida se vuelve 0 después del ajuste de valor, no se inserta registro.
-                
-                # CASO 3: Combinado (entradas y salidas en el mismo registro, asegurando no negatividad de valor)
-                elif debe_tener_entrada and puede_tener_salida:
-                    # Primero calculamos la entrada
-                    factor_variacion_entrada = random.uniform(1.0, 1.8)
-                    cantidad_entrada = max(5, round(cantidad_base * factor_variacion_entrada))
-                    
-                    # Luego calculamos la salida, considerando la entrada que acabamos de planificar
-                    existencia_con_entrada_planificada = existencia_antes + cantidad_entrada
-                    # Calcular salida máxima permitida en cantidad (dejando margen de seguridad de cantidad)
-                    salida_maxima_cantidad = existencia_con_entrada_planificada - 10
-                    
-                    factor_variacion_salida = random.uniform(0.3, 0.7)
-                    cantidad_salida_deseada = round(cantidad_base * factor_variacion_salida)
-                    
-                    # Limitar la salida en cantidad al máximo permitido y al menos 1
-                    cantidad_salida = min(cantidad_salida_deseada, salida_maxima_cantidad)
-                    cantidad_salida = max(1, cantidad_salida)
-
-                    # Ajustar cantidad_salida para no exceder el valor disponible tras la entrada
-                    if precio_unitario > 0:
-                        valor_disponible_para_salida_tras_entrada = (existencia_antes + cantidad_entrada) * precio_unitario
-                        cantidad_salida_max_por_valor = int(valor_disponible_para_salida_tras_entrada / precio_unitario)
-                        if cantidad_salida > cantidad_salida_max_por_valor:
-                            print(f"    AJUSTE VALOR SALIDA (CASO 3): Prod {codigo}, Día {dia.strftime('%Y-%m-%d')}, Cant Salida: {cantidad_salida} -> {cantidad_salida_max_por_valor}, ExistAntes: {existencia_antes}, CantEntrada: {cantidad_entrada}, Precio: {precio_unitario:.2f}, ValorDispTrasEnt: {valor_disponible_para_salida_tras_entrada:.2f}")
-                            cantidad_salida = cantidad_salida_max_por_valor
-                    else: # Si el precio es cero o negativo
-                        if cantidad_salida > 0 :
-                            print(f"    ADVERTENCIA VALOR SALIDA (CASO 3): Prod {codigo}, Precio <= 0 ({precio_unitario:.2f}), forzando cantidad_salida a 0.")
-                        cantidad_salida = 0
-
-                    cantidad_salida = max(0, cantidad_salida) # Asegurar que no sea negativa tras el ajuste de valor
-
-                    # Actualizar existencia acumulada (real)
-                    existencia_acumulada_real = existencia_antes + cantidad_entrada - cantidad_salida
-                    
-                    # Calcular valores monetarios
-                    valor_entrada = round(cantidad_entrada * precio_unitario, 2)
-                    total_valor_entradas += valor_entrada
-                    
-                    valor_salida = 0
-                    if cantidad_salida > 0:
-                        valor_salida = round(cantidad_salida * precio_unitario, 2)
-                        total_valor_salidas += valor_salida
-
-                    # LÓGICA DE PRUEBA:
-                    inicial_para_db = existencia_antes # Por defecto, es la existencia real antes
-                    final_para_db = existencia_acumulada_real # Por defecto, es la existencia real después
-
-                    if cantidad_salida > 0:
-                        inicial_para_db = cantidad_salida
-                        final_para_db = cantidad_entrada # Porque (inicial_db + entrada - salida) = (salida + entrada - salida) = entrada
-                    
-                    cursor.execute("""
-                        INSERT INTO MovInventMes 
-                        (Periodo, Codigo, inicial, Costo, Descripcion, Entradas, Salidas, AutoConsumo, Retiros, final, Fecha, Inventario)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, 0, 0, ?, ?, ?)
-                    """, (
-                        periodo, 
-                        codigo, 
-                        inicial_para_db, # PRUEBA si cantidad_salida > 0
-                        precio_unitario,
-                        producto['descripcion'],
-                        cantidad_entrada,
-                        cantidad_salida, 
-                        final_para_db, # PRUEBA si cantidad_salida > 0
-                        dia,
-                        valor_inventario
-                    ))
-                    existencia_acumulada[codigo] = existencia_acumulada_real # Actualizar el tracker global
-                
-                # Si no se cumplió ninguna condición, asegurar al menos una entrada pequeña
-                else:
-                    cantidad_entrada = max(3, round(cantidad_base * 0.5))
-                    
-                    # Actualizar existencia acumulada
-                    existencia_acumulada[codigo] += cantidad_entrada
-                    
-                    # Calcular valor real
-                    valor_entrada = round(cantidad_entrada * precio_unitario, 2)
-                    total_valor_entradas += valor_entrada
-                    
-                    cursor.execute("""
-                        INSERT INTO MovInventMes 
-                        (Periodo, Codigo, inicial, Costo, Descripcion, Entradas, Salidas, AutoConsumo, Retiros, final, Fecha, Inventario)
-                        VALUES (?, ?, ?, ?, ?, ?, 0, 0, 0, ?, ?, ?)
-                    """, (
-                        periodo, 
-                        codigo, 
-                        existencia_antes,
-                        precio_unitario,
-                        producto['descripcion'],
-                        cantidad_entrada,
-                        existencia_acumulada[codigo],
-                        dia,
-                        valor_inventario
-                    ))
-        
-        # Verificar que los totales monetarios cuadren con lo esperado
-        valor_final_calculado = valor_inicial + total_valor_entradas - total_valor_salidas
+            # Insertar los movimientos por lotes
+            total_insertadas = insertar_en_lotes(cursor, SQL_INSERTAR_PREPARACION, filas, tamaño_lote=tamaño_lote)
+        log.info(f"Insertados {total_insertadas} movimientos en lotes de {tamaño_lote}")
         
-        print(f"Valor inicial: {valor_inicial:.2f}")
-        print(f"Total valor entradas: {total_valor_entradas:.2f}")
-        print(f"Total valor salidas: {total_valor_salidas:.2f}")
-        print(f"Valor final calculado: {valor_final_calculado:.2f}")
-        print(f"Valor final objetivo: {valor_final:.2f}")
-
-        # AJUSTE GENERAL PARA TODOS LOS MESES: Insertar movimientos para cuadrar con InventarioContable.Final
-        # La condición if mes == 12: ha sido eliminada de aquí.
-        valor_actual_inventario_sin_ajuste_final = valor_inicial + total_valor_entradas - total_valor_salidas
-        valor_final_objetivo_de_tabla_contable = float(datos_periodo['Final'])
-        
-        diferencia_ajuste_final = round(valor_final_objetivo_de_tabla_contable - valor_actual_inventario_sin_ajuste_final, 2)
-
-        if abs(diferencia_ajuste_final) > 0.01:
-            print(f"Ajuste final necesario para {periodo}: {diferencia_ajuste_final:.2f}. Se dividirá en 5 movimientos.")
-            fecha_ajuste = dias_habiles[-1] # Último día hábil del mes
-            
-            costo_por_movimiento_ajuste = round(abs(diferencia_ajuste_final) / 5.0, 2)
-            valor_total_ajuste_distribuido = 0
-
-            for i in range(5):
-                costo_actual_movimiento = costo_por_movimiento_ajuste
-                if i == 4:
-                    costo_actual_movimiento = round(abs(diferencia_ajuste_final) - valor_total_ajuste_distribuido, 2)
-                valor_total_ajuste_distribuido += costo_actual_movimiento
-
-                if not productos_seleccionados:
-                    print(f"ADVERTENCIA (Ajuste {i+1}/5): No hay productos. Usando genérico.")
-                    codigo_producto_ajuste = "0000000002"
-                    descripcion_producto_ajuste = f"AJUSTE VALOR FINAL PERIODO ({i+1}/5)"
-                else:
-                    producto_para_ajuste = random.choice(productos_seleccionados)
-                    codigo_producto_ajuste = producto_para_ajuste['codigo']
-                    descripcion_producto_ajuste = producto_para_ajuste['descripcion']
-                
-                q_inicial_ajuste, q_entrada_ajuste, q_salida_ajuste, tipo_ajuste_log = 0, 0, 0, ""
-
-                if diferencia_ajuste_final < 0:
-                    tipo_ajuste_log = "Egreso (Salida) de Ajuste Final"
-                    q_inicial_ajuste = 1 
-                    q_entrada_ajuste = 0
-                    q_salida_ajuste = 1
-                else:
-                    tipo_ajuste_log = "Ingreso (Entrada) de Ajuste Final"
-                    q_inicial_ajuste = 0
-                    q_entrada_ajuste = 1
-                    q_salida_ajuste = 0
-                
-                q_final_ajuste = q_inicial_ajuste + q_entrada_ajuste - q_salida_ajuste
-                
-                print(f"  Mov.AjusteFinal {i+1}/5: Prod: {codigo_producto_ajuste}")
-                print(f"    Tipo: {tipo_ajuste_log}, Cant.Ini: {q_inicial_ajuste}, Ent: {q_entrada_ajuste}, Sal: {q_salida_ajuste}, Cant.Fin: {q_final_ajuste}")
-                print(f"    Costo mov. ajuste: {costo_actual_movimiento:.2f}")
-
-                cursor.execute("""
-                     INSERT INTO MovInventMes
-                     (Periodo, Codigo, inicial, Costo, Descripcion, Entradas, Salidas, AutoConsumo, Retiros, final, Fecha, Inventario)
-                     VALUES (?, ?, ?, ?, ?, ?, ?, 0, 0, ?, ?, ?)
-                """, (
-                    periodo, codigo_producto_ajuste, q_inicial_ajuste, costo_actual_movimiento, 
-                    descripcion_producto_ajuste, q_entrada_ajuste, q_salida_ajuste,  
-                    q_final_ajuste, fecha_ajuste, valor_inventario
-                ))
-            
-            print(f"  Total 5 mov. ajuste insertados. Costo total distribuido: {valor_total_ajuste_distribuido:.2f} (Objetivo: {abs(diferencia_ajuste_final):.2f})")
-            
-            # Actualizar el valor_final_calculado para el print que resume el mes
-            valor_final_calculado = valor_actual_inventario_sin_ajuste_final + diferencia_ajuste_final
-            print(f"Nuevo valor final del mes tras 5 ajustes: {valor_final_calculado:.2f}")
-        else:
-            print(f"No se requiere ajuste final para {periodo}. Diferencia: {diferencia_ajuste_final:.2f}")
-
         # Aplicar verificación adicional para asegurar que no haya existencias negativas
-        print("Verificando que no haya existencias negativas...")
-        asegurar_no_negativos(conn, periodo)
-        
-        # Contar registros generados
-        cursor.execute("SELECT COUNT(*) FROM MovInventMes WHERE Periodo = ?", (periodo,))
-        total_registros = cursor.fetchone()[0]
-        
-        # Generar registro en MovPeridoMes
-        cursor.execute("DELETE FROM MovPeridoMes WHERE Periodo = ?", (periodo,))
-        
-        # Corregir la inserción a MovPeridoMes EXCLUYENDO el campo Inventario que no existe en esa tabla
-        cursor.execute("""
-            INSERT INTO MovPeridoMes 
-            (Periodo, Codigo, Descripcion, Costo, Inicial, Entradas, Salidas, AutoConsumo, Retiros, Fecha)
-            SELECT 
-                Periodo, Codigo, Descripcion, Costo, Inicial, 
-                Entradas, Salidas, AutoConsumo, Retiros, Fecha
-            FROM MovInventMes  
-            WHERE Periodo = ?
-        """, (periodo,))
+        log.info("Verificando que no haya existencias negativas...")
+        with fase('asegurar_no_negativos'):
+            resumen_negativos = asegurar_no_negativos(conn, periodo, confirmar=False, tabla=TABLA_PREPARACION)
+        log.info(f"Registros corregidos por existencias negativas: {resumen_negativos['registros_corregidos']}")
         
-        conn.commit()
+        with fase('publicacion'):
+            total_registros = publicar_periodo(conn, periodo)
         conn.close()
         
-        print(f"\nMovimientos generados directamente para {periodo}")
-        print(f"Total registros generados: {total_registros}")
-        print(f"Valor inicial total: {valor_inicial:.2f}")
-        print(f"Valor inventario: {valor_inventario:.2f} (igual al valor inicial del mes)")
-        print(f"Valor final alcanzado: {valor_final:.2f}")
+        log.info(f"Movimientos generados directamente para {periodo}")
+        log.info(f"Total registros generados: {total_registros}")
+        log.info(f"Valor inicial total: {valor_inicial:.2f}")
+        log.info(f"Valor inventario: {valor_inventario:.2f} (igual al valor inicial del mes)")
+        log.info(f"Valor final alcanzado: {valor_final:.2f}")
         
         return True
     
     except Exception as e:
-        print(f"Error al generar movimientos directos: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception(f"Error al generar movimientos directos: {str(e)}")
         
         try:
             conn.rollback()
@@ -1107,8 +1303,8 @@ def inicializar_periodos_año(año, valor_inicial_enero=None, valor_final_diciem
         
         count = cursor.fetchone()[0]
         if count < 12:
-            print(f"No hay registros completos para el año {año} en InventarioContable.")
-            print(f"Se necesitan crear {12-count} registros.")
+            log.info(f"No hay registros completos para el año {año} en InventarioContable.")
+            log.info(f"Se necesitan crear {12-count} registros.")
             # Esto podría implementarse si es necesario crear registros
             return False
         
@@ -1119,7 +1315,7 @@ def inicializar_periodos_año(año, valor_inicial_enero=None, valor_final_diciem
                 SET Inicial = ?
                 WHERE Periodo = ?
             """, (valor_inicial_enero, f'01/{año}'))
-            print(f"Actualizado el valor inicial de enero {año} a {valor_inicial_enero:.2f}")
+            log.info(f"Actualizado el valor inicial de enero {año} a {valor_inicial_enero:.2f}")
         
         # 3. Si se especificó, actualizar el valor final de diciembre
         if valor_final_diciembre is not None:
@@ -1128,7 +1324,7 @@ def inicializar_periodos_año(año, valor_inicial_enero=None, valor_final_diciem
                 SET Final = ?
                 WHERE Periodo = ?
             """, (valor_final_diciembre, f'12/{año}'))
-            print(f"Actualizado el valor final de diciembre {año} a {valor_final_diciembre:.2f}")
+            log.info(f"Actualizado el valor final de diciembre {año} a {valor_final_diciembre:.2f}")
         
         # 4. Leer los valores inicial de enero y final de diciembre
         cursor.execute("""
@@ -1147,9 +1343,9 @@ def inicializar_periodos_año(año, valor_inicial_enero=None, valor_final_diciem
         
         # 5. Calcular la diferencia anual a distribuir
         diferencia_anual = valor_final_diciembre - valor_inicial_enero
-        print(f"Valor inicial año {año}: {valor_inicial_enero:.2f}")
-        print(f"Valor final año {año}: {valor_final_diciembre:.2f}")
-        print(f"Diferencia a distribuir: {diferencia_anual:.2f}")
+        log.info(f"Valor inicial año {año}: {valor_inicial_enero:.2f}")
+        log.info(f"Valor final año {año}: {valor_final_diciembre:.2f}")
+        log.info(f"Diferencia a distribuir: {diferencia_anual:.2f}")
         
         # 6. Definir la distribución mensual (pesos por mes)
         # Usamos pesos específicos para cada mes según patrones de negocio típicos
@@ -1213,8 +1409,8 @@ def inicializar_periodos_año(año, valor_inicial_enero=None, valor_final_diciem
                 WHERE Periodo = ?
             """, (valor_final_mes, f'{siguiente_mes:02d}/{año}'))
             
-            print(f"Mes {mes:02d}: Final={valor_final_mes:.2f}")
-            print(f"Mes {siguiente_mes:02d}: Inicial={valor_final_mes:.2f}")
+            log.info(f"Mes {mes:02d}: Final={valor_final_mes:.2f}")
+            log.info(f"Mes {siguiente_mes:02d}: Inicial={valor_final_mes:.2f}")
         
         # 9. Manejar diciembre por separado - mantener su valor final específico
         # y asegurarnos que su valor inicial sea el final de noviembre
@@ -1226,7 +1422,7 @@ def inicializar_periodos_año(año, valor_inicial_enero=None, valor_final_diciem
             WHERE Periodo = ?
         """, (valor_final_noviembre, f'12/{año}'))
         
-        print(f"Mes 12: Inicial={valor_final_noviembre:.2f}, Final={valor_final_diciembre:.2f} (mantenido)")
+        log.info(f"Mes 12: Inicial={valor_final_noviembre:.2f}, Final={valor_final_diciembre:.2f} (mantenido)")
         
         # 10. Si el año tiene un año siguiente, actualizar también enero del siguiente
         if año < datetime.now().year + 1:
@@ -1236,18 +1432,16 @@ def inicializar_periodos_año(año, valor_inicial_enero=None, valor_final_diciem
                     SET Inicial = ?
                     WHERE Periodo = ?
                 """, (valor_final_diciembre, f'01/{año+1}'))
-                print(f"Actualizado inicial de enero {año+1} a {valor_final_diciembre:.2f}")
+                log.info(f"Actualizado inicial de enero {año+1} a {valor_final_diciembre:.2f}")
             except:
-                print(f"No se pudo actualizar el valor inicial de enero {año+1}")
+                log.info(f"No se pudo actualizar el valor inicial de enero {año+1}")
         
         conn.commit()
         conn.close()
         return True
     
     except Exception as e:
-        print(f"Error al inicializar períodos del año {año}: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception(f"Error al inicializar períodos del año {año}: {str(e)}")
         
         try:
             conn.rollback()
@@ -1257,42 +1451,60 @@ def inicializar_periodos_año(año, valor_inicial_enero=None, valor_final_diciem
         
         return False
 
-def generar_año_directo(año, valor_inicial_enero=None, valor_final_diciembre=None):
+@medido('Año {año}')
+def generar_año_directo(año, valor_inicial_enero=None, valor_final_diciembre=None, tamaño_lote=TAMAÑO_LOTE_PREDETERMINADO,
+                        vectorizado=False, semilla=None, num_productos=None):
     """
     Genera los movimientos para todos los meses de un año directamente
     
+    Cada mes muestra su propio resumen de fases y al final se muestra el del año completo.
+    
     Args:
         año (int): El año para generar movimientos
         valor_inicial_enero (float): Valor inicial para enero (opcional)
         valor_final_diciembre (float): Valor final para diciembre (opcional)
+        tamaño_lote (int): Número de filas por lote de inserción
+        vectorizado (bool): Si se usa el generador NumPy para cada mes
+        semilla (int): Semilla del año; con la misma semilla se regeneran exactamente los mismos movimientos
+        num_productos (int): Productos con movimientos en cada mes (ver seleccionar_productos)
     """
     try:
-        print(f"Generando movimientos directos para el año {año}...")
+        log.info(f"Generando movimientos directos para el año {año}...")
+        reiniciar_estadisticas_conexiones()
+        
+        # Un único generador para todo el año, de modo que el año completo sea reproducible
+        rng = crear_generador(semilla)
+        if semilla is not None:
+            log.info(f"Semilla de la generación: {semilla}")
         
         # Inicializar los períodos con los valores requeridos
         if valor_inicial_enero is not None or valor_final_diciembre is not None:
-            print(f"Inicializando valores de períodos para el año {año}...")
-            inicializar_periodos_año(año, valor_inicial_enero, valor_final_diciembre)
+            log.info(f"Inicializando valores de períodos para el año {año}...")
+            with fase('inicializar_periodos'):
+                inicializar_periodos_año(año, valor_inicial_enero, valor_final_diciembre)
         
         # Procesar cada mes
         for mes in range(1, 13):
             try:
                 nombre_mes = calendar.month_name[mes]
-                print(f"\nProcesando {nombre_mes} {año}...")
+                log.info(f"Procesando {nombre_mes} {año}...")
                 
-                exito = generar_movimientos_directo(año, mes)
+                exito = generar_movimientos_directo(año, mes, tamaño_lote=tamaño_lote, vectorizado=vectorizado, rng=rng,
+                                                    num_productos=num_productos)
                 if not exito:
-                    print(f"Error al generar movimientos para {mes:02d}/{año}")
-                else:
-                    # Verificar que los valores sean coherentes
-                    verificar_coherencia_valores(año, mes)
+                    log.error(f"Error al generar movimientos para {mes:02d}/{año}")
             
             except Exception as e:
-                print(f"Error en mes {mes}: {str(e)}")
+                log.error(f"Error en mes {mes}: {str(e)}")
+        
+        # Verificar que los valores sean coherentes, todo el año de una vez
+        with fase('verificar_coherencia'):
+            verificar_coherencia_año(año)
         
         # Recalcular valores de InventarioContable para todo el año
-        print("\nRecalculando valores de InventarioContable...")
-        recalcular_periodos_año(año)
+        log.info("Recalculando valores de InventarioContable...")
+        with fase('recalcular_periodos'):
+            recalcular_periodos_año(año)
         
         # Verificación final para asegurar que el valor final de diciembre es correcto
         if valor_final_diciembre is not None:
@@ -1305,15 +1517,16 @@ def generar_año_directo(año, valor_inicial_enero=None, valor_final_diciembre=N
             """, (valor_final_diciembre, f'12/{año}'))
             conn.commit()
             conn.close()
-            print(f"Verificación final: Valor de diciembre {año} ajustado a {valor_final_diciembre:.2f}")
+            log.info(f"Verificación final: Valor de diciembre {año} ajustado a {valor_final_diciembre:.2f}")
             
             # Verificar coherencia del valor final de diciembre
             verificar_coherencia_valores(año, 12)
         
-        print(f"\nGeneración de movimientos completa para el año {año}")
+        log.info(f"Generación de movimientos completa para el año {año}")
+        imprimir_estadisticas_conexiones()
     
     except Exception as e:
-        print(f"Error en generar_año_directo: {str(e)}")
+        log.error(f"Error en generar_año_directo: {str(e)}")
 
 def verificar_coherencia_valores(año, mes):
     """
@@ -1339,7 +1552,7 @@ def verificar_coherencia_valores(año, mes):
         
         row = cursor.fetchone()
         if not row:
-            print(f"No se encontró el período {periodo} en InventarioContable.")
+            log.info(f"No se encontró el período {periodo} en InventarioContable.")
             conn.close()
             return
         
@@ -1355,7 +1568,7 @@ def verificar_coherencia_valores(año, mes):
         
         row = cursor.fetchone()
         if not row:
-            print(f"No se encontró el registro 0000000001 para el período {periodo}.")
+            log.info(f"No se encontró el registro 0000000001 para el período {periodo}.")
             conn.close()
             return
         
@@ -1367,9 +1580,9 @@ def verificar_coherencia_valores(año, mes):
         
         # El Costo debe ser igual al valor inicial
         if abs(costo_registro - valor_inicial_contable) > 0.01:
-            print(f"Corrigiendo Costo del registro 0000000001 para {periodo}:")
-            print(f"  Valor actual: {costo_registro:.2f}")
-            print(f"  Valor correcto: {valor_inicial_contable:.2f}")
+            log.info(f"Corrigiendo Costo del registro 0000000001 para {periodo}:")
+            log.info(f"  Valor actual: {costo_registro:.2f}")
+            log.info(f"  Valor correcto: {valor_inicial_contable:.2f}")
             
             cursor.execute("""
                 UPDATE MovInventMes
@@ -1379,17 +1592,18 @@ def verificar_coherencia_valores(año, mes):
             
             hay_cambios = True
         
-        # El valor final debe ser igual al valor final contable
-        if abs(final_registro - valor_final_contable) > 0.01:
-            print(f"Corrigiendo valor final del registro 0000000001 para {periodo}:")
-            print(f"  Valor actual: {final_registro:.2f}")
-            print(f"  Valor correcto: {valor_final_contable:.2f}")
+        # La cantidad final es la unidad que valora el Costo (no el valor final contable,
+        # que recalcular_periodos_año multiplicaría por el Costo)
+        if abs(final_registro - UNIDADES_REGISTRO_INICIAL) > 0.01:
+            log.info(f"Corrigiendo cantidad final del registro 0000000001 para {periodo}:")
+            log.info(f"  Cantidad actual: {final_registro:.2f}")
+            log.info(f"  Cantidad correcta: {UNIDADES_REGISTRO_INICIAL}")
             
             cursor.execute("""
                 UPDATE MovInventMes
                 SET final = ?
                 WHERE Periodo = ? AND Codigo = '0000000001'
-            """, (valor_final_contable, periodo))
+            """, (UNIDADES_REGISTRO_INICIAL, periodo))
             
             hay_cambios = True
         
@@ -1410,9 +1624,9 @@ def verificar_coherencia_valores(año, mes):
                 
                 # El inicial de este mes debe ser igual al final del anterior
                 if abs(valor_inicial_contable - valor_final_anterior) > 0.01:
-                    print(f"Coherencia entre períodos: El inicial de {periodo} no coincide con el final de {periodo_anterior}")
-                    print(f"  Valor inicial de {periodo}: {valor_inicial_contable:.2f}")
-                    print(f"  Valor final de {periodo_anterior}: {valor_final_anterior:.2f}")
+                    log.info(f"Coherencia entre períodos: El inicial de {periodo} no coincide con el final de {periodo_anterior}")
+                    log.info(f"  Valor inicial de {periodo}: {valor_inicial_contable:.2f}")
+                    log.info(f"  Valor final de {periodo_anterior}: {valor_final_anterior:.2f}")
                     
                     # Corregir el valor inicial del período actual
                     cursor.execute("""
@@ -1428,7 +1642,7 @@ def verificar_coherencia_valores(año, mes):
                         WHERE Periodo = ? AND Codigo = '0000000001'
                     """, (valor_final_anterior, periodo))
                     
-                    print(f"  Se actualizó el valor inicial de {periodo} a {valor_final_anterior:.2f}")
+                    log.info(f"  Se actualizó el valor inicial de {periodo} a {valor_final_anterior:.2f}")
                     hay_cambios = True
         
         # 4.2. Para todos los meses excepto diciembre: verificar que el siguiente mes tenga como inicial el final de este
@@ -1446,9 +1660,9 @@ def verificar_coherencia_valores(año, mes):
                 
                 # El inicial del siguiente debe ser igual al final de este
                 if abs(valor_inicial_siguiente - valor_final_contable) > 0.01:
-                    print(f"Coherencia entre períodos: El inicial de {periodo_siguiente} no coincide con el final de {periodo}")
-                    print(f"  Valor inicial de {periodo_siguiente}: {valor_inicial_siguiente:.2f}")
-                    print(f"  Valor final de {periodo}: {valor_final_contable:.2f}")
+                    log.info(f"Coherencia entre períodos: El inicial de {periodo_siguiente} no coincide con el final de {periodo}")
+                    log.info(f"  Valor inicial de {periodo_siguiente}: {valor_inicial_siguiente:.2f}")
+                    log.info(f"  Valor final de {periodo}: {valor_final_contable:.2f}")
                     
                     # Corregir el valor inicial del período siguiente
                     cursor.execute("""
@@ -1464,7 +1678,7 @@ def verificar_coherencia_valores(año, mes):
                         WHERE Periodo = ? AND Codigo = '0000000001'
                     """, (valor_final_contable, periodo_siguiente))
                     
-                    print(f"  Se actualizó el valor inicial de {periodo_siguiente} a {valor_final_contable:.2f}")
+                    log.info(f"  Se actualizó el valor inicial de {periodo_siguiente} a {valor_final_contable:.2f}")
                     hay_cambios = True
         
         # 4.3. Caso especial: Si es diciembre, verificar coherencia con enero del siguiente año
@@ -1492,9 +1706,9 @@ def verificar_coherencia_valores(año, mes):
                     
                     # El inicial de enero del siguiente año debe ser igual al final de diciembre
                     if abs(valor_inicial_siguiente - valor_final_contable) > 0.01:
-                        print(f"Coherencia entre años: El inicial de {periodo_siguiente} no coincide con el final de {periodo}")
-                        print(f"  Valor inicial de {periodo_siguiente}: {valor_inicial_siguiente:.2f}")
-                        print(f"  Valor final de {periodo}: {valor_final_contable:.2f}")
+                        log.info(f"Coherencia entre años: El inicial de {periodo_siguiente} no coincide con el final de {periodo}")
+                        log.info(f"  Valor inicial de {periodo_siguiente}: {valor_inicial_siguiente:.2f}")
+                        log.info(f"  Valor final de {periodo}: {valor_final_contable:.2f}")
                         
                         # Corregir el valor inicial del período siguiente
                         cursor.execute("""
@@ -1503,32 +1717,184 @@ def verificar_coherencia_valores(año, mes):
                             WHERE Periodo = ?
                         """, (valor_final_contable, periodo_siguiente))
                         
-                        print(f"  Se actualizó el valor inicial de {periodo_siguiente} a {valor_final_contable:.2f}")
+                        log.info(f"  Se actualizó el valor inicial de {periodo_siguiente} a {valor_final_contable:.2f}")
                         hay_cambios = True
         
         if hay_cambios:
             conn.commit()
-            print(f"Valores corregidos para el período {periodo}.")
+            log.info(f"Valores corregidos para el período {periodo}.")
         else:
-            print(f"Los valores del período {periodo} son coherentes.")
+            log.info(f"Los valores del período {periodo} son coherentes.")
         
         conn.close()
     
     except Exception as e:
-        print(f"Error al verificar coherencia de valores para {mes:02d}/{año}: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception(f"Error al verificar coherencia de valores para {mes:02d}/{año}: {str(e)}")
         
         try:
             conn.close()
         except:
             pass
 
+def verificar_coherencia_año(año):
+    """
+    Verifica y corrige la coherencia de valores de los doce meses del año de una sola vez
+    
+    Equivale a llamar verificar_coherencia_valores(año, mes) para cada mes en orden, pero
+    lee InventarioContable y los registros 0000000001 de MovInventMes del año en dos
+    consultas, calcula en memoria todas las correcciones (Costo = Inicial, final =
+    UNIDADES_REGISTRO_INICIAL, Inicial del mes = Final del mes anterior, incluido enero
+    del año siguiente) y las aplica en una única transacción.
+    
+    Después de las correcciones, el valor de los movimientos de cada mes (ver
+    SQL_VALOR_FINAL_MES) debe ser su Final; los meses que no cuadran se advierten.
+    
+    Args:
+        año (int): Año a verificar
+    
+    Returns:
+        list: Correcciones aplicadas, cada una como diccionario con periodo, tabla, campo,
+            valor anterior y valor nuevo (None si ocurrió un error)
+    """
+    conn = None
+    try:
+        conn = get_connection()
+        cursor = conn.cursor()
+        periodo_enero_siguiente = f"01/{año + 1}"
+        
+        # 1. Valores de InventarioContable del año (y enero del año siguiente)
+        cursor.execute("""
+            SELECT Periodo, Inicial, Final
+            FROM InventarioContable
+            WHERE Periodo LIKE ? OR Periodo = ?
+        """, (f'__/{año}', periodo_enero_siguiente))
+        contable = {}
+        for periodo, inicial, final in cursor.fetchall():
+            contable.setdefault(periodo, {'Inicial': float(inicial), 'Final': float(final)})
+        
+        # 2. Registro 0000000001 y valor de los demás movimientos de cada mes del año
+        cursor.execute(f"""
+            SELECT Periodo,
+                   MAX(CASE WHEN Codigo = '0000000001' THEN Costo END) AS Costo,
+                   MAX(CASE WHEN Codigo = '0000000001' THEN final END) AS final,
+                   {SQL_VALOR_MOVIMIENTOS_MES} AS ValorMovimientos
+            FROM MovInventMes
+            WHERE Periodo LIKE ?
+            GROUP BY Periodo
+        """, (f'__/{año}',))
+        registros = {}
+        valor_movimientos = {}
+        for periodo, costo, final, valor in cursor.fetchall():
+            valor_movimientos[periodo] = valor or 0.0
+            if costo is not None:
+                registros[periodo] = {'Costo': float(costo), 'final': float(final)}
+        
+        # 3. Recorrer los meses en orden aplicando las mismas reglas que verificar_coherencia_valores
+        contable_original = {periodo: dict(valores) for periodo, valores in contable.items()}
+        registros_original = {periodo: dict(valores) for periodo, valores in registros.items()}
+        
+        for mes in range(1, 13):
+            periodo = f"{mes:02d}/{año}"
+            if periodo not in contable:
+                log.info(f"No se encontró el período {periodo} en InventarioContable.")
+                continue
+            if periodo not in registros:
+                log.info(f"No se encontró el registro 0000000001 para el período {periodo}.")
+                continue
+            
+            valor_inicial_contable = contable[periodo]['Inicial']
+            valor_final_contable = contable[periodo]['Final']
+            registro = registros[periodo]
+            
+            # El Costo debe ser igual al valor inicial y el final a la unidad que ese Costo valora
+            if abs(registro['Costo'] - valor_inicial_contable) > 0.01:
+                registro['Costo'] = valor_inicial_contable
+            if abs(registro['final'] - UNIDADES_REGISTRO_INICIAL) > 0.01:
+                registro['final'] = UNIDADES_REGISTRO_INICIAL
+            
+            # El inicial de este mes debe ser igual al final del anterior
+            periodo_anterior = f"{mes-1:02d}/{año}"
+            if mes > 1 and periodo_anterior in contable:
+                valor_final_anterior = contable[periodo_anterior]['Final']
+                if abs(valor_inicial_contable - valor_final_anterior) > 0.01:
+                    contable[periodo]['Inicial'] = valor_final_anterior
+                    registro['Costo'] = valor_final_anterior
+            
+            # El inicial del mes siguiente (o de enero del año siguiente) debe ser igual al final de este
+            periodo_siguiente = f"{mes+1:02d}/{año}" if mes < 12 else periodo_enero_siguiente
+            if periodo_siguiente in contable:
+                if abs(contable[periodo_siguiente]['Inicial'] - valor_final_contable) > 0.01:
+                    contable[periodo_siguiente]['Inicial'] = valor_final_contable
+                    if mes < 12 and periodo_siguiente in registros:
+                        registros[periodo_siguiente]['Costo'] = valor_final_contable
+        
+        # 4. Diferencias respecto a lo leído: son las únicas actualizaciones a enviar
+        correcciones = []
+        for periodo, valores in contable.items():
+            if valores['Inicial'] != contable_original[periodo]['Inicial']:
+                correcciones.append({'periodo': periodo, 'tabla': 'InventarioContable', 'campo': 'Inicial',
+                                     'anterior': contable_original[periodo]['Inicial'], 'nuevo': valores['Inicial']})
+        for periodo, valores in registros.items():
+            for campo in ('Costo', 'final'):
+                if valores[campo] != registros_original[periodo][campo]:
+                    correcciones.append({'periodo': periodo, 'tabla': 'MovInventMes', 'campo': campo,
+                                         'anterior': registros_original[periodo][campo], 'nuevo': valores[campo]})
+        
+        # Valor final que tendrá cada mes con las correcciones aplicadas
+        for periodo, registro in sorted(registros.items(), key=lambda item: item[0][:2]):
+            if periodo not in contable:
+                continue
+            valor_final = round(registro['Costo'] * registro['final'] + valor_movimientos[periodo], 2)
+            if abs(valor_final - contable[periodo]['Final']) > 0.01:
+                log.warning(f"ADVERTENCIA: Los movimientos de {periodo} suman {valor_final:.2f} y su valor "
+                            f"final en InventarioContable es {contable[periodo]['Final']:.2f}")
+        
+        if not correcciones:
+            log.info(f"Los valores del año {año} son coherentes.")
+            return correcciones
+        
+        # 5. Aplicar todas las correcciones en una única transacción
+        sentencias = {
+            ('InventarioContable', 'Inicial'): "UPDATE InventarioContable SET Inicial = ? WHERE Periodo = ?",
+            ('MovInventMes', 'Costo'): "UPDATE MovInventMes SET Costo = ? WHERE Periodo = ? AND Codigo = '0000000001'",
+            ('MovInventMes', 'final'): "UPDATE MovInventMes SET final = ? WHERE Periodo = ? AND Codigo = '0000000001'",
+        }
+        for (tabla, campo), sentencia in sentencias.items():
+            parametros = [(c['nuevo'], c['periodo']) for c in correcciones if c['tabla'] == tabla and c['campo'] == campo]
+            if parametros:
+                cursor.executemany(sentencia, parametros)
+        conn.commit()
+        
+        log.info(f"Correcciones aplicadas para el año {año}: {len(correcciones)}")
+        for c in sorted(correcciones, key=lambda c: (c['periodo'][3:], c['periodo'][:2])):
+            log.info(f"  {c['periodo']} {c['tabla']}.{c['campo']}: {c['anterior']:.2f} -> {c['nuevo']:.2f}")
+        return correcciones
+    
+    except Exception as e:
+        log.exception(f"Error al verificar coherencia de valores del año {año}: {str(e)}")
+        
+        try:
+            conn.rollback()
+        except:
+            pass
+        return None
+    
+    finally:
+        if conn is not None:
+            conn.close()
+
 if __name__ == "__main__":
     import sys
     
+    # --semilla N: generar movimientos reproducibles
+    # --silencioso / --detalle / --json: nivel y formato de los mensajes (ver registro.py)
+    from registro import configurar_desde_argumentos, semilla_desde_argumentos
+    configurar_desde_argumentos(sys.argv)
+    semilla = semilla_desde_argumentos(sys.argv)
+    
     if len(sys.argv) < 2:
-        print("Uso: python generador_inventario_directo.py <año> [mes] [valor_inicial_enero] [valor_final_diciembre]")
+        log.error("Uso: python generador_inventario_directo.py <año> [mes] [valor_inicial_enero] [valor_final_diciembre] "
+                  "[--semilla N] [--silencioso|--detalle] [--json]")
         sys.exit(1)
     
     try:
@@ -1547,10 +1913,10 @@ if __name__ == "__main__":
         if año == 2024:
             valor_inicial = VALOR_INICIAL_2024
             valor_final = VALOR_FINAL_2024
-            print(f"Usando valores predefinidos para 2024:")
-            print(f"  Valor inicial (enero): {valor_inicial}")
-            print(f"  Valor final (diciembre): {valor_final}")
-            print(f"  Diferencia anual: {valor_final - valor_inicial}")
+            log.info(f"Usando valores predefinidos para 2024:")
+            log.info(f"  Valor inicial (enero): {valor_inicial}")
+            log.info(f"  Valor final (diciembre): {valor_final}")
+            log.info(f"  Diferencia anual: {valor_final - valor_inicial}")
         
         # Procesar argumentos adicionales si se proporcionaron
         if len(sys.argv) > 3:
@@ -1573,11 +1939,11 @@ if __name__ == "__main__":
                     """, (VALOR_INICIAL_2024,))
                     conn.commit()
                     conn.close()
-                    print(f"Ajustado valor inicial de enero 2024 a {VALOR_INICIAL_2024:.2f}")
+                    log.info(f"Ajustado valor inicial de enero 2024 a {VALOR_INICIAL_2024:.2f}")
                 
-                generar_movimientos_directo(año, mes)
+                generar_movimientos_directo(año, mes, semilla=semilla)
             else:
-                print("Error: El mes debe estar entre 1 y 12")
+                log.error("Error: El mes debe estar entre 1 y 12")
         else:
             # Si no se especifica mes, generar para todo el año
             if año == 2024:
@@ -1604,7 +1970,7 @@ if __name__ == "__main__":
                 
                 # Calcular factores de crecimiento (exponencial)
                 factor_mensual = (VALOR_FINAL_2024 / VALOR_INICIAL_2024) ** (1/12.0)
-                print(f"Factor de crecimiento mensual: {factor_mensual}")
+                log.info(f"Factor de crecimiento mensual: {factor_mensual}")
                 
                 # Calcular valores esperados para cada mes (final)
                 valores_finales = [VALOR_INICIAL_2024]
@@ -1631,23 +1997,24 @@ if __name__ == "__main__":
                         WHERE Periodo = ?
                     """, (valor_final_mes, f'{siguiente_mes:02d}/2024'))
                     
-                    print(f"Mes {mes:02d}: Final={valor_final_mes:.2f}")
-                    print(f"Mes {siguiente_mes:02d}: Inicial={valor_final_mes:.2f}")
+                    log.info(f"Mes {mes:02d}: Final={valor_final_mes:.2f}")
+                    log.info(f"Mes {siguiente_mes:02d}: Inicial={valor_final_mes:.2f}")
                 
                 conn.commit()
                 conn.close()
             
-            # 2. Ahora generar los movimientos para cada mes
+            # 2. Ahora generar los movimientos para cada mes con un único generador
+            rng = crear_generador(semilla)
             for mes in range(1, 13):
                 try:
-                    print(f"\nGenerando movimientos para el mes {mes}/2024...")
-                    generar_movimientos_directo(año, mes)
+                    log.info(f"Generando movimientos para el mes {mes}/2024...")
+                    generar_movimientos_directo(año, mes, rng=rng)
                 except Exception as e:
-                    print(f"Error generando movimientos para mes {mes}: {str(e)}")
+                    log.error(f"Error generando movimientos para mes {mes}: {str(e)}")
             
-            print(f"Generación completa para el año {año}")
+            log.info(f"Generación completa para el año {año}")
     
     except ValueError:
-        print("Error: El año y el mes deben ser números enteros")
+        log.error("Error: El año y el mes deben ser números enteros")
     except Exception as e:
-        print(f"Error: {str(e)}") 
\ No newline at end of file
+        log.error(f"Error: {str(e)}") 
\ No newline at end of file
@@ -1,23 +1,31 @@
-import pyodbc
 import pandas as pd
 from datetime import datetime, timedelta
-import random
 import calendar
 import numpy as np
+from aleatorio import crear_generador, obtener_generador, entero, decimal, elegir, muestra, mezclar
 import openpyxl
-from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
 from openpyxl.utils.dataframe import dataframe_to_rows
+from libro_excel import EscritorLibro, estilos_fila
+from catalogo import obtener_catalogo, cargar_productos
+from conexion import obtener_pool, reiniciar_estadisticas_conexiones, imprimir_estadisticas_conexiones
+from instrumentacion import medido, Etapas
+from generador_inventario_directo import UNIDADES_REGISTRO_INICIAL
+from registro import obtener_registro
+
+log = obtener_registro('excel')
 
 # Configuración de la conexión a SQL Server
+CADENA_CONEXION = (
+    "DRIVER={SQL Server};"
+    "SERVER=DELLXEONE31545\SQLEXPRESS;"
+    "DATABASE=DatqBoxExpress;"
+    "UID=sa;"
+    "PWD=e!334011"
+)
+
 def get_connection():
-    conn_str = (
-        "DRIVER={SQL Server};"
-        "SERVER=DELLXEONE31545\SQLEXPRESS;"
-        "DATABASE=DatqBoxExpress;"
-        "UID=sa;"
-        "PWD=e!334011"
-    )
-    return pyodbc.connect(conn_str)
+    """Obtiene una conexión del pool compartido (close() la devuelve al pool)"""
+    return obtener_pool(CADENA_CONEXION).obtener()
 
 def obtener_datos_periodo(periodo):
     """Obtiene los datos del período de InventarioContable"""
@@ -31,42 +39,20 @@ def obtener_datos_periodo(periodo):
     conn.close()
     return df.iloc[0] if not df.empty else None
 
-def obtener_productos():
-    """Obtiene los productos del inventario para generar movimientos"""
-    conn = get_connection()
-    query = """
-    SELECT CODIGO, CATEGORIA, TIPO, DESCRIPCION, MARCA, PRECIO_COMPRA, EXISTENCIA
-    FROM Inventario
-    WHERE EXISTENCIA > 0 AND CODIGO NOT IN ('0000000001', '0000000002')
+def obtener_productos(snapshot=True):
     """
-    df = pd.read_sql(query, conn)
-    conn.close()
+    Obtiene los productos del inventario para generar movimientos
     
-    productos = []
-    for _, row in df.iterrows():
-        try:
-            # Construir descripción completa
-            categoria = str(row['CATEGORIA']).strip() if 'CATEGORIA' in row and not pd.isna(row['CATEGORIA']) else ""
-            tipo = str(row['TIPO']).strip() if 'TIPO' in row and not pd.isna(row['TIPO']) else ""
-            descripcion = str(row['DESCRIPCION']).strip() if 'DESCRIPCION' in row and not pd.isna(row['DESCRIPCION']) else ""
-            marca = str(row['MARCA']).strip() if 'MARCA' in row and not pd.isna(row['MARCA']) else ""
-            
-            descripcion_completa = f"{categoria} {tipo} {descripcion} {marca}".strip()
-            
-            producto = {
-                'codigo': str(row['CODIGO']).strip(),
-                'descripcion': descripcion_completa,
-                'precio': float(row['PRECIO_COMPRA']) if not pd.isna(row['PRECIO_COMPRA']) else 0.0,
-                'existencia': int(row['EXISTENCIA']) if not pd.isna(row['EXISTENCIA']) else 0
-            }
-            # Asegurar que los precios estén en un rango razonable (entre 5 y 500)
-            producto['precio'] = max(5.0, min(500.0, producto['precio']))
-            productos.append(producto)
-        except Exception as e:
-            print(f"Error al procesar producto: {str(e)}")
-            continue
+    La tabla Inventario solo se vuelve a leer si cambió desde la última carga
+    (ver catalogo.obtener_catalogo).
+    
+    Args:
+        snapshot (bool): Si se usa la copia en disco del catálogo entre ejecuciones
     
-    return productos
+    Returns:
+        list: Lista de diccionarios con codigo, descripcion, precio y existencia
+    """
+    return obtener_catalogo(('productos', CADENA_CONEXION), cargar_productos, get_connection, snapshot=snapshot)
 
 def obtener_dias_habiles(año, mes):
     """Obtiene los días hábiles (lunes a sábado) del mes especificado"""
@@ -86,28 +72,32 @@ def obtener_dias_habiles(año, mes):
     
     return dias_habiles
 
-def distribuir_valor(valor_total, num_productos):
+def distribuir_valor(valor_total, num_productos, rng=None):
     """Distribuye un valor total entre varios productos de forma aleatoria pero equilibrada"""
     if num_productos <= 0:
         return []
+    rng = obtener_generador(rng)
     
     # Generar pesos aleatorios para la distribución
-    pesos = np.random.dirichlet(np.ones(num_productos)) * valor_total
+    pesos = rng.dirichlet(np.ones(num_productos)) * valor_total
     
     # Redondear a 2 decimales
     return [round(peso, 2) for peso in pesos]
 
-def calcular_precio_consistente(precio_base, categoria_precio):
+def calcular_precio_consistente(precio_base, categoria_precio, rng=None):
     """
     Calcula un precio consistente basado en un precio base y una categoría
     
     Args:
         precio_base (float): Precio base del producto
         categoria_precio (int): Categoría de precio (0-4)
+        rng (np.random.Generator): Generador de números aleatorios de la ejecución
         
     Returns:
         float: Precio calculado
     """
+    rng = obtener_generador(rng)
+    
     # Definir rangos de precios por categoría
     rangos = [
         (5.0, 25.0),     # Categoría 0: productos muy económicos
@@ -122,7 +112,7 @@ def calcular_precio_consistente(precio_base, categoria_precio):
     # Si el precio base ya está en el rango, ajustarlo ligeramente
     if rango_min <= precio_base <= rango_max:
         # Variación aleatoria de ±10%
-        factor = random.uniform(0.9, 1.1)
+        factor = decimal(rng, 0.9, 1.1)
         precio = precio_base * factor
     else:
         # Si está fuera del rango, generamos un precio dentro del rango
@@ -132,15 +122,15 @@ def calcular_precio_consistente(precio_base, categoria_precio):
         
         if distancia_min < distancia_max:
             # Más cercano al mínimo
-            precio = rango_min + random.uniform(0, (rango_max - rango_min) * 0.4)
+            precio = rango_min + decimal(rng, 0, (rango_max - rango_min) * 0.4)
         else:
             # Más cercano al máximo
-            precio = rango_max - random.uniform(0, (rango_max - rango_min) * 0.4)
+            precio = rango_max - decimal(rng, 0, (rango_max - rango_min) * 0.4)
     
     # Redondear a 2 decimales
     return round(precio, 2)
 
-def distribuir_cantidad_por_dia(cantidad_total, num_dias, variabilidad=0.3):
+def distribuir_cantidad_por_dia(cantidad_total, num_dias, variabilidad=0.3, rng=None):
     """
     Distribuye una cantidad total entre varios días con cierta variabilidad
     
@@ -148,18 +138,20 @@ def distribuir_cantidad_por_dia(cantidad_total, num_dias, variabilidad=0.3):
         cantidad_total (int): Cantidad total a distribuir
         num_dias (int): Número de días
         variabilidad (float): Factor de variabilidad (0-1)
+        rng (np.random.Generator): Generador de números aleatorios de la ejecución
         
     Returns:
         list: Lista de cantidades por día
     """
     if num_dias <= 0 or cantidad_total <= 0:
         return []
+    rng = obtener_generador(rng)
     
     # Cantidad base por día
     cantidad_base = cantidad_total / num_dias
     
     # Generar factores aleatorios para cada día
-    factores = np.random.normal(1.0, variabilidad, num_dias)
+    factores = rng.normal(1.0, variabilidad, num_dias)
     
     # Normalizar factores para que sumen 1
     factores = factores / factores.sum()
@@ -170,7 +162,7 @@ def distribuir_cantidad_por_dia(cantidad_total, num_dias, variabilidad=0.3):
     # Ajustar para que sumen exactamente la cantidad total
     diferencia = cantidad_total - sum(cantidades)
     if diferencia != 0:
-        idx = random.randint(0, num_dias - 1)
+        idx = entero(rng, 0, num_dias - 1)
         cantidades[idx] += diferencia
     
     # Asegurar que no hay cantidades negativas
@@ -220,7 +212,7 @@ def obtener_existencias_previas(año, mes):
         
         return existencias
     except Exception as e:
-        print(f"Error al obtener existencias previas: {str(e)}")
+        log.error(f"Error al obtener existencias previas: {str(e)}")
         return {}
 
 def actualizar_inventario_contable(periodo, conn=None):
@@ -302,9 +294,7 @@ def actualizar_inventario_contable(periodo, conn=None):
         return True
         
     except Exception as e:
-        print(f"Error al actualizar InventarioContable para {periodo}: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception(f"Error al actualizar InventarioContable para {periodo}: {str(e)}")
         
         try:
             if cerrar_conn and conn:
@@ -331,7 +321,7 @@ def recalcular_periodos_año(año):
         # Primer paso: procesar desde enero hasta noviembre
         for mes in range(1, 12):  # Solo procesar hasta noviembre (11)
             periodo = f"{mes:02d}/{año}"
-            print(f"Recalculando período {periodo}...")
+            log.info(f"Recalculando período {periodo}...")
             
             # Obtener movimientos del período
             cursor = conn.cursor()
@@ -365,14 +355,14 @@ def recalcular_periodos_año(año):
                     WHERE Periodo = ?
                 """, (valor_final, siguiente_periodo))
                 
-                print(f"  Período {periodo}: Actualizado inicial={valor_inicial:.2f}, final={valor_final:.2f}")
-                print(f"  Período {siguiente_periodo}: Actualizado inicial={valor_final:.2f}")
+                log.info(f"  Período {periodo}: Actualizado inicial={valor_inicial:.2f}, final={valor_final:.2f}")
+                log.info(f"  Período {siguiente_periodo}: Actualizado inicial={valor_final:.2f}")
             else:
-                print(f"  No se encontraron datos para el período {periodo}")
+                log.info(f"  No se encontraron datos para el período {periodo}")
         
         # Segundo paso: procesar diciembre por separado
         periodo_diciembre = f"12/{año}"
-        print(f"Recalculando período {periodo_diciembre}...")
+        log.info(f"Recalculando período {periodo_diciembre}...")
         
         cursor = conn.cursor()
         
@@ -413,7 +403,7 @@ def recalcular_periodos_año(año):
                     WHERE Periodo = ? AND Codigo = '0000000001'
                 """, (valor_inicial_diciembre, periodo_diciembre))
                 
-                print(f"  Período {periodo_diciembre}: Actualizado inicial={valor_inicial_diciembre:.2f} (final mantenido en {valor_final_diciembre:.2f})")
+                log.info(f"  Período {periodo_diciembre}: Actualizado inicial={valor_inicial_diciembre:.2f} (final mantenido en {valor_final_diciembre:.2f})")
                 
                 # Si existe enero del siguiente año, actualizar su inicial con el final de diciembre
                 siguiente_año = año + 1
@@ -429,11 +419,11 @@ def recalcular_periodos_año(año):
                         SET Inicial = ?
                         WHERE Periodo = ?
                     """, (valor_final_diciembre, f"01/{siguiente_año}"))
-                    print(f"  Período 01/{siguiente_año}: Actualizado inicial={valor_final_diciembre:.2f}")
+                    log.info(f"  Período 01/{siguiente_año}: Actualizado inicial={valor_final_diciembre:.2f}")
             else:
-                print(f"  No se encontró valor final para el período {periodo_diciembre}")
+                log.info(f"  No se encontró valor final para el período {periodo_diciembre}")
         else:
-            print(f"  No se encontró valor final para el período 11/{año}")
+            log.info(f"  No se encontró valor final para el período 11/{año}")
         
         conn.commit()
         conn.close()
@@ -441,9 +431,7 @@ def recalcular_periodos_año(año):
         return True
         
     except Exception as e:
-        print(f"Error al recalcular períodos del año {año}: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception(f"Error al recalcular períodos del año {año}: {str(e)}")
         
         try:
             conn.rollback()
@@ -474,7 +462,7 @@ def asegurar_no_negativos(conn, periodo):
     
     registros_negativos = cursor.fetchall()
     if registros_negativos:
-        print(f"Corrigiendo {len(registros_negativos)} registros con potencial de existencias negativas...")
+        log.info(f"Corrigiendo {len(registros_negativos)} registros con potencial de existencias negativas...")
         
         for reg in registros_negativos:
             codigo = reg[0]
@@ -505,7 +493,7 @@ def asegurar_no_negativos(conn, periodo):
                         WHERE Periodo = ? AND Codigo = ?
                     """, (entradas_adicionales, entradas_adicionales, periodo, codigo))
                     
-                    print(f"  Código {codigo}: Entradas ajustadas de {entradas} a {entradas + entradas_adicionales}")
+                    log.debug("Código %s: Entradas ajustadas de %s a %s", codigo, entradas, entradas + entradas_adicionales)
             
             # Estrategia 2: Verificación adicional para casos extremos donde final aún sea negativo
             cursor.execute("""
@@ -524,7 +512,7 @@ def asegurar_no_negativos(conn, periodo):
                                   ELSE inicial + Entradas - Salidas - AutoConsumo - Retiros END
                     WHERE Periodo = ? AND Codigo = ? AND final < 0
                 """, (periodo, codigo))
-                print(f"  Código {codigo}: Salidas ajustadas para evitar existencias negativas")
+                log.debug("Código %s: Salidas ajustadas para evitar existencias negativas", codigo)
     
     # Verificación final: asegurar que todos los finales sean >= 0
     cursor.execute("""
@@ -535,25 +523,30 @@ def asegurar_no_negativos(conn, periodo):
     
     conn.commit()
 
-def generar_movimientos_directo(año, mes):
+def generar_movimientos_directo(año, mes, semilla=None, rng=None):
     """
     Genera movimientos directamente para la tabla MovInventMes sin pasar por MovInvent
     
     Args:
         año (int): Año para el cual generar movimientos
         mes (int): Mes para el cual generar movimientos (1-12)
+        semilla (int): Semilla para reproducir exactamente los mismos movimientos (se ignora si se pasa rng)
+        rng (np.random.Generator): Generador de la ejecución, para compartirlo entre varios meses
     
     Returns:
         bool: True si se generó correctamente, False en caso contrario
     """
+    if rng is None:
+        rng = crear_generador(semilla)
+    
     try:
         periodo = f"{mes:02d}/{año}"
-        print(f"\nGenerando movimientos directamente para {periodo}")
+        log.info(f"Generando movimientos directamente para {periodo}")
         
         # Obtener datos del período desde InventarioContable
         datos_periodo = obtener_datos_periodo(periodo)
         if datos_periodo is None:
-            print(f"Error: No se encontró el período {periodo} en InventarioContable")
+            log.error(f"Error: No se encontró el período {periodo} en InventarioContable")
             return False
         
         # CRUCIAL: Usar los valores exactos de la tabla InventarioContable
@@ -571,8 +564,8 @@ def generar_movimientos_directo(año, mes):
         # Para enero 2024, verificar que el valor inicial sea el correcto (final de 2023)
         if año == 2024 and mes == 1:
             if abs(valor_inicial - VALOR_INICIAL_2024) > 0.01:
-                print(f"ADVERTENCIA: El valor inicial de enero 2024 debe ser {VALOR_INICIAL_2024}.")
-                print(f"             Se usará este valor en lugar de {valor_inicial}.")
+                log.warning(f"ADVERTENCIA: El valor inicial de enero 2024 debe ser {VALOR_INICIAL_2024}. "
+                            f"Se usará este valor en lugar de {valor_inicial}.")
                 valor_inicial = VALOR_INICIAL_2024
                 valor_inventario = VALOR_INICIAL_2024
                 
@@ -590,8 +583,8 @@ def generar_movimientos_directo(año, mes):
         # Si estamos generando diciembre 2024, verificar que el valor final sea correcto
         if año == 2024 and mes == 12:
             if abs(valor_final - VALOR_FINAL_2024) > 0.01:
-                print(f"ADVERTENCIA: El valor final de diciembre 2024 debe ser {VALOR_FINAL_2024}.")
-                print(f"             Se usará este valor en lugar de {valor_final}.")
+                log.warning(f"ADVERTENCIA: El valor final de diciembre 2024 debe ser {VALOR_FINAL_2024}. "
+                            f"Se usará este valor en lugar de {valor_final}.")
                 valor_final = VALOR_FINAL_2024
                 
                 # Actualizar el valor en la base de datos para mantener coherencia
@@ -605,27 +598,27 @@ def generar_movimientos_directo(año, mes):
                 conn_temp.commit()
                 conn_temp.close()
         
-        print(f"Valor inicial: {valor_inicial:.2f}")
-        print(f"Valor final objetivo: {valor_final:.2f}")
-        print(f"Diferencia: {valor_final - valor_inicial:.2f}")
+        log.info(f"Valor inicial: {valor_inicial:.2f}")
+        log.info(f"Valor final objetivo: {valor_final:.2f}")
+        log.info(f"Diferencia: {valor_final - valor_inicial:.2f}")
         
         # Calcular diferencia para este mes específico
         diferencia = valor_final - valor_inicial
         
         # Obtener existencias previas del período anterior
         existencias_previas = obtener_existencias_previas(año, mes)
-        print(f"Se encontraron {len(existencias_previas)} productos con existencias previas")
+        log.info(f"Se encontraron {len(existencias_previas)} productos con existencias previas")
         
         # Obtener productos para distribuir movimientos
         productos = obtener_productos()
         if not productos:
-            print("Error: No hay productos disponibles en el inventario")
+            log.error("Error: No hay productos disponibles en el inventario")
             return False
         
         # Obtener días hábiles del mes
         dias_habiles = obtener_dias_habiles(año, mes)
         if not dias_habiles:
-            print(f"Error: No hay días hábiles para {mes}/{año}")
+            log.error(f"Error: No hay días hábiles para {mes}/{año}")
             return False
         
         # Seleccionar un número de productos que depende del mes
@@ -641,15 +634,15 @@ def generar_movimientos_directo(año, mes):
         # Asegurar que tenemos suficientes productos
         if len(productos_con_existencia) < num_productos // 3:
             # Si hay pocos productos con existencia, completar con productos sin existencia
-            productos_adicionales = random.sample(productos_sin_existencia, min(len(productos_sin_existencia), num_productos - len(productos_con_existencia)))
+            productos_adicionales = muestra(rng, productos_sin_existencia, min(len(productos_sin_existencia), num_productos - len(productos_con_existencia)))
             productos_seleccionados = productos_con_existencia + productos_adicionales
         else:
             # Si hay suficientes productos con existencia, seleccionar algunos de ellos
-            productos_seleccionados = random.sample(productos_con_existencia, min(len(productos_con_existencia), num_productos))
+            productos_seleccionados = muestra(rng, productos_con_existencia, min(len(productos_con_existencia), num_productos))
             
             # Completar con productos sin existencia si es necesario
             if len(productos_seleccionados) < num_productos:
-                productos_adicionales = random.sample(productos_sin_existencia, min(len(productos_sin_existencia), num_productos - len(productos_seleccionados)))
+                productos_adicionales = muestra(rng, productos_sin_existencia, min(len(productos_sin_existencia), num_productos - len(productos_seleccionados)))
                 productos_seleccionados += productos_adicionales
         
         # Limpiar registros existentes para este período
@@ -676,7 +669,7 @@ def generar_movimientos_directo(año, mes):
             # Para diferencia negativa, limitamos un poco el valor distribuido
             valor_total_productos = max(valor_distribuir, valor_inicial * 0.05)  # Al menos 5% del valor inicial
             
-        valores_por_producto = distribuir_valor(valor_total_productos, len(productos_seleccionados))
+        valores_por_producto = distribuir_valor(valor_total_productos, len(productos_seleccionados), rng=rng)
         
         # Variables para acumular valores monetarios
         total_valor_entradas = 0
@@ -695,7 +688,7 @@ def generar_movimientos_directo(año, mes):
             categoria_precio = i % 5
             
             # Calcular un precio consistente
-            precio_unitario = calcular_precio_consistente(producto['precio'], categoria_precio)
+            precio_unitario = calcular_precio_consistente(producto['precio'], categoria_precio, rng=rng)
             
             # Valor total asignado a este producto
             valor_producto = valores_por_producto[i]
@@ -706,7 +699,7 @@ def generar_movimientos_directo(año, mes):
             # Para productos con existencia inicial < 5, garantizar una entrada inicial grande
             if existencia_inicial < 5:
                 entrada_inicial_min = max(20, int(valor_producto / (precio_unitario * 0.5)))
-                entrada_inicial = random.randint(entrada_inicial_min, entrada_inicial_min + 20)
+                entrada_inicial = entero(rng, entrada_inicial_min, entrada_inicial_min + 20)
                 
                 # Registrar entrada inicial al principio del mes
                 dia_entrada_inicial = dias_habiles[1] if len(dias_habiles) > 1 else dias_habiles[0]
@@ -739,11 +732,11 @@ def generar_movimientos_directo(año, mes):
             factor_multiplicador_movs = 4 
             if existencia_inicial < 5:
                 # Si ya generamos una entrada inicial grande, menos movimientos adicionales
-                num_movimientos = random.randint(1 * factor_multiplicador_movs, 3 * factor_multiplicador_movs) 
+                num_movimientos = entero(rng, 1 * factor_multiplicador_movs, 3 * factor_multiplicador_movs) 
             else:
                 # Más movimientos para productos con existencia
-                num_movimientos = random.randint(2 * factor_multiplicador_movs, 4 * factor_multiplicador_movs)
-            print(f"    Producto {codigo}: Generando {num_movimientos} movimientos adicionales.")
+                num_movimientos = entero(rng, 2 * factor_multiplicador_movs, 4 * factor_multiplicador_movs)
+            log.debug("Producto %s: Generando %d movimientos adicionales", codigo, num_movimientos)
             
             # Dividir los días hábiles en grupos para distribuir los movimientos
             # Excluimos los primeros días ya usados
@@ -754,7 +747,7 @@ def generar_movimientos_directo(año, mes):
                 continue  # Si no hay más días disponibles, pasar al siguiente producto
                 
             # Mezclar días para evitar patrones
-            random.shuffle(dias_disponibles)
+            dias_disponibles = mezclar(rng, dias_disponibles)
             dias_seleccionados = dias_disponibles[:num_movimientos] if num_movimientos <= len(dias_disponibles) else dias_disponibles
             dias_seleccionados.sort()  # Ordenar cronológicamente
             
@@ -768,10 +761,10 @@ def generar_movimientos_directo(año, mes):
                 existencia_antes = existencia_acumulada[codigo]
                 
                 # Si es el primer movimiento o hay poca existencia, garantizar una entrada
-                debe_tener_entrada = idx == 0 or existencia_antes < 15 or random.random() < porcentaje_entradas
+                debe_tener_entrada = idx == 0 or existencia_antes < 15 or rng.random() < porcentaje_entradas
                 
                 # Solo permitir salidas si hay suficiente existencia
-                puede_tener_salida = existencia_antes >= 15 and random.random() < 0.6
+                puede_tener_salida = existencia_antes >= 15 and rng.random() < 0.6
                 
                 # Si es el último movimiento y aún no hay suficientes existencias, forzar entrada
                 if idx == len(dias_seleccionados) - 1 and existencia_antes < 20:
@@ -784,7 +777,7 @@ def generar_movimientos_directo(año, mes):
                 # CASO 1: Solo entradas
                 if debe_tener_entrada and not puede_tener_salida:
                     # Variación aleatoria para hacer más natural
-                    factor_variacion = random.uniform(0.8, 1.5)
+                    factor_variacion = decimal(rng, 0.8, 1.5)
                     cantidad_entrada = max(5, round(cantidad_base * factor_variacion))
                     
                     # Actualizar existencia acumulada
@@ -816,7 +809,7 @@ def generar_movimientos_directo(año, mes):
                     salida_maxima_cantidad = existencia_antes - 10  # Dejamos al menos 10 unidades
 
                     # Calcular salida deseada en cantidad
-                    factor_variacion = random.uniform(0.3, 0.9)
+                    factor_variacion = decimal(rng, 0.3, 0.9)
                     cantidad_salida_deseada = round(cantidad_base * factor_variacion)
                     
                     # Limitar la salida en cantidad al máximo permitido y al menos 1
@@ -828,11 +821,14 @@ def generar_movimientos_directo(año, mes):
                         valor_disponible_para_salida = existencia_antes * precio_unitario
                         cantidad_salida_max_por_valor = int(valor_disponible_para_salida / precio_unitario)
                         if cantidad_salida > cantidad_salida_max_por_valor:
-                            print(f"    AJUSTE VALOR SALIDA (CASO 2): Prod {codigo}, Día {dia.strftime('%Y-%m-%d')}, Cant Salida: {cantidad_salida} -> {cantidad_salida_max_por_valor}, ExistAntes: {existencia_antes}, Precio: {precio_unitario:.2f}, ValorDisp: {valor_disponible_para_salida:.2f}")
+                            log.debug("AJUSTE VALOR SALIDA (CASO 2): Prod %s, Día %s, Cant Salida: %s -> %s, ExistAntes: %s, "
+                                      "Precio: %.2f, ValorDisp: %.2f", codigo, dia, cantidad_salida, cantidad_salida_max_por_valor,
+                                      existencia_antes, precio_unitario, valor_disponible_para_salida)
                             cantidad_salida = cantidad_salida_max_por_valor
                     else: # Si el precio es cero o negativo, no permitir salidas que puedan causar problemas de valor.
                         if cantidad_salida > 0 :
-                             print(f"    ADVERTENCIA VALOR SALIDA (CASO 2): Prod {codigo}, Precio <= 0 ({precio_unitario:.2f}), forzando cantidad_salida a 0.")
+                            log.debug("VALOR SALIDA (CASO 2): Prod %s, Precio <= 0 (%.2f), forzando cantidad_salida a 0",
+                                      codigo, precio_unitario)
                         cantidad_salida = 0
                     
                     cantidad_salida = max(0, cantidad_salida) # Asegurar que no sea negativa tras el ajuste de valor
@@ -870,7 +866,7 @@ def generar_movimientos_directo(año, mes):
                 # CASO 3: Combinado (entradas y salidas en el mismo registro, asegurando no negatividad de valor)
                 elif debe_tener_entrada and puede_tener_salida:
                     # Primero calculamos la entrada
-                    factor_variacion_entrada = random.uniform(1.0, 1.8)
+                    factor_variacion_entrada = decimal(rng, 1.0, 1.8)
                     cantidad_entrada = max(5, round(cantidad_base * factor_variacion_entrada))
                     
                     # Luego calculamos la salida, considerando la entrada que acabamos de planificar
@@ -878,7 +874,7 @@ def generar_movimientos_directo(año, mes):
                     # Calcular salida máxima permitida en cantidad (dejando margen de seguridad de cantidad)
                     salida_maxima_cantidad = existencia_con_entrada_planificada - 10
                     
-                    factor_variacion_salida = random.uniform(0.3, 0.7)
+                    factor_variacion_salida = decimal(rng, 0.3, 0.7)
                     cantidad_salida_deseada = round(cantidad_base * factor_variacion_salida)
                     
                     # Limitar la salida en cantidad al máximo permitido y al menos 1
@@ -890,11 +886,15 @@ def generar_movimientos_directo(año, mes):
                         valor_disponible_para_salida_tras_entrada = (existencia_antes + cantidad_entrada) * precio_unitario
                         cantidad_salida_max_por_valor = int(valor_disponible_para_salida_tras_entrada / precio_unitario)
                         if cantidad_salida > cantidad_salida_max_por_valor:
-                            print(f"    AJUSTE VALOR SALIDA (CASO 3): Prod {codigo}, Día {dia.strftime('%Y-%m-%d')}, Cant Salida: {cantidad_salida} -> {cantidad_salida_max_por_valor}, ExistAntes: {existencia_antes}, CantEntrada: {cantidad_entrada}, Precio: {precio_unitario:.2f}, ValorDispTrasEnt: {valor_disponible_para_salida_tras_entrada:.2f}")
+                            log.debug("AJUSTE VALOR SALIDA (CASO 3): Prod %s, Día %s, Cant Salida: %s -> %s, ExistAntes: %s, "
+                                      "CantEntrada: %s, Precio: %.2f, ValorDispTrasEnt: %.2f", codigo, dia, cantidad_salida,
+                                      cantidad_salida_max_por_valor, existencia_antes, cantidad_entrada, precio_unitario,
+                                      valor_disponible_para_salida_tras_entrada)
                             cantidad_salida = cantidad_salida_max_por_valor
                     else: # Si el precio es cero o negativo
                         if cantidad_salida > 0 :
-                            print(f"    ADVERTENCIA VALOR SALIDA (CASO 3): Prod {codigo}, Precio <= 0 ({precio_unitario:.2f}), forzando cantidad_salida a 0.")
+                            log.debug("VALOR SALIDA (CASO 3): Prod %s, Precio <= 0 (%.2f), forzando cantidad_salida a 0",
+                                      codigo, precio_unitario)
                         cantidad_salida = 0
 
                     cantidad_salida = max(0, cantidad_salida) # Asegurar que no sea negativa tras el ajuste de valor
@@ -967,11 +967,11 @@ def generar_movimientos_directo(año, mes):
         # Verificar que los totales monetarios cuadren con lo esperado
         valor_final_calculado = valor_inicial + total_valor_entradas - total_valor_salidas
         
-        print(f"Valor inicial: {valor_inicial:.2f}")
-        print(f"Total valor entradas: {total_valor_entradas:.2f}")
-        print(f"Total valor salidas: {total_valor_salidas:.2f}")
-        print(f"Valor final calculado: {valor_final_calculado:.2f}")
-        print(f"Valor final objetivo: {valor_final:.2f}")
+        log.info(f"Valor inicial: {valor_inicial:.2f}")
+        log.info(f"Total valor entradas: {total_valor_entradas:.2f}")
+        log.info(f"Total valor salidas: {total_valor_salidas:.2f}")
+        log.info(f"Valor final calculado: {valor_final_calculado:.2f}")
+        log.info(f"Valor final objetivo: {valor_final:.2f}")
 
         # AJUSTE GENERAL PARA TODOS LOS MESES: Insertar movimientos para cuadrar con InventarioContable.Final
         # La condición if mes == 12: ha sido eliminada de aquí.
@@ -981,7 +981,7 @@ def generar_movimientos_directo(año, mes):
         diferencia_ajuste_final = round(valor_final_objetivo_de_tabla_contable - valor_actual_inventario_sin_ajuste_final, 2)
 
         if abs(diferencia_ajuste_final) > 0.01:
-            print(f"Ajuste final necesario para {periodo}: {diferencia_ajuste_final:.2f}. Se dividirá en 5 movimientos.")
+            log.info(f"Ajuste final necesario para {periodo}: {diferencia_ajuste_final:.2f}. Se dividirá en 5 movimientos.")
             fecha_ajuste = dias_habiles[-1] # Último día hábil del mes
             
             costo_por_movimiento_ajuste = round(abs(diferencia_ajuste_final) / 5.0, 2)
@@ -994,11 +994,11 @@ def generar_movimientos_directo(año, mes):
                 valor_total_ajuste_distribuido += costo_actual_movimiento
 
                 if not productos_seleccionados:
-                    print(f"ADVERTENCIA (Ajuste {i+1}/5): No hay productos. Usando genérico.")
+                    log.warning(f"ADVERTENCIA (Ajuste {i+1}/5): No hay productos. Usando genérico.")
                     codigo_producto_ajuste = "0000000002"
                     descripcion_producto_ajuste = f"AJUSTE VALOR FINAL PERIODO ({i+1}/5)"
                 else:
-                    producto_para_ajuste = random.choice(productos_seleccionados)
+                    producto_para_ajuste = elegir(rng, productos_seleccionados)
                     codigo_producto_ajuste = producto_para_ajuste['codigo']
                     descripcion_producto_ajuste = producto_para_ajuste['descripcion']
                 
@@ -1017,9 +1017,9 @@ def generar_movimientos_directo(año, mes):
                 
                 q_final_ajuste = q_inicial_ajuste + q_entrada_ajuste - q_salida_ajuste
                 
-                print(f"  Mov.AjusteFinal {i+1}/5: Prod: {codigo_producto_ajuste}")
-                print(f"    Tipo: {tipo_ajuste_log}, Cant.Ini: {q_inicial_ajuste}, Ent: {q_entrada_ajuste}, Sal: {q_salida_ajuste}, Cant.Fin: {q_final_ajuste}")
-                print(f"    Costo mov. ajuste: {costo_actual_movimiento:.2f}")
+                log.debug("Mov.AjusteFinal %d/5: Prod: %s, Tipo: %s, Cant.Ini: %s, Ent: %s, Sal: %s, Cant.Fin: %s, "
+                          "Costo mov. ajuste: %.2f", i + 1, codigo_producto_ajuste, tipo_ajuste_log, q_inicial_ajuste,
+                          q_entrada_ajuste, q_salida_ajuste, q_final_ajuste, costo_actual_movimiento)
 
                 cursor.execute("""
                      INSERT INTO MovInventMes
@@ -1031,16 +1031,16 @@ def generar_movimientos_directo(año, mes):
                     q_final_ajuste, fecha_ajuste, valor_inventario
                 ))
             
-            print(f"  Total 5 mov. ajuste insertados. Costo total distribuido: {valor_total_ajuste_distribuido:.2f} (Objetivo: {abs(diferencia_ajuste_final):.2f})")
+            log.info(f"  Total 5 mov. ajuste insertados. Costo total distribuido: {valor_total_ajuste_distribuido:.2f} (Objetivo: {abs(diferencia_ajuste_final):.2f})")
             
             # Actualizar el valor_final_calculado para el print que resume el mes
             valor_final_calculado = valor_actual_inventario_sin_ajuste_final + diferencia_ajuste_final
-            print(f"Nuevo valor final del mes tras 5 ajustes: {valor_final_calculado:.2f}")
+            log.info(f"Nuevo valor final del mes tras 5 ajustes: {valor_final_calculado:.2f}")
         else:
-            print(f"No se requiere ajuste final para {periodo}. Diferencia: {diferencia_ajuste_final:.2f}")
+            log.info(f"No se requiere ajuste final para {periodo}. Diferencia: {diferencia_ajuste_final:.2f}")
 
         # Aplicar verificación adicional para asegurar que no haya existencias negativas
-        print("Verificando que no haya existencias negativas...")
+        log.info("Verificando que no haya existencias negativas...")
         asegurar_no_negativos(conn, periodo)
         
         # Contar registros generados
@@ -1064,18 +1064,16 @@ def generar_movimientos_directo(año, mes):
         conn.commit()
         conn.close()
         
-        print(f"\nMovimientos generados directamente para {periodo}")
-        print(f"Total registros generados: {total_registros}")
-        print(f"Valor inicial total: {valor_inicial:.2f}")
-        print(f"Valor inventario: {valor_inventario:.2f} (igual al valor inicial del mes)")
-        print(f"Valor final alcanzado: {valor_final:.2f}")
+        log.info(f"Movimientos generados directamente para {periodo}")
+        log.info(f"Total registros generados: {total_registros}")
+        log.info(f"Valor inicial total: {valor_inicial:.2f}")
+        log.info(f"Valor inventario: {valor_inventario:.2f} (igual al valor inicial del mes)")
+        log.info(f"Valor final alcanzado: {valor_final:.2f}")
         
         return True
     
     except Exception as e:
-        print(f"Error al generar movimientos directos: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception(f"Error al generar movimientos directos: {str(e)}")
         
         try:
             conn.rollback()
@@ -1110,8 +1108,8 @@ def inicializar_periodos_año(año, valor_inicial_enero=None, valor_final_diciem
         
         count = cursor.fetchone()[0]
         if count < 12:
-            print(f"No hay registros completos para el año {año} en InventarioContable.")
-            print(f"Se necesitan crear {12-count} registros.")
+            log.info(f"No hay registros completos para el año {año} en InventarioContable.")
+            log.info(f"Se necesitan crear {12-count} registros.")
             # Esto podría implementarse si es necesario crear registros
             return False
         
@@ -1122,7 +1120,7 @@ def inicializar_periodos_año(año, valor_inicial_enero=None, valor_final_diciem
                 SET Inicial = ?
                 WHERE Periodo = ?
             """, (valor_inicial_enero, f'01/{año}'))
-            print(f"Actualizado el valor inicial de enero {año} a {valor_inicial_enero:.2f}")
+            log.info(f"Actualizado el valor inicial de enero {año} a {valor_inicial_enero:.2f}")
         
         # 3. Si se especificó, actualizar el valor final de diciembre
         if valor_final_diciembre is not None:
@@ -1131,7 +1129,7 @@ def inicializar_periodos_año(año, valor_inicial_enero=None, valor_final_diciem
                 SET Final = ?
                 WHERE Periodo = ?
             """, (valor_final_diciembre, f'12/{año}'))
-            print(f"Actualizado el valor final de diciembre {año} a {valor_final_diciembre:.2f}")
+            log.info(f"Actualizado el valor final de diciembre {año} a {valor_final_diciembre:.2f}")
         
         # 4. Leer los valores inicial de enero y final de diciembre
         cursor.execute("""
@@ -1150,9 +1148,9 @@ def inicializar_periodos_año(año, valor_inicial_enero=None, valor_final_diciem
         
         # 5. Calcular la diferencia anual a distribuir
         diferencia_anual = valor_final_diciembre - valor_inicial_enero
-        print(f"Valor inicial año {año}: {valor_inicial_enero:.2f}")
-        print(f"Valor final año {año}: {valor_final_diciembre:.2f}")
-        print(f"Diferencia a distribuir: {diferencia_anual:.2f}")
+        log.info(f"Valor inicial año {año}: {valor_inicial_enero:.2f}")
+        log.info(f"Valor final año {año}: {valor_final_diciembre:.2f}")
+        log.info(f"Diferencia a distribuir: {diferencia_anual:.2f}")
         
         # 6. Definir la distribución mensual (pesos por mes)
         # Usamos pesos específicos para cada mes según patrones de negocio típicos
@@ -1216,8 +1214,8 @@ def inicializar_periodos_año(año, valor_inicial_enero=None, valor_final_diciem
                 WHERE Periodo = ?
             """, (valor_final_mes, f'{siguiente_mes:02d}/{año}'))
             
-            print(f"Mes {mes:02d}: Final={valor_final_mes:.2f}")
-            print(f"Mes {siguiente_mes:02d}: Inicial={valor_final_mes:.2f}")
+            log.info(f"Mes {mes:02d}: Final={valor_final_mes:.2f}")
+            log.info(f"Mes {siguiente_mes:02d}: Inicial={valor_final_mes:.2f}")
         
         # 9. Manejar diciembre por separado - mantener su valor final específico
         # y asegurarnos que su valor inicial sea el final de noviembre
@@ -1229,7 +1227,7 @@ def inicializar_periodos_año(año, valor_inicial_enero=None, valor_final_diciem
             WHERE Periodo = ?
         """, (valor_final_noviembre, f'12/{año}'))
         
-        print(f"Mes 12: Inicial={valor_final_noviembre:.2f}, Final={valor_final_diciembre:.2f} (mantenido)")
+        log.info(f"Mes 12: Inicial={valor_final_noviembre:.2f}, Final={valor_final_diciembre:.2f} (mantenido)")
         
         # 10. Si el año tiene un año siguiente, actualizar también enero del siguiente
         if año < datetime.now().year + 1:
@@ -1239,18 +1237,16 @@ def inicializar_periodos_año(año, valor_inicial_enero=None, valor_final_diciem
                     SET Inicial = ?
                     WHERE Periodo = ?
                 """, (valor_final_diciembre, f'01/{año+1}'))
-                print(f"Actualizado inicial de enero {año+1} a {valor_final_diciembre:.2f}")
+                log.info(f"Actualizado inicial de enero {año+1} a {valor_final_diciembre:.2f}")
             except:
-                print(f"No se pudo actualizar el valor inicial de enero {año+1}")
+                log.info(f"No se pudo actualizar el valor inicial de enero {año+1}")
         
         conn.commit()
         conn.close()
         return True
     
     except Exception as e:
-        print(f"Error al inicializar períodos del año {año}: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception(f"Error al inicializar períodos del año {año}: {str(e)}")
         
         try:
             conn.rollback()
@@ -1260,7 +1256,7 @@ def inicializar_periodos_año(año, valor_inicial_enero=None, valor_final_diciem
         
         return False
 
-def generar_año_directo(año, valor_inicial_enero=None, valor_final_diciembre=None):
+def generar_año_directo(año, valor_inicial_enero=None, valor_final_diciembre=None, semilla=None):
     """
     Genera los movimientos para todos los meses de un año directamente
     
@@ -1268,33 +1264,40 @@ def generar_año_directo(año, valor_inicial_enero=None, valor_final_diciembre=N
         año (int): El año para generar movimientos
         valor_inicial_enero (float): Valor inicial para enero (opcional)
         valor_final_diciembre (float): Valor final para diciembre (opcional)
+        semilla (int): Semilla del año; con la misma semilla se regeneran exactamente los mismos movimientos
     """
     try:
-        print(f"Generando movimientos directos para el año {año}...")
+        log.info(f"Generando movimientos directos para el año {año}...")
+        reiniciar_estadisticas_conexiones()
+        
+        # Un único generador para todo el año, de modo que el año completo sea reproducible
+        rng = crear_generador(semilla)
+        if semilla is not None:
+            log.info(f"Semilla de la generación: {semilla}")
         
         # Inicializar los períodos con los valores requeridos
         if valor_inicial_enero is not None or valor_final_diciembre is not None:
-            print(f"Inicializando valores de períodos para el año {año}...")
+            log.info(f"Inicializando valores de períodos para el año {año}...")
             inicializar_periodos_año(año, valor_inicial_enero, valor_final_diciembre)
         
         # Procesar cada mes
         for mes in range(1, 13):
             try:
                 nombre_mes = calendar.month_name[mes]
-                print(f"\nProcesando {nombre_mes} {año}...")
+                log.info(f"Procesando {nombre_mes} {año}...")
                 
-                exito = generar_movimientos_directo(año, mes)
+                exito = generar_movimientos_directo(año, mes, rng=rng)
                 if not exito:
-                    print(f"Error al generar movimientos para {mes:02d}/{año}")
+                    log.error(f"Error al generar movimientos para {mes:02d}/{año}")
                 else:
                     # Verificar que los valores sean coherentes
                     verificar_coherencia_valores(año, mes)
             
             except Exception as e:
-                print(f"Error en mes {mes}: {str(e)}")
+                log.error(f"Error en mes {mes}: {str(e)}")
         
         # Recalcular valores de InventarioContable para todo el año
-        print("\nRecalculando valores de InventarioContable...")
+        log.info("Recalculando valores de InventarioContable...")
         recalcular_periodos_año(año)
         
         # Verificación final para asegurar que el valor final de diciembre es correcto
@@ -1308,15 +1311,16 @@ def generar_año_directo(año, valor_inicial_enero=None, valor_final_diciembre=N
             """, (valor_final_diciembre, f'12/{año}'))
             conn.commit()
             conn.close()
-            print(f"Verificación final: Valor de diciembre {año} ajustado a {valor_final_diciembre:.2f}")
+            log.info(f"Verificación final: Valor de diciembre {año} ajustado a {valor_final_diciembre:.2f}")
             
             # Verificar coherencia del valor final de diciembre
             verificar_coherencia_valores(año, 12)
         
-        print(f"\nGeneración de movimientos completa para el año {año}")
+        log.info(f"Generación de movimientos completa para el año {año}")
+        imprimir_estadisticas_conexiones()
     
     except Exception as e:
-        print(f"Error en generar_año_directo: {str(e)}")
+        log.error(f"Error en generar_año_directo: {str(e)}")
 
 def verificar_coherencia_valores(año, mes):
     """
@@ -1342,7 +1346,7 @@ def verificar_coherencia_valores(año, mes):
         
         row = cursor.fetchone()
         if not row:
-            print(f"No se encontró el período {periodo} en InventarioContable.")
+            log.info(f"No se encontró el período {periodo} en InventarioContable.")
             conn.close()
             return
         
@@ -1358,7 +1362,7 @@ def verificar_coherencia_valores(año, mes):
         
         row = cursor.fetchone()
         if not row:
-            print(f"No se encontró el registro 0000000001 para el período {periodo}.")
+            log.info(f"No se encontró el registro 0000000001 para el período {periodo}.")
             conn.close()
             return
         
@@ -1370,9 +1374,9 @@ def verificar_coherencia_valores(año, mes):
         
         # El Costo debe ser igual al valor inicial
         if abs(costo_registro - valor_inicial_contable) > 0.01:
-            print(f"Corrigiendo Costo del registro 0000000001 para {periodo}:")
-            print(f"  Valor actual: {costo_registro:.2f}")
-            print(f"  Valor correcto: {valor_inicial_contable:.2f}")
+            log.info(f"Corrigiendo Costo del registro 0000000001 para {periodo}:")
+            log.info(f"  Valor actual: {costo_registro:.2f}")
+            log.info(f"  Valor correcto: {valor_inicial_contable:.2f}")
             
             cursor.execute("""
                 UPDATE MovInventMes
@@ -1382,17 +1386,18 @@ def verificar_coherencia_valores(año, mes):
             
             hay_cambios = True
         
-        # El valor final debe ser igual al valor final contable
-        if abs(final_registro - valor_final_contable) > 0.01:
-            print(f"Corrigiendo valor final del registro 0000000001 para {periodo}:")
-            print(f"  Valor actual: {final_registro:.2f}")
-            print(f"  Valor correcto: {valor_final_contable:.2f}")
+        # La cantidad final es la unidad que valora el Costo (no el valor final contable,
+        # que recalcular_periodos_año multiplicaría por el Costo)
+        if abs(final_registro - UNIDADES_REGISTRO_INICIAL) > 0.01:
+            log.info(f"Corrigiendo cantidad final del registro 0000000001 para {periodo}:")
+            log.info(f"  Cantidad actual: {final_registro:.2f}")
+            log.info(f"  Cantidad correcta: {UNIDADES_REGISTRO_INICIAL}")
             
             cursor.execute("""
                 UPDATE MovInventMes
                 SET final = ?
                 WHERE Periodo = ? AND Codigo = '0000000001'
-            """, (valor_final_contable, periodo))
+            """, (UNIDADES_REGISTRO_INICIAL, periodo))
             
             hay_cambios = True
         
@@ -1413,9 +1418,9 @@ def verificar_coherencia_valores(año, mes):
                 
                 # El inicial de este mes debe ser igual al final del anterior
                 if abs(valor_inicial_contable - valor_final_anterior) > 0.01:
-                    print(f"Coherencia entre períodos: El inicial de {periodo} no coincide con el final de {periodo_anterior}")
-                    print(f"  Valor inicial de {periodo}: {valor_inicial_contable:.2f}")
-                    print(f"  Valor final de {periodo_anterior}: {valor_final_anterior:.2f}")
+                    log.info(f"Coherencia entre períodos: El inicial de {periodo} no coincide con el final de {periodo_anterior}")
+                    log.info(f"  Valor inicial de {periodo}: {valor_inicial_contable:.2f}")
+                    log.info(f"  Valor final de {periodo_anterior}: {valor_final_anterior:.2f}")
                     
                     # Corregir el valor inicial del período actual
                     cursor.execute("""
@@ -1431,7 +1436,7 @@ def verificar_coherencia_valores(año, mes):
                         WHERE Periodo = ? AND Codigo = '0000000001'
                     """, (valor_final_anterior, periodo))
                     
-                    print(f"  Se actualizó el valor inicial de {periodo} a {valor_final_anterior:.2f}")
+                    log.info(f"  Se actualizó el valor inicial de {periodo} a {valor_final_anterior:.2f}")
                     hay_cambios = True
         
         # 4.2. Para todos los meses excepto diciembre: verificar que el siguiente mes tenga como inicial el final de este
@@ -1449,9 +1454,9 @@ def verificar_coherencia_valores(año, mes):
                 
                 # El inicial del siguiente debe ser igual al final de este
                 if abs(valor_inicial_siguiente - valor_final_contable) > 0.01:
-                    print(f"Coherencia entre períodos: El inicial de {periodo_siguiente} no coincide con el final de {periodo}")
-                    print(f"  Valor inicial de {periodo_siguiente}: {valor_inicial_siguiente:.2f}")
-                    print(f"  Valor final de {periodo}: {valor_final_contable:.2f}")
+                    log.info(f"Coherencia entre períodos: El inicial de {periodo_siguiente} no coincide con el final de {periodo}")
+                    log.info(f"  Valor inicial de {periodo_siguiente}: {valor_inicial_siguiente:.2f}")
+                    log.info(f"  Valor final de {periodo}: {valor_final_contable:.2f}")
                     
                     # Corregir el valor inicial del período siguiente
                     cursor.execute("""
@@ -1467,7 +1472,7 @@ def verificar_coherencia_valores(año, mes):
                         WHERE Periodo = ? AND Codigo = '0000000001'
                     """, (valor_final_contable, periodo_siguiente))
                     
-                    print(f"  Se actualizó el valor inicial de {periodo_siguiente} a {valor_final_contable:.2f}")
+                    log.info(f"  Se actualizó el valor inicial de {periodo_siguiente} a {valor_final_contable:.2f}")
                     hay_cambios = True
         
         # 4.3. Caso especial: Si es diciembre, verificar coherencia con enero del siguiente año
@@ -1495,9 +1500,9 @@ def verificar_coherencia_valores(año, mes):
                     
                     # El inicial de enero del siguiente año debe ser igual al final de diciembre
                     if abs(valor_inicial_siguiente - valor_final_contable) > 0.01:
-                        print(f"Coherencia entre años: El inicial de {periodo_siguiente} no coincide con el final de {periodo}")
-                        print(f"  Valor inicial de {periodo_siguiente}: {valor_inicial_siguiente:.2f}")
-                        print(f"  Valor final de {periodo}: {valor_final_contable:.2f}")
+                        log.info(f"Coherencia entre años: El inicial de {periodo_siguiente} no coincide con el final de {periodo}")
+                        log.info(f"  Valor inicial de {periodo_siguiente}: {valor_inicial_siguiente:.2f}")
+                        log.info(f"  Valor final de {periodo}: {valor_final_contable:.2f}")
                         
                         # Corregir el valor inicial del período siguiente
                         cursor.execute("""
@@ -1506,88 +1511,157 @@ def verificar_coherencia_valores(año, mes):
                             WHERE Periodo = ?
                         """, (valor_final_contable, periodo_siguiente))
                         
-                        print(f"  Se actualizó el valor inicial de {periodo_siguiente} a {valor_final_contable:.2f}")
+                        log.info(f"  Se actualizó el valor inicial de {periodo_siguiente} a {valor_final_contable:.2f}")
                         hay_cambios = True
         
         if hay_cambios:
             conn.commit()
-            print(f"Valores corregidos para el período {periodo}.")
+            log.info(f"Valores corregidos para el período {periodo}.")
         else:
-            print(f"Los valores del período {periodo} son coherentes.")
+            log.info(f"Los valores del período {periodo} son coherentes.")
         
         conn.close()
     
     except Exception as e:
-        print(f"Error al verificar coherencia de valores para {mes:02d}/{año}: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception(f"Error al verificar coherencia de valores para {mes:02d}/{año}: {str(e)}")
         
         try:
             conn.close()
         except:
             pass
 
-def generar_excel_inventario_2024():
+# Columnas de cantidad del libro y el nombre de su columna de monto
+COLUMNAS_LIBRO = [
+    ('inicial', 'monto_inicial'),
+    ('Entradas', 'monto_entradas'),
+    ('Salidas', 'monto_salidas'),
+    ('AutoConsumo', 'monto_autoconsumo'),
+    ('Retiros', 'monto_retiros'),
+    ('final', 'monto_final'),
+]
+
+def calcular_montos_libro(df_movimientos, factor_ajuste_entradas=1.0):
+    """
+    Prepara las filas del libro auxiliar calculando todos los montos por columnas
+    
+    Args:
+        df_movimientos (pd.DataFrame): Movimientos de MovInventMes ordenados por fecha
+        factor_ajuste_entradas (float): Factor aplicado al costo para cuadrar el inventario
+    
+    Returns:
+        pd.DataFrame: Una fila por movimiento con las 14 columnas del libro, en orden
+    """
+    costo_ajustado = df_movimientos['Costo'].fillna(0) * factor_ajuste_entradas
+    
+    df_libro = pd.DataFrame({
+        'Fecha': df_movimientos['Fecha'].dt.strftime('%d/%m/%Y'),
+        # Limitar descripción
+        'Descripcion': (df_movimientos['Codigo'].astype(str) + ' ' + df_movimientos['Descripcion'].astype(str)).str[:50]
+    })
+    for columna_cantidad, columna_monto in COLUMNAS_LIBRO:
+        # Siempre mostrar valor (0 en lugar de vacío)
+        cantidades = df_movimientos[columna_cantidad].fillna(0)
+        montos = cantidades * costo_ajustado
+        df_libro[columna_cantidad] = cantidades
+        df_libro[columna_monto] = montos.mask(montos == 0, 0)
+    
+    return df_libro
+
+def obtener_inventario_contable(años, conn):
+    """
+    Obtiene en una sola consulta los períodos de InventarioContable de varios años
+    
+    Args:
+        años (list): Años a consultar
+        conn: Conexión abierta a la base de datos
+    
+    Returns:
+        pd.DataFrame: Periodo (sin espacios), Inicial, Final, AjusteCompras y AjusteVentas
+    """
+    filtro_años = " OR ".join(["LTRIM(RTRIM(Periodo)) LIKE ?"] * len(años))
+    query_contable = f"""
+    SELECT Periodo, Inicial, Final, AjusteCompras, AjusteVentas
+    FROM InventarioContable
+    WHERE {filtro_años}
+    ORDER BY Periodo
+    """
+    df_contable = pd.read_sql(query_contable, conn, params=[f'%/{año}' for año in años])
+    
+    # Limpiar espacios en blanco del campo Periodo
+    df_contable['Periodo'] = df_contable['Periodo'].str.strip()
+    return df_contable
+
+@medido('Excel {año}')
+def generar_excel_inventario(año, streaming=True, conn=None, df_contable=None, empresa=None):
     """
     Genera un archivo Excel con el Libro Auxiliar de Entradas y Salidas del Inventario
-    basado en los datos existentes en MovInventMes para el año 2024
+    basado en los datos existentes en MovInventMes para el año indicado.
+    Al terminar se muestra el tiempo de lectura, escritura y guardado del libro.
+    
+    Args:
+        año (int): Año del libro auxiliar
+        streaming (bool): Si se escribe con un libro write_only de memoria constante
+            (False construye el libro completo en memoria)
+        conn: Conexión a reutilizar (opcional; si se indica no se cierra al terminar)
+        df_contable (pd.DataFrame): InventarioContable ya cargado, p. ej. por
+            obtener_inventario_contable para varios años (opcional)
+        empresa (str): Nombre de la empresa para el nombre del archivo (opcional)
+    
+    Returns:
+        str: Nombre del archivo generado, o None en caso de error
     """
+    conexion_propia = conn is None
+    etapas = Etapas()
     try:
-        print("Generando archivo Excel del Libro Auxiliar de Inventario 2024...")
-        
-        # Obtener datos de InventarioContable para 2024
-        conn = get_connection()
-        
-        # Consultar el inventario inicial y final del año 2024
-        query_contable = """
-        SELECT Periodo, Inicial, Final, AjusteCompras, AjusteVentas
-        FROM InventarioContable
-        WHERE LTRIM(RTRIM(Periodo)) LIKE '%/2024'
-        ORDER BY Periodo
-        """
-        df_contable = pd.read_sql(query_contable, conn)
+        log.info(f"Generando archivo Excel del Libro Auxiliar de Inventario {año}...")
+        etapas.siguiente('inventario_contable')
+        if conexion_propia:
+            reiniciar_estadisticas_conexiones()
+            conn = get_connection()
         
-        print(f"Registros encontrados en InventarioContable: {len(df_contable)}")
+        # Consultar el inventario inicial y final del año
+        if df_contable is None:
+            df_contable = obtener_inventario_contable([año], conn)
+        else:
+            df_contable = df_contable[df_contable['Periodo'].str.endswith(f'/{año}')].copy()
         
-        # Limpiar espacios en blanco del campo Periodo
-        df_contable['Periodo'] = df_contable['Periodo'].str.strip()
+        log.info(f"Registros encontrados en InventarioContable: {len(df_contable)}")
         
-        print(f"Períodos encontrados después de TRIM: {df_contable['Periodo'].tolist()}")
+        log.info(f"Períodos encontrados después de TRIM: {df_contable['Periodo'].tolist()}")
         
         # Si no encontramos registros con el filtro, intentemos obtener todos y filtrar
         if df_contable.empty:
-            print("No se encontraron registros con filtro 2024, obteniendo todos los períodos para debug...")
+            log.info(f"No se encontraron registros con filtro {año}, obteniendo todos los períodos para debug...")
             query_debug = "SELECT Periodo, Inicial, Final FROM InventarioContable"
             df_debug = pd.read_sql(query_debug, conn)
             df_debug['Periodo'] = df_debug['Periodo'].str.strip()
-            print(f"Todos los períodos disponibles: {df_debug['Periodo'].tolist()}")
+            log.info(f"Todos los períodos disponibles: {df_debug['Periodo'].tolist()}")
             
-            # Filtrar manualmente los períodos de 2024
-            df_contable = df_debug[df_debug['Periodo'].str.endswith('/2024')].copy()
-            print(f"Períodos 2024 encontrados manualmente: {df_contable['Periodo'].tolist()}")
+            # Filtrar manualmente los períodos del año
+            df_contable = df_debug[df_debug['Periodo'].str.endswith(f'/{año}')].copy()
+            log.info(f"Períodos {año} encontrados manualmente: {df_contable['Periodo'].tolist()}")
         
-        # Obtener el inventario inicial del año (enero 2024)
-        df_enero = df_contable[df_contable['Periodo'] == '01/2024']
+        # Obtener el inventario inicial del año (enero)
+        df_enero = df_contable[df_contable['Periodo'] == f'01/{año}']
         if df_enero.empty:
-            print("Error: No se encontró el período 01/2024 en InventarioContable")
-            print(f"Períodos disponibles: {df_contable['Periodo'].unique()}")
-            conn.close()
+            log.error(f"Error: No se encontró el período 01/{año} en InventarioContable")
+            log.info(f"Períodos disponibles: {df_contable['Periodo'].unique()}")
             return None
         inventario_inicial_año = df_enero['Inicial'].iloc[0]
         
-        # Obtener el inventario final del año (diciembre 2024)  
-        df_diciembre = df_contable[df_contable['Periodo'] == '12/2024']
+        # Obtener el inventario final del año (diciembre)
+        df_diciembre = df_contable[df_contable['Periodo'] == f'12/{año}']
         if df_diciembre.empty:
-            print("Error: No se encontró el período 12/2024 en InventarioContable")
-            print(f"Períodos disponibles: {df_contable['Periodo'].unique()}")
-            conn.close()
+            log.error(f"Error: No se encontró el período 12/{año} en InventarioContable")
+            log.info(f"Períodos disponibles: {df_contable['Periodo'].unique()}")
             return None
         inventario_final_año = df_diciembre['Final'].iloc[0]
         
-        print(f"Inventario Inicial Acumulado del Ejercicio Fiscal Anterior: {inventario_inicial_año:,.2f}")
-        print(f"Inventario Final del Año 2024: {inventario_final_año:,.2f}")
+        log.info(f"Inventario Inicial Acumulado del Ejercicio Fiscal Anterior: {inventario_inicial_año:,.2f}")
+        log.info(f"Inventario Final del Año {año}: {inventario_final_año:,.2f}")
         
-        # Consultar todos los movimientos de 2024 ordenados por fecha
+        # Consultar todos los movimientos del año ordenados por fecha
+        etapas.siguiente('movimientos')
         query_movimientos = """
         SELECT 
             Periodo,
@@ -1603,17 +1677,17 @@ def generar_excel_inventario_2024():
             Costo,
             Inventario
         FROM MovInventMes
-        WHERE LTRIM(RTRIM(Periodo)) LIKE '%/2024'
+        WHERE LTRIM(RTRIM(Periodo)) LIKE ?
         AND Codigo != '0000000001'  -- Excluir el registro de inventario inicial
         ORDER BY Fecha, Codigo
         """
-        df_movimientos = pd.read_sql(query_movimientos, conn)
+        df_movimientos = pd.read_sql(query_movimientos, conn, params=[f'%/{año}'])
         
-        print(f"Movimientos encontrados para 2024: {len(df_movimientos)}")
+        log.info(f"Movimientos encontrados para {año}: {len(df_movimientos)}")
         
         # Si no hay movimientos, intentar consulta de debug
         if df_movimientos.empty:
-            print("No se encontraron movimientos con filtro 2024, verificando disponibilidad...")
+            log.info(f"No se encontraron movimientos con filtro {año}, verificando disponibilidad...")
             query_debug_mov = """
             SELECT DISTINCT LTRIM(RTRIM(Periodo)) as Periodo
             FROM MovInventMes
@@ -1621,7 +1695,7 @@ def generar_excel_inventario_2024():
             ORDER BY Periodo
             """
             df_debug_mov = pd.read_sql(query_debug_mov, conn)
-            print(f"Períodos con movimientos disponibles: {df_debug_mov['Periodo'].tolist()}")
+            log.info(f"Períodos con movimientos disponibles: {df_debug_mov['Periodo'].tolist()}")
             
             # Intentar obtener todos los movimientos y filtrar manualmente
             query_all_mov = """
@@ -1644,74 +1718,49 @@ def generar_excel_inventario_2024():
             """
             df_all_mov = pd.read_sql(query_all_mov, conn)
             df_all_mov['Periodo'] = df_all_mov['Periodo'].str.strip()
-            df_movimientos = df_all_mov[df_all_mov['Periodo'].str.endswith('/2024')].copy()
-            print(f"Movimientos 2024 encontrados manualmente: {len(df_movimientos)}")
+            df_movimientos = df_all_mov[df_all_mov['Periodo'].str.endswith(f'/{año}')].copy()
+            log.info(f"Movimientos {año} encontrados manualmente: {len(df_movimientos)}")
         
         # Convertir la columna Fecha a datetime
         if not df_movimientos.empty:
             df_movimientos['Fecha'] = pd.to_datetime(df_movimientos['Fecha'])
         else:
-            print("ADVERTENCIA: No se encontraron movimientos para 2024")
-            print("El reporte se generará solo con datos de InventarioContable")
-        
-        # Crear el archivo Excel
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Libro Auxiliar Inventario 2024"
-        
-        # Configurar estilos
-        font_titulo = Font(name='Arial', size=12, bold=True)
-        font_subtitulo = Font(name='Arial', size=10, bold=True)
-        font_normal = Font(name='Arial', size=9)
-        font_totales = Font(name='Arial', size=9, bold=True)
-        
-        align_center = Alignment(horizontal='center', vertical='center')
-        align_left = Alignment(horizontal='left', vertical='center')
-        align_right = Alignment(horizontal='right', vertical='center')
-        
-        border_thin = Border(
-            left=Side(style='thin'),
-            right=Side(style='thin'), 
-            top=Side(style='thin'),
-            bottom=Side(style='thin')
-        )
-        
-        fill_header = PatternFill(start_color='D9D9D9', end_color='D9D9D9', fill_type='solid')
-        fill_totales = PatternFill(start_color='E6E6E6', end_color='E6E6E6', fill_type='solid')
-        
-        # Escribir encabezados del reporte
-        ws['A1'] = 'FECHA DESDE: 01/01/2024'
-        ws['A1'].font = font_subtitulo
-        
-        ws['I1'] = 'Fecha:'
-        ws['I1'].font = font_subtitulo
-        ws['J1'] = datetime.now().strftime('%d/%m/%Y')
-        ws['J1'].font = font_normal
+            log.warning(f"ADVERTENCIA: No se encontraron movimientos para {año}")
+            log.info("El reporte se generará solo con datos de InventarioContable")
         
-        ws['A2'] = 'FECHA HASTA: 31/12/2024'
-        ws['A2'].font = font_subtitulo
+        # Crear el archivo Excel (en streaming cada fila se vuelca al archivo al escribirla)
+        etapas.siguiente('escritura')
+        libro = EscritorLibro(f"Libro Auxiliar Inventario {año}", streaming=streaming)
         
-        ws['C3'] = 'Libro Auxiliar de Entradas y Salidas del Inventario'
-        ws['C3'].font = font_titulo
-        ws.merge_cells('C3:G3')
-        ws['C3'].alignment = align_center
-        
-        ws['C4'] = 'Movimiento de Unidades Según el Artículo 177 de Ley de Impuesto Sobre la Renta'
-        ws['C4'].font = font_subtitulo
-        ws.merge_cells('C4:H4')
-        ws['C4'].alignment = align_center
-        
-        ws['J4'] = 'Pag:'
-        ws['J4'].font = font_subtitulo
-        ws['K4'] = '1'
-        ws['L4'] = 'de'
-        ws['M4'] = '1'
-        
-        ws['A6'] = f'Inventario Inicial Acumulado del Ejercicio Fiscal Anterior: {inventario_inicial_año:,.2f}'
-        ws['A6'].font = font_subtitulo
+        # Ajustar anchos de columna (antes de escribir la primera fila)
+        column_widths = [12, 35, 8, 12, 8, 12, 8, 12, 8, 12, 8, 12, 8, 12]
+        libro.anchos_columna(column_widths)
         
-        ws['J6'] = 'MÉTODO P.E.P.S.'
-        ws['J6'].font = font_subtitulo
+        # Escribir encabezados del reporte (filas 1 a 6)
+        libro.escribir_fila(
+            [f'FECHA DESDE: 01/01/{año}', None, None, None, None, None, None, None, 'Fecha:', datetime.now().strftime('%d/%m/%Y')],
+            ['libro_subtitulo', None, None, None, None, None, None, None, 'libro_subtitulo', 'libro_normal']
+        )
+        libro.escribir_texto(f'FECHA HASTA: 31/12/{año}', 'libro_subtitulo')
+        libro.escribir_fila(
+            [None, None, 'Libro Auxiliar de Entradas y Salidas del Inventario'],
+            [None, None, 'libro_titulo']
+        )
+        libro.combinar('C3:G3')
+        libro.escribir_fila(
+            [None, None, 'Movimiento de Unidades Según el Artículo 177 de Ley de Impuesto Sobre la Renta',
+             None, None, None, None, None, None, 'Pag:', '1', 'de', '1'],
+            [None, None, 'libro_subtitulo_centrado', None, None, None, None, None, None, 'libro_subtitulo']
+            + [None] * 3
+        )
+        libro.combinar('C4:H4')
+        libro.saltar_filas()
+        libro.escribir_fila(
+            [f'Inventario Inicial Acumulado del Ejercicio Fiscal Anterior: {inventario_inicial_año:,.2f}',
+             None, None, None, None, None, None, None, None, 'MÉTODO P.E.P.S.'],
+            ['libro_subtitulo', None, None, None, None, None, None, None, None, 'libro_subtitulo']
+        )
+        libro.saltar_filas()
         
         # Encabezados de columnas (fila 8)
         encabezados = [
@@ -1725,34 +1774,22 @@ def generar_excel_inventario_2024():
             'Cant.', 'Monto', 'Cant.', 'Monto', 'Cant.', 'Monto'
         ]
         
-        # Escribir encabezados
-        for col, header in enumerate(encabezados, 1):
-            cell = ws.cell(row=8, column=col, value=header)
-            cell.font = font_subtitulo
-            cell.alignment = align_center
-            cell.border = border_thin
-            cell.fill = fill_header
-        
-        # Escribir subencabezados
-        for col, subheader in enumerate(subencabezados, 1):
-            cell = ws.cell(row=9, column=col, value=subheader)
-            cell.font = font_subtitulo
-            cell.alignment = align_center
-            cell.border = border_thin
-            cell.fill = fill_header
-        
-        # Ajustar anchos de columna
-        column_widths = [12, 35, 8, 12, 8, 12, 8, 12, 8, 12, 8, 12, 8, 12]
-        for i, width in enumerate(column_widths, 1):
-            ws.column_dimensions[openpyxl.utils.get_column_letter(i)].width = width
+        # Escribir encabezados y subencabezados
+        libro.escribir_fila(encabezados, 'libro_encabezado')
+        libro.escribir_fila(subencabezados, 'libro_encabezado')
         
         # Combinar celdas de encabezados
-        ws.merge_cells('C8:D8')  # Existencia Inicial
-        ws.merge_cells('E8:F8')  # Entradas
-        ws.merge_cells('G8:H8')  # Salidas
-        ws.merge_cells('I8:J8')  # Autoconsumos
-        ws.merge_cells('K8:L8')  # Retiros
-        ws.merge_cells('M8:N8')  # Existencia Actual
+        libro.combinar('C8:D8')  # Existencia Inicial
+        libro.combinar('E8:F8')  # Entradas
+        libro.combinar('G8:H8')  # Salidas
+        libro.combinar('I8:J8')  # Autoconsumos
+        libro.combinar('K8:L8')  # Retiros
+        libro.combinar('M8:N8')  # Existencia Actual
+        
+        # Estilos por columna de cada tipo de fila
+        estilos_inicial = estilos_fila('libro_inicial')
+        estilos_movimiento = estilos_fila('libro_mov')
+        estilos_ajuste = estilos_fila('libro_ajuste')
         
         # Variables para totales
         total_registros = 0
@@ -1765,11 +1802,9 @@ def generar_excel_inventario_2024():
         total_retiros_cantidad = 0
         total_retiros_monto = 0
         
-        fila_actual = 10
-        
         # Agregar el registro de inventario inicial del año anterior como primer registro
         primer_registro = [
-            '01/01/2024',
+            f'01/01/{año}',
             'INVENTARIO INICIAL ACUMULADO DEL EJERCICIO FISCAL ANTERIOR',
             0,  # Cantidad inicial (0 para que se vea limpio)
             0,  # Monto inicial (0 para que se vea limpio)
@@ -1785,28 +1820,8 @@ def generar_excel_inventario_2024():
             inventario_inicial_año   # Existencia final monto
         ]
         
-        for col, valor in enumerate(primer_registro, 1):
-            cell = ws.cell(row=fila_actual, column=col, value=valor)
-            cell.font = font_totales  # Usar formato de totales para destacar
-            cell.border = border_thin
-            cell.fill = fill_header
-            
-            # Formato de números - consistente con el resto
-            if col >= 3:  # Columnas numéricas
-                if col in [3, 5, 7, 9, 11, 13]:  # Columnas de cantidad
-                    cell.number_format = '#,##0'
-                    cell.alignment = align_right
-                elif col in [4, 6, 8, 10, 12, 14]:  # Columnas de monto
-                    cell.number_format = '#,##0.00'
-                    cell.alignment = align_right
-                else:
-                    cell.alignment = align_center
-            elif col == 2:  # Columna de descripción
-                cell.alignment = align_left
-            else:  # Columna de fecha
-                cell.alignment = align_center
-        
-        fila_actual += 1
+        # Usar formato de totales para destacar
+        libro.escribir_fila(primer_registro, estilos_inicial)
         total_registros = 1  # Contar el registro inicial
         
         # Inicializar totales con el inventario inicial que ahora va en entradas
@@ -1820,26 +1835,21 @@ def generar_excel_inventario_2024():
             df_movimientos_ordenados = df_movimientos.sort_values('Fecha').copy()
             
             # AJUSTE DINÁMICO PARA CUADRAR INVENTARIOS
-            print("Calculando ajustes necesarios para cuadrar inventarios...")
+            log.info("Calculando ajustes necesarios para cuadrar inventarios...")
             
-            # Calcular el total actual con los datos originales
-            total_entradas_original = 0
-            total_salidas_original = 0
-            
-            for _, row in df_movimientos_ordenados.iterrows():
-                monto_entradas_orig = (row['Entradas'] * row['Costo']) if pd.notna(row['Entradas']) and pd.notna(row['Costo']) else 0
-                monto_salidas_orig = (row['Salidas'] * row['Costo']) if pd.notna(row['Salidas']) and pd.notna(row['Costo']) else 0
-                total_entradas_original += monto_entradas_orig
-                total_salidas_original += monto_salidas_orig
+            # Calcular el total actual con los datos originales (por columnas, sin recorrer filas)
+            costos = df_movimientos_ordenados['Costo'].fillna(0)
+            total_entradas_original = float((df_movimientos_ordenados['Entradas'].fillna(0) * costos).sum())
+            total_salidas_original = float((df_movimientos_ordenados['Salidas'].fillna(0) * costos).sum())
             
             # Calcular qué debería dar para cuadrar
             variacion_requerida = inventario_final_año - inventario_inicial_año
             diferencia_neta_actual = total_entradas_original - total_salidas_original
             ajuste_necesario = variacion_requerida - diferencia_neta_actual
             
-            print(f"Variación requerida: {variacion_requerida:,.2f}")
-            print(f"Diferencia neta actual: {diferencia_neta_actual:,.2f}")
-            print(f"Ajuste necesario: {ajuste_necesario:,.2f}")
+            log.info(f"Variación requerida: {variacion_requerida:,.2f}")
+            log.info(f"Diferencia neta actual: {diferencia_neta_actual:,.2f}")
+            log.info(f"Ajuste necesario: {ajuste_necesario:,.2f}")
             
             # Factor de ajuste proporcional
             if abs(ajuste_necesario) > 0.01:
@@ -1847,92 +1857,45 @@ def generar_excel_inventario_2024():
                     factor_ajuste_entradas = (total_entradas_original + ajuste_necesario) / total_entradas_original
                 else:
                     factor_ajuste_entradas = 1.0
-                print(f"Factor de ajuste aplicado: {factor_ajuste_entradas:.6f}")
+                log.info(f"Factor de ajuste aplicado: {factor_ajuste_entradas:.6f}")
             else:
                 factor_ajuste_entradas = 1.0
             
             # Verificar si el factor de ajuste es razonable (entre 0.1 y 10.0)
             ajuste_mediante_movimientos = False
             if factor_ajuste_entradas < 0.1 or factor_ajuste_entradas > 10.0:
-                print(f"ADVERTENCIA: Factor de ajuste extremo ({factor_ajuste_entradas:.6f})")
-                print("Se generarán movimientos de ajuste adicionales en lugar de ajustar precios.")
+                log.warning(f"ADVERTENCIA: Factor de ajuste extremo ({factor_ajuste_entradas:.6f})")
+                log.info("Se generarán movimientos de ajuste adicionales en lugar de ajustar precios.")
                 factor_ajuste_entradas = 1.0  # No ajustar precios
                 ajuste_mediante_movimientos = True
             
+            # Calcular todos los montos con el costo ajustado en una sola pasada por columnas
+            df_libro = calcular_montos_libro(df_movimientos_ordenados, factor_ajuste_entradas)
+            
             # Escribir cada movimiento del año con ajustes
-            for _, row in df_movimientos_ordenados.iterrows():
-                # Aplicar factor de ajuste a los costos para que cuadre
-                costo_ajustado = row['Costo'] * factor_ajuste_entradas if pd.notna(row['Costo']) else 0
-                
-                # Calcular montos con el costo ajustado
-                monto_inicial = (row['inicial'] * costo_ajustado) if pd.notna(row['inicial']) else 0
-                monto_entradas = (row['Entradas'] * costo_ajustado) if pd.notna(row['Entradas']) else 0
-                monto_salidas = (row['Salidas'] * costo_ajustado) if pd.notna(row['Salidas']) else 0
-                monto_autoconsumo = (row['AutoConsumo'] * costo_ajustado) if pd.notna(row['AutoConsumo']) else 0
-                monto_retiros = (row['Retiros'] * costo_ajustado) if pd.notna(row['Retiros']) else 0
-                monto_final = (row['final'] * costo_ajustado) if pd.notna(row['final']) else 0
-                
-                # Escribir fila
-                datos_fila = [
-                    row['Fecha'].strftime('%d/%m/%Y'),
-                    f"{row['Codigo']} {row['Descripcion']}"[:50],  # Limitar descripción
-                    row['inicial'] if pd.notna(row['inicial']) else 0,  # Siempre mostrar valor
-                    monto_inicial if monto_inicial != 0 else 0,  # Con costo ajustado
-                    row['Entradas'] if pd.notna(row['Entradas']) else 0,  # Siempre mostrar valor
-                    monto_entradas if monto_entradas != 0 else 0,  # Con costo ajustado
-                    row['Salidas'] if pd.notna(row['Salidas']) else 0,  # Siempre mostrar valor
-                    monto_salidas if monto_salidas != 0 else 0,  # Con costo ajustado
-                    row['AutoConsumo'] if pd.notna(row['AutoConsumo']) else 0,  # Siempre mostrar valor
-                    monto_autoconsumo if monto_autoconsumo != 0 else 0,  # Con costo ajustado
-                    row['Retiros'] if pd.notna(row['Retiros']) else 0,  # Siempre mostrar valor
-                    monto_retiros if monto_retiros != 0 else 0,  # Con costo ajustado
-                    row['final'] if pd.notna(row['final']) else 0,  # Siempre mostrar valor
-                    monto_final if monto_final != 0 else 0  # Con costo ajustado
-                ]
-                
-                for col, valor in enumerate(datos_fila, 1):
-                    cell = ws.cell(row=fila_actual, column=col, value=valor)
-                    cell.font = font_normal
-                    cell.border = border_thin
-                    
-                    # Formato de números - aplicar formato numérico a todas las columnas numéricas
-                    if col >= 3:  # Columnas numéricas
-                        if col in [3, 5, 7, 9, 11, 13]:  # Columnas de cantidad
-                            cell.number_format = '#,##0'
-                            cell.alignment = align_right
-                        elif col in [4, 6, 8, 10, 12, 14]:  # Columnas de monto
-                            cell.number_format = '#,##0.00'
-                            cell.alignment = align_right
-                        else:
-                            cell.alignment = align_center
-                    elif col == 2:  # Columna de descripción
-                        cell.alignment = align_left
-                    else:  # Columna de fecha
-                        cell.alignment = align_center
-                
-                # Acumular totales generales (con valores ajustados)
-                total_entradas_cantidad += row['Entradas'] if pd.notna(row['Entradas']) else 0
-                total_entradas_monto += monto_entradas
-                total_salidas_cantidad += row['Salidas'] if pd.notna(row['Salidas']) else 0
-                total_salidas_monto += monto_salidas
-                total_autoconsumo_cantidad += row['AutoConsumo'] if pd.notna(row['AutoConsumo']) else 0
-                total_autoconsumo_monto += monto_autoconsumo
-                total_retiros_cantidad += row['Retiros'] if pd.notna(row['Retiros']) else 0
-                total_retiros_monto += monto_retiros
-                
-                total_registros += 1
-                fila_actual += 1
+            for datos_fila in df_libro.itertuples(index=False, name=None):
+                libro.escribir_fila(datos_fila, estilos_movimiento)
+            
+            # Acumular totales generales (con valores ajustados)
+            total_entradas_cantidad += df_libro['Entradas'].sum()
+            total_entradas_monto += df_libro['monto_entradas'].sum()
+            total_salidas_cantidad += df_libro['Salidas'].sum()
+            total_salidas_monto += df_libro['monto_salidas'].sum()
+            total_autoconsumo_cantidad += df_libro['AutoConsumo'].sum()
+            total_autoconsumo_monto += df_libro['monto_autoconsumo'].sum()
+            total_retiros_cantidad += df_libro['Retiros'].sum()
+            total_retiros_monto += df_libro['monto_retiros'].sum()
+            
+            total_registros += len(df_libro)
         else:
             # Si no hay movimientos, mostrar mensaje informativo
-            ws.cell(row=fila_actual, column=1, value="No se encontraron movimientos de inventario para el año 2024").font = font_totales
-            ws.merge_cells(f'A{fila_actual}:N{fila_actual}')
-            ws.cell(row=fila_actual, column=1).alignment = align_center
-            ws.cell(row=fila_actual, column=1).fill = fill_totales
-            fila_actual += 2
+            fila_mensaje = libro.escribir_texto(f"No se encontraron movimientos de inventario para el año {año}", 'libro_mensaje')
+            libro.combinar(f'A{fila_mensaje}:N{fila_mensaje}')
+            libro.saltar_filas()
         
         # Generar movimientos de ajuste si es necesario
         if 'ajuste_mediante_movimientos' in locals() and ajuste_mediante_movimientos:
-            print("Generando movimientos de ajuste adicionales...")
+            log.info("Generando movimientos de ajuste adicionales...")
             
             # Calcular cuánto necesitamos ajustar
             variacion_actual = total_entradas_monto - total_salidas_monto - total_autoconsumo_monto - total_retiros_monto
@@ -1953,7 +1916,7 @@ def generar_excel_inventario_2024():
                     if valor_movimiento > 0:
                         # Movimiento de entrada
                         datos_ajuste = [
-                            '31/12/2024',
+                            f'31/12/{año}',
                             f'AJUSTE-{i+1:03d} ENTRADA DE CUADRE INVENTARIO FINAL',
                             0,  # Inicial cantidad
                             0,  # Inicial monto
@@ -1968,7 +1931,7 @@ def generar_excel_inventario_2024():
                     else:
                         # Movimiento de salida
                         datos_ajuste = [
-                            '31/12/2024',
+                            f'31/12/{año}',
                             f'AJUSTE-{i+1:03d} SALIDA DE CUADRE INVENTARIO FINAL',
                             1,  # Inicial cantidad
                             abs(valor_movimiento),  # Inicial monto
@@ -1981,38 +1944,18 @@ def generar_excel_inventario_2024():
                         total_salidas_cantidad += 1
                         total_salidas_monto += abs(valor_movimiento)
                     
-                    # Escribir el movimiento de ajuste
-                    for col, valor in enumerate(datos_ajuste, 1):
-                        cell = ws.cell(row=fila_actual, column=col, value=valor)
-                        cell.font = Font(name='Arial', size=9, bold=True, color='FF8000')  # Naranja para destacar
-                        cell.border = border_thin
-                        cell.fill = PatternFill(start_color='FFF2CC', end_color='FFF2CC', fill_type='solid')  # Fondo amarillo claro
-                        
-                        # Formato de números
-                        if col >= 3:
-                            if col in [3, 5, 7, 9, 11, 13]:  # Columnas de cantidad
-                                cell.number_format = '#,##0'
-                                cell.alignment = align_right
-                            elif col in [4, 6, 8, 10, 12, 14]:  # Columnas de monto
-                                cell.number_format = '#,##0.00'
-                                cell.alignment = align_right
-                        elif col == 2:
-                            cell.alignment = align_left
-                        else:
-                            cell.alignment = align_center
-                    
+                    # Escribir el movimiento de ajuste (naranja sobre fondo amarillo claro para destacar)
+                    libro.escribir_fila(datos_ajuste, estilos_ajuste)
                     total_registros += 1
-                    fila_actual += 1
                 
-                print(f"Se generaron {num_movimientos_ajuste} movimientos de ajuste por {ajuste_restante:,.2f}")
+                log.info(f"Se generaron {num_movimientos_ajuste} movimientos de ajuste por {ajuste_restante:,.2f}")
         
         # Escribir totales generales
-        fila_actual += 1
+        libro.saltar_filas()
         
         # Separador
-        ws.cell(row=fila_actual, column=1, value="=" * 100).font = font_totales
-        ws.merge_cells(f'A{fila_actual}:N{fila_actual}')
-        fila_actual += 1
+        fila_separador = libro.escribir_texto("=" * 100, 'libro_totales')
+        libro.combinar(f'A{fila_separador}:N{fila_separador}')
         
         # Crear una fila de totales completa con todas las columnas
         fila_totales = [
@@ -2032,29 +1975,14 @@ def generar_excel_inventario_2024():
             ''   # Columna 14: Existencia Actual - Monto (vacía para totales)
         ]
         
-        # Escribir cada celda de la fila de totales
-        for col, valor in enumerate(fila_totales, 1):
-            cell = ws.cell(row=fila_actual, column=col, value=valor)
-            cell.font = font_totales
-            cell.border = border_thin
-            cell.fill = fill_totales
-            
-            # Aplicar formato según el tipo de columna
-            if col == 2:  # Columna de descripción
-                cell.alignment = align_left
-            elif col in [5, 7, 9, 11] and valor != '':  # Columnas de cantidad con valores
-                cell.number_format = '#,##0'
-                cell.alignment = align_right
-            elif col in [6, 8, 10, 12] and valor != '':  # Columnas de monto con valores
-                cell.number_format = '#,##0.00'
-                cell.alignment = align_right
-            else:  # Otras columnas
-                cell.alignment = align_center
-        
-        fila_actual += 1
+        # Formato según el tipo de columna: descripción a la izquierda, cantidades y montos a la derecha
+        estilos_totales = ['libro_total_centro', 'libro_total_texto'] + ['libro_total_centro'] * 2
+        estilos_totales += ['libro_total_cantidad', 'libro_total_monto'] * 4
+        estilos_totales += ['libro_total_centro'] * 2
+        libro.escribir_fila(fila_totales, estilos_totales)
         
         # Separador adicional antes del resumen
-        fila_actual += 2
+        libro.saltar_filas(2)
         
         # Calcular el inventario final teórico basado en los movimientos
         inventario_final_calculado = inventario_inicial_año + total_entradas_monto - total_salidas_monto - total_autoconsumo_monto - total_retiros_monto
@@ -2062,128 +1990,164 @@ def generar_excel_inventario_2024():
         variacion_anual = inventario_final_año - inventario_inicial_año
         
         # DEMOSTRACIÓN DEL CUADRE DEL INVENTARIO
-        ws.cell(row=fila_actual, column=1, value="DEMOSTRACIÓN DEL CUADRE DEL INVENTARIO").font = Font(name='Arial', size=12, bold=True)
-        fila_actual += 1
-        
-        ws.cell(row=fila_actual, column=1, value="=" * 80).font = font_totales
-        fila_actual += 1
+        libro.escribir_texto("DEMOSTRACIÓN DEL CUADRE DEL INVENTARIO", 'libro_resumen_titulo')
+        libro.escribir_texto("=" * 80, 'libro_totales')
         
         # Mostrar si se aplicaron ajustes
         if 'factor_ajuste_entradas' in locals() and abs(factor_ajuste_entradas - 1.0) > 0.001:
-            ws.cell(row=fila_actual, column=1, value=f'*** SE APLICÓ FACTOR DE AJUSTE: {factor_ajuste_entradas:.6f} PARA CUADRAR INVENTARIOS ***').font = Font(name='Arial', size=10, bold=True, color='FF8000')  # Naranja
-            fila_actual += 1
-            ws.cell(row=fila_actual, column=1, value=f'Los precios fueron ajustados proporcionalmente para lograr el cuadre perfecto').font = Font(name='Arial', size=9, color='FF8000')
-            fila_actual += 1
-            ws.cell(row=fila_actual, column=1, value="=" * 80).font = font_totales
-            fila_actual += 1
+            libro.escribir_texto(f'*** SE APLICÓ FACTOR DE AJUSTE: {factor_ajuste_entradas:.6f} PARA CUADRAR INVENTARIOS ***', 'libro_aviso')
+            libro.escribir_texto('Los precios fueron ajustados proporcionalmente para lograr el cuadre perfecto', 'libro_aviso_detalle')
+            libro.escribir_texto("=" * 80, 'libro_totales')
         elif 'ajuste_mediante_movimientos' in locals() and ajuste_mediante_movimientos:
-            ws.cell(row=fila_actual, column=1, value='*** SE AGREGARON MOVIMIENTOS DE AJUSTE PARA CUADRAR INVENTARIOS ***').font = Font(name='Arial', size=10, bold=True, color='FF8000')  # Naranja
-            fila_actual += 1
-            ws.cell(row=fila_actual, column=1, value='Se generaron movimientos adicionales destacados en amarillo para lograr el cuadre').font = Font(name='Arial', size=9, color='FF8000')
-            fila_actual += 1
-            ws.cell(row=fila_actual, column=1, value="=" * 80).font = font_totales
-            fila_actual += 1
+            libro.escribir_texto('*** SE AGREGARON MOVIMIENTOS DE AJUSTE PARA CUADRAR INVENTARIOS ***', 'libro_aviso')
+            libro.escribir_texto('Se generaron movimientos adicionales destacados en amarillo para lograr el cuadre', 'libro_aviso_detalle')
+            libro.escribir_texto("=" * 80, 'libro_totales')
         
         # Paso 1: Inventario inicial
-        ws.cell(row=fila_actual, column=1, value=f'NOTA: El inventario inicial ({inventario_inicial_año:,.2f}) está incluido en Total Entradas').font = Font(name='Arial', size=9, color='0000FF')
-        fila_actual += 1
+        libro.escribir_texto(f'NOTA: El inventario inicial ({inventario_inicial_año:,.2f}) está incluido en Total Entradas', 'libro_nota')
         
         # Paso 2: Entradas
-        ws.cell(row=fila_actual, column=1, value=f'(+) Total Entradas del Año (incluye inicial): {total_entradas_monto:,.2f}').font = font_totales
-        fila_actual += 1
+        libro.escribir_texto(f'(+) Total Entradas del Año (incluye inicial): {total_entradas_monto:,.2f}', 'libro_totales')
         
         # Paso 3: Salidas
-        ws.cell(row=fila_actual, column=1, value=f'(-) Total Salidas del Año: {total_salidas_monto:,.2f}').font = font_normal
-        fila_actual += 1
+        libro.escribir_texto(f'(-) Total Salidas del Año: {total_salidas_monto:,.2f}', 'libro_normal')
         
         # Paso 4: Autoconsumos
-        ws.cell(row=fila_actual, column=1, value=f'(-) Total Autoconsumos del Año: {total_autoconsumo_monto:,.2f}').font = font_normal
-        fila_actual += 1
+        libro.escribir_texto(f'(-) Total Autoconsumos del Año: {total_autoconsumo_monto:,.2f}', 'libro_normal')
         
         # Paso 5: Retiros
-        ws.cell(row=fila_actual, column=1, value=f'(-) Total Retiros del Año: {total_retiros_monto:,.2f}').font = font_normal
-        fila_actual += 1
+        libro.escribir_texto(f'(-) Total Retiros del Año: {total_retiros_monto:,.2f}', 'libro_normal')
         
-        ws.cell(row=fila_actual, column=1, value="=" * 80).font = font_totales
-        fila_actual += 1
+        libro.escribir_texto("=" * 80, 'libro_totales')
         
         # Resultado del cálculo (ahora debe cuadrar siempre debido a los ajustes)
         inventario_final_calculado_ajustado = total_entradas_monto - total_salidas_monto - total_autoconsumo_monto - total_retiros_monto
-        ws.cell(row=fila_actual, column=1, value=f'(=) INVENTARIO FINAL CALCULADO: {inventario_final_calculado_ajustado:,.2f}').font = font_totales
-        fila_actual += 1
-        
-        ws.cell(row=fila_actual, column=1, value=f'(=) INVENTARIO FINAL SEGÚN SISTEMA: {inventario_final_año:,.2f}').font = font_totales
-        fila_actual += 1
-        
-        fila_actual += 1
+        libro.escribir_texto(f'(=) INVENTARIO FINAL CALCULADO: {inventario_final_calculado_ajustado:,.2f}', 'libro_totales')
+        libro.escribir_texto(f'(=) INVENTARIO FINAL SEGÚN SISTEMA: {inventario_final_año:,.2f}', 'libro_totales')
+        libro.saltar_filas()
         
         # Verificación del cuadre (ahora siempre debe ser perfecto)
         diferencia_final = inventario_final_año - inventario_final_calculado_ajustado
         if abs(diferencia_final) < 0.01:
-            ws.cell(row=fila_actual, column=1, value='✓ ¡CUADRE PERFECTO! - LOS MOVIMIENTOS DEMUESTRAN CORRECTAMENTE LA TRANSICIÓN DEL INVENTARIO').font = Font(name='Arial', size=11, bold=True, color='008000')  # Verde
+            libro.escribir_texto('✓ ¡CUADRE PERFECTO! - LOS MOVIMIENTOS DEMUESTRAN CORRECTAMENTE LA TRANSICIÓN DEL INVENTARIO', 'libro_cuadre_ok')
         else:
-            ws.cell(row=fila_actual, column=1, value=f'⚠ DIFERENCIA REMANENTE: {diferencia_final:,.2f} - NECESARIO AJUSTE ADICIONAL').font = Font(name='Arial', size=11, bold=True, color='FF0000')  # Rojo
-        
-        fila_actual += 2
+            libro.escribir_texto(f'⚠ DIFERENCIA REMANENTE: {diferencia_final:,.2f} - NECESARIO AJUSTE ADICIONAL', 'libro_cuadre_error')
+        libro.saltar_filas()
         
         # Fórmula de verificación
-        ws.cell(row=fila_actual, column=1, value="FÓRMULA DE VERIFICACIÓN:").font = font_totales
-        fila_actual += 1
-        ws.cell(row=fila_actual, column=1, value=f'Inventario Final = Total Entradas (incluyendo inicial) - Salidas - Autoconsumos - Retiros').font = font_normal
-        fila_actual += 1
-        ws.cell(row=fila_actual, column=1, value=f'{inventario_final_año:,.2f} = {total_entradas_monto:,.2f} - {total_salidas_monto:,.2f} - {total_autoconsumo_monto:,.2f} - {total_retiros_monto:,.2f}').font = font_normal
-        fila_actual += 1
-        
-        fila_actual += 1
-        ws.cell(row=fila_actual, column=1, value=f'VARIACIÓN NETA DEL INVENTARIO EN EL AÑO: {variacion_anual:,.2f}').font = Font(name='Arial', size=11, bold=True, color='0000FF')  # Azul
+        libro.escribir_texto("FÓRMULA DE VERIFICACIÓN:", 'libro_totales')
+        libro.escribir_texto(f'Inventario Final = Total Entradas (incluyendo inicial) - Salidas - Autoconsumos - Retiros', 'libro_normal')
+        libro.escribir_texto(f'{inventario_final_año:,.2f} = {total_entradas_monto:,.2f} - {total_salidas_monto:,.2f} - {total_autoconsumo_monto:,.2f} - {total_retiros_monto:,.2f}', 'libro_normal')
+        libro.saltar_filas()
+        libro.escribir_texto(f'VARIACIÓN NETA DEL INVENTARIO EN EL AÑO: {variacion_anual:,.2f}', 'libro_variacion')
         
         # Guardar archivo
-        nombre_archivo = f'Libro_Auxiliar_Inventario_2024_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-        wb.save(nombre_archivo)
-        
-        conn.close()
-        
-        print(f"\nArchivo Excel generado exitosamente: {nombre_archivo}")
-        print(f"Total de registros procesados: {total_registros}")
-        print(f"Inventario inicial del año: {inventario_inicial_año:,.2f}")
-        print(f"Inventario final del año: {inventario_final_año:,.2f}")
-        print(f"Variación del año: {inventario_final_año - inventario_inicial_año:,.2f}")
+        prefijo = f'Libro_Auxiliar_Inventario_{empresa}_{año}' if empresa else f'Libro_Auxiliar_Inventario_{año}'
+        nombre_archivo = f'{prefijo}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
+        etapas.siguiente('guardado')
+        libro.guardar(nombre_archivo)
+        etapas.terminar()
+        
+        log.info(f"Archivo Excel generado exitosamente: {nombre_archivo}")
+        log.info(f"Total de registros procesados: {total_registros}")
+        log.info(f"Inventario inicial del año: {inventario_inicial_año:,.2f}")
+        log.info(f"Inventario final del año: {inventario_final_año:,.2f}")
+        log.info(f"Variación del año: {inventario_final_año - inventario_inicial_año:,.2f}")
+        if conexion_propia:
+            imprimir_estadisticas_conexiones()
         
         return nombre_archivo
         
     except Exception as e:
-        print(f"Error al generar archivo Excel: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        log.exception(f"Error al generar archivo Excel: {str(e)}")
         return None
+    
+    finally:
+        etapas.terminar()
+        # Solo se devuelve al pool la conexión abierta por esta función
+        if conexion_propia and conn is not None:
+            conn.close()
+
+def generar_excel_inventario_2024(streaming=True):
+    """Genera el Libro Auxiliar de Inventario del año 2024 (ver generar_excel_inventario)"""
+    return generar_excel_inventario(2024, streaming=streaming)
+
+def generar_excel_inventarios(años, streaming=True, empresas=None):
+    """
+    Genera en una sola ejecución los Libros Auxiliares de varios años y/o empresas
+    
+    Por cada empresa se usa una única sesión de base de datos para todos los años,
+    e InventarioContable de todos los años se carga con una sola consulta.
+    
+    Args:
+        años (list): Años a exportar
+        streaming (bool): Si se escribe con un libro write_only de memoria constante
+        empresas (dict): Diccionario {nombre: cadena de conexión} de las empresas a exportar
+            (por defecto la base de datos configurada en CADENA_CONEXION)
+    
+    Returns:
+        dict: Diccionario {(empresa, año): nombre del archivo generado o None}
+    """
+    if empresas is None:
+        empresas = {None: CADENA_CONEXION}
+    
+    reiniciar_estadisticas_conexiones()
+    archivos = {}
+    for empresa, cadena_conexion in empresas.items():
+        if empresa:
+            log.info(f"=== Empresa {empresa} ===")
+        try:
+            with obtener_pool(cadena_conexion).sesion() as conn:
+                df_contable = obtener_inventario_contable(años, conn)
+                log.info(f"Períodos de InventarioContable cargados para {len(años)} años: {len(df_contable)}")
+                for año in años:
+                    archivos[(empresa, año)] = generar_excel_inventario(
+                        año, streaming=streaming, conn=conn, df_contable=df_contable, empresa=empresa
+                    )
+        except Exception as e:
+            log.error(f"Error al generar los archivos Excel de {empresa or 'la empresa'}: {str(e)}")
+            for año in años:
+                archivos.setdefault((empresa, año), None)
+    
+    imprimir_estadisticas_conexiones()
+    return archivos
 
 if __name__ == "__main__":
     import sys
     
+    # --semilla N: generar movimientos reproducibles
+    # --silencioso / --detalle / --json: nivel y formato de los mensajes (ver registro.py)
+    from registro import configurar_desde_argumentos, semilla_desde_argumentos
+    configurar_desde_argumentos(sys.argv)
+    semilla = semilla_desde_argumentos(sys.argv)
+    
     if len(sys.argv) < 2:
-        print("Uso: ")
-        print("  python generador_inventario_execel.py excel                    # Generar archivo Excel 2024")
-        print("  python generador_inventario_execel.py <año> [mes]              # Generar movimientos")
-        print("  python generador_inventario_execel.py <año> [mes] [val_ini] [val_fin]  # Generar movimientos con valores específicos")
+        log.error("Uso: ")
+        log.error("  python generador_inventario_execel.py excel [año ...]          # Generar archivo Excel (2024 por defecto)")
+        log.error("  python generador_inventario_execel.py <año> [mes]              # Generar movimientos")
+        log.error("  python generador_inventario_execel.py <año> [mes] [val_ini] [val_fin]  # Generar movimientos con valores específicos")
+        log.error("  Añadir --semilla N para generar movimientos reproducibles, --silencioso|--detalle y --json para los mensajes")
         sys.exit(1)
     
     try:
         # Opción para generar Excel
         if sys.argv[1].lower() == 'excel':
-            print("=== GENERADOR DE LIBRO AUXILIAR DE INVENTARIO 2024 ===")
-            print("Generando archivo Excel basado en los datos existentes...")
-            archivo_generado = generar_excel_inventario_2024()
-            if archivo_generado:
-                print(f"\n✓ Archivo generado exitosamente: {archivo_generado}")
-                print("\nEl archivo contiene:")
-                print("- Libro Auxiliar de Entradas y Salidas del Inventario")
-                print("- Inventario inicial del ejercicio fiscal anterior como primer registro")
-                print("- Todos los movimientos del año 2024 ordenados cronológicamente")
-                print("- Totales anuales de entradas, salidas, autoconsumos y retiros")
-                print("- Validación del inventario final vs InventarioContable")
-                print("- Formato compatible con el Artículo 177 de la Ley de Impuesto Sobre la Renta")
-            else:
-                print("\n✗ Error al generar el archivo Excel")
+            años_excel = [int(a) for a in sys.argv[2:]] or [2024]
+            log.info(f"=== GENERADOR DE LIBRO AUXILIAR DE INVENTARIO {', '.join(str(a) for a in años_excel)} ===")
+            log.info("Generando archivo Excel basado en los datos existentes...")
+            archivos = generar_excel_inventarios(años_excel)
+            for (_, año_excel), archivo_generado in archivos.items():
+                if archivo_generado:
+                    log.info(f"✓ Archivo generado exitosamente: {archivo_generado}")
+                    log.info("El archivo contiene:")
+                    log.info("- Libro Auxiliar de Entradas y Salidas del Inventario")
+                    log.info("- Inventario inicial del ejercicio fiscal anterior como primer registro")
+                    log.info(f"- Todos los movimientos del año {año_excel} ordenados cronológicamente")
+                    log.info("- Totales anuales de entradas, salidas, autoconsumos y retiros")
+                    log.info("- Validación del inventario final vs InventarioContable")
+                    log.info("- Formato compatible con el Artículo 177 de la Ley de Impuesto Sobre la Renta")
+                else:
+                    log.info(f"✗ Error al generar el archivo Excel de {año_excel}")
             sys.exit(0)
         
         # Código existente para generar movimientos
@@ -2202,10 +2166,10 @@ if __name__ == "__main__":
         if año == 2024:
             valor_inicial = VALOR_INICIAL_2024
             valor_final = VALOR_FINAL_2024
-            print(f"Usando valores predefinidos para 2024:")
-            print(f"  Valor inicial (enero): {valor_inicial}")
-            print(f"  Valor final (diciembre): {valor_final}")
-            print(f"  Diferencia anual: {valor_final - valor_inicial}")
+            log.info(f"Usando valores predefinidos para 2024:")
+            log.info(f"  Valor inicial (enero): {valor_inicial}")
+            log.info(f"  Valor final (diciembre): {valor_final}")
+            log.info(f"  Diferencia anual: {valor_final - valor_inicial}")
         
         # Procesar argumentos adicionales si se proporcionaron
         if len(sys.argv) > 3:
@@ -2228,11 +2192,11 @@ if __name__ == "__main__":
                     """, (VALOR_INICIAL_2024,))
                     conn.commit()
                     conn.close()
-                    print(f"Ajustado valor inicial de enero 2024 a {VALOR_INICIAL_2024:.2f}")
+                    log.info(f"Ajustado valor inicial de enero 2024 a {VALOR_INICIAL_2024:.2f}")
                 
-                generar_movimientos_directo(año, mes)
+                generar_movimientos_directo(año, mes, semilla=semilla)
             else:
-                print("Error: El mes debe estar entre 1 y 12")
+                log.error("Error: El mes debe estar entre 1 y 12")
         else:
             # Si no se especifica mes, generar para todo el año
             if año == 2024:
@@ -2259,7 +2223,7 @@ if __name__ == "__main__":
                 
                 # Calcular factores de crecimiento (exponencial)
                 factor_mensual = (VALOR_FINAL_2024 / VALOR_INICIAL_2024) ** (1/12.0)
-                print(f"Factor de crecimiento mensual: {factor_mensual}")
+                log.info(f"Factor de crecimiento mensual: {factor_mensual}")
                 
                 # Calcular valores esperados para cada mes (final)
                 valores_finales = [VALOR_INICIAL_2024]
@@ -2286,23 +2250,24 @@ if __name__ == "__main__":
                         WHERE Periodo = ?
                     """, (valor_final_mes, f'{siguiente_mes:02d}/2024'))
                     
-                    print(f"Mes {mes:02d}: Final={valor_final_mes:.2f}")
-                    print(f"Mes {siguiente_mes:02d}: Inicial={valor_final_mes:.2f}")
+                    log.info(f"Mes {mes:02d}: Final={valor_final_mes:.2f}")
+                    log.info(f"Mes {siguiente_mes:02d}: Inicial={valor_final_mes:.2f}")
                 
                 conn.commit()
                 conn.close()
             
-            # 2. Ahora generar los movimientos para cada mes
+            # 2. Ahora generar los movimientos para cada mes con un único generador
+            rng = crear_generador(semilla)
             for mes in range(1, 13):
                 try:
-                    print(f"\nGenerando movimientos para el mes {mes}/2024...")
-                    generar_movimientos_directo(año, mes)
+                    log.info(f"Generando movimientos para el mes {mes}/2024...")
+                    generar_movimientos_directo(año, mes, rng=rng)
                 except Exception as e:
-                    print(f"Error generando movimientos para mes {mes}: {str(e)}")
+                    log.error(f"Error generando movimientos para mes {mes}: {str(e)}")
             
-            print(f"Generación completa para el año {año}")
+            log.info(f"Generación completa para el año {año}")
     
     except ValueError:
-        print("Error: El año y el mes deben ser números enteros")
+        log.error("Error: El año y el mes deben ser números enteros")
     except Exception as e:
-        print(f"Error: {str(e)}")
\ No newline at end of file
+        log.error(f"Error: {str(e)}")
\ No newline at end of file
@@ -0,0 +1,239 @@
+import numpy as np
+import pandas as pd
+
+from aleatorio import obtener_generador
+from generador_inventario_directo import seleccionar_productos, generar_ajuste_final, UNIDADES_REGISTRO_INICIAL
+from cuadre_exacto import cuadrar_cantidades
+from insercion_lotes import COLUMNAS_MOVINVENTMES
+from registro import obtener_registro
+
+log = obtener_registro('vectorizado')
+
+# Rangos de precios por categoría (mismos que calcular_precio_consistente)
+RANGOS_PRECIO = np.array([
+    (5.0, 25.0),     # Categoría 0: productos muy económicos
+    (20.0, 80.0),    # Categoría 1: productos económicos
+    (75.0, 150.0),   # Categoría 2: productos de precio medio
+    (140.0, 250.0),  # Categoría 3: productos de precio alto
+    (240.0, 500.0)   # Categoría 4: productos premium
+])
+
+# Existencia mínima que debe quedar tras cualquier salida (como el margen de 10 unidades del generador por fila)
+EXISTENCIA_MINIMA_TRAS_SALIDA = 10
+
+def calcular_precios_consistentes(precios_base, categorias, rng):
+    """
+    Versión vectorizada de calcular_precio_consistente
+
+    Args:
+        precios_base (np.ndarray): Precio base de cada producto
+        categorias (np.ndarray): Categoría de precio (0-4) de cada producto
+        rng (np.random.Generator): Generador de números aleatorios
+
+    Returns:
+        np.ndarray: Precios calculados, redondeados a 2 decimales
+    """
+    rango_min = RANGOS_PRECIO[categorias, 0]
+    rango_max = RANGOS_PRECIO[categorias, 1]
+    ancho = rango_max - rango_min
+
+    u = rng.random(len(precios_base))
+    en_rango = (precios_base >= rango_min) & (precios_base <= rango_max)
+    cerca_minimo = np.abs(precios_base - rango_min) < np.abs(precios_base - rango_max)
+
+    precios = np.where(
+        en_rango,
+        precios_base * (0.9 + 0.2 * u),  # Variación aleatoria de ±10%
+        np.where(cerca_minimo, rango_min + u * ancho * 0.4, rango_max - u * ancho * 0.4)
+    )
+    return np.round(precios, 2)
+
+def generar_movimientos_vectorizado(periodo, valor_inicial, valor_final, valor_inventario, catalogo,
+                                    existencias_previas, dias_habiles, rng=None, num_productos=None):
+    """
+    Genera los movimientos de MovInventMes de un período con operaciones NumPy sobre todos los productos
+
+    Equivale a generar_filas_mes, pero los días, las cantidades y la decisión entrada/salida
+    de todos los productos se sortean de una vez como matrices (producto x día). La restricción
+    de existencias se aplica con sumas acumuladas: si alguna salida dejaría al producto por debajo
+    de EXISTENCIA_MINIMA_TRAS_SALIDA, la diferencia se suma a su primera entrada del mes.
+    El valor final se cuadra con InventarioContable ajustando las cantidades (ver cuadre_exacto).
+
+    Args:
+        periodo (str): Período en formato MM/AAAA
+        valor_inicial (float): Valor inicial del período (InventarioContable.Inicial)
+        valor_final (float): Valor final objetivo del período (InventarioContable.Final)
+        valor_inventario (float): Valor del campo Inventario de cada registro
+        catalogo (Catalogo): Productos disponibles (ver obtener_productos)
+        existencias_previas (np.ndarray): Existencia de cada producto del catálogo al cierre del período anterior
+        dias_habiles (list): Días hábiles del mes
+        rng (np.random.Generator): Generador de números aleatorios de la ejecución
+        num_productos (int): Productos con movimientos en el mes; como todo el mes se genera con
+            matrices, puede ser el catálogo completo (por defecto el criterio de seleccionar_productos)
+
+    Returns:
+        pd.DataFrame: Movimientos con las columnas de COLUMNAS_MOVINVENTMES
+    """
+    rng = obtener_generador(rng)
+
+    diferencia = valor_final - valor_inicial
+    productos_seleccionados = seleccionar_productos(catalogo, existencias_previas, diferencia, rng=rng,
+                                                    num_productos=num_productos)
+
+    num_productos = len(productos_seleccionados)
+    num_dias = len(dias_habiles)
+    fechas = np.array(dias_habiles, dtype='datetime64[ns]')
+
+    codigos = catalogo.codigos[productos_seleccionados]
+    descripciones = catalogo.descripciones[productos_seleccionados]
+    precios_base = catalogo.precios[productos_seleccionados]
+    existencia_inicial = existencias_previas[productos_seleccionados].astype(np.int64)
+
+    # Valor total a distribuir entre los productos (mismo criterio que generar_filas_mes)
+    valor_distribuir = abs(diferencia) * 0.5
+    if diferencia > 0:
+        valor_total_productos = valor_distribuir + valor_inicial * 0.1
+    else:
+        valor_total_productos = max(valor_distribuir, valor_inicial * 0.05)
+
+    if num_productos:
+        valores_producto = np.round(rng.dirichlet(np.ones(num_productos)) * valor_total_productos, 2)
+    else:
+        valores_producto = np.zeros(0)
+    precios = calcular_precios_consistentes(precios_base, np.arange(num_productos) % 5, rng)
+
+    # Entrada inicial grande para productos con poca existencia
+    poca_existencia = existencia_inicial < 5
+    entrada_inicial_min = np.maximum(20, (valores_producto / (precios * 0.5)).astype(np.int64))
+    entrada_inicial = np.where(poca_existencia, rng.integers(entrada_inicial_min, entrada_inicial_min + 21), 0)
+    dia_entrada_inicial = 1 if num_dias > 1 else 0
+
+    # Número de movimientos adicionales por producto (aprox. 4x)
+    num_movimientos = np.where(
+        poca_existencia,
+        rng.integers(4, 13, size=num_productos),
+        rng.integers(8, 17, size=num_productos)
+    )
+
+    # Sortear los días de cada producto: claves aleatorias, excluyendo los primeros días ya usados
+    dias_inicio = np.where(poca_existencia, 2, 1)
+    indices_dia = np.arange(num_dias)
+    claves = rng.random((num_productos, num_dias))
+    claves[indices_dia[None, :] < dias_inicio[:, None]] = np.inf
+    rangos = np.argsort(np.argsort(claves, axis=1), axis=1)
+    dias_disponibles = np.maximum(0, num_dias - dias_inicio)
+    seleccionado = rangos < np.minimum(num_movimientos, dias_disponibles)[:, None]
+
+    # Orden de cada movimiento dentro del producto (0 = primero del mes)
+    orden = np.cumsum(seleccionado, axis=1) - 1
+    total_por_producto = seleccionado.sum(axis=1)
+    es_primero = seleccionado & (orden == 0)
+    es_ultimo = seleccionado & (orden == total_por_producto[:, None] - 1)
+
+    # Decisión entrada/salida: el primer movimiento siempre es entrada y el último nunca es solo salida
+    porcentaje_entradas = 0.7 if diferencia > 0 else 0.5
+    forma = (num_productos, num_dias)
+    entrada = seleccionado & ((rng.random(forma) < porcentaje_entradas) | es_primero)
+    salida = seleccionado & (rng.random(forma) < 0.6) & ~es_primero
+    entrada |= es_ultimo & salida
+    # Los días sin entrada ni salida reciben una entrada pequeña
+    entrada_pequeña = seleccionado & ~entrada & ~salida
+
+    cantidad_base = np.maximum(5, np.round(valores_producto / (precios * (num_movimientos + 1))))[:, None]
+    factor_entrada = np.where(salida, rng.uniform(1.0, 1.8, forma), rng.uniform(0.8, 1.5, forma))
+    factor_salida = np.where(entrada, rng.uniform(0.3, 0.7, forma), rng.uniform(0.3, 0.9, forma))
+
+    entradas = np.where(entrada, np.maximum(5, np.round(cantidad_base * factor_entrada)), 0)
+    entradas = np.where(entrada_pequeña, np.maximum(3, np.round(cantidad_base * 0.5)), entradas).astype(np.int64)
+    salidas = np.where(salida, np.maximum(1, np.round(cantidad_base * factor_salida)), 0).astype(np.int64)
+
+    # Restricción de existencias: la existencia tras cada salida no puede quedar bajo el mínimo
+    existencia_arranque = existencia_inicial + entrada_inicial
+    existencia_despues = existencia_arranque[:, None] + np.cumsum(entradas - salidas, axis=1)
+    minimo_tras_salida = np.where(salidas > 0, existencia_despues, np.iinfo(np.int64).max).min(axis=1)
+    deficit = np.maximum(0, EXISTENCIA_MINIMA_TRAS_SALIDA - minimo_tras_salida)
+    entradas += np.where(es_primero, deficit[:, None], 0)
+    existencia_despues += deficit[:, None] * (orden >= 0)
+    existencia_antes = existencia_despues - entradas + salidas
+
+    # LÓGICA DE PRUEBA: en los registros con salida, inicial = salida y final = entrada
+    con_salida = salidas > 0
+    inicial_db = np.where(con_salida, salidas, existencia_antes)
+    final_db = np.where(con_salida, entradas, existencia_despues)
+
+    # Filas de movimientos (producto, día) más las entradas iniciales, en orden producto -> día
+    filas_prod, filas_dia = np.nonzero(seleccionado)
+    iniciales_prod = np.flatnonzero(poca_existencia)
+    producto_idx = np.concatenate([iniciales_prod, filas_prod])
+    dia_idx = np.concatenate([np.full(len(iniciales_prod), dia_entrada_inicial), filas_dia])
+    es_inicial = np.concatenate([np.ones(len(iniciales_prod), dtype=bool), np.zeros(len(filas_prod), dtype=bool)])
+    orden_filas = np.lexsort((~es_inicial, dia_idx, producto_idx))
+    producto_idx, dia_idx, es_inicial = producto_idx[orden_filas], dia_idx[orden_filas], es_inicial[orden_filas]
+
+    movimientos = pd.DataFrame({
+        'Periodo': periodo,
+        'Codigo': codigos[producto_idx],
+        'inicial': np.where(es_inicial, existencia_inicial[producto_idx], inicial_db[producto_idx, dia_idx]),
+        'Costo': precios[producto_idx],
+        'Descripcion': descripciones[producto_idx],
+        'Entradas': np.where(es_inicial, entrada_inicial[producto_idx], entradas[producto_idx, dia_idx]),
+        'Salidas': np.where(es_inicial, 0, salidas[producto_idx, dia_idx]),
+        'AutoConsumo': 0,
+        'Retiros': 0,
+        'final': np.where(es_inicial, existencia_arranque[producto_idx], final_db[producto_idx, dia_idx]),
+        'Fecha': fechas[dia_idx],
+        'Inventario': valor_inventario
+    }, columns=list(COLUMNAS_MOVINVENTMES))
+
+    total_valor_entradas = float(np.round(movimientos['Entradas'] * movimientos['Costo'], 2).sum())
+    total_valor_salidas = float(np.round(movimientos['Salidas'] * movimientos['Costo'], 2).sum())
+
+    log.info(f"Generados {len(movimientos)} movimientos para {num_productos} productos")
+    log.info(f"Valor inicial: {valor_inicial:.2f}")
+    log.info(f"Total valor entradas: {total_valor_entradas:.2f}")
+    log.info(f"Total valor salidas: {total_valor_salidas:.2f}")
+    log.info(f"Valor final calculado: {valor_inicial + total_valor_entradas - total_valor_salidas:.2f}")
+    log.info(f"Valor final objetivo: {valor_final:.2f}")
+
+    # Cuadrar el valor final ajustando las cantidades de los movimientos generados
+    diferencia_final = valor_final - (valor_inicial + total_valor_entradas - total_valor_salidas)
+    entradas_cuadradas, salidas_cuadradas, inicial_cuadrada, final_cuadrada, residuo = cuadrar_cantidades(
+        movimientos['Codigo'].to_numpy(), movimientos['Entradas'].to_numpy(), movimientos['Salidas'].to_numpy(),
+        movimientos['inicial'].to_numpy(), movimientos['final'].to_numpy(), movimientos['Costo'].to_numpy(),
+        dict(zip(codigos, existencia_inicial.tolist())), diferencia_final
+    )
+    movimientos['Entradas'] = entradas_cuadradas
+    movimientos['Salidas'] = salidas_cuadradas
+    movimientos['inicial'] = inicial_cuadrada
+    movimientos['final'] = final_cuadrada
+    log.info(f"Cuadre de {periodo}: diferencia {diferencia_final:.2f}, {diferencia_final - residuo:.2f} cubiertos "
+             f"con cantidades de productos, {residuo:.2f} sin cubrir")
+
+    # Registro de inventario inicial (1 unidad con el valor monetario total) y ajuste por lo que no se cubrió
+    registro_inicial = pd.DataFrame([(
+        periodo, '0000000001', UNIDADES_REGISTRO_INICIAL, valor_inicial, 'INVENTARIO INICIAL MES ANTERIOR',
+        0, 0, 0, 0, UNIDADES_REGISTRO_INICIAL, dias_habiles[0], valor_inventario
+    )], columns=list(COLUMNAS_MOVINVENTMES))
+    ajustes = pd.DataFrame(generar_ajuste_final(periodo, residuo, dias_habiles, valor_inventario),
+                           columns=list(COLUMNAS_MOVINVENTMES))
+
+    partes = [parte for parte in (registro_inicial, movimientos, ajustes) if not parte.empty]
+    return pd.concat(partes, ignore_index=True)
+
+def dataframe_a_filas(movimientos):
+    """
+    Convierte el resultado columnar en tuplas con tipos nativos de Python, listas para executemany
+
+    Args:
+        movimientos (pd.DataFrame): Movimientos con las columnas de COLUMNAS_MOVINVENTMES
+
+    Returns:
+        list: Lista de tuplas en el orden de COLUMNAS_MOVINVENTMES
+    """
+    columnas = []
+    for columna in COLUMNAS_MOVINVENTMES:
+        if columna == 'Fecha':
+            columnas.append([fecha.to_pydatetime() for fecha in pd.to_datetime(movimientos[columna])])
+        else:
+            columnas.append(movimientos[columna].tolist())
+    return list(zip(*columnas))
@@ -0,0 +1,175 @@
+from base_datos import crear_punto_guardado, deshacer_hasta_punto_guardado, liberar_punto_guardado, pyodbc_importado
+from registro import obtener_registro
+
+log = obtener_registro('insercion_lotes')
+
+# Tamaño de lote por defecto para las inserciones masivas
+TAMAÑO_LOTE_PREDETERMINADO = 1000
+
+# Columnas de MovInventMes en el orden en que se generan las filas
+COLUMNAS_MOVINVENTMES = (
+    'Periodo', 'Codigo', 'inicial', 'Costo', 'Descripcion', 'Entradas',
+    'Salidas', 'AutoConsumo', 'Retiros', 'final', 'Fecha', 'Inventario'
+)
+
+SQL_INSERTAR_MOVINVENTMES = f"""
+    INSERT INTO MovInventMes
+    ({', '.join(COLUMNAS_MOVINVENTMES)})
+    VALUES ({', '.join('?' for _ in COLUMNAS_MOVINVENTMES)})
+"""
+
+# Tabla con la misma estructura que MovInventMes donde se prepara un mes antes de publicarlo
+TABLA_PREPARACION = 'MovInventMesPreparacion'
+
+SQL_INSERTAR_PREPARACION = f"""
+    INSERT INTO {TABLA_PREPARACION}
+    ({', '.join(COLUMNAS_MOVINVENTMES)})
+    VALUES ({', '.join('?' for _ in COLUMNAS_MOVINVENTMES)})
+"""
+
+# Estados SQLSTATE con los que un driver indica que no admite fast_executemany (arreglos de
+# parámetros): función o atributo no soportado, secuencia de llamadas o precisión no válidas
+ESTADOS_SIN_FAST_EXECUTEMANY = ('HYC00', 'HY010', 'HY024', 'HY092', 'HY104', 'IM001')
+
+def activar_fast_executemany(cursor):
+    """
+    Intenta activar fast_executemany en el cursor
+
+    Args:
+        cursor: Cursor de la base de datos
+
+    Returns:
+        bool: True si el driver/cursor admite fast_executemany, False en caso contrario
+    """
+    try:
+        cursor.fast_executemany = True
+        return bool(getattr(cursor, 'fast_executemany', False))
+    except Exception:
+        # sqlite3 no admite el atributo; pyodbc puede rechazarlo según el driver
+        return False
+
+def es_error_fast_executemany(error):
+    """
+    Indica si un error de executemany se debe a que el driver no admite fast_executemany
+
+    Los errores de los datos (restricciones, conversiones, truncamientos) no cuentan: con
+    executemany normal fallarían igual.
+
+    Args:
+        error (Exception): Error lanzado por executemany
+
+    Returns:
+        bool: True si el SQLSTATE del error está en ESTADOS_SIN_FAST_EXECUTEMANY
+    """
+    pyodbc = pyodbc_importado()
+    if pyodbc is None:
+        return False
+    if not isinstance(error, pyodbc.Error) or isinstance(error, (pyodbc.IntegrityError, pyodbc.DataError)):
+        return False
+    estado = str(error.args[0]) if error.args else ''
+    return estado in ESTADOS_SIN_FAST_EXECUTEMANY
+
+def insertar_en_lotes(cursor, sql, filas, tamaño_lote=TAMAÑO_LOTE_PREDETERMINADO, usar_fast_executemany=True):
+    """
+    Inserta una lista de filas usando executemany en bloques de tamaño fijo.
+
+    Si el driver no soporta fast_executemany (p. ej. el driver antiguo "SQL Server"),
+    el primer lote que falle por ese motivo (ver es_error_fast_executemany) se deshace
+    hasta el punto de guardado tomado antes del lote, se reintenta con executemany normal
+    y el resto de lotes continúa por esa vía. Cualquier otro error se propaga.
+
+    Args:
+        cursor: Cursor de la base de datos
+        sql (str): Sentencia INSERT parametrizada
+        filas (list): Lista de tuplas con los valores de cada fila
+        tamaño_lote (int): Número de filas por lote
+        usar_fast_executemany (bool): Si se intenta usar fast_executemany
+
+    Returns:
+        int: Número de filas insertadas
+    """
+    if not filas:
+        return 0
+
+    tamaño_lote = max(1, int(tamaño_lote))
+    rapido = usar_fast_executemany and activar_fast_executemany(cursor)
+
+    insertadas = 0
+    for inicio in range(0, len(filas), tamaño_lote):
+        lote = filas[inicio:inicio + tamaño_lote]
+        if not rapido:
+            cursor.executemany(sql, lote)
+            insertadas += len(lote)
+            continue
+
+        # Mientras se use fast_executemany, cada lote puede tener que repetirse: el punto de
+        # guardado permite deshacer las filas que el driver hubiera llegado a insertar
+        crear_punto_guardado(cursor, 'lote_rapido')
+        try:
+            cursor.executemany(sql, lote)
+        except Exception as e:
+            if not es_error_fast_executemany(e):
+                raise
+            deshacer_hasta_punto_guardado(cursor, 'lote_rapido')
+            log.info(f"fast_executemany no disponible ({str(e)}), usando executemany normal")
+            cursor.fast_executemany = False
+            rapido = False
+            cursor.executemany(sql, lote)
+        else:
+            liberar_punto_guardado(cursor, 'lote_rapido')
+        insertadas += len(lote)
+
+    return insertadas
+
+def insertar_aislando_rechazos(cursor, sql, filas, tamaño_lote=TAMAÑO_LOTE_PREDETERMINADO, usar_fast_executemany=True):
+    """
+    Inserta por lotes como insertar_en_lotes, pero un error no detiene la inserción
+
+    Cada lote se ejecuta dentro de un punto de guardado. Si falla, se deshace y se divide
+    en dos mitades que se reintentan por separado, hasta aislar las filas que fallan por sí
+    solas; esas filas se devuelven como rechazadas y el resto se inserta. Con k filas
+    erróneas en un lote de n filas hacen falta del orden de k·log2(n) sentencias adicionales.
+    Tras el primer error se deja de usar fast_executemany. No confirma la transacción.
+
+    Args:
+        cursor: Cursor de la base de datos
+        sql (str): Sentencia INSERT parametrizada
+        filas (list): Lista de tuplas con los valores de cada fila
+        tamaño_lote (int): Número de filas por lote
+        usar_fast_executemany (bool): Si se intenta usar fast_executemany
+
+    Returns:
+        tuple: (filas insertadas, lista de (posición en filas, mensaje de error) de las filas rechazadas)
+    """
+    rechazadas = []
+    if not filas:
+        return 0, rechazadas
+
+    tamaño_lote = max(1, int(tamaño_lote))
+    estado = {'rapido': usar_fast_executemany and activar_fast_executemany(cursor)}
+
+    def insertar(inicio, fin):
+        crear_punto_guardado(cursor, 'lote_insercion')
+        try:
+            cursor.executemany(sql, filas[inicio:fin])
+        except Exception as e:
+            deshacer_hasta_punto_guardado(cursor, 'lote_insercion')
+            if estado['rapido']:
+                # Puede ser el driver y no los datos: seguir con executemany normal
+                log.info(f"Error con fast_executemany ({str(e)}), se reintenta con executemany normal")
+                cursor.fast_executemany = False
+                estado['rapido'] = False
+                return insertar(inicio, fin)
+            if fin - inicio == 1:
+                rechazadas.append((inicio, str(e)))
+                return 0
+            mitad = (inicio + fin) // 2
+            return insertar(inicio, mitad) + insertar(mitad, fin)
+        liberar_punto_guardado(cursor, 'lote_insercion')
+        return fin - inicio
+
+    insertadas = 0
+    for inicio in range(0, len(filas), tamaño_lote):
+        insertadas += insertar(inicio, min(inicio + tamaño_lote, len(filas)))
+
+    return insertadas, rechazadas
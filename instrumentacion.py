@@ -0,0 +1,272 @@
+import functools
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+
+from registro import obtener_registro, RESUMEN
+
+log = obtener_registro('instrumentacion')
+
+# Mediciones abiertas en cada hilo (la más externa primero): un período dentro de un año, etc.
+_local = threading.local()
+
+def _abiertas():
+    abiertas = getattr(_local, 'mediciones', None)
+    if abiertas is None:
+        abiertas = _local.mediciones = []
+    return abiertas
+
+class Medicion:
+    """
+    Tiempos por fase y estadísticas de base de datos de una ejecución o de un período
+
+    Las fases, las sentencias y los contadores se registran en todas las mediciones abiertas
+    del hilo, de modo que la medición de un año acumula también lo medido en cada uno de sus meses.
+    """
+
+    def __init__(self, nombre):
+        self.nombre = nombre
+        self.fases = {}  # {fase: [veces, segundos]}
+        self.contadores = {}  # {evento: veces}, p. ej. ajustes aplicados dentro de un bucle
+        self.sentencias = 0
+        self.filas_leidas = 0
+        self.filas_escritas = 0
+        self.segundos_bd = 0.0
+        self.inicio = time.perf_counter()
+        self.segundos = None
+
+    def registrar_fase(self, fase, segundos):
+        acumulado = self.fases.setdefault(fase, [0, 0.0])
+        acumulado[0] += 1
+        acumulado[1] += segundos
+
+    def contar(self, evento, cantidad=1):
+        self.contadores[evento] = self.contadores.get(evento, 0) + cantidad
+
+    def registrar_sentencia(self, filas_escritas, segundos):
+        self.sentencias += 1
+        self.filas_escritas += filas_escritas
+        self.segundos_bd += segundos
+
+    def terminar(self):
+        self.segundos = time.perf_counter() - self.inicio
+
+    def resumen(self):
+        """
+        Resumen estructurado de la medición
+
+        Returns:
+            dict: Nombre, segundos totales, fases {fase: {'veces', 'segundos'}}, contadores y
+                estadísticas de base de datos (sentencias, filas leídas y escritas, segundos en la base de datos)
+        """
+        segundos = self.segundos if self.segundos is not None else time.perf_counter() - self.inicio
+        return {
+            'nombre': self.nombre,
+            'segundos': round(segundos, 4),
+            'fases': {fase: {'veces': veces, 'segundos': round(total, 4)}
+                      for fase, (veces, total) in self.fases.items()},
+            'contadores': dict(self.contadores),
+            'sentencias': self.sentencias,
+            'filas_leidas': self.filas_leidas,
+            'filas_escritas': self.filas_escritas,
+            'segundos_bd': round(self.segundos_bd, 4)
+        }
+
+    def texto(self):
+        """Resumen en una línea: total, fases en orden de aparición, contadores y estadísticas de base de datos"""
+        resumen = self.resumen()
+        fases = ', '.join(f"{fase} {datos['segundos']:.2f} s" + (f" (x{datos['veces']})" if datos['veces'] > 1 else "")
+                          for fase, datos in resumen['fases'].items())
+        contadores = ', '.join(f"{evento} {veces}" for evento, veces in self.contadores.items())
+        return (f"[{self.nombre}] {resumen['segundos']:.2f} s"
+                + (f" | {fases}" if fases else "")
+                + (f" | {contadores}" if contadores else "")
+                + f" | {self.sentencias} sentencias, {self.filas_leidas} filas leídas, "
+                  f"{self.filas_escritas} filas escritas, {self.segundos_bd:.2f} s en base de datos")
+
+# Resúmenes de las últimas mediciones terminadas (la más reciente al final)
+MAXIMO_RESUMENES = 100
+_resumenes = []
+_bloqueo_resumenes = threading.Lock()
+
+@contextmanager
+def medicion(nombre, mostrar=True):
+    """
+    Mide un bloque de trabajo (una ejecución, un año, un período)
+
+    Al terminar registra el resumen (nivel RESUMEN, con los datos estructurados en el
+    formato JSON) y lo guarda en ultimos_resumenes().
+
+    Args:
+        nombre (str): Nombre de la medición, p. ej. 'Período 03/2024'
+        mostrar (bool): Si se registra el resumen al terminar
+    """
+    actual = Medicion(nombre)
+    abiertas = _abiertas()
+    abiertas.append(actual)
+    try:
+        yield actual
+    finally:
+        abiertas.remove(actual)
+        actual.terminar()
+        with _bloqueo_resumenes:
+            _resumenes.append(actual.resumen())
+            del _resumenes[:-MAXIMO_RESUMENES]
+        if mostrar:
+            log.log(RESUMEN, actual.texto(), extra={'datos': actual.resumen()})
+
+def medido(nombre):
+    """
+    Decorador: ejecuta la función dentro de una medición
+
+    Args:
+        nombre (str): Plantilla del nombre con los argumentos de la función, p. ej. 'Período {mes:02d}/{año}'
+    """
+    def decorador(funcion):
+        firma = inspect.signature(funcion)
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            argumentos = firma.bind(*args, **kwargs)
+            argumentos.apply_defaults()
+            with medicion(nombre.format(**argumentos.arguments)):
+                return funcion(*args, **kwargs)
+        return envoltura
+    return decorador
+
+@contextmanager
+def fase(nombre):
+    """
+    Mide una fase dentro de las mediciones abiertas (sin mediciones abiertas no hace nada)
+
+    Args:
+        nombre (str): Nombre de la fase, p. ej. 'catalogo' o 'insercion'
+    """
+    abiertas = _abiertas()
+    if not abiertas:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        segundos = time.perf_counter() - inicio
+        for abierta in list(abiertas):
+            abierta.registrar_fase(nombre, segundos)
+
+class Etapas:
+    """
+    Fases consecutivas de un proceso largo: cada llamada a siguiente() cierra la fase
+    anterior y abre la nueva, sin anidar el código en bloques with.
+    """
+
+    def __init__(self):
+        self._fase = None
+        self._inicio = None
+
+    def siguiente(self, nombre):
+        """Termina la fase en curso (si hay una) y empieza la fase nombre"""
+        self.terminar()
+        self._fase = nombre
+        self._inicio = time.perf_counter()
+
+    def terminar(self):
+        """Termina la fase en curso"""
+        if self._fase is None:
+            return
+        segundos = time.perf_counter() - self._inicio
+        for abierta in list(_abiertas()):
+            abierta.registrar_fase(self._fase, segundos)
+        self._fase = None
+
+def contar(evento, cantidad=1):
+    """
+    Cuenta un evento en las mediciones abiertas (sin mediciones abiertas no hace nada)
+
+    Reemplaza a los mensajes que se repiten dentro de los bucles por producto: el total
+    aparece una sola vez en el resumen del período.
+
+    Args:
+        evento (str): Nombre del evento, p. ej. 'ajuste_valor_salida'
+        cantidad (int): Veces que ocurrió
+    """
+    for abierta in _abiertas():
+        abierta.contar(evento, cantidad)
+
+def ultimos_resumenes():
+    """Copia de los resúmenes de las últimas mediciones terminadas (ver Medicion.resumen)"""
+    with _bloqueo_resumenes:
+        return list(_resumenes)
+
+def _registrar_sentencia(filas_escritas, segundos):
+    for abierta in _abiertas():
+        abierta.registrar_sentencia(filas_escritas, segundos)
+
+def _registrar_lectura(filas):
+    for abierta in _abiertas():
+        abierta.filas_leidas += filas
+
+class CursorMedido:
+    """
+    Envoltura de un cursor que cuenta sentencias, filas y tiempo en la base de datos
+
+    Cada execute o executemany es un viaje a la base de datos; las filas escritas son
+    las afectadas por execute (rowcount) o el número de filas de executemany, y las
+    filas leídas las devueltas por fetchone, fetchmany y fetchall. El resto de atributos
+    (description, rowcount, fast_executemany...) se delegan en el cursor original.
+    """
+
+    def __init__(self, cursor, conexion=None):
+        object.__setattr__(self, '_cursor', cursor)
+        # Referencia a la conexión del pool para que no vuelva al pool mientras se usa el cursor
+        object.__setattr__(self, '_conexion', conexion)
+
+    def __getattr__(self, nombre):
+        return getattr(self._cursor, nombre)
+
+    def __setattr__(self, nombre, valor):
+        setattr(self._cursor, nombre, valor)
+
+    def __iter__(self):
+        for fila in self._cursor:
+            _registrar_lectura(1)
+            yield fila
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        self._cursor.close()
+        return False
+
+    def execute(self, sql, *parametros):
+        inicio = time.perf_counter()
+        self._cursor.execute(sql, *parametros)
+        filas = getattr(self._cursor, 'rowcount', -1)
+        _registrar_sentencia(filas if filas and filas > 0 else 0, time.perf_counter() - inicio)
+        return self
+
+    def executemany(self, sql, filas):
+        if not hasattr(filas, '__len__'):
+            filas = list(filas)
+        inicio = time.perf_counter()
+        self._cursor.executemany(sql, filas)
+        _registrar_sentencia(len(filas), time.perf_counter() - inicio)
+        return self
+
+    def fetchone(self):
+        fila = self._cursor.fetchone()
+        if fila is not None:
+            _registrar_lectura(1)
+        return fila
+
+    def fetchmany(self, *args):
+        filas = self._cursor.fetchmany(*args)
+        _registrar_lectura(len(filas))
+        return filas
+
+    def fetchall(self):
+        filas = self._cursor.fetchall()
+        _registrar_lectura(len(filas))
+        return filas
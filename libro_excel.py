@@ -0,0 +1,188 @@
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, Border, Side, PatternFill, NamedStyle
+from openpyxl.worksheet.cell_range import CellRange
+
+# Columnas (1-14) del libro auxiliar según el tipo de dato
+COLUMNAS_CANTIDAD = (3, 5, 7, 9, 11, 13)
+COLUMNAS_MONTO = (4, 6, 8, 10, 12, 14)
+
+FORMATO_CANTIDAD = '#,##0'
+FORMATO_MONTO = '#,##0.00'
+
+def _borde_fino():
+    return Border(
+        left=Side(style='thin'),
+        right=Side(style='thin'),
+        top=Side(style='thin'),
+        bottom=Side(style='thin')
+    )
+
+def _relleno(color):
+    return PatternFill(start_color=color, end_color=color, fill_type='solid')
+
+def _estilo(nombre, font, alineacion=None, borde=False, relleno=None, formato=None):
+    estilo = NamedStyle(name=nombre, font=font)
+    if alineacion:
+        estilo.alignment = Alignment(horizontal=alineacion, vertical='center')
+    if borde:
+        estilo.border = _borde_fino()
+    if relleno:
+        estilo.fill = _relleno(relleno)
+    if formato:
+        estilo.number_format = formato
+    return estilo
+
+def _estilos_tabla(familia, font, relleno=None):
+    """Estilos de una familia de filas de la tabla: fecha, texto, cantidad, monto y centro"""
+    return [
+        _estilo(f'{familia}_fecha', font, 'center', True, relleno),
+        _estilo(f'{familia}_texto', font, 'left', True, relleno),
+        _estilo(f'{familia}_cantidad', font, 'right', True, relleno, FORMATO_CANTIDAD),
+        _estilo(f'{familia}_monto', font, 'right', True, relleno, FORMATO_MONTO),
+        _estilo(f'{familia}_centro', font, 'center', True, relleno),
+    ]
+
+def crear_estilos():
+    """
+    Crea los estilos con nombre del libro auxiliar
+
+    Cada celda referencia uno de estos estilos por su nombre en lugar de llevar
+    sus propios objetos Font/Border/Alignment, de modo que el libro guarda
+    una sola copia de cada formato.
+
+    Returns:
+        list: Lista de NamedStyle para registrar en el libro
+    """
+    font_normal = Font(name='Arial', size=9)
+    font_totales = Font(name='Arial', size=9, bold=True)
+
+    estilos = [
+        _estilo('libro_titulo', Font(name='Arial', size=12, bold=True), 'center'),
+        _estilo('libro_subtitulo', Font(name='Arial', size=10, bold=True)),
+        _estilo('libro_subtitulo_centrado', Font(name='Arial', size=10, bold=True), 'center'),
+        _estilo('libro_normal', font_normal),
+        _estilo('libro_totales', font_totales),
+        _estilo('libro_encabezado', Font(name='Arial', size=10, bold=True), 'center', True, 'D9D9D9'),
+        _estilo('libro_mensaje', font_totales, 'center', False, 'E6E6E6'),
+        _estilo('libro_resumen_titulo', Font(name='Arial', size=12, bold=True)),
+        _estilo('libro_aviso', Font(name='Arial', size=10, bold=True, color='FF8000')),
+        _estilo('libro_aviso_detalle', Font(name='Arial', size=9, color='FF8000')),
+        _estilo('libro_nota', Font(name='Arial', size=9, color='0000FF')),
+        _estilo('libro_cuadre_ok', Font(name='Arial', size=11, bold=True, color='008000')),
+        _estilo('libro_cuadre_error', Font(name='Arial', size=11, bold=True, color='FF0000')),
+        _estilo('libro_variacion', Font(name='Arial', size=11, bold=True, color='0000FF')),
+    ]
+    estilos += _estilos_tabla('libro_inicial', font_totales, 'D9D9D9')
+    estilos += _estilos_tabla('libro_mov', font_normal)
+    estilos += _estilos_tabla('libro_ajuste', Font(name='Arial', size=9, bold=True, color='FF8000'), 'FFF2CC')
+    estilos += _estilos_tabla('libro_total', font_totales, 'E6E6E6')
+    return estilos
+
+def estilos_fila(familia):
+    """
+    Estilos por columna de una fila de movimiento (fecha, descripción, cantidades y montos)
+
+    Args:
+        familia (str): Familia de estilos ('libro_inicial', 'libro_mov', 'libro_ajuste')
+
+    Returns:
+        list: Nombre del estilo de cada una de las 14 columnas
+    """
+    estilos = []
+    for col in range(1, 15):
+        if col in COLUMNAS_CANTIDAD:
+            estilos.append(f'{familia}_cantidad')
+        elif col in COLUMNAS_MONTO:
+            estilos.append(f'{familia}_monto')
+        elif col == 2:
+            estilos.append(f'{familia}_texto')
+        else:
+            estilos.append(f'{familia}_fecha')
+    return estilos
+
+class EscritorLibro:
+    """
+    Escribe el libro auxiliar fila a fila.
+
+    En modo streaming usa un libro write_only de openpyxl: cada fila se vuelca
+    al archivo al agregarla, por lo que la memoria no crece con el número de
+    movimientos. Sin streaming se construye el libro completo en memoria con
+    las mismas filas y estilos.
+    """
+
+    def __init__(self, titulo, streaming=True):
+        """
+        Args:
+            titulo (str): Título de la hoja
+            streaming (bool): Si se usa un libro write_only (memoria constante)
+        """
+        self.streaming = streaming
+        self.wb = openpyxl.Workbook(write_only=streaming)
+        for estilo in crear_estilos():
+            self.wb.add_named_style(estilo)
+
+        if streaming:
+            self.ws = self.wb.create_sheet(titulo)
+        else:
+            self.ws = self.wb.active
+            self.ws.title = titulo
+        self.fila_actual = 0
+
+    def anchos_columna(self, anchos):
+        """Fija el ancho de las columnas (en streaming debe llamarse antes de escribir filas)"""
+        for i, ancho in enumerate(anchos, 1):
+            self.ws.column_dimensions[openpyxl.utils.get_column_letter(i)].width = ancho
+
+    def combinar(self, rango):
+        """Combina un rango de celdas, p. ej. 'C3:G3'"""
+        if self.streaming:
+            self.ws.merged_cells.add(CellRange(rango))
+        else:
+            self.ws.merge_cells(rango)
+
+    def escribir_fila(self, valores, estilos=None):
+        """
+        Agrega una fila al final de la hoja
+
+        Args:
+            valores (list): Valores de la fila (None deja la celda vacía)
+            estilos (str|list): Nombre de estilo para toda la fila o uno por columna (None = sin estilo)
+
+        Returns:
+            int: Número de la fila escrita
+        """
+        if estilos is None or isinstance(estilos, str):
+            estilos = [estilos] * len(valores)
+
+        if self.streaming:
+            celdas = []
+            for valor, estilo in zip(valores, estilos):
+                if estilo is None:
+                    celdas.append(valor)
+                else:
+                    celda = WriteOnlyCell(self.ws, value=valor)
+                    celda.style = estilo
+                    celdas.append(celda)
+            self.ws.append(celdas)
+        else:
+            self.ws.append(list(valores))
+            for col, estilo in enumerate(estilos, 1):
+                if estilo is not None:
+                    self.ws.cell(row=self.fila_actual + 1, column=col).style = estilo
+
+        self.fila_actual += 1
+        return self.fila_actual
+
+    def escribir_texto(self, texto, estilo=None):
+        """Agrega una fila con un único texto en la columna A"""
+        return self.escribir_fila([texto], estilo)
+
+    def saltar_filas(self, cantidad=1):
+        """Agrega filas vacías"""
+        for _ in range(cantidad):
+            self.escribir_fila([])
+
+    def guardar(self, nombre_archivo):
+        """Guarda el libro en disco"""
+        self.wb.save(nombre_archivo)
@@ -0,0 +1,208 @@
+from array import array
+from datetime import datetime
+from itertools import repeat
+
+import numpy as np
+
+# Columnas de MovInvent en el orden de las filas que se insertan
+COLUMNAS_MOVINVENT = (
+    'Product', 'Fecha', 'Tipo', 'Motivo', 'Cantidad_Actual',
+    'Cantidad', 'Co_Usuario', 'Codigo', 'Precio_Compra',
+    'Precio_venta', 'cantidad_nueva', 'autoriza',
+    'Documento', 'Anulada', 'Alicuota'
+)
+
+SQL_INSERTAR_MOVINVENT = f"""
+    INSERT INTO MovInvent ({', '.join(COLUMNAS_MOVINVENT)})
+    VALUES ({', '.join('?' for _ in COLUMNAS_MOVINVENT)})
+"""
+
+# Campos con el mismo valor en todos los movimientos generados: se guardan una sola vez
+CONSTANTES_MOVINVENT = {
+    'Co_Usuario': 'SUPERVISOR',
+    'autoriza': None,
+    'Anulada': 0,
+    'Alicuota': 16.0
+}
+
+# Límite del valor de cada movimiento al calcular los totales del mes
+MONTO_MAXIMO_MOVIMIENTO = 50000
+
+class LoteMovimientos:
+    """
+    Movimientos de MovInvent de un mes guardados por columnas
+
+    Cada movimiento ocupa una posición en columnas paralelas: las cantidades y precios en
+    arreglos de 8 bytes por valor, la combinación de tipo, motivo y documento fijo como una
+    clase de 1 byte, el número de documento (serie-correlativo) en dos enteros de 2 bytes y el
+    código y la fecha como referencias a objetos compartidos. Los campos constantes
+    (CONSTANTES_MOVINVENT) se guardan una sola vez para todo el lote y Product es siempre el Codigo.
+
+    Los totales de valor (inicial, entradas, salidas) se llevan al día en cada agregar, de
+    modo que consultarlos no recorre el lote; recalcular_totales los obtiene de nuevo desde
+    las columnas con NumPy para verificarlos. Por eso las columnas solo se llenan con agregar.
+
+    generar_movimientos llena el lote, calcular_totales_movimientos lee sus totales e
+    insertar_movimientos inserta directamente desde las columnas (ver filas).
+    """
+
+    __slots__ = ('codigos', 'fechas', 'clases', 'cantidades_actuales', 'cantidades', 'precios_compra',
+                 'precios_venta', 'cantidades_nuevas', 'series', 'correlativos', '_clases', '_indice_clases',
+                 'total_inicial', 'total_entradas', 'total_salidas')
+
+    def __init__(self):
+        self.codigos = []
+        self.fechas = []
+        self.clases = array('B')
+        self.cantidades_actuales = array('d')
+        self.cantidades = array('d')
+        self.precios_compra = array('d')
+        self.precios_venta = array('d')
+        self.cantidades_nuevas = array('d')
+        self.series = array('H')
+        self.correlativos = array('H')
+        self._clases = []  # [(tipo, motivo, documento fijo o None)]
+        self._indice_clases = {}
+        self.total_inicial = 0.0
+        self.total_entradas = 0.0
+        self.total_salidas = 0.0
+
+    def agregar(self, codigo, fecha, tipo, motivo, cantidad_actual, cantidad, precio_compra, precio_venta,
+                cantidad_nueva, documento=None, serie=0, correlativo=0):
+        """
+        Agrega un movimiento al final del lote
+
+        Args:
+            documento (str): Documento fijo (p. ej. 'AJUSTE-FINAL'); si es None el documento
+                es el número f"{serie}-{correlativo:03d}"
+            serie (int): Serie del documento numerado (hasta 65535)
+            correlativo (int): Correlativo del documento numerado (hasta 65535)
+        """
+        clave = (tipo, motivo, documento)
+        clase = self._indice_clases.get(clave)
+        if clase is None:
+            clase = self._indice_clases[clave] = len(self._clases)
+            self._clases.append(clave)
+        self.codigos.append(codigo)
+        self.fechas.append(fecha)
+        self.clases.append(clase)
+        self.cantidades_actuales.append(cantidad_actual)
+        self.cantidades.append(cantidad)
+        self.precios_compra.append(precio_compra)
+        self.precios_venta.append(precio_venta)
+        self.cantidades_nuevas.append(cantidad_nueva)
+        self.series.append(serie)
+        self.correlativos.append(correlativo)
+
+        # Totales incrementales, con las mismas reglas que recalcular_totales
+        if codigo == '0000000001':
+            if motivo == 'INVENTARIO INICIAL MES ANTERIOR':
+                self.total_inicial = float(precio_compra)
+        elif tipo == 'Ingreso':
+            self.total_entradas += min(float(precio_compra) * float(cantidad), MONTO_MAXIMO_MOVIMIENTO)
+        elif tipo == 'Egreso':
+            self.total_salidas += min(float(precio_venta) * float(cantidad), MONTO_MAXIMO_MOVIMIENTO)
+
+    def __len__(self):
+        return len(self.codigos)
+
+    def _documento(self, i):
+        documento = self._clases[self.clases[i]][2]
+        return documento if documento is not None else f"{self.series[i]}-{self.correlativos[i]:03d}"
+
+    def __getitem__(self, i):
+        """Movimiento i como diccionario con las columnas de MovInvent"""
+        tipo, motivo, _ = self._clases[self.clases[i]]
+        return {
+            'Product': self.codigos[i],
+            'Fecha': self.fechas[i],
+            'Tipo': tipo,
+            'Motivo': motivo,
+            'Cantidad_Actual': self.cantidades_actuales[i],
+            'Cantidad': self.cantidades[i],
+            'Co_Usuario': CONSTANTES_MOVINVENT['Co_Usuario'],
+            'Codigo': self.codigos[i],
+            'Precio_Compra': self.precios_compra[i],
+            'Precio_venta': self.precios_venta[i],
+            'cantidad_nueva': self.cantidades_nuevas[i],
+            'autoriza': CONSTANTES_MOVINVENT['autoriza'],
+            'Documento': self._documento(i),
+            'Anulada': CONSTANTES_MOVINVENT['Anulada'],
+            'Alicuota': CONSTANTES_MOVINVENT['Alicuota']
+        }
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def _mascara_clases(self, condicion):
+        """Máscara de los movimientos cuya clase (tipo, motivo, documento) cumple la condición"""
+        por_clase = np.array([condicion(*clave) for clave in self._clases], dtype=bool)
+        return por_clase[np.frombuffer(self.clases, dtype=np.uint8)]
+
+    def totales(self):
+        """
+        Totales de valor del lote, llevados al día en cada agregar (ver calcular_totales_movimientos)
+
+        Returns:
+            tuple: (inicial, entradas, salidas) sin limitar a cero
+        """
+        return self.total_inicial, self.total_entradas, self.total_salidas
+
+    def recalcular_totales(self):
+        """
+        Totales de valor del lote recalculados desde las columnas con reducciones de NumPy
+
+        El inicial es el precio del último registro de inventario inicial (código 0000000001);
+        las entradas y salidas suman los ingresos y egresos del resto de códigos, cada uno
+        limitado a MONTO_MAXIMO_MOVIMIENTO. Sirve para verificar los totales incrementales
+        (pueden diferir en el último decimal por el orden de la suma).
+
+        Returns:
+            tuple: (inicial, entradas, salidas) sin limitar a cero
+        """
+        if not len(self):
+            return 0.0, 0.0, 0.0
+        cantidades = np.frombuffer(self.cantidades, dtype=float)
+        precios_compra = np.frombuffer(self.precios_compra, dtype=float)
+        precios_venta = np.frombuffer(self.precios_venta, dtype=float)
+
+        es_principal = np.asarray(self.codigos, dtype=object) == '0000000001'
+        iniciales = np.flatnonzero(es_principal & self._mascara_clases(
+            lambda tipo, motivo, documento: motivo == 'INVENTARIO INICIAL MES ANTERIOR'))
+        inicial = float(precios_compra[iniciales[-1]]) if len(iniciales) else 0.0
+
+        # El código 0000000002 (ajustes) cuenta como cualquier otro según su tipo
+        es_ingreso = ~es_principal & self._mascara_clases(lambda tipo, motivo, documento: tipo == 'Ingreso')
+        es_egreso = ~es_principal & self._mascara_clases(lambda tipo, motivo, documento: tipo == 'Egreso')
+        entradas = np.minimum(precios_compra[es_ingreso] * cantidades[es_ingreso], MONTO_MAXIMO_MOVIMIENTO).sum()
+        salidas = np.minimum(precios_venta[es_egreso] * cantidades[es_egreso], MONTO_MAXIMO_MOVIMIENTO).sum()
+        return inicial, float(entradas), float(salidas)
+
+    def filas(self, inicio=0, fin=None):
+        """
+        Tuplas para executemany de los movimientos [inicio, fin), en el orden de COLUMNAS_MOVINVENT
+
+        Las fechas se truncan al día, como hacía CONVERT(datetime, 'YYYY-MM-DD', 120).
+
+        Args:
+            inicio (int): Primer movimiento
+            fin (int): Movimiento siguiente al último (por defecto, el final del lote)
+
+        Returns:
+            list: Lista de tuplas
+        """
+        fin = len(self) if fin is None else min(fin, len(self))
+        cantidad = max(0, fin - inicio)
+        codigos = self.codigos[inicio:fin]
+        fechas = [datetime(fecha.year, fecha.month, fecha.day) for fecha in self.fechas[inicio:fin]]
+        clases = [self._clases[clase] for clase in self.clases[inicio:fin]]
+        return list(zip(
+            codigos, fechas, [tipo for tipo, _, _ in clases], [motivo for _, motivo, _ in clases],
+            self.cantidades_actuales[inicio:fin].tolist(), self.cantidades[inicio:fin].tolist(),
+            repeat(CONSTANTES_MOVINVENT['Co_Usuario'], cantidad), codigos,
+            self.precios_compra[inicio:fin].tolist(), self.precios_venta[inicio:fin].tolist(),
+            self.cantidades_nuevas[inicio:fin].tolist(), repeat(CONSTANTES_MOVINVENT['autoriza'], cantidad),
+            [self._documento(i) for i in range(inicio, fin)], repeat(CONSTANTES_MOVINVENT['Anulada'], cantidad),
+            repeat(CONSTANTES_MOVINVENT['Alicuota'], cantidad)
+        ))
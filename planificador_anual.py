@@ -0,0 +1,274 @@
+import calendar
+import sys
+
+import numpy as np
+import pandas as pd
+
+from generador_inventario_directo import (
+    CADENA_CONEXION,
+    get_connection,
+    obtener_productos,
+    obtener_dias_habiles,
+    obtener_existencias_previas,
+    generar_filas_mes,
+    asegurar_no_negativos,
+    publicar_periodo,
+    inicializar_periodos_año,
+    recalcular_periodos_año,
+    verificar_coherencia_valores,
+    verificar_coherencia_año,
+)
+from generador_vectorizado import generar_movimientos_vectorizado, dataframe_a_filas
+from insercion_lotes import insertar_en_lotes, SQL_INSERTAR_PREPARACION, TABLA_PREPARACION, TAMAÑO_LOTE_PREDETERMINADO
+from base_datos import asegurar_tabla_preparacion
+from aleatorio import crear_generador
+from conexion import reiniciar_estadisticas_conexiones, imprimir_estadisticas_conexiones
+from instrumentacion import medicion
+from registro import obtener_registro, configurar_desde_argumentos, semilla_desde_argumentos
+
+log = obtener_registro('planificador')
+
+def obtener_periodos_año(año):
+    """
+    Obtiene en una sola consulta los valores de InventarioContable de los doce meses del año
+
+    Args:
+        año (int): Año a consultar
+
+    Returns:
+        dict: Diccionario {periodo: {'Inicial': float, 'Final': float}}
+    """
+    conn = get_connection()
+    query = """
+    SELECT Periodo, Inicial, Final
+    FROM InventarioContable
+    WHERE Periodo LIKE ?
+    """
+    df = pd.read_sql(query, conn, params=[f'__/{año}'])
+    conn.close()
+
+    periodos = {}
+    for periodo, inicial, final in df[['Periodo', 'Inicial', 'Final']].itertuples(index=False, name=None):
+        periodos[str(periodo).strip()] = {
+            'Inicial': float(inicial) if not pd.isna(inicial) else 0.0,
+            'Final': float(final) if not pd.isna(final) else 0.0
+        }
+    return periodos
+
+def existencias_desde_filas(filas, catalogo):
+    """
+    Calcula las existencias al cierre de un mes a partir de sus filas generadas,
+    con el mismo criterio que obtener_existencias_previas aplica sobre MovInventMes
+
+    Args:
+        filas (list): Filas del mes en el orden de COLUMNAS_MOVINVENTMES
+        catalogo (Catalogo): Productos disponibles (ver obtener_productos)
+
+    Returns:
+        np.ndarray: Existencia de cada producto del catálogo
+    """
+    existencias = np.zeros(len(catalogo), dtype=np.int64)
+    for fila in filas:
+        # El registro de inventario inicial y los ajustes genéricos no están en el catálogo
+        indice = catalogo.indice(fila[1])
+        if indice is None:
+            continue
+        # Asegurar que no haya existencias negativas en los datos previos
+        existencias[indice] = max(0, int(fila[9]))
+    return existencias
+
+def planificar_año(año, periodos, catalogo, existencias_iniciales, vectorizado=False, rng=None, num_productos=None):
+    """
+    Simula en memoria los doce meses del año arrastrando las existencias de cada producto
+
+    Args:
+        año (int): Año a planificar
+        periodos (dict): Valores de InventarioContable por período (ver obtener_periodos_año)
+        catalogo (Catalogo): Productos disponibles (ver obtener_productos)
+        existencias_iniciales (np.ndarray): Existencia de cada producto del catálogo al cierre del año anterior
+        vectorizado (bool): Si se usa el generador NumPy para cada mes
+        rng (np.random.Generator): Generador de números aleatorios de la ejecución
+        num_productos (int): Productos con movimientos en cada mes (ver seleccionar_productos)
+
+    Returns:
+        dict: Diccionario {periodo: filas} con los doce meses, o None si falta algún período
+    """
+    plan = {}
+    existencias = existencias_iniciales
+
+    for mes in range(1, 13):
+        periodo = f"{mes:02d}/{año}"
+        datos_periodo = periodos.get(periodo)
+        if datos_periodo is None:
+            log.error(f"Error: No se encontró el período {periodo} en InventarioContable")
+            return None
+
+        dias_habiles = obtener_dias_habiles(año, mes)
+        if not dias_habiles:
+            log.error(f"Error: No hay días hábiles para {periodo}")
+            return None
+
+        valor_inicial = datos_periodo['Inicial']
+        valor_final = datos_periodo['Final']
+
+        log.info(f"Planificando {calendar.month_name[mes]} {año}...")
+        log.info(f"Valor inicial: {valor_inicial:.2f}")
+        log.info(f"Valor final objetivo: {valor_final:.2f}")
+        log.info(f"Se arrastran {np.count_nonzero(existencias)} productos con existencias previas")
+
+        # El campo Inventario es el valor inicial del mes
+        with medicion(f"Planificar {periodo}"):
+            if vectorizado:
+                filas = dataframe_a_filas(generar_movimientos_vectorizado(
+                    periodo, valor_inicial, valor_final, valor_inicial,
+                    catalogo, existencias, dias_habiles, rng=rng, num_productos=num_productos
+                ))
+            else:
+                filas = generar_filas_mes(
+                    periodo, valor_inicial, valor_final, valor_inicial,
+                    catalogo, existencias, dias_habiles, rng=rng, num_productos=num_productos
+                )
+        plan[periodo] = filas
+        existencias = existencias_desde_filas(filas, catalogo)
+
+    return plan
+
+def persistir_año(año, plan, tamaño_lote=TAMAÑO_LOTE_PREDETERMINADO):
+    """
+    Guarda en una única transacción los movimientos planificados de todo el año
+
+    Igual que generar_movimientos_directo, los meses se escriben y se corrigen en la tabla
+    de preparación y se publican con publicar_periodo. Si algo falla se revierte la
+    transacción completa, de modo que el año queda como estaba antes de empezar.
+
+    Args:
+        año (int): Año planificado
+        plan (dict): Diccionario {periodo: filas} generado por planificar_año
+        tamaño_lote (int): Número de filas por lote de inserción
+
+    Returns:
+        bool: True si se guardó correctamente, False en caso contrario
+    """
+    conn = get_connection()
+    try:
+        asegurar_tabla_preparacion(conn, CADENA_CONEXION)
+        cursor = conn.cursor()
+        cursor.execute(f"DELETE FROM {TABLA_PREPARACION} WHERE Periodo LIKE ?", (f'__/{año}',))
+
+        periodos = sorted(plan, key=lambda p: int(p[:2]))
+        filas = [fila for periodo in periodos for fila in plan[periodo]]
+        total_insertadas = insertar_en_lotes(cursor, SQL_INSERTAR_PREPARACION, filas, tamaño_lote=tamaño_lote)
+        log.info(f"Insertados {total_insertadas} movimientos del año {año} en lotes de {tamaño_lote}")
+
+        # Verificar existencias negativas de cada mes dentro de la misma transacción
+        corregidos = 0
+        for periodo in periodos:
+            resumen_negativos = asegurar_no_negativos(conn, periodo, confirmar=False, tabla=TABLA_PREPARACION)
+            corregidos += resumen_negativos['registros_corregidos']
+        log.info(f"Registros corregidos por existencias negativas: {corregidos}")
+
+        # Publicar los doce meses en MovInventMes y MovPeridoMes y confirmar todo junto
+        for periodo in periodos:
+            publicar_periodo(conn, periodo, confirmar=False)
+
+        conn.commit()
+        return True
+
+    except Exception as e:
+        log.exception(f"Error al guardar el año {año}, se revierten todos los cambios: {str(e)}")
+        try:
+            conn.rollback()
+        except:
+            pass
+        return False
+
+    finally:
+        conn.close()
+
+def generar_año_planificado(año, valor_inicial_enero=None, valor_final_diciembre=None, tamaño_lote=TAMAÑO_LOTE_PREDETERMINADO,
+                            vectorizado=False, semilla=None, num_productos=None):
+    """
+    Genera los movimientos de todo un año planificándolos primero en memoria
+
+    A diferencia de generar_año_directo, el catálogo, los períodos de InventarioContable
+    y las existencias del año anterior se leen una sola vez; las existencias se arrastran
+    de un mes a otro en memoria y el año completo se guarda en una única transacción.
+
+    Args:
+        año (int): El año para generar movimientos
+        valor_inicial_enero (float): Valor inicial para enero (opcional)
+        valor_final_diciembre (float): Valor final para diciembre (opcional)
+        tamaño_lote (int): Número de filas por lote de inserción
+        vectorizado (bool): Si se usa el generador NumPy para cada mes
+        semilla (int): Semilla del año; con la misma semilla se regeneran exactamente los mismos movimientos
+        num_productos (int): Productos con movimientos en cada mes (ver seleccionar_productos)
+
+    Returns:
+        bool: True si se generó correctamente, False en caso contrario
+    """
+    try:
+        log.info(f"Generando movimientos planificados para el año {año}...")
+        reiniciar_estadisticas_conexiones()
+
+        # Inicializar los períodos con los valores requeridos
+        if valor_inicial_enero is not None or valor_final_diciembre is not None:
+            log.info(f"Inicializando valores de períodos para el año {año}...")
+            inicializar_periodos_año(año, valor_inicial_enero, valor_final_diciembre)
+
+        # Lecturas únicas: períodos del año, catálogo y existencias de diciembre anterior
+        periodos = obtener_periodos_año(año)
+        catalogo = obtener_productos()
+        if not catalogo:
+            log.error("Error: No hay productos disponibles en el inventario")
+            return False
+        existencias_iniciales = obtener_existencias_previas(año, 1, catalogo)
+        log.info(f"Se encontraron {np.count_nonzero(existencias_iniciales)} productos con existencias previas")
+
+        plan = planificar_año(año, periodos, catalogo, existencias_iniciales, vectorizado=vectorizado,
+                              rng=crear_generador(semilla), num_productos=num_productos)
+        if plan is None:
+            return False
+
+        log.info(f"Guardando el año {año} en una única transacción...")
+        if not persistir_año(año, plan, tamaño_lote=tamaño_lote):
+            return False
+
+        # Mismos pasos posteriores que generar_año_directo
+        verificar_coherencia_año(año)
+
+        log.info("Recalculando valores de InventarioContable...")
+        recalcular_periodos_año(año)
+
+        if valor_final_diciembre is not None:
+            conn = get_connection()
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE InventarioContable
+                SET Final = ?
+                WHERE Periodo = ?
+            """, (valor_final_diciembre, f'12/{año}'))
+            conn.commit()
+            conn.close()
+            log.info(f"Verificación final: Valor de diciembre {año} ajustado a {valor_final_diciembre:.2f}")
+            verificar_coherencia_valores(año, 12)
+
+        log.info(f"Generación planificada completa para el año {año}")
+        imprimir_estadisticas_conexiones()
+        return True
+
+    except Exception as e:
+        log.exception(f"Error en generar_año_planificado: {str(e)}")
+        return False
+
+if __name__ == "__main__":
+    # --semilla N: generar movimientos reproducibles
+    # --silencioso / --detalle / --json: nivel y formato de los mensajes (ver registro.py)
+    configurar_desde_argumentos(sys.argv)
+    semilla = semilla_desde_argumentos(sys.argv)
+
+    if len(sys.argv) > 1:
+        año = int(sys.argv[1])
+    else:
+        año = int(input("Ingrese el año para generar los movimientos: "))
+
+    generar_año_planificado(año, semilla=semilla)
@@ -0,0 +1,189 @@
+from base_datos import es_sqlite
+
+# Movimientos de MovInvent del rango agrupados por producto (tabla @MovimientosProducto del SP)
+SUBCONSULTA_MOVIMIENTOS_PRODUCTO = """
+    SELECT
+        m.Product AS Codigo,
+        SUM(CASE WHEN m.Tipo = 'Ingreso' THEN m.Cantidad ELSE 0 END) AS Entradas,
+        SUM(CASE WHEN m.Tipo = 'Ingreso' THEN m.Cantidad * m.Precio_Compra ELSE 0 END) AS EntradasValor,
+        SUM(CASE WHEN m.Tipo = 'Egreso' THEN m.Cantidad ELSE 0 END) AS Salidas,
+        SUM(CASE WHEN m.Tipo = 'Egreso' THEN m.Cantidad * m.Precio_venta ELSE 0 END) AS SalidasValor,
+        SUM(CASE WHEN m.Tipo = 'Consumo' THEN m.Cantidad ELSE 0 END) AS Autoconsumo,
+        SUM(CASE WHEN m.Tipo = 'Consumo' THEN m.Cantidad * m.Precio_Compra ELSE 0 END) AS AutoconsumoValor,
+        SUM(CASE WHEN m.Tipo = 'Retiro' THEN m.Cantidad ELSE 0 END) AS Retiros,
+        SUM(CASE WHEN m.Tipo = 'Retiro' THEN m.Cantidad * m.Precio_Compra ELSE 0 END) AS RetirosValor
+    FROM MovInvent m
+    WHERE m.Fecha BETWEEN ? AND ? AND m.Anulada = 0
+    GROUP BY m.Product
+"""
+
+def periodo_anterior(periodo):
+    """Período anterior a uno en formato MM/AAAA (diciembre del año anterior para enero)"""
+    mes, año = int(periodo[:2]), int(periodo[-4:])
+    if mes == 1:
+        return f"12/{año - 1}"
+    return f"{mes - 1:02d}/{año}"
+
+def sp_mov_unidades_mes(conn, periodo, desde, hasta, todos=True):
+    """
+    Versión en Python del procedimiento almacenado sp_MovUnidadesMes (ver sp.sql)
+
+    Reconstruye MovInventMes del período a partir de los movimientos de MovInvent entre
+    desde y hasta, cuadra el registro 0000000001 con InventarioContable y, si todos es
+    True, copia el resultado a MovPeridoMes. Usa solo SQL común a SQL Server y SQLite,
+    y todo se confirma en una única transacción, como en el procedimiento.
+
+    Args:
+        conn: Conexión abierta a la base de datos
+        periodo (str): Período en formato MM/AAAA
+        desde (datetime): Fecha de inicio del período
+        hasta (datetime): Fecha de fin del período
+        todos (bool): Si se genera también el resumen de MovPeridoMes
+
+    Returns:
+        bool: True si se procesó correctamente, False en caso de error
+    """
+    cursor = conn.cursor()
+    try:
+        mes_actual = int(periodo[:2])
+
+        # 1. LIMPIEZA INICIAL
+        cursor.execute("""
+            DELETE FROM MovInvent
+            WHERE Fecha BETWEEN ? AND ?
+              AND Product IN (SELECT CODIGO FROM Inventario WHERE Linea = 'SERVICIO')
+        """, (desde, hasta))
+        cursor.execute("""
+            UPDATE MovInvent
+            SET CANTIDAD_ACTUAL = 0
+            WHERE CANTIDAD_ACTUAL < 0 AND Fecha BETWEEN ? AND ?
+        """, (desde, hasta))
+
+        # 2. OBTENER VALORES DE INVENTARIO
+        cursor.execute("SELECT Inicial, Final FROM InventarioContable WHERE Periodo = ?", (periodo,))
+        row = cursor.fetchone()
+        if not row:
+            print(f"Error: No se encontró el período {periodo} en InventarioContable")
+            conn.rollback()
+            return False
+        inventario_inicial = float(row[0] or 0)
+        inventario_final = float(row[1] or 0)
+
+        # Para enero, el valor inicial es el final de diciembre del año anterior
+        if mes_actual == 1:
+            cursor.execute("SELECT Final FROM InventarioContable WHERE Periodo = ?", (periodo_anterior(periodo),))
+            row = cursor.fetchone()
+            if row and row[0] is not None:
+                inventario_inicial = float(row[0])
+                cursor.execute("UPDATE InventarioContable SET Inicial = ? WHERE Periodo = ?",
+                               (inventario_inicial, periodo))
+
+        # 4 y 5. LIMPIAR EL PERÍODO E INSERTAR EL REGISTRO DE INVENTARIO INICIAL
+        cursor.execute("DELETE FROM MovInventMes WHERE Periodo = ?", (periodo,))
+        cursor.execute("""
+            INSERT INTO MovInventMes (Periodo, Codigo, inicial, Costo, Descripcion, Entradas, Salidas, AutoConsumo, Retiros, final)
+            VALUES (?, '0000000001', ?, ?, 'INVENTARIO INICIAL MES ANTERIOR', 0, 0, 0, 0, ?)
+        """, (periodo, inventario_inicial, inventario_inicial, inventario_inicial))
+
+        # 6 y 7. INSERTAR PRODUCTOS CON SUS MOVIMIENTOS
+        cursor.execute(f"""
+            INSERT INTO MovInventMes (Periodo, Codigo, inicial, Costo, Descripcion, Entradas, Salidas, AutoConsumo, Retiros)
+            SELECT
+                ?,
+                i.CODIGO,
+                0,
+                i.COSTO_REFERENCIA,
+                CONCAT(i.CATEGORIA, ' ', i.TIPO, ' ', i.DESCRIPCION, ' ', i.MARCA),
+                COALESCE(mp.Entradas, 0),
+                COALESCE(mp.Salidas, 0),
+                COALESCE(mp.Autoconsumo, 0),
+                COALESCE(mp.Retiros, 0)
+            FROM Inventario i
+            INNER JOIN ({SUBCONSULTA_MOVIMIENTOS_PRODUCTO}) mp ON i.CODIGO = mp.Codigo
+            WHERE i.CODIGO <> '0000000001'
+        """, (periodo, desde, hasta))
+
+        # 8. CALCULAR TOTALES DE VALORES
+        cursor.execute(f"""
+            SELECT
+                COALESCE(SUM(EntradasValor), 0),
+                COALESCE(SUM(SalidasValor), 0),
+                COALESCE(SUM(AutoconsumoValor), 0),
+                COALESCE(SUM(RetirosValor), 0)
+            FROM ({SUBCONSULTA_MOVIMIENTOS_PRODUCTO}) mp
+        """, (desde, hasta))
+        total_entradas, total_salidas, total_autoconsumo, total_retiros = (float(valor) for valor in cursor.fetchone())
+
+        # 9. AJUSTAR ENTRADAS O SALIDAS DEL REGISTRO INICIAL PARA CUADRAR
+        valor_final_calculado = (inventario_inicial + total_entradas - total_salidas
+                                 - total_autoconsumo - total_retiros)
+        if abs(valor_final_calculado - inventario_final) > 1:
+            if valor_final_calculado < inventario_final:
+                cursor.execute("""
+                    UPDATE MovInventMes
+                    SET Entradas = ?
+                    WHERE Periodo = ? AND Codigo = '0000000001'
+                """, (inventario_final - valor_final_calculado, periodo))
+            else:
+                cursor.execute("""
+                    UPDATE MovInventMes
+                    SET Salidas = ?
+                    WHERE Periodo = ? AND Codigo = '0000000001'
+                """, (valor_final_calculado - inventario_final, periodo))
+
+        # 10. CÁLCULOS FINALES (sin existencias negativas)
+        cursor.execute("""
+            UPDATE MovInventMes
+            SET final = COALESCE(inicial, 0) + COALESCE(Entradas, 0) - COALESCE(Salidas, 0)
+                      - COALESCE(AutoConsumo, 0) - COALESCE(Retiros, 0)
+            WHERE Periodo = ?
+        """, (periodo,))
+        cursor.execute("UPDATE MovInventMes SET final = 0 WHERE final < 0 AND Periodo = ?", (periodo,))
+
+        # 11. EL REGISTRO PRINCIPAL CIERRA CON EL VALOR FINAL CONTABLE
+        cursor.execute("""
+            UPDATE MovInventMes
+            SET final = ?
+            WHERE Periodo = ? AND Codigo = '0000000001'
+        """, (inventario_final, periodo))
+
+        # 12. RESUMEN EN MOVPERIDOMES
+        if todos:
+            cursor.execute("DELETE FROM MovPeridoMes WHERE Periodo = ?", (periodo,))
+            cursor.execute("""
+                INSERT INTO MovPeridoMes (Periodo, Codigo, Descripcion, Costo, Inicial, Entradas, Salidas, AutoConsumo, Retiros)
+                SELECT Periodo, Codigo, Descripcion, Costo, Inicial, Entradas, Salidas, AutoConsumo, Retiros
+                FROM MovInventMes
+                WHERE Periodo = ?
+            """, (periodo,))
+
+        conn.commit()
+        return True
+
+    except Exception as e:
+        print(f"Error en sp_MovUnidadesMes para el período {periodo}: {str(e)}")
+        conn.rollback()
+        return False
+
+def ejecutar_sp_mov_unidades_mes(conn, periodo, desde, hasta, todos=True):
+    """
+    Ejecuta sp_MovUnidadesMes con el motor configurado
+
+    En SQL Server llama al procedimiento almacenado; en SQLite, que no tiene
+    procedimientos, usa la versión en Python (sp_mov_unidades_mes).
+
+    Returns:
+        bool: True si se procesó correctamente, False en caso de error
+    """
+    if es_sqlite():
+        return sp_mov_unidades_mes(conn, periodo, desde, hasta, todos)
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute("EXEC sp_MovUnidadesMes ?, ?, ?, ?", (periodo, desde, hasta, 1 if todos else 0))
+        conn.commit()
+        return True
+    except Exception as e:
+        print(f"Error en sp_MovUnidadesMes para el período {periodo}: {str(e)}")
+        conn.rollback()
+        return False
@@ -0,0 +1,161 @@
+import json
+import logging
+import os
+import sys
+import threading
+from datetime import datetime
+
+# Nivel de los resúmenes (por mes, por ejecución, estadísticas de conexiones): entre INFO y WARNING,
+# de modo que el modo silencioso los sigue mostrando
+RESUMEN = 25
+logging.addLevelName(RESUMEN, 'RESUMEN')
+
+NOMBRE_RAIZ = 'inventario'
+NIVELES = {
+    'detalle': logging.DEBUG,
+    'info': logging.INFO,
+    'silencioso': RESUMEN,
+    'error': logging.ERROR,
+}
+FORMATOS = ('texto', 'json')
+
+# Configuración por variables de entorno (configurar_registro tiene prioridad):
+#   INVENTARIO_LOG_NIVEL   = detalle | info (predeterminado) | silencioso | error
+#   INVENTARIO_LOG_FORMATO = texto (predeterminado) | json
+VARIABLE_NIVEL = 'INVENTARIO_LOG_NIVEL'
+VARIABLE_FORMATO = 'INVENTARIO_LOG_FORMATO'
+
+_configurado = False
+_bloqueo = threading.Lock()
+
+class _ManejadorConsola(logging.StreamHandler):
+    """Escribe en el sys.stdout vigente en cada mensaje (como print, respeta redirect_stdout)"""
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+class _FormatoTexto(logging.Formatter):
+    """Solo el mensaje, igual que los print que reemplaza; los avisos y errores llevan su nivel"""
+
+    def format(self, record):
+        mensaje = record.getMessage()
+        if record.levelno >= logging.WARNING and not mensaje.upper().startswith(('ERROR', 'ADVERTENCIA')):
+            mensaje = f"{'ERROR' if record.levelno >= logging.ERROR else 'ADVERTENCIA'}: {mensaje}"
+        if record.exc_info:
+            mensaje = f"{mensaje}\n{self.formatException(record.exc_info)}"
+        return mensaje
+
+class _FormatoJson(logging.Formatter):
+    """Un objeto JSON por línea; los resúmenes incluyen sus datos estructurados en 'datos'"""
+
+    def format(self, record):
+        registro = {
+            'tiempo': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'nivel': record.levelname,
+            'modulo': record.name,
+            'mensaje': record.getMessage(),
+        }
+        datos = getattr(record, 'datos', None)
+        if datos is not None:
+            registro['datos'] = datos
+        if record.exc_info:
+            registro['excepcion'] = self.formatException(record.exc_info)
+        return json.dumps(registro, ensure_ascii=False, default=str)
+
+def configurar_registro(nivel=None, formato=None):
+    """
+    Configura el nivel y el formato de los mensajes de los generadores
+
+    Args:
+        nivel (str): 'detalle' (incluye los mensajes por producto), 'info', 'silencioso'
+            (solo resúmenes, avisos y errores) o 'error'
+        formato (str): 'texto' o 'json' (un objeto por línea)
+    """
+    global _configurado
+    nivel = (nivel or os.environ.get(VARIABLE_NIVEL) or 'info').lower()
+    formato = (formato or os.environ.get(VARIABLE_FORMATO) or 'texto').lower()
+    if nivel not in NIVELES:
+        raise ValueError(f"Nivel de registro desconocido: {nivel} (opciones: {', '.join(NIVELES)})")
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato de registro desconocido: {formato} (opciones: {', '.join(FORMATOS)})")
+
+    with _bloqueo:
+        raiz = logging.getLogger(NOMBRE_RAIZ)
+        for manejador in list(raiz.handlers):
+            raiz.removeHandler(manejador)
+        manejador = _ManejadorConsola()
+        manejador.setFormatter(_FormatoJson() if formato == 'json' else _FormatoTexto())
+        raiz.addHandler(manejador)
+        raiz.setLevel(NIVELES[nivel])
+        raiz.propagate = False
+        _configurado = True
+
+def obtener_registro(nombre):
+    """
+    Logger de un módulo, configurado desde las variables de entorno la primera vez
+
+    Args:
+        nombre (str): Nombre corto del módulo, p. ej. 'directo'
+
+    Returns:
+        logging.Logger: Logger 'inventario.<nombre>'
+    """
+    if not _configurado:
+        configurar_registro()
+    return logging.getLogger(f"{NOMBRE_RAIZ}.{nombre}")
+
+def configurar_desde_argumentos(argumentos):
+    """
+    Aplica las opciones de registro de la línea de comandos y las quita de la lista
+
+    --silencioso: solo resúmenes, avisos y errores; --detalle: incluye los mensajes por
+    producto; --json: un objeto JSON por línea.
+
+    Args:
+        argumentos (list): Argumentos de la línea de comandos (p. ej. sys.argv), se modifican
+    """
+    nivel = None
+    formato = None
+    for opcion, valor in (('--silencioso', 'silencioso'), ('--detalle', 'detalle')):
+        if opcion in argumentos:
+            argumentos.remove(opcion)
+            nivel = valor
+    if '--json' in argumentos:
+        argumentos.remove('--json')
+        formato = 'json'
+    if nivel or formato:
+        configurar_registro(nivel, formato)
+
+def entero_desde_argumentos(argumentos, opcion):
+    """
+    Lee una opción entera de la línea de comandos (p. ej. --semilla 42) y la quita de la lista
+
+    Args:
+        argumentos (list): Argumentos de la línea de comandos (p. ej. sys.argv), se modifican
+        opcion (str): Nombre de la opción, con los guiones
+
+    Returns:
+        int: Valor de la opción, o None si no se indicó
+    """
+    if opcion not in argumentos:
+        return None
+    posicion = argumentos.index(opcion)
+    valor = int(argumentos[posicion + 1])
+    del argumentos[posicion:posicion + 2]
+    return valor
+
+def semilla_desde_argumentos(argumentos):
+    """
+    Lee --semilla N de la línea de comandos y la quita de la lista
+
+    Args:
+        argumentos (list): Argumentos de la línea de comandos (p. ej. sys.argv), se modifican
+
+    Returns:
+        int: Semilla para generar movimientos reproducibles, o None si no se indicó
+    """
+    return entero_desde_argumentos(argumentos, '--semilla')
@@ -0,0 +1,34 @@
+import os
+import sys
+
+import pytest
+
+# Los módulos del proyecto están en la raíz del repositorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PRODUCTOS_BASE_SINTETICA = 60
+
+@pytest.fixture
+def base_sintetica(tmp_path, monkeypatch):
+    """
+    Base SQLite sintética (ver benchmark.crear_base_sintetica) configurada como motor de las conexiones
+
+    Las copias en disco del catálogo se escriben en el directorio temporal de la prueba y
+    al terminar se cierran las conexiones del pool y se vuelve al motor por defecto.
+    """
+    import base_datos
+    import benchmark
+    import catalogo
+    import conexion
+
+    ruta = str(tmp_path / 'inventario.db')
+    benchmark.crear_base_sintetica(ruta, PRODUCTOS_BASE_SINTETICA)
+    base_datos.configurar_backend(base_datos.BACKEND_SQLITE, ruta)
+    monkeypatch.setattr(catalogo, 'DIRECTORIO_SNAPSHOTS', str(tmp_path / 'cache_catalogo'))
+    catalogo.limpiar_cache_catalogos()
+
+    yield ruta
+
+    conexion.cerrar_pools()
+    catalogo.limpiar_cache_catalogos()
+    base_datos._configuracion.clear()
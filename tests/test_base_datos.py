@@ -0,0 +1,27 @@
+import os
+
+import base_datos
+import benchmark
+
+def tablas(conn):
+    return {fila[0] for fila in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+def test_crea_el_esquema_en_un_archivo_nuevo(tmp_path):
+    conn = base_datos.conectar_sqlite(str(tmp_path / 'nueva.db'))
+
+    assert {'Inventario', 'InventarioContable', 'MovInvent', 'MovInventMes', 'MovInventMesPreparacion',
+            'MovPeridoMes'} <= tablas(conn)
+    conn.close()
+
+def test_vuelve_a_crear_el_esquema_si_el_archivo_se_borra(tmp_path):
+    ruta = str(tmp_path / 'recreada.db')
+    base_datos.conectar_sqlite(ruta).close()
+    os.remove(ruta)
+
+    # crear_base_sintetica también borra el archivo antes de abrirlo
+    benchmark.crear_base_sintetica(ruta, 5)
+    benchmark.crear_base_sintetica(ruta, 7)
+
+    conn = base_datos.conectar_sqlite(ruta)
+    assert conn.execute("SELECT COUNT(*) FROM Inventario").fetchone()[0] == 7
+    conn.close()
@@ -0,0 +1,70 @@
+import sqlite3
+
+import pytest
+
+import catalogo
+
+@pytest.fixture
+def cargas(base_sintetica, monkeypatch):
+    """Cuenta las lecturas completas de la tabla Inventario (las consultas de la marca no cuentan)"""
+    contador = {'cargas': 0}
+    cargar_original = catalogo.cargar_catalogo
+
+    def cargar_contando(conn):
+        contador['cargas'] += 1
+        return cargar_original(conn)
+
+    import generador_inventario_directo
+    monkeypatch.setattr(generador_inventario_directo, 'cargar_catalogo', cargar_contando)
+    return contador
+
+def obtener_productos():
+    from generador_inventario_directo import obtener_productos
+    return obtener_productos()
+
+def actualizar_inventario(ruta, sentencia, parametros=()):
+    conn = sqlite3.connect(ruta)
+    conn.execute(sentencia, parametros)
+    conn.commit()
+    conn.close()
+
+def test_no_vuelve_a_leer_si_la_tabla_no_cambio(cargas):
+    primero = obtener_productos()
+    segundo = obtener_productos()
+
+    assert cargas['cargas'] == 1
+    assert list(segundo.codigos) == list(primero.codigos)
+
+def test_un_cambio_en_inventario_invalida_la_cache(base_sintetica, cargas):
+    antes = obtener_productos()
+    codigo = antes.codigos[0]
+
+    actualizar_inventario(base_sintetica, "UPDATE Inventario SET PRECIO_COMPRA = 123.45 WHERE CODIGO = ?", (codigo,))
+    despues = obtener_productos()
+
+    assert cargas['cargas'] == 2
+    assert despues[despues.indice(codigo)]['precio'] == 123.45
+
+def test_productos_nuevos_o_sin_existencia_invalidan_la_cache(base_sintetica, cargas):
+    antes = obtener_productos()
+
+    actualizar_inventario(base_sintetica, "UPDATE Inventario SET EXISTENCIA = 0 WHERE CODIGO = ?", (antes.codigos[0],))
+    despues = obtener_productos()
+
+    assert cargas['cargas'] == 2
+    assert despues.indice(antes.codigos[0]) is None
+    assert len(despues) == len(antes) - 1
+
+def test_la_copia_en_disco_se_usa_entre_procesos_mientras_no_cambie(base_sintetica, cargas):
+    obtener_productos()
+    # Un proceso nuevo no tiene el catálogo en memoria, pero sí la copia en disco
+    catalogo.limpiar_cache_catalogos()
+    obtener_productos()
+    assert cargas['cargas'] == 1
+
+    catalogo.limpiar_cache_catalogos()
+    actualizar_inventario(base_sintetica, "UPDATE Inventario SET DESCRIPCION = 'OTRO' WHERE CODIGO = ?",
+                          (obtener_productos().codigos[0],))
+    catalogo.limpiar_cache_catalogos()
+    obtener_productos()
+    assert cargas['cargas'] == 2
@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+
+from cuadre_exacto import EXISTENCIA_MINIMA, a_centavos, buscar_combinacion_exacta, cuadrar_cantidades
+
+def mes_sintetico(productos=25, semilla=0):
+    """
+    Filas de un mes como las genera generar_filas_mes: el registro 0000000001 y, por producto,
+    una entrada, una salida y otra entrada. Las filas de solo entrada llevan la existencia real
+    (inicial y final) y las de salida guardan inicial = Salidas y final = 0.
+    """
+    rng = np.random.default_rng(semilla)
+    codigos, entradas, salidas, inicial, final, costos = ['0000000001'], [0], [0], [1], [1], [1000.00]
+    existencias = {}
+    for i in range(productos):
+        codigo = f'P{i:03d}'
+        existencia = existencias[codigo] = int(rng.integers(50, 150))
+        costo = round(float(rng.uniform(5, 300)), 2)
+        for tipo in ('entrada', 'salida', 'entrada'):
+            cantidad = int(rng.integers(5, 40))
+            if tipo == 'entrada':
+                fila = (cantidad, 0, existencia, existencia + cantidad)
+                existencia += cantidad
+            else:
+                fila = (0, cantidad, cantidad, 0)
+                existencia -= cantidad
+            for columna, valor in zip((codigos, entradas, salidas, inicial, final, costos), (codigo, *fila, costo)):
+                columna.append(valor)
+    return (np.array(codigos, dtype=object), np.array(entradas), np.array(salidas), np.array(inicial),
+            np.array(final), np.array(costos), existencias)
+
+CODIGOS, ENTRADAS, SALIDAS, INICIAL, FINAL, COSTOS, EXISTENCIAS_INICIALES = mes_sintetico()
+PRODUCTOS = sorted(EXISTENCIAS_INICIALES)
+
+def cuadrar(diferencia, costos=COSTOS):
+    return cuadrar_cantidades(CODIGOS, ENTRADAS, SALIDAS, INICIAL, FINAL, costos, EXISTENCIAS_INICIALES, diferencia)
+
+def cambio_de_valor(entradas, salidas, costos=COSTOS):
+    """Cambio del valor del mes, en centavos, respecto a las cantidades originales"""
+    return int((a_centavos(costos) * ((entradas - ENTRADAS) - (salidas - SALIDAS))).sum())
+
+def existencias_por_movimiento(codigo, entradas, salidas):
+    filas = np.flatnonzero(CODIGOS == codigo)
+    return EXISTENCIAS_INICIALES[codigo] + np.cumsum(entradas[filas] - salidas[filas])
+
+@pytest.mark.parametrize('diferencia', [1234.56, -2000.00, 0.01, -0.07])
+def test_cuadra_exactamente_con_cantidades(diferencia):
+    entradas, salidas, _, _, residuo = cuadrar(diferencia)
+
+    assert residuo == 0.0
+    assert cambio_de_valor(entradas, salidas) == round(diferencia * 100)
+
+def test_bajar_existencias_respeta_la_existencia_minima():
+    entradas, salidas, _, _, _ = cuadrar(-2000.00)
+
+    for codigo in PRODUCTOS:
+        assert existencias_por_movimiento(codigo, entradas, salidas).min() >= EXISTENCIA_MINIMA
+
+def test_existencias_registradas_siguen_a_las_cantidades():
+    entradas, salidas, inicial, final, _ = cuadrar(345.67)
+
+    solo_entrada = (salidas == 0) & (CODIGOS != '0000000001')
+    assert (final[solo_entrada] - inicial[solo_entrada] == entradas[solo_entrada]).all()
+    con_salida = salidas > 0
+    assert (inicial[con_salida] == salidas[con_salida]).all()
+    # La existencia inicial de cada fila de entrada es la que dejan los movimientos anteriores
+    for codigo in PRODUCTOS:
+        filas = np.flatnonzero(CODIGOS == codigo)
+        antes = np.r_[EXISTENCIAS_INICIALES[codigo], existencias_por_movimiento(codigo, entradas, salidas)[:-1]]
+        entrada = solo_entrada[filas]
+        assert (inicial[filas][entrada] == antes[entrada]).all()
+
+def test_no_modifica_los_codigos_reservados():
+    entradas, salidas, inicial, final, _ = cuadrar(500.00)
+
+    assert (entradas[0], salidas[0], inicial[0], final[0]) == (0, 0, 1, 1)
+
+def test_devuelve_lo_que_no_se_pudo_cubrir():
+    diferencia = 1_000_000.00
+    entradas, salidas, _, _, residuo = cuadrar(diferencia)
+
+    assert residuo > 0
+    assert cambio_de_valor(entradas, salidas) + round(residuo * 100) == round(diferencia * 100)
+
+def test_sin_diferencia_no_cambia_nada():
+    entradas, salidas, inicial, final, residuo = cuadrar(0.0)
+
+    assert residuo == 0.0
+    for obtenido, original in ((entradas, ENTRADAS), (salidas, SALIDAS), (inicial, INICIAL), (final, FINAL)):
+        assert (obtenido == original).all()
+
+def test_filas_sin_costo_no_cubren_nada():
+    costos = COSTOS.copy()
+    sin_costo = CODIGOS == PRODUCTOS[0]
+    costos[sin_costo] = 0.0
+    entradas, salidas, _, _, residuo = cuadrar(98.71, costos)
+
+    assert (entradas[sin_costo] == ENTRADAS[sin_costo]).all() and (salidas[sin_costo] == SALIDAS[sin_costo]).all()
+    assert cambio_de_valor(entradas, salidas, costos) + round(residuo * 100) == 9871
+
+def test_busqueda_exacta_usa_la_menor_cantidad_de_unidades():
+    costos = np.array([300, 500, 700])
+    holgura = np.array([5, 5, 5])
+
+    cambio = buscar_combinacion_exacta(1200, costos, holgura, holgura)
+
+    assert int((cambio * costos).sum()) == 1200
+    assert int(np.abs(cambio).sum()) == 2
+
+def test_busqueda_exacta_respeta_las_holguras():
+    costos = np.array([300])
+
+    assert buscar_combinacion_exacta(600, costos, np.array([1]), np.array([0])) is None
@@ -0,0 +1,69 @@
+import sqlite3
+
+import pytest
+
+# Año de la base sintética sin valores fijos en el código (2024 tiene sus propios objetivos)
+AÑO = 2025
+
+def leer_contable(ruta):
+    conn = sqlite3.connect(ruta)
+    try:
+        return {periodo: (inicial, final) for periodo, inicial, final in conn.execute(
+            "SELECT Periodo, Inicial, Final FROM InventarioContable")}
+    finally:
+        conn.close()
+
+def valor_de_los_movimientos(ruta, periodo):
+    """Valor inicial (registro 0000000001) más entradas menos salidas valoradas a su costo"""
+    conn = sqlite3.connect(ruta)
+    try:
+        return conn.execute("""
+            SELECT SUM(CASE WHEN Codigo = '0000000001' THEN Costo * final
+                            ELSE Costo * (Entradas - Salidas - AutoConsumo - Retiros) END)
+            FROM MovInventMes WHERE Periodo = ?
+        """, (periodo,)).fetchone()[0]
+    finally:
+        conn.close()
+
+def generar_directo(año, semilla):
+    from generador_inventario_directo import generar_año_directo
+    generar_año_directo(año, semilla=semilla)
+
+def generar_planificado(año, semilla):
+    from planificador_anual import generar_año_planificado
+    assert generar_año_planificado(año, semilla=semilla)
+
+@pytest.mark.parametrize('generar', [generar_directo, generar_planificado])
+def test_el_año_generado_conserva_los_objetivos_de_inventario_contable(base_sintetica, generar):
+    objetivos = leer_contable(base_sintetica)
+
+    generar(AÑO, semilla=7)
+
+    contable = leer_contable(base_sintetica)
+    final_anterior = objetivos[f"12/{AÑO - 1}"][1]
+    for mes in range(1, 13):
+        periodo = f"{mes:02d}/{AÑO}"
+        inicial, final = contable[periodo]
+        assert final == pytest.approx(objetivos[periodo][1], abs=0.005), periodo
+        assert inicial == pytest.approx(final_anterior, abs=0.005), periodo
+        assert valor_de_los_movimientos(base_sintetica, periodo) == pytest.approx(final, abs=0.005), periodo
+        final_anterior = final
+
+@pytest.mark.parametrize('generar', [generar_directo, generar_planificado])
+def test_los_meses_se_publican_desde_la_tabla_de_preparacion(base_sintetica, generar):
+    generar(AÑO, semilla=7)
+
+    conn = sqlite3.connect(base_sintetica)
+    try:
+        def filas_por_periodo(tabla):
+            return dict(conn.execute(f"SELECT Periodo, COUNT(*) FROM {tabla} WHERE Periodo LIKE ? GROUP BY Periodo",
+                                     (f"%/{AÑO}",)).fetchall())
+        movimientos = filas_por_periodo('MovInventMes')
+        resumen = filas_por_periodo('MovPeridoMes')
+        preparacion = filas_por_periodo('MovInventMesPreparacion')
+    finally:
+        conn.close()
+
+    assert sorted(movimientos) == [f"{mes:02d}/{AÑO}" for mes in range(1, 13)]
+    assert resumen == movimientos
+    assert preparacion == {}
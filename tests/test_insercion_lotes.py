@@ -0,0 +1,82 @@
+import pytest
+
+import base_datos
+from insercion_lotes import insertar_aislando_rechazos, insertar_en_lotes
+
+SQL_INSERTAR = "INSERT INTO Prueba (Codigo, Cantidad) VALUES (?, ?)"
+
+@pytest.fixture
+def conexion(tmp_path):
+    base_datos.configurar_backend(base_datos.BACKEND_SQLITE, str(tmp_path / 'insercion.db'))
+    conn = base_datos.conectar_sqlite(str(tmp_path / 'insercion.db'))
+    conn.execute("CREATE TABLE Prueba (Codigo VARCHAR(10) PRIMARY KEY, Cantidad INTEGER CHECK (Cantidad >= 0))")
+    conn.commit()
+    yield conn
+    conn.close()
+    base_datos._configuracion.clear()
+
+def contenido(conn):
+    return conn.execute("SELECT Codigo, Cantidad FROM Prueba ORDER BY Codigo").fetchall()
+
+def test_aisla_las_filas_rechazadas_e_inserta_el_resto(conexion):
+    filas = [(f'{i:04d}', i) for i in range(100)]
+    filas[7] = ('0007', -1)   # Viola el CHECK
+    filas[42] = ('0041', 5)   # Código repetido
+    filas[99] = ('0099', -3)
+
+    insertadas, rechazadas = insertar_aislando_rechazos(conexion.cursor(), SQL_INSERTAR, filas, tamaño_lote=16)
+    conexion.commit()
+
+    assert insertadas == 97
+    assert [posicion for posicion, _ in rechazadas] == [7, 42, 99]
+    assert all(mensaje for _, mensaje in rechazadas)
+    esperadas = [fila for i, fila in enumerate(filas) if i not in (7, 42, 99)]
+    assert contenido(conexion) == sorted(esperadas)
+
+def test_sin_rechazos_inserta_todo(conexion):
+    filas = [(f'{i:04d}', i) for i in range(10)]
+
+    assert insertar_aislando_rechazos(conexion.cursor(), SQL_INSERTAR, filas, tamaño_lote=3) == (10, [])
+    assert insertar_aislando_rechazos(conexion.cursor(), SQL_INSERTAR, []) == (0, [])
+
+def test_lote_completamente_rechazado(conexion):
+    filas = [(f'{i:04d}', -1) for i in range(5)]
+
+    insertadas, rechazadas = insertar_aislando_rechazos(conexion.cursor(), SQL_INSERTAR, filas, tamaño_lote=8)
+
+    assert insertadas == 0
+    assert [posicion for posicion, _ in rechazadas] == [0, 1, 2, 3, 4]
+    assert contenido(conexion) == []
+
+class CursorSinFastExecutemany:
+    """Cursor que, con fast_executemany, inserta parte del lote y falla como un driver que no lo admite"""
+
+    def __init__(self, cursor, error):
+        self.cursor = cursor
+        self.error = error
+        self.fast_executemany = False
+
+    def execute(self, *argumentos):
+        return self.cursor.execute(*argumentos)
+
+    def executemany(self, sql, filas):
+        if self.fast_executemany:
+            self.cursor.executemany(sql, filas[:2])
+            raise self.error
+        return self.cursor.executemany(sql, filas)
+
+def test_reintento_sin_fast_executemany_no_duplica_filas(conexion):
+    pyodbc = pytest.importorskip('pyodbc')
+    cursor = CursorSinFastExecutemany(conexion.cursor(), pyodbc.Error('HYC00', 'Optional feature not implemented'))
+    filas = [(f'{i:04d}', i) for i in range(10)]
+
+    assert insertar_en_lotes(cursor, SQL_INSERTAR, filas, tamaño_lote=4) == 10
+    assert cursor.fast_executemany is False
+    assert contenido(conexion) == filas
+
+def test_errores_de_datos_no_activan_el_reintento(conexion):
+    pyodbc = pytest.importorskip('pyodbc')
+    cursor = CursorSinFastExecutemany(conexion.cursor(), pyodbc.IntegrityError('23000', 'Violation of PRIMARY KEY'))
+
+    with pytest.raises(pyodbc.IntegrityError):
+        insertar_en_lotes(cursor, SQL_INSERTAR, [(f'{i:04d}', i) for i in range(10)], tamaño_lote=4)
@@ -0,0 +1,58 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from lote_movimientos import COLUMNAS_MOVINVENT, MONTO_MAXIMO_MOVIMIENTO, LoteMovimientos
+
+def lote_aleatorio(movimientos=500, semilla=0):
+    """Lote con el registro de inventario inicial, ingresos, egresos y algún ajuste 0000000002"""
+    rng = np.random.default_rng(semilla)
+    lote = LoteMovimientos()
+    lote.agregar('0000000001', datetime(2024, 1, 2), 'Ingreso', 'INVENTARIO INICIAL MES ANTERIOR', 0, 1,
+                 150000.0, 150000.0, 1, documento='INV-INICIAL')
+    for i in range(movimientos):
+        tipo = 'Ingreso' if rng.random() < 0.5 else 'Egreso'
+        codigo = '0000000002' if i % 97 == 0 else f'{1000 + int(rng.integers(0, 40)):010d}'
+        cantidad = float(rng.integers(1, 400))
+        lote.agregar(codigo, datetime(2024, 1, 1 + i % 28, 10, 30), tipo, 'COMPRA' if tipo == 'Ingreso' else 'VENTA',
+                     10.0, cantidad, round(float(rng.uniform(1, 300)), 2), round(float(rng.uniform(1, 400)), 2),
+                     10.0 + cantidad, serie=1 + i // 1000, correlativo=i % 1000)
+    return lote
+
+def test_totales_incrementales_coinciden_con_el_recalculo():
+    lote = lote_aleatorio()
+
+    assert lote.totales() == pytest.approx(lote.recalcular_totales(), rel=1e-12)
+
+def test_totales_limitan_cada_movimiento_y_toman_el_ultimo_inicial():
+    lote = LoteMovimientos()
+    fecha = datetime(2024, 3, 1)
+    lote.agregar('0000000001', fecha, 'Ingreso', 'INVENTARIO INICIAL MES ANTERIOR', 0, 1, 100.0, 100.0, 1)
+    lote.agregar('0000000001', fecha, 'Ingreso', 'INVENTARIO INICIAL MES ANTERIOR', 0, 1, 250.0, 250.0, 1)
+    lote.agregar('0000000005', fecha, 'Ingreso', 'COMPRA', 0, 1000, 80.0, 90.0, 1000)
+    lote.agregar('0000000005', fecha, 'Egreso', 'VENTA', 1000, 10, 80.0, 90.0, 990)
+
+    assert lote.totales() == (250.0, MONTO_MAXIMO_MOVIMIENTO, 900.0)
+    assert lote.recalcular_totales() == (250.0, MONTO_MAXIMO_MOVIMIENTO, 900.0)
+
+def test_lote_vacio():
+    lote = LoteMovimientos()
+
+    assert len(lote) == 0
+    assert lote.totales() == (0.0, 0.0, 0.0)
+    assert lote.recalcular_totales() == (0.0, 0.0, 0.0)
+    assert lote.filas() == []
+
+def test_filas_en_el_orden_de_las_columnas():
+    lote = lote_aleatorio(movimientos=20)
+
+    filas = lote.filas(1, 4)
+
+    assert len(filas) == 3
+    for i, fila in zip(range(1, 4), filas):
+        movimiento = lote[i]
+        esperado = dict(movimiento, Fecha=movimiento['Fecha'].replace(hour=0, minute=0))
+        assert dict(zip(COLUMNAS_MOVINVENT, fila)) == esperado
+    assert filas[0][COLUMNAS_MOVINVENT.index('Documento')] == '1-000'
+    assert lote[0]['Documento'] == 'INV-INICIAL'
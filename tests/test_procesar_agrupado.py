@@ -0,0 +1,55 @@
+import contextlib
+import io
+import shutil
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+CONSULTA_MOVINVENTMES = """
+    SELECT Periodo, Codigo, inicial, ROUND(Costo, 4), Entradas, Salidas, AutoConsumo, Retiros, final
+    FROM MovInventMes
+"""
+
+@pytest.fixture
+def base_con_movimientos(base_sintetica):
+    """Base sintética con los movimientos de enero de 2024 ya insertados en MovInvent"""
+    import conexion
+    import generador_inventario
+    from aleatorio import crear_generador
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        movimientos = generador_inventario.generar_movimientos(2024, 1, rng=crear_generador(1))
+        generador_inventario.insertar_movimientos(movimientos)
+    conexion.cerrar_pools()
+    return base_sintetica
+
+def procesar_copia(base, ruta, agrupado):
+    """Procesa enero de 2024 sobre una copia de la base y devuelve lo que quedó en las tablas del mes"""
+    import base_datos
+    import conexion
+    import generador_inventario
+
+    shutil.copy(base, ruta)
+    base_datos.configurar_backend(base_datos.BACKEND_SQLITE, ruta)
+    with contextlib.redirect_stdout(io.StringIO()):
+        exito = generador_inventario.procesar_movimientos_inventario(
+            '01/2024', datetime(2024, 1, 1), datetime(2024, 1, 31), agrupado=agrupado)
+    conexion.cerrar_pools()
+
+    conn = sqlite3.connect(ruta)
+    try:
+        filas = sorted(conn.execute(CONSULTA_MOVINVENTMES).fetchall(), key=repr)
+        periodos = conn.execute("SELECT COUNT(*) FROM MovPeridoMes").fetchone()[0]
+    finally:
+        conn.close()
+    return exito, filas, periodos
+
+def test_modo_agrupado_produce_lo_mismo_que_el_modo_por_fila(base_con_movimientos, tmp_path):
+    por_fila = procesar_copia(base_con_movimientos, str(tmp_path / 'por_fila.db'), agrupado=False)
+    agrupado = procesar_copia(base_con_movimientos, str(tmp_path / 'agrupado.db'), agrupado=True)
+
+    assert por_fila[0] and agrupado[0]
+    assert len(por_fila[1]) > 0
+    assert agrupado[1] == por_fila[1]
+    assert agrupado[2] == por_fila[2]
@@ -0,0 +1,59 @@
+import shutil
+import sqlite3
+
+import pytest
+
+import registro
+
+# Año de la base sintética sin valores fijos en el código
+AÑO = 2025
+
+def generar_directo(año, semilla):
+    from generador_inventario_directo import generar_año_directo
+    generar_año_directo(año, semilla=semilla)
+
+def generar_planificado(año, semilla):
+    from planificador_anual import generar_año_planificado
+    assert generar_año_planificado(año, semilla=semilla)
+
+def filas_del_año(ruta):
+    conn = sqlite3.connect(ruta)
+    try:
+        return sorted(conn.execute("SELECT * FROM MovInventMes WHERE Periodo LIKE ?", (f"%/{AÑO}",)).fetchall(),
+                      key=repr)
+    finally:
+        conn.close()
+
+def generar_en_copia(original, ruta, generar, semilla):
+    """Genera el año sobre una copia de la base original y devuelve las filas de MovInventMes"""
+    import base_datos
+    import catalogo
+    import conexion
+
+    shutil.copy(original, ruta)
+    conexion.cerrar_pools()
+    catalogo.limpiar_cache_catalogos()
+    base_datos.configurar_backend(base_datos.BACKEND_SQLITE, ruta)
+    generar(AÑO, semilla=semilla)
+    conexion.cerrar_pools()
+    return filas_del_año(ruta)
+
+@pytest.mark.parametrize('generar', [generar_directo, generar_planificado])
+def test_la_misma_semilla_regenera_las_mismas_filas(base_sintetica, tmp_path, generar):
+    original = str(tmp_path / 'original.db')
+    shutil.copy(base_sintetica, original)
+
+    primera = generar_en_copia(original, str(tmp_path / 'primera.db'), generar, semilla=7)
+    segunda = generar_en_copia(original, str(tmp_path / 'segunda.db'), generar, semilla=7)
+    otra = generar_en_copia(original, str(tmp_path / 'otra.db'), generar, semilla=8)
+
+    assert len(primera) > 12
+    assert segunda == primera
+    assert otra != primera
+
+def test_semilla_desde_argumentos_la_quita_de_la_lista():
+    argumentos = ['programa.py', '2025', '--semilla', '42', '--json']
+
+    assert registro.semilla_desde_argumentos(argumentos) == 42
+    assert argumentos == ['programa.py', '2025', '--json']
+    assert registro.semilla_desde_argumentos(argumentos) is None